@@ -8,7 +8,7 @@ Institution: IIT Madras BS in Data Science and Applications
 import os
 import logging
 from logging.handlers import RotatingFileHandler
-from flask import Flask, jsonify, send_from_directory
+from flask import Flask, jsonify
 from flask_cors import CORS
 from flask_migrate import Migrate
 
@@ -37,6 +37,9 @@ def create_app(config_name=None):
     # Register error handlers
     register_error_handlers(app)
     
+    # Register CLI commands
+    register_commands(app)
+    
     # Setup logging
     setup_logging(app)
     
@@ -50,7 +53,11 @@ def create_app(config_name=None):
 
 def initialize_extensions(app):
     """Initialize Flask extensions."""
+    # Backend-specific engine tuning (SQLite WAL/PRAGMAs, PostgreSQL pool)
+    from app.utils.engine_profiles import configure_engine_options, install_connect_hooks
+    configure_engine_options(app)
     db.init_app(app)
+    install_connect_hooks(app)
     migrate.init_app(app, db)
     
     # Setup Flask-Security
@@ -78,9 +85,28 @@ def initialize_extensions(app):
     # Setup cache
     cache.init_app(app)
     
+    # Setup principal cache used by the auth decorators
+    from app.utils.principal import principal_cache
+    principal_cache.configure(
+        maxsize=app.config['PRINCIPAL_CACHE_SIZE'],
+        ttl=app.config['PRINCIPAL_CACHE_TTL']
+    )
+    
     # Setup mail (optional)
     if app.config.get('MAIL_SERVER'):
         mail.init_app(app)
+    
+    # Per-request SQL and latency instrumentation (no-op unless enabled)
+    from app.utils.instrumentation import init_instrumentation
+    init_instrumentation(app)
+    
+    # Prometheus metrics (no-op unless enabled and prometheus_client is installed)
+    from app.utils.metrics import init_metrics
+    init_metrics(app)
+    
+    # Read replica routing (no-op unless SQLALCHEMY_REPLICA_URI is set)
+    from app.db_routing import init_replica_routing
+    init_replica_routing(app)
 
 
 def register_blueprints(app):
@@ -97,6 +123,7 @@ def register_blueprints(app):
     from app.api.dashboard import dashboard_bp
     from app.api.health import health_bp
     from app.api.tasks import tasks_bp
+    from app.api.debug import debug_bp
     
     # Register with /api prefix
     app.register_blueprint(health_bp, url_prefix='/api')
@@ -111,12 +138,14 @@ def register_blueprints(app):
     app.register_blueprint(notifications_bp, url_prefix='/api/notifications')
     app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
     app.register_blueprint(tasks_bp, url_prefix='/api/tasks')
+    app.register_blueprint(debug_bp, url_prefix='/api/debug')
     
-    # Route to serve uploaded files
+    # Route to serve uploaded files (signed URLs only, see sign_upload_url)
     @app.route('/uploads/<path:filename>')
     def serve_uploads(filename):
         """Serve uploaded files from the uploads directory."""
-        return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+        from app.services.upload_service import EvidenceUploadService
+        return EvidenceUploadService.send(filename)
 
 
 def register_error_handlers(app):
@@ -173,6 +202,77 @@ def register_error_handlers(app):
         }), 500
 
 
+def register_commands(app):
+    """Register maintenance commands with the Flask CLI."""
+    import click
+    
+    @app.cli.command('recount-counters')
+    @click.option('--dry-run', is_flag=True, help='Only report drift, do not repair.')
+    def recount_counters(dry_run):
+        """Recompute denormalized complaint counters."""
+        from app.services.task_service import TaskService
+        
+        result = TaskService.recount_complaint_counters(dry_run=dry_run)
+        if not result['success']:
+            raise click.ClickException(result['error'])
+        click.echo(
+            f"Checked {result['checked']} complaints, "
+            f"{result['drifted']} drifted, {result['repaired']} repaired."
+        )
+    
+    @app.cli.command('reconcile-stats')
+    @click.option('--dry-run', is_flag=True, help='Only report drift, do not repair.')
+    @click.option('--society-id', type=int, default=None, help='Limit to one society.')
+    def reconcile_stats(dry_run, society_id):
+        """Rebuild society statistics rollups that drifted."""
+        from app.services.task_service import TaskService
+        
+        result = TaskService.reconcile_society_stats(society_id=society_id, dry_run=dry_run)
+        if not result['success']:
+            raise click.ClickException(result['error'])
+        click.echo(
+            f"Checked {result['checked']} societies, "
+            f"{result['drifted']} drifted, {result['repaired']} repaired."
+        )
+    
+    @app.cli.command('rebuild-karma-aggregates')
+    @click.option('--batch-size', type=int, default=500, help='Users rebuilt per commit.')
+    def rebuild_karma_aggregates(batch_size):
+        """Recompute the monthly karma aggregates from the karma ledger."""
+        from app.services.task_service import TaskService
+        
+        result = TaskService.rebuild_karma_aggregates(batch_size=batch_size)
+        if not result['success']:
+            raise click.ClickException(result['error'])
+        click.echo(f"Rebuilt karma aggregates for {result['rebuilt']} users.")
+    
+    @app.cli.command('rebuild-search')
+    def rebuild_search():
+        """Recreate and fully rebuild the complaint search index."""
+        from app.services.search_service import ComplaintSearch
+        
+        backend = ComplaintSearch.rebuild()
+        click.echo(f"Rebuilt complaint search index ({backend}).")
+    
+    @app.cli.command('process-evidence')
+    def process_evidence():
+        """Generate metadata and thumbnails for pending evidence."""
+        from app.services.upload_service import EvidenceUploadService
+        
+        result = EvidenceUploadService.process_pending()
+        click.echo(f"Processed {result['processed']} evidence files ({result['failed']} failed).")
+    
+    @app.cli.command('gc-uploads')
+    @click.option('--dry-run', is_flag=True, help='Only report what would be removed.')
+    def gc_uploads(dry_run):
+        """Remove evidence files no complaint references any more."""
+        from app.services.upload_service import EvidenceUploadService
+        
+        result = EvidenceUploadService.collect_garbage(dry_run=dry_run)
+        verb = 'Would remove' if dry_run else 'Removed'
+        click.echo(f"{verb} {result['files']} files ({result['bytes']} bytes).")
+
+
 def setup_logging(app):
     """Setup logging configuration."""
     if not app.debug and not app.testing:
@@ -13,6 +13,7 @@ from app.api.escalations import escalations_bp
 from app.api.karma import karma_bp
 from app.api.notifications import notifications_bp
 from app.api.dashboard import dashboard_bp
+from app.api.debug import debug_bp
 
 __all__ = [
     'health_bp',
@@ -25,5 +26,6 @@ __all__ = [
     'escalations_bp',
     'karma_bp',
     'notifications_bp',
-    'dashboard_bp'
+    'dashboard_bp',
+    'debug_bp'
 ]
@@ -11,7 +11,7 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from app.extensions import db, limiter
 from app.models import User, Society, Role, user_datastore, Notification, NotificationType
 from app.utils import (
-    jwt_required_custom, get_current_user, validate_json,
+    jwt_required_custom, get_current_user, validate_json, invalidate_principal,
     APIResponse, validate_request,
     UserRegistrationSchema, UserLoginSchema, UserUpdateSchema
 )
@@ -206,6 +206,7 @@ def update_profile():
     
     try:
         db.session.commit()
+        invalidate_principal(user.id)
         return jsonify({
             'success': True,
             'message': 'Profile updated successfully',
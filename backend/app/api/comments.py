@@ -8,7 +8,7 @@ from app.extensions import db
 from app.models import Complaint, ComplaintComment, Notification, NotificationType
 from app.utils import (
     jwt_required_custom, get_current_user,
-    APIResponse, paginate_query, get_pagination_params,
+    APIResponse, paginate_query, get_pagination_params, get_cursor_params,
     validate_request, CommentSchema
 )
 
@@ -27,21 +27,22 @@ def get_complaint_comments(complaint_id):
         return APIResponse.error('Access denied', 403)
     
     page, per_page = get_pagination_params()
+    cursor, include_total = get_cursor_params()
     
     query = ComplaintComment.query.filter_by(complaint_id=complaint_id)\
         .order_by(ComplaintComment.created_at.desc())
     
-    pagination = paginate_query(query, page, per_page)
+    pagination = paginate_query(
+        query, page, per_page,
+        cursor=cursor,
+        keyset=(ComplaintComment.created_at, ComplaintComment.id),
+        include_total=include_total
+    )
     
     return jsonify({
         'success': True,
         'data': [c.to_dict(user) for c in pagination['items']],
-        'pagination': {
-            'total': pagination['total'],
-            'pages': pagination['pages'],
-            'page': pagination['page'],
-            'per_page': pagination['per_page']
-        }
+        'pagination': APIResponse.pagination_meta(pagination)
     }), 200
 
 
@@ -73,6 +74,7 @@ def add_comment(complaint_id):
         )
         
         db.session.add(comment)
+        complaint.adjust_counter('comments_count', 1)
         
         # Notify complainant about new comment (unless they're the commenter)
         if complaint.complainant_id != user.id:
@@ -124,6 +126,7 @@ def delete_comment(id):
         return APIResponse.error('You cannot delete this comment', 403)
     
     try:
+        comment.complaint.adjust_counter('comments_count', -1)
         db.session.delete(comment)
         db.session.commit()
         
@@ -2,23 +2,27 @@
 Complaints API - CRUD operations for complaints
 """
 
-from datetime import datetime
-from flask import Blueprint, request, jsonify, current_app
+from datetime import datetime, timedelta
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
 from sqlalchemy import or_, and_, desc
-from werkzeug.utils import secure_filename
 
 from app.extensions import db
 from app.models import (
     Complaint, ComplaintStatus, ComplaintCategory, ComplaintPriority,
-    User, Notification, NotificationType, KarmaLog, KarmaReason,
-    ComplaintEvidence
+    User, Notification, NotificationType, KarmaLog, KarmaReason
 )
 from app.utils import (
-    jwt_required_custom, get_current_user, same_society_required, committee_required,
-    APIResponse, paginate_query, get_pagination_params,
+    jwt_required_custom, get_current_user, get_current_principal, same_society_required,
+    committee_required, secretary_required,
+    APIResponse, paginate_query, get_pagination_params, get_cursor_params,
     validate_request, ComplaintCreateSchema, ComplaintUpdateSchema, ComplaintStatusUpdateSchema,
-    save_uploaded_file, allowed_file
+    allowed_file
 )
+from app.utils.engine_profiles import without_db_timeouts
+from app.services.notification_service import NotificationDispatcher
+from app.services.search_service import ComplaintSearch
+from app.services.export_service import ComplaintExporter
+from app.services.upload_service import EvidenceUploadService
 
 complaints_bp = Blueprint('complaints', __name__)
 
@@ -29,6 +33,7 @@ def list_complaints():
     """List complaints with filtering and pagination."""
     user = get_current_user()
     page, per_page = get_pagination_params()
+    cursor, include_total = get_cursor_params()
     
     # Start with base query for user's society
     query = Complaint.query.filter_by(society_id=user.society_id)
@@ -61,51 +66,115 @@ def list_complaints():
             )
         )
     
-    # Search
+    # Full-text search; words match as prefixes ('leak' finds 'leakage',
+    # 'A-10' finds 'A-101') unless search_prefix=false asks for whole words
     search = request.args.get('search', '').strip()
+    relevance = None
     if search:
-        search_filter = f'%{search}%'
-        query = query.filter(
-            or_(
-                Complaint.title.ilike(search_filter),
-                Complaint.description.ilike(search_filter),
-                Complaint.accused_flat.ilike(search_filter)
-            )
-        )
+        prefix = request.args.get('search_prefix', 'true').lower() != 'false'
+        query, relevance = ComplaintSearch.apply(query, search, prefix=prefix,
+                                                 society_id=user.society_id)
     
-    # Sorting
-    sort_by = request.args.get('sort_by', 'created_at')
+    # Sorting; searches rank by relevance unless another order is asked for
+    default_sort = 'relevance' if relevance is not None and cursor is None else 'created_at'
+    sort_by = request.args.get('sort_by', default_sort)
     sort_order = request.args.get('sort_order', 'desc')
     
-    if sort_by == 'support_count':
+    if sort_by == 'relevance' and relevance is not None:
+        order_col = None
+        query = query.order_by(relevance, Complaint.created_at.desc())
+    elif sort_by == 'support_count':
         order_col = Complaint.support_count
     elif sort_by == 'priority':
         order_col = Complaint.priority
     else:
         order_col = Complaint.created_at
     
-    if sort_order == 'asc':
+    if order_col is None:
+        pass
+    elif sort_order == 'asc':
         query = query.order_by(order_col.asc())
     else:
         query = query.order_by(order_col.desc())
     
+    # Cursor mode pages on (created_at, id), so it only applies to date sorting
+    if cursor is not None and order_col is not Complaint.created_at:
+        return APIResponse.error('Cursor pagination requires sort_by=created_at', 400)
+    
     # Paginate
-    pagination = paginate_query(query, page, per_page)
+    pagination = paginate_query(
+        query, page, per_page,
+        cursor=cursor,
+        keyset=(Complaint.created_at, Complaint.id),
+        include_total=include_total,
+        direction=sort_order
+    )
     
     return jsonify({
         'success': True,
-        'data': [c.to_list_dict(user) for c in pagination['items']],
-        'pagination': {
-            'total': pagination['total'],
-            'pages': pagination['pages'],
-            'page': pagination['page'],
-            'per_page': pagination['per_page'],
-            'has_next': pagination['has_next'],
-            'has_prev': pagination['has_prev']
-        }
+        'data': Complaint.to_list_dicts(pagination['items'], user),
+        'pagination': APIResponse.pagination_meta(pagination)
     }), 200
 
 
+@complaints_bp.route('/export', methods=['GET'])
+@without_db_timeouts
+@secretary_required
+def export_complaints():
+    """
+    Stream the society's complaints with comments and escalations.
+    
+    Query params: format=csv|ndjson, status (comma separated), category,
+    from / to (YYYY-MM-DD, inclusive). The body is gzip-encoded when the
+    client accepts it.
+    """
+    principal = get_current_principal()
+    
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in ('csv', 'ndjson'):
+        return APIResponse.error('format must be csv or ndjson', 400)
+    
+    statuses = [s for s in request.args.get('status', '').split(',') if s]
+    invalid = set(statuses) - {s.value for s in ComplaintStatus}
+    if invalid:
+        return APIResponse.error(f'Invalid status: {", ".join(sorted(invalid))}', 400)
+    
+    try:
+        date_from = request.args.get('from')
+        date_from = datetime.strptime(date_from, '%Y-%m-%d') if date_from else None
+        date_to = request.args.get('to')
+        date_to = datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1) if date_to else None
+    except ValueError:
+        return APIResponse.error('Dates must be YYYY-MM-DD', 400)
+    
+    chunks = ComplaintExporter.iter_records(
+        principal.society_id,
+        status=statuses,
+        category=request.args.get('category'),
+        date_from=date_from,
+        date_to=date_to
+    )
+    if export_format == 'csv':
+        body, mimetype = ComplaintExporter.iter_csv(chunks), 'text/csv'
+    else:
+        body, mimetype = ComplaintExporter.iter_ndjson(chunks), 'application/x-ndjson'
+    
+    filename = f'complaints-{principal.society_id}-{datetime.utcnow():%Y%m%d}.{export_format}'
+    headers = {
+        'Content-Disposition': f'attachment; filename={filename}',
+        'Cache-Control': 'no-store',
+        'Vary': 'Accept-Encoding',
+        'X-Accel-Buffering': 'no'
+    }
+    if 'gzip' in request.accept_encodings:
+        body = ComplaintExporter.gzip(body)
+        headers['Content-Encoding'] = 'gzip'
+    
+    # The request context (and its DB session) stays open while rows stream;
+    # a slow client leaves the transaction idle, hence without_db_timeouts
+    return Response(stream_with_context(body), mimetype=mimetype, headers=headers)
+
+
 @complaints_bp.route('/<int:id>', methods=['GET'])
 @jwt_required_custom
 @same_society_required
@@ -167,6 +236,16 @@ def create_complaint():
         if accused_user:
             accused_user_id = accused_user.id
     
+    # Copy evidence files to disk before the complaint insert, so no write
+    # transaction is open while they are received and written
+    staged_evidence = []
+    for file in request.files.getlist('evidence'):
+        if file and file.filename and allowed_file(file.filename):
+            try:
+                staged_evidence.append(EvidenceUploadService.stage(file))
+            except Exception as e:
+                current_app.logger.error(f'Failed to save evidence file: {str(e)}')
+    
     try:
         complaint = Complaint(
             title=data['title'].strip(),
@@ -184,28 +263,6 @@ def create_complaint():
         db.session.add(complaint)
         db.session.flush()  # Get the complaint ID
         
-        # Handle file uploads (evidence)
-        uploaded_evidence = []
-        if 'evidence' in request.files:
-            files = request.files.getlist('evidence')
-            for file in files:
-                if file and file.filename and allowed_file(file.filename):
-                    try:
-                        file_url, file_type = save_uploaded_file(file, f'evidence/{complaint.id}')
-                        if file_url:
-                            evidence = ComplaintEvidence(
-                                complaint_id=complaint.id,
-                                uploaded_by_id=user.id,
-                                file_url=file_url,
-                                file_type=file_type,
-                                file_name=secure_filename(file.filename),
-                                file_size=file.content_length or 0
-                            )
-                            db.session.add(evidence)
-                            uploaded_evidence.append(evidence)
-                    except Exception as e:
-                        current_app.logger.error(f'Failed to save evidence file: {str(e)}')
-        
         # Award karma for filing a complaint
         user.update_karma(
             KarmaLog.get_points_for_reason(KarmaReason.COMPLAINT_FILED),
@@ -227,7 +284,7 @@ def create_complaint():
         
         # Notify society secretary about high priority complaints
         if data.get('priority') in ['high', 'critical']:
-            secretaries = User.query.join(User.roles).filter(
+            secretary_ids = db.session.query(User.id).filter(
                 User.society_id == user.society_id,
                 User.active == True
             ).filter(
@@ -237,28 +294,36 @@ def create_complaint():
                 )
             ).all()
             
-            for secretary in secretaries:
-                Notification.create_notification(
-                    user_id=secretary.id,
-                    title='High Priority Complaint Filed',
-                    message=f'A {data["priority"]} priority complaint "{complaint.title}" requires attention',
-                    notification_type=NotificationType.COMPLAINT,
-                    complaint_id=complaint.id,
-                    action_url=f'/complaints/{complaint.id}'
-                )
+            NotificationDispatcher.notify_many(
+                [secretary_id for (secretary_id,) in secretary_ids],
+                title='High Priority Complaint Filed',
+                message=f'A {data["priority"]} priority complaint "{complaint.title}" requires attention',
+                notification_type=NotificationType.COMPLAINT,
+                complaint_id=complaint.id,
+                action_url=f'/complaints/{complaint.id}'
+            )
         
         db.session.commit()
         
-        return jsonify({
-            'success': True,
-            'message': 'Complaint filed successfully',
-            'data': complaint.to_dict(current_user=user)
-        }), 201
-        
     except Exception as e:
         db.session.rollback()
+        EvidenceUploadService.discard(staged_evidence)
         current_app.logger.error(f'Create complaint error: {str(e)}')
         return APIResponse.error('Failed to file complaint', 500)
+    
+    # Evidence is recorded in its own transaction; the complaint stands
+    # even if attaching its files fails
+    if staged_evidence:
+        try:
+            EvidenceUploadService.attach(complaint.id, user.id, staged_evidence)
+        except Exception as e:
+            current_app.logger.error(f'Failed to attach evidence to complaint {complaint.id}: {str(e)}')
+    
+    return jsonify({
+        'success': True,
+        'message': 'Complaint filed successfully',
+        'data': complaint.to_dict(current_user=user)
+    }), 201
 
 
 @complaints_bp.route('/<int:id>', methods=['PUT'])
@@ -364,6 +429,7 @@ def update_complaint_status(id):
                 # Check for repeat offender
                 resolved_against = Complaint.query.filter(
                     Complaint.accused_user_id == complaint.accused_user_id,
+                    Complaint.society_id == complaint.society_id,
                     Complaint.status == ComplaintStatus.RESOLVED.value
                 ).count()
                 
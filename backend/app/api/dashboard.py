@@ -9,11 +9,12 @@ from sqlalchemy import func, and_
 from app.extensions import db
 from app.models import (
     Complaint, ComplaintStatus, ComplaintCategory,
-    User, Notification, KarmaLog
+    User, Notification, KarmaLog, SocietyStat
 )
+from app.services.dashboard_service import DashboardService
 from app.utils import (
-    jwt_required_custom, get_current_user, secretary_required,
-    APIResponse
+    jwt_required_custom, get_current_user, get_current_principal,
+    secretary_required, APIResponse
 )
 
 dashboard_bp = Blueprint('dashboard', __name__)
@@ -22,77 +23,19 @@ dashboard_bp = Blueprint('dashboard', __name__)
 @dashboard_bp.route('/stats', methods=['GET'])
 @jwt_required_custom
 def get_dashboard_stats():
-    """Get dashboard statistics for current user."""
-    user = get_current_user()
-    society_id = user.society_id
-    
-    # Get complaint counts
-    total_complaints_open = Complaint.query.filter(
-        Complaint.society_id == society_id,
-        Complaint.status.in_([
-            ComplaintStatus.OPEN.value,
-            ComplaintStatus.ACKNOWLEDGED.value,
-            ComplaintStatus.IN_PROGRESS.value,
-            ComplaintStatus.ESCALATED.value
-        ])
-    ).count()
-    
-    total_complaints_resolved = Complaint.query.filter(
-        Complaint.society_id == society_id,
-        Complaint.status == ComplaintStatus.RESOLVED.value
-    ).count()
+    """
+    Get dashboard statistics for current user.
     
-    my_complaints_count = user.complaints_filed.count()
-    
-    complaints_against_me = Complaint.query.filter(
-        db.or_(
-            Complaint.accused_user_id == user.id,
-            Complaint.accused_flat == user.flat_number
-        )
-    ).count()
-    
-    # Get society karma average
-    society_karma_avg = db.session.query(func.avg(User.karma_score)).filter(
-        User.society_id == society_id,
-        User.active == True
-    ).scalar() or 0
-    
-    # Get recent activity (last 7 days)
-    week_ago = datetime.utcnow() - timedelta(days=7)
-    
-    new_complaints_this_week = Complaint.query.filter(
-        Complaint.society_id == society_id,
-        Complaint.created_at >= week_ago
-    ).count()
-    
-    resolved_this_week = Complaint.query.filter(
-        Complaint.society_id == society_id,
-        Complaint.resolved_at >= week_ago
-    ).count()
-    
-    # My karma change this week
-    my_karma_change = db.session.query(func.sum(KarmaLog.points)).filter(
-        KarmaLog.user_id == user.id,
-        KarmaLog.created_at >= week_ago
-    ).scalar() or 0
-    
-    # Unread notifications count
-    unread_notifications = Notification.get_unread_count(user.id)
+    complaints_against_me counts complaints in the caller's society that
+    accuse them or their flat, the same set the against_me list filter
+    returns; complaints about a flat with the same number in another
+    society are not included.
+    """
+    principal = get_current_principal()
     
     return jsonify({
         'success': True,
-        'data': {
-            'total_complaints_open': total_complaints_open,
-            'total_complaints_resolved': total_complaints_resolved,
-            'my_complaints_count': my_complaints_count,
-            'complaints_against_me': complaints_against_me,
-            'my_karma': user.karma_score,
-            'my_karma_change_this_week': my_karma_change,
-            'society_karma_average': round(society_karma_avg, 2),
-            'new_complaints_this_week': new_complaints_this_week,
-            'resolved_this_week': resolved_this_week,
-            'unread_notifications': unread_notifications
-        }
+        'data': DashboardService.get_stats(principal.user_id, principal.society_id)
     }), 200
 
 
@@ -103,46 +46,8 @@ def get_society_stats():
     user = get_current_user()
     society_id = user.society_id
     
-    # Category-wise complaints
-    category_stats = db.session.query(
-        Complaint.category,
-        func.count(Complaint.id).label('count')
-    ).filter(Complaint.society_id == society_id)\
-     .group_by(Complaint.category).all()
-    
-    # Status-wise complaints
-    status_stats = db.session.query(
-        Complaint.status,
-        func.count(Complaint.id).label('count')
-    ).filter(Complaint.society_id == society_id)\
-     .group_by(Complaint.status).all()
-    
-    # Priority-wise complaints
-    priority_stats = db.session.query(
-        Complaint.priority,
-        func.count(Complaint.id).label('count')
-    ).filter(
-        Complaint.society_id == society_id,
-        Complaint.status.notin_([ComplaintStatus.RESOLVED.value, ComplaintStatus.CLOSED.value])
-    ).group_by(Complaint.priority).all()
-    
-    # Resolution rate
-    total_complaints = Complaint.query.filter_by(society_id=society_id).count()
-    resolved_complaints = Complaint.query.filter_by(
-        society_id=society_id,
-        status=ComplaintStatus.RESOLVED.value
-    ).count()
-    resolution_rate = (resolved_complaints / total_complaints * 100) if total_complaints > 0 else 0
-    
-    # Average resolution time (for resolved complaints)
-    avg_resolution_time = db.session.query(
-        func.avg(
-            func.julianday(Complaint.resolved_at) - func.julianday(Complaint.created_at)
-        )
-    ).filter(
-        Complaint.society_id == society_id,
-        Complaint.resolved_at.isnot(None)
-    ).scalar() or 0
+    # Counts, resolution rate and resolution time from the society rollup
+    rollup = SocietyStat.get_rollup(society_id)
     
     # Repeat offenders (users with 3+ resolved complaints against them)
     repeat_offenders = db.session.query(
@@ -173,29 +78,21 @@ def get_society_stats():
      .limit(10).all()
     
     # Monthly trends (last 6 months)
-    six_months_ago = datetime.utcnow() - timedelta(days=180)
-    monthly_trends = db.session.query(
-        func.strftime('%Y-%m', Complaint.created_at).label('month'),
-        func.count(Complaint.id).label('total'),
-        func.sum(
-            db.case((Complaint.status == ComplaintStatus.RESOLVED.value, 1), else_=0)
-        ).label('resolved')
-    ).filter(
-        Complaint.society_id == society_id,
-        Complaint.created_at >= six_months_ago
-    ).group_by(func.strftime('%Y-%m', Complaint.created_at))\
-     .order_by(func.strftime('%Y-%m', Complaint.created_at)).all()
+    first_month = (datetime.utcnow() - timedelta(days=180)).strftime('%Y-%m')
+    monthly_trends = sorted(
+        (month, total) for month, total in rollup['month'].items() if month >= first_month
+    )
     
     return jsonify({
         'success': True,
         'data': {
-            'category_wise': {stat.category: stat.count for stat in category_stats},
-            'status_wise': {stat.status: stat.count for stat in status_stats},
-            'priority_wise': {stat.priority: stat.count for stat in priority_stats},
-            'resolution_rate': round(resolution_rate, 2),
-            'average_resolution_days': round(avg_resolution_time, 1),
-            'total_complaints': total_complaints,
-            'resolved_complaints': resolved_complaints,
+            'category_wise': rollup['category'],
+            'status_wise': rollup['status'],
+            'priority_wise': rollup['open_priority'],
+            'resolution_rate': round(rollup['resolution_rate'], 2),
+            'average_resolution_days': round(rollup['average_resolution_days'], 1),
+            'total_complaints': rollup['total'],
+            'resolved_complaints': rollup['resolved'],
             'repeat_offenders': [
                 {
                     'id': r.id,
@@ -215,10 +112,10 @@ def get_society_stats():
             ],
             'monthly_trends': [
                 {
-                    'month': t.month,
-                    'total': t.total,
-                    'resolved': t.resolved or 0
-                } for t in monthly_trends
+                    'month': month,
+                    'total': total,
+                    'resolved': rollup['month_resolved'].get(month, 0)
+                } for month, total in monthly_trends
             ]
         }
     }), 200
@@ -248,7 +145,7 @@ def get_recent_activity():
     return jsonify({
         'success': True,
         'data': {
-            'recent_complaints': [c.to_list_dict(user) for c in recent_complaints],
-            'recent_resolutions': [c.to_list_dict(user) for c in recent_resolutions]
+            'recent_complaints': Complaint.to_list_dicts(recent_complaints, user),
+            'recent_resolutions': Complaint.to_list_dicts(recent_resolutions, user)
         }
     }), 200
@@ -0,0 +1,35 @@
+"""
+Debug API - Request instrumentation for administrators
+"""
+
+from flask import Blueprint, jsonify, current_app
+
+from app.utils import admin_required, APIResponse
+from app.utils.instrumentation import route_metrics
+
+debug_bp = Blueprint('debug', __name__)
+
+
+@debug_bp.route('/metrics', methods=['GET'])
+@admin_required
+def get_metrics():
+    """Rolling per-route latency histograms, query counts and slowest statements."""
+    if not current_app.config.get('INSTRUMENTATION_ENABLED'):
+        return APIResponse.error('Instrumentation is disabled (set INSTRUMENTATION_ENABLED)', 404)
+    
+    return jsonify({
+        'success': True,
+        'data': {
+            'window_seconds': route_metrics.window,
+            'n_plus_one_threshold': current_app.config.get('INSTRUMENTATION_N_PLUS_ONE_THRESHOLD'),
+            'routes': route_metrics.snapshot()
+        }
+    }), 200
+
+
+@debug_bp.route('/metrics', methods=['DELETE'])
+@admin_required
+def reset_metrics():
+    """Start a fresh measurement window."""
+    route_metrics.reset()
+    return jsonify({'success': True, 'message': 'Metrics reset'}), 200
@@ -14,6 +14,7 @@ from app.utils import (
     APIResponse, paginate_query, get_pagination_params,
     validate_request, EscalationSchema
 )
+from app.services.notification_service import NotificationDispatcher
 
 escalations_bp = Blueprint('escalations', __name__)
 
@@ -40,15 +41,21 @@ def list_escalations():
     if level:
         query = query.filter(Escalation.escalated_to == level)
     
-    query = query.order_by(Escalation.escalated_at.desc())
+    query = query.options(
+        db.contains_eager(Escalation.complaint),
+        db.selectinload(Escalation.escalated_by_user)
+    ).order_by(Escalation.escalated_at.desc())
     pagination = paginate_query(query, page, per_page)
     
+    escalations = pagination['items']
+    complaint_dicts = Complaint.to_list_dicts([e.complaint for e in escalations], user)
+    
     return jsonify({
         'success': True,
         'data': [{
             **e.to_dict(),
-            'complaint': e.complaint.to_list_dict(user)
-        } for e in pagination['items']],
+            'complaint': complaint_dict
+        } for e, complaint_dict in zip(escalations, complaint_dicts)],
         'pagination': {
             'total': pagination['total'],
             'pages': pagination['pages'],
@@ -96,6 +103,7 @@ def escalate_complaint(complaint_id):
         complaint.updated_at = db.func.now()
         
         db.session.add(escalation)
+        complaint.adjust_counter('escalations_count', 1)
         
         # Find and notify appropriate users based on escalation level
         target_roles = {
@@ -108,21 +116,20 @@ def escalate_complaint(complaint_id):
         
         # Get users to notify
         from sqlalchemy import or_
-        targets = User.query.join(User.roles).filter(
+        target_ids = db.session.query(User.id).filter(
             User.society_id == user.society_id,
             User.active == True,
             or_(*[User.roles.any(name=role) for role in roles_to_notify])
         ).all()
         
-        for target in targets:
-            Notification.create_notification(
-                user_id=target.id,
-                title=f'Complaint Escalated to {data["escalate_to"].title()}',
-                message=f'Complaint "{complaint.title}" has been escalated. Reason: {data["reason"][:100]}...',
-                notification_type=NotificationType.ESCALATION,
-                complaint_id=complaint.id,
-                action_url=f'/complaints/{complaint.id}'
-            )
+        NotificationDispatcher.notify_many(
+            [target_id for (target_id,) in target_ids],
+            title=f'Complaint Escalated to {data["escalate_to"].title()}',
+            message=f'Complaint "{complaint.title}" has been escalated. Reason: {data["reason"][:100]}...',
+            notification_type=NotificationType.ESCALATION,
+            complaint_id=complaint.id,
+            action_url=f'/complaints/{complaint.id}'
+        )
         
         # Notify complainant about escalation
         if complaint.complainant_id != user.id:
@@ -3,34 +3,40 @@ Evidence API - File upload and management for complaints
 """
 
 import os
+import re
 from flask import Blueprint, request, jsonify, current_app, send_from_directory
-from werkzeug.utils import secure_filename
 
 from app.extensions import db
 from app.models import Complaint, ComplaintEvidence
+from app.services.upload_service import EvidenceUploadService
 from app.utils import (
     jwt_required_custom, get_current_user, same_society_required,
-    APIResponse, save_uploaded_file, delete_uploaded_file, allowed_file
+    APIResponse, allowed_file
 )
 
 evidence_bp = Blueprint('evidence', __name__)
 
 
+def _same_society(complaint, user):
+    """Evidence is visible within the complaint's society (admins see every society)."""
+    return complaint.society_id == user.society_id or user.is_admin()
+
+
 @evidence_bp.route('', methods=['POST'])
 @jwt_required_custom
 def upload_evidence():
     """Upload evidence for a complaint."""
-    user = get_current_user()
-    
     complaint_id = request.form.get('complaint_id')
     if not complaint_id:
         return APIResponse.error('Complaint ID is required', 400)
+    try:
+        complaint_id = int(complaint_id)
+    except ValueError:
+        return APIResponse.error('Invalid complaint ID', 400)
     
-    complaint = Complaint.query.get_or_404(int(complaint_id))
-    
-    # Verify user can add evidence (complainant or committee)
-    if complaint.complainant_id != user.id and not user.is_committee_member():
-        return APIResponse.error('You cannot add evidence to this complaint', 403)
+    content_hash = request.form.get('content_hash', '').lower()
+    if content_hash and 'file' not in request.files:
+        return attach_by_hash(complaint_id, content_hash)
     
     if 'file' not in request.files:
         return APIResponse.error('No file provided', 400)
@@ -42,29 +48,39 @@ def upload_evidence():
     if not allowed_file(file.filename):
         return APIResponse.error('File type not allowed', 400)
     
+    user = get_current_user()
+    complaint = Complaint.query.get(complaint_id)
+    
+    if complaint is None:
+        return APIResponse.error('Complaint not found', 404)
+    
+    # Verify user can add evidence (complainant or committee of the same society)
+    # before anything is written or hashed
+    if not _same_society(complaint, user) or \
+            (complaint.complainant_id != user.id and not user.is_committee_member()):
+        return APIResponse.error('You cannot add evidence to this complaint', 403)
+    
+    # End the read transaction before copying the upload, so a slow client
+    # or disk never holds it open
+    user_id = user.id
+    db.session.rollback()
+    
+    try:
+        staged = EvidenceUploadService.stage(file)
+    except ValueError as e:
+        return APIResponse.error(str(e), 400)
+    except Exception as e:
+        current_app.logger.error(f'Evidence staging error: {str(e)}')
+        return APIResponse.error('Failed to save file', 500)
+    
     description = request.form.get('description', '')
     
     try:
-        # Save file
-        file_url, file_type = save_uploaded_file(file, f'evidence/{complaint_id}')
-        
-        if not file_url:
-            return APIResponse.error('Failed to save file', 500)
-        
-        # Create evidence record
-        evidence = ComplaintEvidence(
-            complaint_id=complaint.id,
-            uploaded_by_id=user.id,
-            file_url=file_url,
-            file_type=file_type,
-            file_name=secure_filename(file.filename),
-            file_size=file.content_length or 0,
+        evidence, = EvidenceUploadService.attach(
+            complaint_id, user_id, [staged],
             description=description.strip() if description else None
         )
         
-        db.session.add(evidence)
-        db.session.commit()
-        
         return jsonify({
             'success': True,
             'message': 'Evidence uploaded successfully',
@@ -72,17 +88,59 @@ def upload_evidence():
         }), 201
         
     except Exception as e:
-        db.session.rollback()
         current_app.logger.error(f'Evidence upload error: {str(e)}')
         return APIResponse.error('Failed to upload evidence', 500)
 
 
+def attach_by_hash(complaint_id, content_hash):
+    """
+    Attach a file already stored in the society by its SHA-256, skipping the
+    upload. Responds 404 when the content is unknown so the client can fall
+    back to sending the file.
+    """
+    if not re.fullmatch(r'[0-9a-f]{64}', content_hash):
+        return APIResponse.error('Invalid content hash', 400)
+    
+    user = get_current_user()
+    complaint = Complaint.query.get_or_404(complaint_id)
+    
+    if not _same_society(complaint, user) or \
+            (complaint.complainant_id != user.id and not user.is_committee_member()):
+        return APIResponse.error('You cannot add evidence to this complaint', 403)
+    
+    description = request.form.get('description', '')
+    
+    try:
+        evidence = EvidenceUploadService.attach_existing(
+            complaint, user.id, content_hash,
+            file_name=request.form.get('file_name'),
+            description=description.strip() if description else None
+        )
+    except Exception as e:
+        current_app.logger.error(f'Evidence attach error: {str(e)}')
+        return APIResponse.error('Failed to upload evidence', 500)
+    
+    if evidence is None:
+        return APIResponse.error('File not found; upload it instead', 404)
+    
+    return jsonify({
+        'success': True,
+        'message': 'Evidence uploaded successfully',
+        'data': evidence.to_dict()
+    }), 201
+
+
 @evidence_bp.route('/<int:id>', methods=['GET'])
 @jwt_required_custom
 def get_evidence(id):
     """Get evidence details."""
+    user = get_current_user()
     evidence = ComplaintEvidence.query.get_or_404(id)
     
+    # Checked before any signed link is handed out
+    if not _same_society(evidence.complaint, user):
+        return APIResponse.error('Access denied: Different society', 403)
+    
     return jsonify({
         'success': True,
         'data': evidence.to_dict()
@@ -97,17 +155,22 @@ def delete_evidence(id):
     evidence = ComplaintEvidence.query.get_or_404(id)
     
     # Check permissions
-    if evidence.uploaded_by_id != user.id and not user.is_secretary():
+    if not _same_society(evidence.complaint, user) or \
+            (evidence.uploaded_by_id != user.id and not user.is_secretary()):
         return APIResponse.error('You cannot delete this evidence', 403)
     
+    files = (evidence.file_url, evidence.thumbnail_url, evidence.content_hash)
+    
     try:
-        # Delete file from filesystem
-        delete_uploaded_file(evidence.file_url)
-        
         # Delete record
+        EvidenceUploadService.release_preview(evidence)
+        evidence.complaint.adjust_counter('evidence_count', -1)
         db.session.delete(evidence)
         db.session.commit()
         
+        # Files may be shared with other evidence; they go with the last reference
+        EvidenceUploadService.release_files(*files)
+        
         return jsonify({
             'success': True,
             'message': 'Evidence deleted successfully'
@@ -122,6 +185,7 @@ def delete_evidence(id):
 # Complaint-specific evidence endpoints (prefixed routes)
 @evidence_bp.route('/complaints/<int:complaint_id>/evidence', methods=['GET'])
 @jwt_required_custom
+@same_society_required
 def get_complaint_evidence(complaint_id):
     """Get all evidence for a complaint."""
     complaint = Complaint.query.get_or_404(complaint_id)
@@ -2,10 +2,13 @@
 Health Check API - System status endpoints
 """
 
-from flask import Blueprint, jsonify
+import hmac
+
+from flask import Blueprint, jsonify, request, current_app, Response
 from datetime import datetime
 
 from app.extensions import db
+from app.utils import APIResponse
 
 health_bp = Blueprint('health', __name__)
 
@@ -35,3 +38,21 @@ def database_health():
         'database': db_status,
         'timestamp': datetime.utcnow().isoformat()
     }), 200 if db_status == 'connected' else 503
+
+
+@health_bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus scrape endpoint (all workers when PROMETHEUS_MULTIPROC_DIR is set)."""
+    from app.utils import metrics
+    
+    if not current_app.config.get('METRICS_ENABLED'):
+        return APIResponse.error('Metrics are disabled (set METRICS_ENABLED)', 404)
+    if metrics.metrics is None:
+        return APIResponse.error('prometheus_client is not installed', 501)
+    
+    token = current_app.config.get('METRICS_TOKEN')
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return APIResponse.error('Invalid metrics token', 401)
+    
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
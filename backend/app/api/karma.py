@@ -6,10 +6,11 @@ from flask import Blueprint, request, jsonify
 from sqlalchemy import func
 
 from app.extensions import db
-from app.models import User, Society, KarmaLog
+from app.models import User, KarmaLog, KarmaMonthlyAggregate
+from app.services.leaderboard_service import LeaderboardService
 from app.utils import (
-    jwt_required_custom, get_current_user,
-    APIResponse, paginate_query, get_pagination_params
+    jwt_required_custom, get_current_user, get_current_principal,
+    APIResponse, paginate_query, get_pagination_params, get_cursor_params
 )
 
 karma_bp = Blueprint('karma', __name__)
@@ -28,11 +29,17 @@ def get_user_karma(user_id):
     
     # Get karma history
     page, per_page = get_pagination_params()
+    cursor, include_total = get_cursor_params()
     
     query = KarmaLog.query.filter_by(user_id=user_id)\
         .order_by(KarmaLog.created_at.desc())
     
-    pagination = paginate_query(query, page, per_page)
+    pagination = paginate_query(
+        query, page, per_page,
+        cursor=cursor,
+        keyset=(KarmaLog.created_at, KarmaLog.id),
+        include_total=include_total
+    )
     
     # Calculate monthly karma
     from datetime import datetime
@@ -47,12 +54,7 @@ def get_user_karma(user_id):
             'total_karma': user.karma_score,
             'monthly_karma': monthly_karma,
             'history': [log.to_dict() for log in pagination['items']],
-            'pagination': {
-                'total': pagination['total'],
-                'pages': pagination['pages'],
-                'page': pagination['page'],
-                'per_page': pagination['per_page']
-            }
+            'pagination': APIResponse.pagination_meta(pagination)
         }
     }), 200
 
@@ -69,13 +71,16 @@ def get_my_karma():
 @jwt_required_custom
 def get_karma_leaderboard(society_id):
     """Get karma leaderboard for a society."""
-    current_user = get_current_user()
-    society = Society.query.get_or_404(society_id)
+    principal = get_current_principal()
     
     # Verify access
-    if society.id != current_user.society_id and not current_user.is_admin():
+    if society_id != principal.society_id and not principal.is_admin():
         return APIResponse.error('Access denied', 403)
     
+    board = LeaderboardService.get(society_id)
+    if board is None:
+        return APIResponse.error('Society not found', 404)
+    
     # Get parameters
     limit = request.args.get('limit', 10, type=int)
     leaderboard_type = request.args.get('type', 'top')  # 'top' or 'bottom'
@@ -85,30 +90,28 @@ def get_karma_leaderboard(society_id):
     
     # Get leaderboard
     if leaderboard_type == 'bottom':
-        order = 'asc'
+        leaders = board.bottom(limit)
     else:
-        order = 'desc'
-    
-    leaders = society.get_leaderboard(limit=limit, order=order)
+        leaders = board.top(limit)
     
     return jsonify({
         'success': True,
         'data': {
             'society_id': society_id,
-            'society_name': society.name,
-            'average_karma': society.average_karma,
+            'society_name': board.name,
+            'average_karma': board.average,
             'type': leaderboard_type,
             'leaderboard': [
                 {
                     'rank': idx + 1,
-                    'user_id': user.id,
-                    'full_name': user.full_name,
-                    'flat_number': user.flat_number,
-                    'wing': user.wing,
-                    'karma_score': user.karma_score,
-                    'avatar_url': user.avatar_url
+                    'user_id': member.user_id,
+                    'full_name': member.full_name,
+                    'flat_number': member.flat_number,
+                    'wing': member.wing,
+                    'karma_score': member.karma_score,
+                    'avatar_url': member.avatar_url
                 }
-                for idx, user in enumerate(leaders)
+                for idx, member in enumerate(leaders)
             ]
         }
     }), 200
@@ -118,8 +121,8 @@ def get_karma_leaderboard(society_id):
 @jwt_required_custom
 def get_my_society_leaderboard():
     """Get karma leaderboard for current user's society."""
-    user = get_current_user()
-    return get_karma_leaderboard(user.society_id)
+    principal = get_current_principal()
+    return get_karma_leaderboard(principal.society_id)
 
 
 @karma_bp.route('/karma-stats', methods=['GET'])
@@ -128,28 +131,13 @@ def get_karma_stats():
     """Get karma statistics for current user."""
     user = get_current_user()
     
-    # Get karma breakdown by reason
-    from sqlalchemy import func
-    
-    breakdown = db.session.query(
-        KarmaLog.reason,
-        func.sum(KarmaLog.points).label('total_points'),
-        func.count(KarmaLog.id).label('count')
-    ).filter(KarmaLog.user_id == user.id)\
-     .group_by(KarmaLog.reason).all()
+    # Get karma breakdown by reason (lifetime aggregate rows)
+    breakdown = KarmaMonthlyAggregate.get_breakdown(user.id)
     
-    # Get rank in society
-    higher_karma_count = User.query.filter(
-        User.society_id == user.society_id,
-        User.karma_score > user.karma_score,
-        User.active == True
-    ).count()
-    
-    rank = higher_karma_count + 1
-    total_users = User.query.filter(
-        User.society_id == user.society_id,
-        User.active == True
-    ).count()
+    # Get rank in society from the ranked leaderboard
+    board = LeaderboardService.get(user.society_id)
+    rank = board.rank_for_score(user.karma_score)
+    total_users = len(board)
     
     return jsonify({
         'success': True,
@@ -157,14 +145,7 @@ def get_karma_stats():
             'total_karma': user.karma_score,
             'rank': rank,
             'total_users': total_users,
-            'percentile': round((total_users - rank + 1) / total_users * 100, 1) if total_users > 0 else 100,
-            'breakdown': [
-                {
-                    'reason': r.reason,
-                    'total_points': r.total_points,
-                    'count': r.count
-                }
-                for r in breakdown
-            ]
+            'percentile': board.percentile(rank),
+            'breakdown': breakdown
         }
     }), 200
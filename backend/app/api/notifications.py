@@ -2,13 +2,20 @@
 Notifications API - User notification management
 """
 
-from flask import Blueprint, request, jsonify
+from datetime import timedelta
+
+from flask import Blueprint, Response, request, jsonify, current_app
+from flask_jwt_extended import create_access_token
 
 from app.extensions import db
 from app.models import Notification
+from app.services.dashboard_service import DashboardService
+from app.services.notification_stream import (
+    broker, latest_position, stream_notifications as stream_events
+)
 from app.utils import (
-    jwt_required_custom, get_current_user,
-    APIResponse, paginate_query, get_pagination_params
+    jwt_required_custom, jwt_stream_required, STREAM_TOKEN_SCOPE, get_current_user, get_current_principal,
+    APIResponse, paginate_query, get_pagination_params, get_cursor_params, decode_cursor
 )
 
 notifications_bp = Blueprint('notifications', __name__)
@@ -20,6 +27,7 @@ def get_notifications():
     """Get user's notifications."""
     user = get_current_user()
     page, per_page = get_pagination_params()
+    cursor, include_total = get_cursor_params()
     
     # Filter options
     unread_only = request.args.get('unread_only', 'false').lower() == 'true'
@@ -36,7 +44,12 @@ def get_notifications():
     
     query = query.order_by(Notification.created_at.desc())
     
-    pagination = paginate_query(query, page, per_page)
+    pagination = paginate_query(
+        query, page, per_page,
+        cursor=cursor,
+        keyset=(Notification.created_at, Notification.id),
+        include_total=include_total
+    )
     
     # Get unread count
     unread_count = Notification.get_unread_count(user.id)
@@ -45,12 +58,7 @@ def get_notifications():
         'success': True,
         'data': [n.to_dict() for n in pagination['items']],
         'unread_count': unread_count,
-        'pagination': {
-            'total': pagination['total'],
-            'pages': pagination['pages'],
-            'page': pagination['page'],
-            'per_page': pagination['per_page']
-        }
+        'pagination': APIResponse.pagination_meta(pagination)
     }), 200
 
 
@@ -69,6 +77,79 @@ def get_unread_count():
     }), 200
 
 
+@notifications_bp.route('/stream-token', methods=['POST'])
+@jwt_required_custom
+def get_stream_token():
+    """
+    Issue a short-lived token for opening the notification stream.
+    
+    EventSource can't set headers, so the stream token travels in the URL;
+    it expires after NOTIFICATION_STREAM_TOKEN_EXPIRES seconds and is
+    rejected by every other endpoint.
+    """
+    principal = get_current_principal()
+    expires = current_app.config['NOTIFICATION_STREAM_TOKEN_EXPIRES']
+    token = create_access_token(
+        identity=str(principal.user_id),
+        additional_claims={'scope': STREAM_TOKEN_SCOPE},
+        expires_delta=timedelta(seconds=expires)
+    )
+    
+    return jsonify({
+        'success': True,
+        'data': {
+            'token': token,
+            'expires_in': expires
+        }
+    }), 200
+
+
+@notifications_bp.route('/stream', methods=['GET'])
+@jwt_stream_required
+def stream_notifications():
+    """
+    Stream new notifications and unread-count changes as Server-Sent Events.
+    
+    Replaces polling /unread-count where a stream server has capacity (see
+    DEPLOYMENT.md). EventSource can't set headers, so a stream token from
+    /stream-token may be passed as ?token=. Streams close after
+    NOTIFICATION_STREAM_MAX_AGE seconds and the browser reconnects with
+    Last-Event-ID; when the worker is at capacity the client gets a 503 and
+    should fall back to polling.
+    """
+    principal = get_current_principal()
+    
+    subscription = broker.subscribe(
+        principal.user_id,
+        max_clients=current_app.config['NOTIFICATION_STREAM_MAX_CLIENTS']
+    )
+    if subscription is None:
+        body, status = APIResponse.error('Too many live connections, poll instead', 503)
+        return body, status, {'Retry-After': str(current_app.config['NOTIFICATION_STREAM_MAX_AGE'])}
+    
+    broker.start_bridge(current_app._get_current_object())
+    
+    # Resume after the last event the client saw, else only send what's new
+    position = None
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    if last_event_id:
+        try:
+            position = decode_cursor(last_event_id)
+        except ValueError:
+            pass
+    if position is None:
+        position = latest_position(principal.user_id)
+    
+    return Response(
+        stream_events(current_app._get_current_object(), subscription, position),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # don't let nginx buffer the stream
+        }
+    )
+
+
 @notifications_bp.route('/<int:id>/read', methods=['PATCH'])
 @jwt_required_custom
 def mark_as_read(id):
@@ -148,6 +229,8 @@ def clear_all_notifications():
     try:
         Notification.query.filter_by(user_id=user.id).delete()
         db.session.commit()
+        DashboardService.invalidate_user(user.id)
+        broker.publish([user.id])
         
         return jsonify({
             'success': True,
@@ -95,6 +95,60 @@ def run_cleanup():
         return APIResponse.error(str(e), 500)
 
 
+@tasks_bp.route('/run-recount', methods=['POST'])
+@jwt_required_custom
+@admin_required
+def run_recount():
+    """
+    Recompute denormalized complaint counters.
+    Pass ?dry_run=true to only report drift.
+    Admin only.
+    """
+    try:
+        dry_run = request.args.get('dry_run', 'false').lower() == 'true'
+        result = TaskService.recount_complaint_counters(dry_run=dry_run)
+        
+        if result['success']:
+            return jsonify({
+                'success': True,
+                'message': f"Recount completed. {result.get('drifted', 0)} of {result.get('checked', 0)} complaints had drifted.",
+                'data': result
+            }), 200
+        else:
+            return APIResponse.error(result.get('error', 'Task failed'), 500)
+            
+    except Exception as e:
+        current_app.logger.error(f'Recount task error: {e}')
+        return APIResponse.error(str(e), 500)
+
+
+@tasks_bp.route('/run-reconcile-stats', methods=['POST'])
+@jwt_required_custom
+@admin_required
+def run_reconcile_stats():
+    """
+    Rebuild society statistics rollups that drifted from the complaint table.
+    Pass ?dry_run=true to only report drift.
+    Admin only.
+    """
+    try:
+        dry_run = request.args.get('dry_run', 'false').lower() == 'true'
+        result = TaskService.reconcile_society_stats(dry_run=dry_run)
+        
+        if result['success']:
+            return jsonify({
+                'success': True,
+                'message': f"Reconcile completed. {result.get('drifted', 0)} of {result.get('checked', 0)} societies had drifted.",
+                'data': result
+            }), 200
+        else:
+            return APIResponse.error(result.get('error', 'Task failed'), 500)
+            
+    except Exception as e:
+        current_app.logger.error(f'Reconcile task error: {e}')
+        return APIResponse.error(str(e), 500)
+
+
 @tasks_bp.route('/calculate-stats', methods=['POST'])
 @jwt_required_custom
 def calculate_stats():
@@ -201,6 +255,32 @@ def cron_cleanup():
         return APIResponse.error(str(e), 500)
 
 
+@tasks_bp.route('/cron/monthly-karma', methods=['POST'])
+def cron_monthly_karma():
+    """
+    Cloudflare Cron Trigger endpoint for the monthly karma bonus.
+    Idempotent per month, so it can run on every trigger.
+    Secured via secret header.
+    """
+    cron_secret = request.headers.get('X-Cron-Secret')
+    expected_secret = current_app.config.get('CRON_SECRET', 'default-cron-secret')
+    
+    if cron_secret != expected_secret:
+        return APIResponse.error('Unauthorized', 401)
+    
+    try:
+        result = TaskService.award_monthly_karma_bonus()
+        return jsonify({
+            'success': True,
+            'task': 'monthly_karma',
+            'result': result,
+            'timestamp': datetime.utcnow().isoformat()
+        }), 200
+    except Exception as e:
+        current_app.logger.error(f'Cron monthly karma error: {e}')
+        return APIResponse.error(str(e), 500)
+
+
 @tasks_bp.route('/status', methods=['GET'])
 @jwt_required_custom
 @admin_required
@@ -224,7 +304,9 @@ def task_status():
                 {'name': 'auto_escalate', 'description': 'Auto-escalate old complaints (7+ days)'},
                 {'name': 'send_reminders', 'description': 'Send reminders for stale complaints (3+ days)'},
                 {'name': 'cleanup_notifications', 'description': 'Delete old read notifications'},
-                {'name': 'calculate_stats', 'description': 'Calculate society statistics'}
+                {'name': 'calculate_stats', 'description': 'Calculate society statistics'},
+                {'name': 'recount_counters', 'description': 'Repair denormalized complaint counters'},
+                {'name': 'reconcile_stats', 'description': 'Repair society statistics rollups'}
             ],
             'cron_endpoints': [
                 {'path': '/api/tasks/cron/escalate', 'schedule': 'Daily at midnight'},
@@ -3,8 +3,14 @@ Celery Configuration and Tasks for Padosi Politics
 Optional background job processing
 """
 
+import os
+import time
+
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import task_prerun, task_postrun
+
+from app.utils.metrics import enable_metrics, observe_task
 
 def make_celery(app=None):
     """Create and configure Celery instance."""
@@ -12,7 +18,7 @@ def make_celery(app=None):
         'padosi_politics',
         broker=app.config['CELERY_BROKER_URL'] if app else 'redis://localhost:6379/0',
         backend=app.config['CELERY_RESULT_BACKEND'] if app else 'redis://localhost:6379/0',
-        include=['app.tasks.scheduled', 'app.tasks.email_tasks']
+        include=['app.tasks.scheduled', 'app.tasks.email_tasks', 'app.tasks.evidence_tasks']
     )
     
     celery.conf.update(
@@ -49,6 +55,16 @@ def make_celery(app=None):
                 'task': 'app.tasks.scheduled.cleanup_old_notifications',
                 'schedule': crontab(day_of_week=0, hour=0, minute=0),
             },
+            # Repair drifted society statistics rollups - runs daily at 3 AM
+            'reconcile-society-stats': {
+                'task': 'app.tasks.scheduled.reconcile_society_stats',
+                'schedule': crontab(hour=3, minute=0),
+            },
+            # Reclaim evidence files no complaint references - runs daily at 4 AM
+            'collect-upload-garbage': {
+                'task': 'app.tasks.scheduled.collect_upload_garbage',
+                'schedule': crontab(hour=4, minute=0),
+            },
         }
     )
     
@@ -65,3 +81,27 @@ def make_celery(app=None):
 
 # Create default celery instance
 celery = make_celery()
+
+
+# ============================================
+# Task metrics
+# Workers on the web host share PROMETHEUS_MULTIPROC_DIR with gunicorn, so
+# their task durations show up in the API's /api/metrics.
+# ============================================
+
+if os.environ.get('METRICS_ENABLED', 'false').lower() == 'true':
+    enable_metrics()
+
+_task_started = {}
+
+
+@task_prerun.connect
+def _start_task_timer(task_id=None, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def _record_task(task_id=None, task=None, retval=None, state=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        observe_task(task.name, time.perf_counter() - started, retval, failed=state != 'SUCCESS')
@@ -0,0 +1,145 @@
+"""
+Database Routing - Read replica for safe requests and reporting jobs
+With SQLALCHEMY_REPLICA_URI set, db.session sends the SELECTs of GET/HEAD
+requests, and of code run inside replica_reads() (reporting jobs), to the
+'replica' bind; everything else goes to the primary. A session that has
+written reads from the primary from then on, and a user's own requests
+stay on the primary for REPLICA_STICKY_SECONDS after they commit a write,
+so their change never disappears behind replication lag.
+
+This module is imported by app.extensions, so it must not import app.* at
+module level.
+"""
+
+import math
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from flask_sqlalchemy.session import Session as BaseSession
+from sqlalchemy import event
+
+
+REPLICA_BIND = 'replica'
+SAFE_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+
+# session.info keys
+_PINNED_KEY = 'db_primary_pinned'   # the session has written; read the primary
+_WROTE_KEY = 'db_wrote'             # uncommitted writes that make the user sticky
+_READS_KEY = 'db_replica_reads'     # replica_reads() override, True or False
+
+
+def _sticky_key(user_id):
+    return f'replica_sticky_{user_id}'
+
+
+def _is_plain_read(clause):
+    """SELECTs only; text(), DML and SELECT ... FOR UPDATE stay on the primary."""
+    return (getattr(clause, 'is_select', False)
+            and getattr(clause, '_for_update_arg', None) is None)
+
+
+def _recently_wrote(user_id):
+    from app.extensions import cache
+    until = cache.get(_sticky_key(user_id))
+    return until is not None and until > time.time()
+
+
+def _replica_allowed(session):
+    forced = session.info.get(_READS_KEY)
+    if forced is not None:
+        return forced
+    if not has_request_context() or request.method not in SAFE_METHODS:
+        return False
+
+    # Decided once per caller and request; the auth decorators load the
+    # principal from the primary before any view query runs
+    principal = g.get('principal')
+    user_id = principal.user_id if principal is not None else None
+    decision = g.get('_replica_decision')
+    if decision is None or decision[0] != user_id:
+        decision = g._replica_decision = (user_id, user_id is None or not _recently_wrote(user_id))
+    return decision[1]
+
+
+class RoutingSession(BaseSession):
+    """db.session class that sends eligible reads to the replica bind, if one is configured."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            engines = self._db.engines
+            if REPLICA_BIND in engines:
+                if self._flushing or not _is_plain_read(clause):
+                    # Writes, raw connections and locking reads: read the
+                    # primary for the rest of this session
+                    self.info[_PINNED_KEY] = True
+                    if self._flushing or getattr(clause, 'is_dml', False):
+                        self.info[_WROTE_KEY] = True
+                elif not self.info.get(_PINNED_KEY) and _replica_allowed(self):
+                    return engines[REPLICA_BIND]
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """
+    Route the current session's reads to the replica inside the block (or,
+    with enabled=False, keep them on the primary even in a GET request).
+    Usable as a decorator. Reads after a write in the same session still
+    go to the primary.
+    """
+    from app.extensions import db
+    info = db.session().info
+    previous = info.get(_READS_KEY)
+    info[_READS_KEY] = enabled
+    try:
+        yield
+    finally:
+        if previous is None:
+            info.pop(_READS_KEY, None)
+        else:
+            info[_READS_KEY] = previous
+
+
+def primary_reads():
+    """Keep reads on the primary inside the block (e.g. auth lookups)."""
+    return replica_reads(False)
+
+
+# ============================================
+# Read-your-writes stickiness
+# ============================================
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _remember_writer(session):
+    if not session.info.pop(_WROTE_KEY, False) or not has_request_context():
+        return
+    principal = g.get('principal')
+    window = current_app.config.get('REPLICA_STICKY_SECONDS', 5)
+    if principal is None or not window:
+        return
+
+    from app.extensions import cache
+    cache.set(_sticky_key(principal.user_id), time.time() + window, timeout=math.ceil(window) + 1)
+
+
+@event.listens_for(RoutingSession, 'after_soft_rollback')
+def _forget_writes(session, previous_transaction):
+    if not session.in_transaction():
+        session.info.pop(_WROTE_KEY, None)
+
+
+def init_replica_routing(app):
+    """Reset the routing state per request when a replica is configured."""
+    if not app.config.get('SQLALCHEMY_REPLICA_URI'):
+        return
+
+    from app.extensions import db
+
+    # Production pushes a fresh app context (and session) per request; tests
+    # and CLI code may serve several requests from one, so start clean
+    @app.before_request
+    def reset_replica_routing():
+        db.session.info.pop(_PINNED_KEY, None)
+        g.pop('_replica_decision', None)
@@ -11,8 +11,10 @@ from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_caching import Cache
 
-# SQLAlchemy for database ORM
-db = SQLAlchemy()
+from app.db_routing import RoutingSession
+
+# SQLAlchemy for database ORM; the session routes reads to an optional replica
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 # Flask-Security for user management
 security = Security()
@@ -19,6 +19,8 @@ from app.models.complaint import (
 from app.models.escalation import Escalation, EscalationLevel
 from app.models.karma import KarmaLog, KarmaReason
 from app.models.notification import Notification, NotificationType
+from app.models.society_stats import SocietyStat
+from app.models.karma_stats import KarmaMonthlyAggregate
 
 # Flask-Security user datastore
 user_datastore = SQLAlchemyUserDatastore(db, User, Role)
@@ -42,5 +44,7 @@ __all__ = [
     'KarmaLog',
     'KarmaReason',
     'Notification',
-    'NotificationType'
+    'NotificationType',
+    'SocietyStat',
+    'KarmaMonthlyAggregate'
 ]
@@ -57,11 +57,11 @@ class Complaint(db.Model):
     
     # Accused (optional - who the complaint is against)
     accused_flat = db.Column(db.String(20))  # Can file against a flat even if user not registered
-    accused_user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True, index=True)
+    accused_user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     accused_user = db.relationship('User', foreign_keys=[accused_user_id], back_populates='complaints_against')
     
     # Society
-    society_id = db.Column(db.Integer, db.ForeignKey('society.id'), nullable=False, index=True)
+    society_id = db.Column(db.Integer, db.ForeignKey('society.id'), nullable=False)
     society = db.relationship('Society', back_populates='complaints')
     
     # Privacy and status
@@ -73,6 +73,16 @@ class Complaint(db.Model):
     support_count = db.Column(db.Integer, default=0)
     oppose_count = db.Column(db.Integer, default=0)
     
+    # Denormalized child counts, maintained by the comments, evidence and
+    # escalations APIs (repair with `flask recount-counters`)
+    comments_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    evidence_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    escalations_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
+    # Thumbnail of the first processed image evidence, set by the evidence
+    # processor so list views need no evidence lookup
+    preview_url = db.Column(db.String(500))
+    
     # Resolution
     resolution_note = db.Column(db.Text)
     resolved_by_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
@@ -83,6 +93,20 @@ class Complaint(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     resolved_at = db.Column(db.DateTime)
     
+    # Composite indexes matching the hot query shapes; society_id and
+    # accused_user_id are covered by their leading columns
+    __table_args__ = (
+        # Complaint list (newest first, keyset on created_at + id) and weekly counts
+        db.Index('ix_complaint_society_created', 'society_id', 'created_at', 'id'),
+        # Complaint list filtered by status
+        db.Index('ix_complaint_society_status_created', 'society_id', 'status', 'created_at'),
+        # Resolved-this-week counts
+        db.Index('ix_complaint_society_resolved', 'society_id', 'resolved_at'),
+        # Repeat-offender check and the dashboard's "against me" count
+        db.Index('ix_complaint_accused_society_status', 'accused_user_id', 'society_id', 'status'),
+        db.Index('ix_complaint_society_accused_flat', 'society_id', 'accused_flat'),
+    )
+    
     # Relationships
     evidence = db.relationship('ComplaintEvidence', back_populates='complaint', 
                               cascade='all, delete-orphan', lazy='dynamic')
@@ -98,11 +122,12 @@ class Complaint(db.Model):
     def __repr__(self):
         return f'<Complaint {self.id}: {self.title[:30]}>'
     
-    def get_complainant_display_name(self):
-        """Get complainant name considering anonymity."""
+    def get_complainant_display_name(self, complainant=None):
+        """Get complainant name considering anonymity (complainant: a pre-loaded self.complainant)."""
+        complainant = complainant or self.complainant
         if self.is_anonymous:
-            return f"Anonymous ({self.complainant.wing or 'Unknown Wing'})"
-        return self.complainant.full_name
+            return f"Anonymous ({complainant.wing or 'Unknown Wing'})"
+        return complainant.full_name
     
     def can_be_edited_by(self, user):
         """Check if user can edit this complaint."""
@@ -138,14 +163,14 @@ class Complaint(db.Model):
         self.updated_at = datetime.utcnow()
         
         # Create notification for complainant
-        from app.models.notification import Notification
-        notification = Notification(
+        from app.models.notification import Notification, NotificationType
+        Notification.create_notification(
             user_id=self.complainant_id,
             title='Complaint Status Updated',
             message=f'Your complaint "{self.title}" status changed from {old_status} to {new_status}',
-            notification_type='complaint'
+            notification_type=NotificationType.COMPLAINT,
+            complaint_id=self.id
         )
-        db.session.add(notification)
         
         return old_status
     
@@ -204,6 +229,66 @@ class Complaint(db.Model):
             return True
         return False
     
+    def adjust_counter(self, counter, delta=1):
+        """
+        Adjust a denormalized counter (comments_count, evidence_count or
+        escalations_count) as part of the current transaction.
+        
+        The change is written as a SQL expression so concurrent requests
+        cannot overwrite each other's increments.
+        """
+        from sqlalchemy.sql import ClauseElement
+        
+        pending = self.__dict__.get(counter)
+        base = pending if isinstance(pending, ClauseElement) else getattr(Complaint, counter)
+        value = base + delta
+        if delta < 0:
+            value = db.case((value < 0, 0), else_=value)
+        setattr(self, counter, value)
+    
+    @staticmethod
+    def recount_counters(dry_run=False, chunk_size=5000):
+        """
+        Recompute denormalized counters from the child tables in bulk.
+        
+        Works through the table in id ranges, committing per chunk, and
+        returns how many complaints were checked and how many had drifted.
+        """
+        from sqlalchemy import func, select, update, or_
+        from app.models.escalation import Escalation
+        
+        actual = {
+            'comments_count': select(func.count(ComplaintComment.id))
+                .where(ComplaintComment.complaint_id == Complaint.id).scalar_subquery(),
+            'evidence_count': select(func.count(ComplaintEvidence.id))
+                .where(ComplaintEvidence.complaint_id == Complaint.id).scalar_subquery(),
+            'escalations_count': select(func.count(Escalation.id))
+                .where(Escalation.complaint_id == Complaint.id).scalar_subquery(),
+        }
+        drifted = or_(*[getattr(Complaint, name) != expr for name, expr in actual.items()])
+        
+        max_id = db.session.query(func.max(Complaint.id)).scalar() or 0
+        checked = 0
+        drifted_count = 0
+        
+        for start in range(0, max_id, chunk_size):
+            in_chunk = Complaint.id.between(start + 1, start + chunk_size)
+            checked += db.session.query(func.count(Complaint.id)).filter(in_chunk).scalar()
+            
+            if dry_run:
+                drifted_count += db.session.query(func.count(Complaint.id))\
+                    .filter(in_chunk, drifted).scalar()
+                continue
+            
+            result = db.session.execute(
+                update(Complaint).where(in_chunk, drifted).values(**actual)
+                .execution_options(synchronize_session=False)
+            )
+            drifted_count += result.rowcount
+            db.session.commit()
+        
+        return {'checked': checked, 'drifted': drifted_count, 'repaired': 0 if dry_run else drifted_count}
+    
     def get_user_vote(self, user_id):
         """Get a specific user's vote on this complaint."""
         return ComplaintVote.query.filter_by(
@@ -263,14 +348,27 @@ class Complaint(db.Model):
         if include_details:
             data['evidence'] = [e.to_dict() for e in self.evidence.all()]
             data['comments'] = [c.to_dict(current_user) for c in self.comments.limit(10).all()]
-            data['comments_count'] = self.comments.count()
-            data['evidence_count'] = self.evidence.count()
+            data['comments_count'] = self.comments_count
+            data['evidence_count'] = self.evidence_count
+            data['escalations_count'] = self.escalations_count
             data['escalations'] = [e.to_dict() for e in self.escalations.all()]
         
         return data
     
     def to_list_dict(self, current_user=None):
         """Minimal dict for list views."""
+        user_vote = None
+        if current_user:
+            vote = self.get_user_vote(current_user.id)
+            user_vote = vote.vote_type if vote else None
+        
+        return self._build_list_dict(include_vote=current_user is not None, user_vote=user_vote)
+    
+    def _build_list_dict(self, include_vote, user_vote, complainant=None):
+        """Assemble the list view dict given the viewer's pre-fetched vote (and complainant)."""
+        from app.utils.helpers import sign_upload_url
+        
+        complainant = complainant or self.complainant
         data = {
             'id': self.id,
             'title': self.title,
@@ -280,21 +378,65 @@ class Complaint(db.Model):
             'support_count': self.support_count,
             'is_anonymous': self.is_anonymous,
             'accused_flat': self.accused_flat,
-            'comments_count': self.comments.count(),
-            'evidence_count': self.evidence.count(),
+            'comments_count': self.comments_count,
+            'evidence_count': self.evidence_count,
+            'preview_url': sign_upload_url(self.preview_url),
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'complainant': {
-                'display_name': self.get_complainant_display_name() if self.is_anonymous else self.complainant.full_name,
-                'wing': self.complainant.wing,
-                'flat_number': None if self.is_anonymous else self.complainant.flat_number
+                'display_name': self.get_complainant_display_name(complainant),
+                'wing': complainant.wing,
+                'flat_number': None if self.is_anonymous else complainant.flat_number
             }
         }
         
-        if current_user:
-            user_vote = self.get_user_vote(current_user.id)
-            data['user_vote'] = user_vote.vote_type if user_vote else None
+        if include_vote:
+            data['user_vote'] = user_vote
         
         return data
+    
+    @staticmethod
+    def to_list_dicts(complaints, current_user=None):
+        """
+        Serialize a page of complaints for list views.
+        
+        Produces the same output as calling to_list_dict() on each complaint,
+        but fetches the viewer's votes and the complainants for the whole page
+        in a fixed number of queries instead of several queries per row.
+        Comment and evidence counts come from the denormalized columns.
+        """
+        from app.models.user import User
+        
+        complaints = list(complaints)
+        if not complaints:
+            return []
+        
+        complaint_ids = [c.id for c in complaints]
+        
+        user_votes = {}
+        if current_user:
+            user_votes = dict(
+                db.session.query(ComplaintVote.complaint_id, ComplaintVote.vote_type)
+                .filter(
+                    ComplaintVote.complaint_id.in_(complaint_ids),
+                    ComplaintVote.user_id == current_user.id
+                ).all()
+            )
+        
+        # Load all complainants at once and hand each row its own
+        complainant_ids = {c.complainant_id for c in complaints}
+        complainants = {
+            user.id: user
+            for user in User.query.filter(User.id.in_(complainant_ids)).all()
+        }
+        
+        return [
+            c._build_list_dict(
+                include_vote=current_user is not None,
+                user_vote=user_votes.get(c.id),
+                complainant=complainants.get(c.complainant_id)
+            )
+            for c in complaints
+        ]
 
 
 class ComplaintEvidence(db.Model):
@@ -311,6 +453,17 @@ class ComplaintEvidence(db.Model):
     file_size = db.Column(db.Integer)  # in bytes
     description = db.Column(db.String(500))
     
+    # SHA-256 of the file; rows sharing a hash share one stored file
+    content_hash = db.Column(db.String(64), index=True)
+    
+    # Filled in by the background evidence processor
+    mime_type = db.Column(db.String(100))
+    width = db.Column(db.Integer)
+    height = db.Column(db.Integer)
+    thumbnail_url = db.Column(db.String(500))
+    processing_status = db.Column(db.String(20), nullable=False, default='pending',
+                                  server_default='pending')  # pending, ready, failed
+    
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -320,15 +473,32 @@ class ComplaintEvidence(db.Model):
     def __repr__(self):
         return f'<Evidence {self.id} for Complaint {self.complaint_id}>'
     
+    @staticmethod
+    def count_references(content_hash, file_url=None):
+        """Number of evidence rows using content with this hash (stored at file_url, if given)."""
+        query = db.session.query(db.func.count(ComplaintEvidence.id))\
+            .filter(ComplaintEvidence.content_hash == content_hash)
+        if file_url is not None:
+            query = query.filter(ComplaintEvidence.file_url == file_url)
+        return query.scalar()
+    
     def to_dict(self):
+        from app.utils.helpers import sign_upload_url
+        
         return {
             'id': self.id,
             'complaint_id': self.complaint_id,
-            'file_url': self.file_url,
+            'file_url': sign_upload_url(self.file_url),
             'file_type': self.file_type,
             'file_name': self.file_name,
             'file_size': self.file_size,
+            'content_hash': self.content_hash,
             'description': self.description,
+            'mime_type': self.mime_type,
+            'width': self.width,
+            'height': self.height,
+            'thumbnail_url': sign_upload_url(self.thumbnail_url),
+            'processing_status': self.processing_status,
             'uploaded_at': self.uploaded_at.isoformat() if self.uploaded_at else None,
             'uploaded_by': {
                 'id': self.uploader.id,
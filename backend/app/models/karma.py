@@ -25,7 +25,7 @@ class KarmaLog(db.Model):
     __tablename__ = 'karma_log'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     
     points = db.Column(db.Integer, nullable=False)  # Can be positive or negative
     reason = db.Column(db.String(100), nullable=False)
@@ -33,8 +33,20 @@ class KarmaLog(db.Model):
     
     related_complaint_id = db.Column(db.Integer, db.ForeignKey('complaint.id'), nullable=True)
     
+    # Period a recurring award is for (e.g. '2026-09' for the monthly bonus);
+    # NULL for ordinary karma changes
+    period = db.Column(db.String(7), nullable=True)
+    
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     
+    # Karma history (newest first, keyset on created_at + id) and weekly
+    # deltas; user_id is covered by the leading column. The unique key pays a
+    # periodic award at most once per user and period (NULL periods never clash).
+    __table_args__ = (
+        db.Index('ix_karma_log_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('uq_karma_log_award_period', 'user_id', 'reason', 'period', unique=True),
+    )
+    
     # Relationships
     user = db.relationship('User', back_populates='karma_logs')
     complaint = db.relationship('Complaint', back_populates='karma_logs')
@@ -58,6 +70,48 @@ class KarmaLog(db.Model):
         }
         return points_map.get(reason, 0)
     
+    @staticmethod
+    def insert_awards(user_ids, reason, period, points, description, created_at):
+        """
+        Insert one ledger row per user for a periodic award, skipping users
+        who already hold it for that period. Returns the user ids that got a
+        new row; only those should be credited. Safe against overlapping runs:
+        the second insert of a (user_id, reason, period) finds the first.
+        """
+        from sqlalchemy import insert
+        from sqlalchemy.exc import IntegrityError
+        
+        rows = [
+            {'user_id': user_id, 'points': points, 'reason': reason, 'period': period,
+             'description': description, 'created_at': created_at}
+            for user_id in user_ids
+        ]
+        if not rows:
+            return []
+        
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            
+            stmt = insert(KarmaLog).on_conflict_do_nothing(
+                index_elements=['user_id', 'reason', 'period']
+            ).returning(KarmaLog.user_id)
+            return list(db.session.execute(stmt, rows).scalars())
+        
+        # Portable fallback: one savepoint per row
+        awarded = []
+        for row in rows:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(insert(KarmaLog).values(**row))
+                awarded.append(row['user_id'])
+            except IntegrityError:
+                pass
+        return awarded
+    
     @staticmethod
     def get_user_karma_history(user_id, limit=50):
         """Get karma history for a user."""
@@ -68,16 +122,9 @@ class KarmaLog(db.Model):
     @staticmethod
     def calculate_monthly_karma(user_id, year, month):
         """Calculate total karma change for a specific month."""
-        from sqlalchemy import func, extract
-        
-        result = db.session.query(func.sum(KarmaLog.points))\
-            .filter(
-                KarmaLog.user_id == user_id,
-                extract('year', KarmaLog.created_at) == year,
-                extract('month', KarmaLog.created_at) == month
-            ).scalar()
+        from app.models.karma_stats import KarmaMonthlyAggregate
         
-        return result or 0
+        return KarmaMonthlyAggregate.get_monthly_karma(user_id, year, month)
     
     def to_dict(self):
         """Convert karma log to dictionary."""
@@ -88,5 +135,6 @@ class KarmaLog(db.Model):
             'reason': self.reason,
             'description': self.description,
             'related_complaint_id': self.related_complaint_id,
+            'period': self.period,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
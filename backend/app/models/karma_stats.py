@@ -0,0 +1,298 @@
+"""
+Karma Aggregate Model - Per-user, per-month karma totals by reason
+Kept up to date incrementally on every flush that writes to the karma
+ledger, so monthly karma and reason breakdowns read a handful of indexed
+rows instead of scanning the user's whole history.
+"""
+
+from collections import defaultdict, namedtuple
+from datetime import datetime
+
+from sqlalchemy import event, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models.karma import KarmaLog
+from app.models.user import User
+
+
+# Period and reason of the per-user marker row holding the lifetime total
+ALL_PERIODS = 'all'
+ALL_REASONS = '*'
+
+# One aggregate bucket as read back by the getters
+AggregateRow = namedtuple('AggregateRow', ['period', 'reason', 'points', 'count'])
+
+
+def period_of(when):
+    """Aggregate period ('YYYY-MM') a ledger entry falls into."""
+    return (when or datetime.utcnow()).strftime('%Y-%m')
+
+
+def _contributions(period, reason, points):
+    """Yield the (period, reason, points) rows a single ledger entry adds to."""
+    yield period, reason, points
+    yield ALL_PERIODS, reason, points
+    yield ALL_PERIODS, ALL_REASONS, points
+
+
+class KarmaMonthlyAggregate(db.Model):
+    """Karma points and entry count of one user, month and reason."""
+    __tablename__ = 'karma_monthly_aggregate'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'period', 'reason', name='uq_karma_monthly_aggregate'),
+        db.Index('ix_karma_monthly_aggregate_society_period', 'society_id', 'period'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    society_id = db.Column(db.Integer, db.ForeignKey('society.id'), nullable=False)
+
+    # 'YYYY-MM', or 'all' for lifetime rows; reason '*' sums every reason
+    period = db.Column(db.String(7), nullable=False)
+    reason = db.Column(db.String(100), nullable=False)
+
+    points = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<KarmaMonthlyAggregate {self.user_id} {self.period}:{self.reason}={self.points:+d}>'
+
+    # ============================================
+    # Writing
+    # ============================================
+
+    @staticmethod
+    def _upsert(connection, rows, replace=False):
+        """
+        Insert or update aggregate rows.
+        rows: iterable of (user_id, society_id, period, reason, points, count).
+        With replace=False the values are added to existing rows,
+        otherwise they overwrite them.
+        """
+        rows = [
+            {'user_id': u, 'society_id': s, 'period': p, 'reason': r,
+             'points': pts, 'count': c, 'updated_at': datetime.utcnow()}
+            for u, s, p, r, pts, c in rows
+        ]
+        if not rows:
+            return
+
+        table = KarmaMonthlyAggregate.__table__
+        dialect = connection.dialect.name
+
+        if dialect in ('sqlite', 'postgresql'):
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+
+            stmt = insert(table)
+            if replace:
+                points = stmt.excluded.points
+                count = stmt.excluded['count']
+            else:
+                points = table.c.points + stmt.excluded.points
+                count = table.c['count'] + stmt.excluded['count']
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['user_id', 'period', 'reason'],
+                set_={'points': points, 'count': count,
+                      'updated_at': stmt.excluded.updated_at}
+            )
+            connection.execute(stmt, rows)
+            return
+
+        # Portable fallback: update, then insert whatever did not exist yet
+        for row in rows:
+            if replace:
+                values = {'points': row['points'], 'count': row['count']}
+            else:
+                values = {
+                    'points': table.c.points + row['points'],
+                    'count': table.c['count'] + row['count']
+                }
+            result = connection.execute(
+                table.update().where(
+                    table.c.user_id == row['user_id'],
+                    table.c.period == row['period'],
+                    table.c.reason == row['reason']
+                ).values(updated_at=row['updated_at'], **values)
+            )
+            if result.rowcount == 0:
+                connection.execute(table.insert().values(**row))
+
+    @staticmethod
+    def rebuild(user_ids, connection=None):
+        """Recompute the aggregates of the given users from the karma ledger."""
+        connection = connection or db.session.connection()
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+
+        societies = dict(connection.execute(
+            select(User.id, User.society_id).where(User.id.in_(user_ids))
+        ).all())
+
+        # Every rebuilt user gets a marker row, even without any karma yet
+        totals = defaultdict(lambda: [0, 0])
+        for user_id in societies:
+            totals[(user_id, ALL_PERIODS, ALL_REASONS)]
+
+        query = select(KarmaLog.user_id, KarmaLog.created_at, KarmaLog.reason, KarmaLog.points)\
+            .where(KarmaLog.user_id.in_(user_ids))
+        for user_id, created_at, reason, points in connection.execute(
+                query.execution_options(yield_per=5000)):
+            for period, bucket, value in _contributions(period_of(created_at), reason, points):
+                entry = totals[(user_id, period, bucket)]
+                entry[0] += value
+                entry[1] += 1
+
+        table = KarmaMonthlyAggregate.__table__
+        connection.execute(table.delete().where(table.c.user_id.in_(user_ids)))
+        KarmaMonthlyAggregate._upsert(connection, [
+            (user_id, societies[user_id], period, reason, points, count)
+            for (user_id, period, reason), (points, count) in totals.items()
+            if user_id in societies
+        ], replace=True)
+
+    @staticmethod
+    def apply(entries, connection=None):
+        """
+        Add new ledger entries to the aggregates.
+        entries: iterable of (user_id, created_at, reason, points).
+        Bulk code paths that bypass the ORM flush must call this themselves.
+        """
+        connection = connection or db.session.connection()
+        deltas = defaultdict(lambda: [0, 0])
+
+        for user_id, created_at, reason, points in entries:
+            for period, bucket, value in _contributions(period_of(created_at), reason, points):
+                entry = deltas[(user_id, period, bucket)]
+                entry[0] += value
+                entry[1] += 1
+
+        if not deltas:
+            return
+
+        # Users without aggregates yet (pre-dating the table) are built from
+        # scratch; the ledger already holds the entries being applied.
+        user_ids = {user_id for user_id, _, _ in deltas}
+        table = KarmaMonthlyAggregate.__table__
+        built = dict(connection.execute(
+            select(table.c.user_id, table.c.society_id).where(
+                table.c.user_id.in_(user_ids),
+                table.c.period == ALL_PERIODS,
+                table.c.reason == ALL_REASONS
+            )
+        ).all())
+
+        KarmaMonthlyAggregate.rebuild(user_ids - built.keys(), connection)
+        KarmaMonthlyAggregate._upsert(connection, [
+            (user_id, built[user_id], period, reason, points, count)
+            for (user_id, period, reason), (points, count) in deltas.items()
+            if user_id in built
+        ])
+
+    # ============================================
+    # Reading
+    # ============================================
+
+    @staticmethod
+    def _ledger_rows(user_id, period):
+        """
+        Rows of one period aggregated straight from the ledger (read-only),
+        for users whose aggregates haven't been built yet.
+        """
+        query = db.session.query(
+            KarmaLog.reason, func.sum(KarmaLog.points), func.count(KarmaLog.id)
+        ).filter(KarmaLog.user_id == user_id)
+        if period != ALL_PERIODS:
+            start = datetime.strptime(period, '%Y-%m')
+            end = datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+            query = query.filter(KarmaLog.created_at >= start, KarmaLog.created_at < end)
+        return [
+            AggregateRow(period, reason, int(points or 0), count)
+            for reason, points, count in query.group_by(KarmaLog.reason)
+        ]
+
+    @staticmethod
+    def _rows(user_id, period):
+        """
+        Rows of one period. Until the user's aggregates exist (built by their
+        next karma change or `flask rebuild-karma-aggregates`) the ledger is
+        aggregated instead; reads never write.
+        """
+        rows = db.session.query(
+            KarmaMonthlyAggregate.period, KarmaMonthlyAggregate.reason,
+            KarmaMonthlyAggregate.points, KarmaMonthlyAggregate.count
+        ).filter(
+            KarmaMonthlyAggregate.user_id == user_id,
+            or_(
+                KarmaMonthlyAggregate.period == period,
+                (KarmaMonthlyAggregate.period == ALL_PERIODS) &
+                (KarmaMonthlyAggregate.reason == ALL_REASONS)
+            )
+        ).all()
+
+        if not any(r.period == ALL_PERIODS and r.reason == ALL_REASONS for r in rows):
+            return KarmaMonthlyAggregate._ledger_rows(user_id, period)
+        return [r for r in rows if r.period == period and r.reason != ALL_REASONS]
+
+    @staticmethod
+    def get_monthly_karma(user_id, year, month):
+        """Total karma change of a user in the given month."""
+        period = f'{year:04d}-{month:02d}'
+        return sum(row.points for row in KarmaMonthlyAggregate._rows(user_id, period))
+
+    @staticmethod
+    def get_breakdown(user_id, period=ALL_PERIODS):
+        """Points and entry count per reason, lifetime by default, largest count first."""
+        rows = KarmaMonthlyAggregate._rows(user_id, period)
+        return sorted(
+            ({'reason': r.reason, 'total_points': r.points, 'count': r.count}
+             for r in rows if r.count),
+            key=lambda item: (-item['count'], item['reason'])
+        )
+
+
+# ============================================
+# Incremental maintenance
+# ============================================
+
+@event.listens_for(Session, 'after_flush')
+def _update_karma_aggregates(session, flush_context):
+    entries = []
+    rebuild = set()
+    dropped = set()
+
+    for obj in session.new:
+        if isinstance(obj, KarmaLog):
+            entries.append((obj.user_id, obj.created_at, obj.reason, obj.points))
+
+    # The ledger is append-only in practice; anything else is rare enough
+    # to simply recompute the affected users.
+    for obj in session.deleted:
+        if isinstance(obj, KarmaLog):
+            rebuild.add(obj.user_id)
+        elif isinstance(obj, User):
+            dropped.add(obj.id)
+
+    for obj in session.dirty:
+        if isinstance(obj, KarmaLog) and obj not in session.deleted and session.is_modified(obj):
+            rebuild.add(obj.user_id)
+
+    if not entries and not rebuild and not dropped:
+        return
+
+    connection = session.connection()
+    if dropped:
+        table = KarmaMonthlyAggregate.__table__
+        connection.execute(table.delete().where(table.c.user_id.in_(dropped)))
+    rebuild -= dropped
+    KarmaMonthlyAggregate.apply(
+        [entry for entry in entries if entry[0] not in rebuild and entry[0] not in dropped],
+        connection
+    )
+    KarmaMonthlyAggregate.rebuild(rebuild, connection)
@@ -22,7 +22,7 @@ class Notification(db.Model):
     __tablename__ = 'notification'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     
     title = db.Column(db.String(200), nullable=False)
     message = db.Column(db.Text, nullable=False)
@@ -35,10 +35,25 @@ class Notification(db.Model):
     # Action URL for frontend navigation
     action_url = db.Column(db.String(500))
     
+    # Number of events merged into this notification (see NotificationDispatcher)
+    coalesced_count = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    
     is_read = db.Column(db.Boolean, default=False, index=True)
     read_at = db.Column(db.DateTime)
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    # Last event merged into this notification; created_at stays the first
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Composite indexes for the per-user inbox; user_id is covered by all
+    __table_args__ = (
+        # Notification list, newest first (keyset on created_at + id)
+        db.Index('ix_notification_user_created', 'user_id', 'created_at', 'id'),
+        # Unread list and unread counts
+        db.Index('ix_notification_user_read_created', 'user_id', 'is_read', 'created_at'),
+        # Change feed for the stream and the coalescing lookup (keyset on updated_at + id)
+        db.Index('ix_notification_user_updated', 'user_id', 'updated_at', 'id'),
+    )
     
     # Relationships
     user = db.relationship('User', back_populates='notifications')
@@ -56,17 +71,18 @@ class Notification(db.Model):
     @staticmethod
     def create_notification(user_id, title, message, notification_type=NotificationType.SYSTEM,
                            complaint_id=None, action_url=None):
-        """Helper method to create a notification."""
-        notification = Notification(
-            user_id=user_id,
-            title=title,
-            message=message,
-            notification_type=notification_type,
-            related_complaint_id=complaint_id,
-            action_url=action_url
+        """
+        Queue a notification for the current transaction.
+        
+        Written in bulk when the session commits; repeats about the same
+        complaint are merged into the recipient's recent unread notification.
+        Returns None: the row does not exist until the commit.
+        """
+        from app.services.notification_service import NotificationDispatcher
+        NotificationDispatcher.notify(
+            user_id, title, message, notification_type,
+            complaint_id=complaint_id, action_url=action_url
         )
-        db.session.add(notification)
-        return notification
     
     @staticmethod
     def get_unread_count(user_id):
@@ -87,6 +103,11 @@ class Notification(db.Model):
             'read_at': datetime.utcnow()
         })
         db.session.commit()
+        
+        from app.services.dashboard_service import DashboardService
+        from app.services.notification_stream import broker
+        DashboardService.invalidate_user(user_id)
+        broker.publish([user_id])
     
     @staticmethod
     def cleanup_old_notifications(days=30):
@@ -111,7 +132,9 @@ class Notification(db.Model):
             'notification_type': self.notification_type,
             'related_complaint_id': self.related_complaint_id,
             'action_url': self.action_url,
+            'coalesced_count': self.coalesced_count,
             'is_read': self.is_read,
             'read_at': self.read_at.isoformat() if self.read_at else None,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -50,7 +50,8 @@ class Society(db.Model):
     @property
     def open_complaints_count(self):
         """Get open complaints count."""
-        return self.complaints.filter_by(status='open').count()
+        from app.models.society_stats import SocietyStat
+        return SocietyStat.get_rollup(self.id)['status'].get('open', 0)
     
     @property
     def average_karma(self):
@@ -71,37 +72,19 @@ class Society(db.Model):
     
     def get_stats(self):
         """Get comprehensive society statistics."""
-        from sqlalchemy import func
-        from app.models.complaint import Complaint
-        
-        # Category-wise complaints
-        category_stats = db.session.query(
-            Complaint.category,
-            func.count(Complaint.id)
-        ).filter(Complaint.society_id == self.id)\
-         .group_by(Complaint.category).all()
-        
-        # Status-wise complaints
-        status_stats = db.session.query(
-            Complaint.status,
-            func.count(Complaint.id)
-        ).filter(Complaint.society_id == self.id)\
-         .group_by(Complaint.status).all()
+        from app.models.society_stats import SocietyStat
         
-        # Resolution rate
-        total = self.complaints.count()
-        resolved = self.complaints.filter_by(status='resolved').count()
-        resolution_rate = (resolved / total * 100) if total > 0 else 0
+        rollup = SocietyStat.get_rollup(self.id)
         
         return {
             'total_residents': self.total_residents,
-            'total_complaints': total,
-            'open_complaints': self.open_complaints_count,
-            'resolved_complaints': resolved,
-            'resolution_rate': round(resolution_rate, 2),
+            'total_complaints': rollup['total'],
+            'open_complaints': rollup['status'].get('open', 0),
+            'resolved_complaints': rollup['resolved'],
+            'resolution_rate': round(rollup['resolution_rate'], 2),
             'average_karma': self.average_karma,
-            'category_wise': dict(category_stats),
-            'status_wise': dict(status_stats)
+            'category_wise': rollup['category'],
+            'status_wise': rollup['status']
         }
     
     def to_dict(self, include_stats=False):
@@ -0,0 +1,385 @@
+"""
+Society Stats Model - Materialized complaint rollups per society
+Kept up to date incrementally on every flush that creates, deletes or
+changes a complaint, so dashboards read one indexed lookup instead of
+re-aggregating the complaint table.
+"""
+
+from collections import defaultdict, namedtuple
+from datetime import datetime
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models.complaint import Complaint, ComplaintStatus
+
+
+# Statuses that no longer count towards open priorities
+CLOSED_STATUSES = frozenset({ComplaintStatus.RESOLVED.value, ComplaintStatus.CLOSED.value})
+
+# Statuses shown as "open" on the resident dashboard
+ACTIVE_STATUSES = (
+    ComplaintStatus.OPEN.value,
+    ComplaintStatus.ACKNOWLEDGED.value,
+    ComplaintStatus.IN_PROGRESS.value,
+    ComplaintStatus.ESCALATED.value
+)
+
+TRACKED_FIELDS = ('society_id', 'status', 'category', 'priority', 'created_at', 'resolved_at')
+
+# A rollup bucket as read back by get_rollup()
+RollupRow = namedtuple('RollupRow', ['dimension', 'bucket', 'count', 'resolution_seconds'])
+
+
+class ComplaintSnapshot(namedtuple('ComplaintSnapshot', TRACKED_FIELDS)):
+    """The complaint fields that feed the society rollup."""
+    __slots__ = ()
+
+    @classmethod
+    def of(cls, complaint):
+        return cls(*(getattr(complaint, field) for field in TRACKED_FIELDS))
+
+    def contributions(self):
+        """Yield (dimension, bucket, count, resolution_seconds) rows for this complaint."""
+        yield 'total', 'all', 1, 0
+        yield 'status', self.status, 1, 0
+        yield 'category', self.category, 1, 0
+        if self.status not in CLOSED_STATUSES:
+            yield 'open_priority', self.priority, 1, 0
+        if self.created_at:
+            month = self.created_at.strftime('%Y-%m')
+            yield 'month', month, 1, 0
+            if self.status == ComplaintStatus.RESOLVED.value:
+                yield 'month_resolved', month, 1, 0
+        if self.resolved_at and self.created_at:
+            seconds = int((self.resolved_at - self.created_at).total_seconds())
+            yield 'resolution', 'all', 1, seconds
+
+
+class SocietyStat(db.Model):
+    """One counter of the per-society complaint rollup."""
+    __tablename__ = 'society_stats'
+    __table_args__ = (
+        db.UniqueConstraint('society_id', 'dimension', 'bucket', name='uq_society_stats_bucket'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    society_id = db.Column(db.Integer, db.ForeignKey('society.id'), nullable=False)
+
+    # e.g. ('status', 'open'), ('category', 'noise'), ('month', '2024-05')
+    dimension = db.Column(db.String(20), nullable=False)
+    bucket = db.Column(db.String(50), nullable=False)
+
+    count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    resolution_seconds = db.Column(db.BigInteger, nullable=False, default=0, server_default='0')
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<SocietyStat {self.society_id} {self.dimension}:{self.bucket}={self.count}>'
+
+    # ============================================
+    # Writing
+    # ============================================
+
+    @staticmethod
+    def _upsert(connection, rows, replace=False):
+        """
+        Insert or update rollup rows.
+        rows: iterable of (society_id, dimension, bucket, count, seconds).
+        With replace=False the values are added to existing counters,
+        otherwise they overwrite them.
+        """
+        rows = [
+            {'society_id': s, 'dimension': d, 'bucket': b, 'count': c,
+             'resolution_seconds': r, 'updated_at': datetime.utcnow()}
+            for s, d, b, c, r in rows
+        ]
+        if not rows:
+            return
+
+        table = SocietyStat.__table__
+        dialect = connection.dialect.name
+
+        if dialect in ('sqlite', 'postgresql'):
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+
+            stmt = insert(table)
+            if replace:
+                count = stmt.excluded['count']
+                seconds = stmt.excluded.resolution_seconds
+            else:
+                count = table.c['count'] + stmt.excluded['count']
+                seconds = table.c.resolution_seconds + stmt.excluded.resolution_seconds
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['society_id', 'dimension', 'bucket'],
+                set_={'count': count, 'resolution_seconds': seconds,
+                      'updated_at': stmt.excluded.updated_at}
+            )
+            connection.execute(stmt, rows)
+            return
+
+        # Portable fallback: update, then insert whatever did not exist yet
+        for row in rows:
+            if replace:
+                values = {'count': row['count'], 'resolution_seconds': row['resolution_seconds']}
+            else:
+                values = {
+                    'count': table.c['count'] + row['count'],
+                    'resolution_seconds': table.c.resolution_seconds + row['resolution_seconds']
+                }
+            result = connection.execute(
+                table.update().where(
+                    table.c.society_id == row['society_id'],
+                    table.c.dimension == row['dimension'],
+                    table.c.bucket == row['bucket']
+                ).values(updated_at=row['updated_at'], **values)
+            )
+            if result.rowcount == 0:
+                connection.execute(table.insert().values(**row))
+
+    @staticmethod
+    def _compute(connection, society_ids=None):
+        """Aggregate the complaint table into {society_id: {(dimension, bucket): [count, seconds]}}."""
+        columns = [getattr(Complaint, field) for field in TRACKED_FIELDS]
+        query = select(*columns)
+        if society_ids is not None:
+            query = query.where(Complaint.society_id.in_(society_ids))
+
+        totals = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+        for society_id in society_ids or ():
+            totals[society_id][('total', 'all')]  # every rebuilt society gets a marker row
+
+        for row in connection.execute(query.execution_options(yield_per=5000)):
+            snapshot = ComplaintSnapshot(*row)
+            buckets = totals[snapshot.society_id]
+            for dimension, bucket, count, seconds in snapshot.contributions():
+                entry = buckets[(dimension, bucket)]
+                entry[0] += count
+                entry[1] += seconds
+        return totals
+
+    @staticmethod
+    def rebuild(society_ids, connection=None):
+        """Recompute the rollup for the given societies from the complaint table."""
+        connection = connection or db.session.connection()
+        society_ids = list(society_ids)
+        if not society_ids:
+            return
+
+        table = SocietyStat.__table__
+        totals = SocietyStat._compute(connection, society_ids)
+        connection.execute(table.delete().where(table.c.society_id.in_(society_ids)))
+        SocietyStat._upsert(connection, [
+            (society_id, dimension, bucket, count, seconds)
+            for society_id, buckets in totals.items()
+            for (dimension, bucket), (count, seconds) in buckets.items()
+        ], replace=True)
+
+    @staticmethod
+    def apply_changes(changes, connection=None):
+        """
+        Apply complaint changes to the rollup.
+        changes: iterable of (before, after) ComplaintSnapshot pairs, where
+        before is None for new complaints and after is None for deleted ones.
+        Bulk code paths that bypass the ORM flush must call this themselves.
+        """
+        connection = connection or db.session.connection()
+        deltas = defaultdict(lambda: [0, 0])
+
+        for before, after in changes:
+            for snapshot, sign in ((before, -1), (after, 1)):
+                if snapshot is None:
+                    continue
+                for dimension, bucket, count, seconds in snapshot.contributions():
+                    entry = deltas[(snapshot.society_id, dimension, bucket)]
+                    entry[0] += sign * count
+                    entry[1] += sign * seconds
+
+        deltas = {key: value for key, value in deltas.items() if value != [0, 0]}
+        if not deltas:
+            return
+
+        # Societies without a rollup yet (new, or pre-dating the table) are
+        # built from scratch; the complaint table already reflects this flush.
+        society_ids = {society_id for society_id, _, _ in deltas}
+        table = SocietyStat.__table__
+        built = set(connection.execute(
+            select(table.c.society_id).where(
+                table.c.society_id.in_(society_ids),
+                table.c.dimension == 'total'
+            )
+        ).scalars())
+
+        SocietyStat.rebuild(society_ids - built, connection)
+        SocietyStat._upsert(connection, [
+            (society_id, dimension, bucket, count, seconds)
+            for (society_id, dimension, bucket), (count, seconds) in deltas.items()
+            if society_id in built
+        ])
+
+    @staticmethod
+    def reconcile(society_id=None, dry_run=False):
+        """
+        Compare the rollup with a fresh aggregate and repair drifted societies.
+        Commits once per society. Returns {checked, drifted, repaired}.
+        """
+        from app.models.society import Society
+
+        if society_id is not None:
+            society_ids = [society_id]
+        else:
+            society_ids = [row[0] for row in db.session.query(Society.id).order_by(Society.id)]
+
+        checked = drifted = repaired = 0
+        for sid in society_ids:
+            connection = db.session.connection()
+            expected = {
+                key: tuple(value)
+                for key, value in SocietyStat._compute(connection, [sid])[sid].items()
+                if value != [0, 0] or key == ('total', 'all')
+            }
+            current = {
+                (row.dimension, row.bucket): (row.count, row.resolution_seconds)
+                for row in SocietyStat.query.filter_by(society_id=sid)
+                if row.count or row.resolution_seconds or row.dimension == 'total'
+            }
+
+            checked += 1
+            if expected != current:
+                drifted += 1
+                if not dry_run:
+                    SocietyStat.rebuild([sid], connection)
+                    db.session.commit()
+                    repaired += 1
+            if dry_run:
+                db.session.rollback()
+
+        return {'checked': checked, 'drifted': drifted, 'repaired': repaired}
+
+    # ============================================
+    # Reading
+    # ============================================
+
+    @staticmethod
+    def get_rollup(society_id):
+        """
+        Return the society's rollup as a dict.
+        Zero buckets are omitted, matching what a GROUP BY would return.
+        A society without a stored rollup is aggregated on the fly and
+        nothing is written: read paths may run on the replica or share the
+        session with a caller's uncommitted work. The rollup is stored by
+        the next complaint write for the society or by reconcile().
+        """
+        rows = db.session.query(
+            SocietyStat.dimension, SocietyStat.bucket,
+            SocietyStat.count, SocietyStat.resolution_seconds
+        ).filter(SocietyStat.society_id == society_id).all()
+
+        if not any(row.dimension == 'total' for row in rows):
+            computed = SocietyStat._compute(db.session, [society_id])[society_id]
+            rows = [
+                RollupRow(dimension, bucket, count, seconds)
+                for (dimension, bucket), (count, seconds) in computed.items()
+            ]
+
+        rollup = {
+            'total': 0,
+            'status': {},
+            'category': {},
+            'open_priority': {},
+            'month': {},
+            'month_resolved': {},
+            'resolution_count': 0,
+            'resolution_seconds': 0
+        }
+        for row in rows:
+            if row.dimension == 'total':
+                rollup['total'] = row.count
+            elif row.dimension == 'resolution':
+                rollup['resolution_count'] = row.count
+                rollup['resolution_seconds'] = row.resolution_seconds
+            elif row.count and row.dimension in rollup:
+                rollup[row.dimension][row.bucket] = row.count
+
+        total = rollup['total']
+        resolved = rollup['status'].get(ComplaintStatus.RESOLVED.value, 0)
+        rollup['resolved'] = resolved
+        rollup['open'] = sum(rollup['status'].get(s, 0) for s in ACTIVE_STATUSES)
+        rollup['resolution_rate'] = (resolved / total * 100) if total > 0 else 0
+        rollup['average_resolution_days'] = (
+            rollup['resolution_seconds'] / rollup['resolution_count'] / 86400
+            if rollup['resolution_count'] else 0
+        )
+        return rollup
+
+
+# ============================================
+# Incremental maintenance
+# ============================================
+
+def _snapshot_before(complaint):
+    """
+    Rebuild the complaint's pre-flush snapshot from attribute history.
+    Returns None when the old value of a changed field was never loaded.
+    """
+    state = inspect(complaint)
+    values = []
+    for field in TRACKED_FIELDS:
+        history = state.attrs[field].history
+        if history.deleted:
+            values.append(history.deleted[0])
+        elif history.unchanged:
+            values.append(history.unchanged[0])
+        elif history.added:
+            return None
+        else:
+            values.append(getattr(complaint, field))
+    return ComplaintSnapshot(*values)
+
+
+def _has_tracked_changes(complaint):
+    state = inspect(complaint)
+    return any(state.attrs[field].history.added for field in TRACKED_FIELDS)
+
+
+@event.listens_for(Session, 'after_flush')
+def _update_society_stats(session, flush_context):
+    changes = []
+    rebuild = set()
+
+    for obj in session.new:
+        if isinstance(obj, Complaint):
+            changes.append((None, ComplaintSnapshot.of(obj)))
+
+    for obj in session.deleted:
+        if isinstance(obj, Complaint):
+            before = _snapshot_before(obj)
+            if before is None:
+                rebuild.add(obj.society_id)
+            else:
+                changes.append((before, None))
+
+    for obj in session.dirty:
+        if isinstance(obj, Complaint) and obj not in session.deleted and _has_tracked_changes(obj):
+            before = _snapshot_before(obj)
+            after = ComplaintSnapshot.of(obj)
+            if before is None:
+                rebuild.add(after.society_id)
+            else:
+                changes.append((before, after))
+
+    if not changes and not rebuild:
+        return
+
+    connection = session.connection()
+    SocietyStat.apply_changes(
+        [(b, a) for b, a in changes
+         if (b is None or b.society_id not in rebuild) and (a is None or a.society_id not in rebuild)],
+        connection
+    )
+    SocietyStat.rebuild(rebuild, connection)
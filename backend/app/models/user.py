@@ -91,9 +91,21 @@ class User(db.Model, UserMixin):
     def __repr__(self):
         return f'<User {self.email}>'
     
+    def attach_principal(self, principal):
+        """Use a cached principal's role set for this instance's role checks."""
+        self._principal = principal
+    
+    @property
+    def role_names(self):
+        """Set of the user's role names."""
+        principal = getattr(self, '_principal', None)
+        if principal is not None:
+            return principal.roles
+        return frozenset(role.name for role in self.roles)
+    
     def has_role(self, role_name):
         """Check if user has a specific role."""
-        return any(role.name == role_name for role in self.roles)
+        return role_name in self.role_names
     
     def is_admin(self):
         """Check if user is admin."""
@@ -101,11 +113,11 @@ class User(db.Model, UserMixin):
     
     def is_secretary(self):
         """Check if user is secretary."""
-        return self.has_role('secretary') or self.has_role('admin')
+        return not self.role_names.isdisjoint(('secretary', 'admin'))
     
     def is_committee_member(self):
         """Check if user is committee member or above."""
-        return self.has_role('committee_member') or self.is_secretary()
+        return not self.role_names.isdisjoint(('committee_member', 'secretary', 'admin'))
     
     def get_display_name(self, anonymous=False):
         """Get display name, considering anonymity."""
@@ -114,7 +126,10 @@ class User(db.Model, UserMixin):
         return self.full_name
     
     def update_karma(self, points, reason, complaint_id=None):
-        """Update karma score and log the change."""
+        """
+        Update karma score and log the change.
+        The monthly aggregates pick the new entry up on flush (see karma_stats).
+        """
         self.karma_score += points
         
         karma_log = KarmaLog(
@@ -0,0 +1,220 @@
+"""
+Dashboard Service - Resident dashboard statistics
+Computes the dashboard in two queries (a conditional aggregate over the
+society rollup plus index-served scalar subqueries) and caches the result
+per user. Cache entries are keyed on society and user version stamps that
+are bumped whenever a commit touches the underlying data.
+"""
+
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect, select, func, case, or_
+from sqlalchemy.orm import Session
+
+from app.extensions import db, cache
+from app.models import Complaint, ComplaintStatus, User, KarmaLog, Notification, SocietyStat
+
+
+ACTIVE_STATUSES = (
+    ComplaintStatus.OPEN.value,
+    ComplaintStatus.ACKNOWLEDGED.value,
+    ComplaintStatus.IN_PROGRESS.value,
+    ComplaintStatus.ESCALATED.value
+)
+
+# Complaint fields that feed the dashboard counts
+COMPLAINT_FIELDS = ('society_id', 'status', 'resolved_at', 'accused_user_id', 'accused_flat')
+
+
+def _sum_if(condition, value):
+    return func.coalesce(func.sum(case((condition, value), else_=0)), 0)
+
+
+def _count(model, *criteria):
+    return select(func.count()).select_from(model).where(*criteria).scalar_subquery()
+
+
+class DashboardService:
+    """Build and cache per-user dashboard statistics."""
+
+    @staticmethod
+    def _version(kind, entity_id):
+        """Return the current version stamp for a society or user, creating one if missing."""
+        key = f'dashboard_ver:{kind}:{entity_id}'
+        version = cache.get(key)
+        if version is None:
+            version = uuid.uuid4().hex
+            cache.set(key, version, timeout=0)
+        return version
+
+    @staticmethod
+    def invalidate_society(society_id):
+        """Expire cached dashboards of every member of a society."""
+        cache.set(f'dashboard_ver:society:{society_id}', uuid.uuid4().hex, timeout=0)
+
+    @staticmethod
+    def invalidate_user(user_id):
+        """Expire one user's cached dashboard."""
+        cache.set(f'dashboard_ver:user:{user_id}', uuid.uuid4().hex, timeout=0)
+
+    @staticmethod
+    def get_stats(user_id, society_id):
+        """Return dashboard statistics for a user, served from cache when fresh."""
+        key = 'dashboard:{}:{}:{}'.format(
+            user_id,
+            DashboardService._version('society', society_id),
+            DashboardService._version('user', user_id)
+        )
+        stats = cache.get(key)
+        if stats is None:
+            stats = DashboardService.compute_stats(user_id, society_id)
+            cache.set(key, stats, timeout=current_app.config.get('DASHBOARD_CACHE_TIMEOUT', 30))
+        return stats
+
+    @staticmethod
+    def compute_stats(user_id, society_id):
+        """Compute dashboard statistics with two queries."""
+        week_ago = datetime.utcnow() - timedelta(days=7)
+
+        # 1. Status totals from the society rollup, plus per-user and weekly
+        #    complaint counts that each resolve to an index range
+        my_flat = select(User.flat_number).where(User.id == user_id).scalar_subquery()
+        accused_by_id = _count(
+            Complaint,
+            Complaint.accused_user_id == user_id,
+            Complaint.society_id == society_id
+        )
+        accused_by_flat = _count(
+            Complaint,
+            Complaint.society_id == society_id,
+            Complaint.accused_flat == my_flat,
+            or_(Complaint.accused_user_id.is_(None), Complaint.accused_user_id != user_id)
+        )
+        complaints = db.session.query(
+            _sum_if(SocietyStat.dimension == 'total', 1).label('has_rollup'),
+            _sum_if(SocietyStat.bucket.in_(ACTIVE_STATUSES), SocietyStat.count).label('open'),
+            _sum_if(SocietyStat.bucket == ComplaintStatus.RESOLVED.value, SocietyStat.count).label('resolved'),
+            _count(Complaint, Complaint.complainant_id == user_id).label('mine'),
+            (accused_by_id + accused_by_flat).label('against_me'),
+            _count(
+                Complaint,
+                Complaint.society_id == society_id,
+                Complaint.created_at >= week_ago
+            ).label('new_this_week'),
+            _count(
+                Complaint,
+                Complaint.society_id == society_id,
+                Complaint.resolved_at >= week_ago
+            ).label('resolved_this_week')
+        ).filter(
+            SocietyStat.society_id == society_id,
+            SocietyStat.dimension.in_(('total', 'status'))
+        ).one()
+
+        open_count, resolved_count = complaints.open, complaints.resolved
+        if not complaints.has_rollup:
+            # Society predates the rollup; aggregate its statuses on the fly
+            statuses = SocietyStat.get_rollup(society_id)['status']
+            open_count = sum(statuses.get(status, 0) for status in ACTIVE_STATUSES)
+            resolved_count = statuses.get(ComplaintStatus.RESOLVED.value, 0)
+
+        # 2. Everything else as scalar subqueries of one statement
+        society_karma = select(func.avg(User.karma_score)).where(
+            User.society_id == society_id,
+            User.active == True
+        ).scalar_subquery()
+        karma_change = select(func.sum(KarmaLog.points)).where(
+            KarmaLog.user_id == user_id,
+            KarmaLog.created_at >= week_ago
+        ).scalar_subquery()
+        unread = select(func.count(Notification.id)).where(
+            Notification.user_id == user_id,
+            Notification.is_read == False
+        ).scalar_subquery()
+        person = db.session.query(
+            User.karma_score,
+            society_karma.label('society_karma'),
+            karma_change.label('karma_change'),
+            unread.label('unread')
+        ).filter(User.id == user_id).one()
+
+        return {
+            'total_complaints_open': int(open_count or 0),
+            'total_complaints_resolved': int(resolved_count or 0),
+            'my_complaints_count': int(complaints.mine),
+            'complaints_against_me': int(complaints.against_me),
+            'my_karma': person.karma_score,
+            'my_karma_change_this_week': person.karma_change or 0,
+            'society_karma_average': round(person.society_karma or 0, 2),
+            'new_complaints_this_week': int(complaints.new_this_week),
+            'resolved_this_week': int(complaints.resolved_this_week),
+            'unread_notifications': person.unread
+        }
+
+
+# ============================================
+# Event-driven invalidation
+# Affected societies and users are collected at flush time and their
+# version stamps bumped once the transaction commits. Bulk UPDATE/DELETE
+# paths call DashboardService.invalidate_* themselves.
+# ============================================
+
+_PENDING_KEY = 'dashboard_invalidations'
+
+
+def _changed(obj, fields):
+    state = inspect(obj)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+
+def _previous(obj, field):
+    history = inspect(obj).attrs[field].history
+    return history.deleted[0] if history.deleted else None
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_dashboard_invalidations(session, flush_context):
+    societies, users = set(), set()
+
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, Complaint):
+            societies.add(obj.society_id)
+        elif isinstance(obj, (Notification, KarmaLog)):
+            users.add(obj.user_id)
+
+    for obj in session.dirty:
+        if isinstance(obj, Complaint) and _changed(obj, COMPLAINT_FIELDS):
+            societies.update({obj.society_id, _previous(obj, 'society_id')})
+        elif isinstance(obj, Notification) and _changed(obj, ('is_read',)):
+            users.add(obj.user_id)
+        elif isinstance(obj, User):
+            if _changed(obj, ('karma_score', 'flat_number')):
+                users.add(obj.id)
+            if _changed(obj, ('karma_score', 'active', 'society_id')):
+                societies.update({obj.society_id, _previous(obj, 'society_id')})
+
+    societies.discard(None)
+    users.discard(None)
+    if societies or users:
+        pending = session.info.setdefault(_PENDING_KEY, (set(), set()))
+        pending[0].update(societies)
+        pending[1].update(users)
+
+
+@event.listens_for(Session, 'after_commit')
+def _flush_dashboard_invalidations(session):
+    societies, users = session.info.pop(_PENDING_KEY, ((), ()))
+    if not has_app_context():
+        return  # no cache to talk to; entries expire via DASHBOARD_CACHE_TIMEOUT
+    for society_id in societies:
+        DashboardService.invalidate_society(society_id)
+    for user_id in users:
+        DashboardService.invalidate_user(user_id)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_dashboard_invalidations(session, previous_transaction):
+    if not session.in_transaction():
+        session.info.pop(_PENDING_KEY, None)
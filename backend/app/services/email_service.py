@@ -216,6 +216,60 @@ def send_email(to, template_name, **kwargs):
         }
 
 
+def render_email(template_name, **kwargs):
+    """
+    Render a template to (subject, body).
+    Compiled templates are kept on the app, so bulk sends parse each template once.
+    """
+    compiled = current_app.extensions.setdefault('email_templates', {})
+    if template_name not in compiled:
+        template = TEMPLATES.get(template_name)
+        if not template:
+            raise KeyError(f'Unknown template: {template_name}')
+        compiled[template_name] = (
+            current_app.jinja_env.from_string(template['subject']),
+            current_app.jinja_env.from_string(template['body'])
+        )
+    subject, body = compiled[template_name]
+    return subject.render(**kwargs), body.render(**kwargs)
+
+
+def send_batch(messages):
+    """
+    Send many templated emails over one SMTP connection
+    (Flask-Mail reconnects every MAIL_MAX_EMAILS messages).
+    
+    Args:
+        messages: Iterable of (to, template_name, kwargs)
+    
+    Returns:
+        dict: Counts of sent and failed messages
+    """
+    messages = list(messages)
+    if not current_app.config.get('MAIL_SERVER'):
+        logger.warning(f"Emails not sent - MAIL_SERVER not configured. Would send {len(messages)} messages")
+        return {'success': False, 'message': 'Mail server not configured', 'sent': 0, 'failed': 0}
+    
+    sent = failed = 0
+    sender = current_app.config.get('MAIL_DEFAULT_SENDER')
+    try:
+        with mail.connect() as connection:
+            for to, template_name, kwargs in messages:
+                try:
+                    subject, body = render_email(template_name, **kwargs)
+                    connection.send(Message(subject=subject, recipients=[to], body=body, sender=sender))
+                    sent += 1
+                except Exception as e:
+                    logger.error(f"Failed to send {template_name} to {to}: {str(e)}")
+                    failed += 1
+    except Exception as e:
+        logger.error(f"Mail connection failed: {str(e)}")
+        return {'success': False, 'message': str(e), 'sent': sent, 'failed': len(messages) - sent}
+    
+    logger.info(f"Email batch sent: {sent} sent, {failed} failed")
+    return {'success': failed == 0, 'sent': sent, 'failed': failed}
+
+
 def send_email_async(to, template_name, **kwargs):
     """
     Send email asynchronously using Celery if available.
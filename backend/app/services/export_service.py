@@ -0,0 +1,191 @@
+"""
+Export Service - Streaming complaint exports
+Complaints are read through a server-side cursor (yield_per) in society
+and date order; comments and escalations are loaded once per chunk. Output
+is produced chunk by chunk as CSV or NDJSON, optionally gzip-compressed,
+so memory use does not grow with the size of the society.
+"""
+
+import csv
+import io
+import json
+import zlib
+
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+
+from app.extensions import db
+from app.models import Complaint, ComplaintComment, Escalation, User
+
+
+EXPORT_CHUNK_SIZE = 500
+
+ANONYMOUS_NAME = 'Anonymous Resident'
+
+CSV_COLUMNS = (
+    'id', 'created_at', 'title', 'description', 'category', 'priority', 'status',
+    'complainant', 'accused_flat', 'support_count', 'oppose_count', 'comments_count',
+    'evidence_count', 'escalations_count', 'escalated_to', 'resolved_at',
+    'resolution_note', 'comments'
+)
+
+
+# Leading characters that make Excel / Sheets treat a cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _csv_cell(value):
+    """Neutralise resident-supplied text that would run as a spreadsheet formula."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class ComplaintExporter:
+    """Stream a society's complaints with their comments and escalations."""
+
+    @staticmethod
+    def iter_records(society_id, status=None, category=None, date_from=None, date_to=None,
+                     chunk_size=EXPORT_CHUNK_SIZE):
+        """
+        Yield lists of complaint dicts, one list per chunk of chunk_size.
+
+        Identities are masked on anonymous complaints and comments: exports
+        leave the app, so they follow the public view rather than the
+        secretary's.
+        """
+        complainant = aliased(User)
+        query = select(
+            Complaint.id, Complaint.created_at, Complaint.title, Complaint.description,
+            Complaint.category, Complaint.priority, Complaint.status, Complaint.is_anonymous,
+            complainant.full_name.label('complainant_name'),
+            complainant.flat_number.label('complainant_flat'),
+            Complaint.accused_flat, Complaint.support_count, Complaint.oppose_count,
+            Complaint.comments_count, Complaint.evidence_count, Complaint.escalations_count,
+            Complaint.resolved_at, Complaint.resolution_note
+        ).join(complainant, complainant.id == Complaint.complainant_id)\
+         .where(Complaint.society_id == society_id)
+
+        if status:
+            query = query.where(Complaint.status.in_(status))
+        if category:
+            query = query.where(Complaint.category == category)
+        if date_from:
+            query = query.where(Complaint.created_at >= date_from)
+        if date_to:
+            query = query.where(Complaint.created_at < date_to)
+
+        # (society_id, created_at, id) is covered by ix_complaint_society_created
+        query = query.order_by(Complaint.created_at, Complaint.id)
+
+        result = db.session.execute(query.execution_options(yield_per=chunk_size))
+        for rows in result.partitions():
+            ids = [row.id for row in rows]
+            comments = ComplaintExporter._comments_by_complaint(ids)
+            escalations = ComplaintExporter._escalations_by_complaint(ids)
+
+            yield [{
+                'id': row.id,
+                'created_at': _iso(row.created_at),
+                'title': row.title,
+                'description': row.description,
+                'category': row.category,
+                'priority': row.priority,
+                'status': row.status,
+                'complainant': ANONYMOUS_NAME if row.is_anonymous
+                else f'{row.complainant_name} ({row.complainant_flat})',
+                'accused_flat': row.accused_flat,
+                'support_count': row.support_count or 0,
+                'oppose_count': row.oppose_count or 0,
+                'comments_count': row.comments_count,
+                'evidence_count': row.evidence_count,
+                'escalations_count': row.escalations_count,
+                'resolved_at': _iso(row.resolved_at),
+                'resolution_note': row.resolution_note,
+                'comments': comments.get(row.id, []),
+                'escalations': escalations.get(row.id, [])
+            } for row in rows]
+
+    @staticmethod
+    def _comments_by_complaint(ids):
+        grouped = {}
+        rows = db.session.query(
+            ComplaintComment.complaint_id, ComplaintComment.comment_text,
+            ComplaintComment.is_anonymous, ComplaintComment.is_official,
+            ComplaintComment.created_at, User.full_name
+        ).join(User, User.id == ComplaintComment.user_id)\
+         .filter(ComplaintComment.complaint_id.in_(ids))\
+         .order_by(ComplaintComment.complaint_id, ComplaintComment.created_at)
+        for row in rows:
+            grouped.setdefault(row.complaint_id, []).append({
+                'author': ANONYMOUS_NAME if row.is_anonymous else row.full_name,
+                'is_official': bool(row.is_official),
+                'text': row.comment_text,
+                'created_at': _iso(row.created_at)
+            })
+        return grouped
+
+    @staticmethod
+    def _escalations_by_complaint(ids):
+        grouped = {}
+        rows = db.session.query(
+            Escalation.complaint_id, Escalation.escalated_to, Escalation.reason,
+            Escalation.is_auto_escalated, Escalation.is_acknowledged, Escalation.escalated_at
+        ).filter(Escalation.complaint_id.in_(ids))\
+         .order_by(Escalation.complaint_id, Escalation.escalated_at)
+        for row in rows:
+            grouped.setdefault(row.complaint_id, []).append({
+                'escalated_to': row.escalated_to,
+                'reason': row.reason,
+                'is_auto_escalated': bool(row.is_auto_escalated),
+                'is_acknowledged': bool(row.is_acknowledged),
+                'escalated_at': _iso(row.escalated_at)
+            })
+        return grouped
+
+    # ============================================
+    # Encoders: each yields one string per chunk
+    # ============================================
+
+    @staticmethod
+    def iter_csv(chunks):
+        """
+        CSV with one row per complaint; comments and escalations are
+        flattened. Text cells that start like a formula are prefixed with '.
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CSV_COLUMNS)
+        yield buffer.getvalue()
+
+        for records in chunks:
+            buffer.seek(0)
+            buffer.truncate()
+            for record in records:
+                flat = dict(record)
+                flat['escalated_to'] = ';'.join(e['escalated_to'] for e in record['escalations'])
+                flat['comments'] = ' | '.join(
+                    f"{c['author']}: {c['text']}" for c in record['comments']
+                )
+                writer.writerow([_csv_cell(flat[column]) for column in CSV_COLUMNS])
+            yield buffer.getvalue()
+
+    @staticmethod
+    def iter_ndjson(chunks):
+        """One JSON object per line, with nested comments and escalations."""
+        for records in chunks:
+            yield ''.join(json.dumps(record) + '\n' for record in records)
+
+    @staticmethod
+    def gzip(chunks):
+        """Compress a stream of strings into a gzip stream of bytes."""
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31: gzip container
+        for chunk in chunks:
+            data = compressor.compress(chunk.encode('utf-8'))
+            if data:
+                yield data
+        yield compressor.flush()
@@ -0,0 +1,435 @@
+"""
+Leaderboard Service - Ranked karma index per society
+Each society's active residents are kept in a score-sorted array, so
+top-N, bottom-N, rank and percentile are answered with bisection instead
+of sorting and counting residents in the database. The array is loaded
+from the database on first use and published to the shared cache under a
+version stamp, so other workers reuse it without a reload.
+
+A commit that changes residents applies its score deltas and listing
+changes to the published board under a per-society lock in the shared
+cache, without touching the database. Every change also replaces the
+society's generation token, and a board loaded from the database is only
+published if the token is unchanged, so a slow load can't overwrite a
+newer board. A published board never outlives LEADERBOARD_CACHE_TIMEOUT
+from its load, which bounds drift from anything the commit hooks miss.
+"""
+
+import math
+import threading
+import time
+import uuid
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, namedtuple
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.extensions import db, cache
+from app.models import Society, User
+
+
+# User fields shown on the leaderboard; changes to any of them drop the board
+MEMBER_FIELDS = ('karma_score', 'full_name', 'flat_number', 'wing', 'avatar_url')
+TRACKED_FIELDS = MEMBER_FIELDS + ('active', 'society_id')
+
+# Boards kept in each worker process (one per recently used society)
+LOCAL_BOARDS = 256
+
+# Per-society publish lock in the shared cache: expiry if a holder dies,
+# and how long a commit waits for it before dropping the board instead
+LOCK_TIMEOUT = 5
+LOCK_RETRIES = (0.005, 0.01, 0.02, 0.05, 0.1)
+
+
+class LeaderboardMember(namedtuple('LeaderboardMember',
+                                   ['user_id', 'karma_score', 'full_name', 'flat_number', 'wing', 'avatar_url'])):
+    """One resident's entry on the leaderboard."""
+    __slots__ = ()
+
+    @property
+    def key(self):
+        # Ascending by score; ties list the older account first from the top
+        return (self.karma_score or 0, -self.user_id)
+
+
+class Leaderboard:
+    """Immutable score-ordered view of one society's active residents."""
+
+    def __init__(self, society_id, name, members, version=None, expires_at=None):
+        self.society_id = society_id
+        self.name = name
+        self.version = version
+        self.expires_at = expires_at
+        self._members = {member.user_id: member for member in members}
+        self._keys = sorted(member.key for member in self._members.values())
+        self._total = sum(key[0] for key in self._keys)
+
+    @classmethod
+    def from_snapshot(cls, society_id, snapshot, version):
+        return cls(society_id, snapshot['name'],
+                   [LeaderboardMember(*row) for row in snapshot['members']],
+                   version, snapshot['expires_at'])
+
+    def snapshot(self):
+        """Picklable form stored in the shared cache."""
+        return {'name': self.name, 'expires_at': self.expires_at,
+                'members': [tuple(m) for m in self._members.values()]}
+
+    def with_changes(self, changes):
+        """
+        New board with {user_id: change} applied (see MemberChange), keeping
+        the sorted keys by bisection instead of re-sorting. Returns None if a
+        change can't be applied, e.g. a delta for a resident not on the board.
+        """
+        members = dict(self._members)
+        keys = list(self._keys)
+        total = self._total
+        for user_id, change in changes.items():
+            old = members.pop(user_id, None)
+            new = change.apply(old)
+            if new is change.INVALID:
+                return None
+            if old is not None:
+                del keys[bisect_left(keys, old.key)]
+                total -= old.key[0]
+            if new is not None:
+                members[user_id] = new
+                keys.insert(bisect_left(keys, new.key), new.key)
+                total += new.key[0]
+
+        board = Leaderboard.__new__(Leaderboard)
+        board.society_id = self.society_id
+        board.name = self.name
+        board.version = None
+        board.expires_at = self.expires_at
+        board._members = members
+        board._keys = keys
+        board._total = total
+        return board
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, user_id):
+        return user_id in self._members
+
+    @property
+    def average(self):
+        return round(self._total / len(self._keys), 2) if self._keys else 0
+
+    def member(self, user_id):
+        return self._members.get(user_id)
+
+    def top(self, limit):
+        """Highest karma first."""
+        keys = self._keys[:-limit - 1:-1] if limit > 0 else []
+        return [self._members[-user_id] for _, user_id in keys]
+
+    def bottom(self, limit):
+        """Lowest karma first."""
+        return [self._members[-user_id] for _, user_id in self._keys[:max(limit, 0)]]
+
+    def rank_for_score(self, score):
+        """1 + number of residents with strictly more karma (ties share a rank)."""
+        return len(self._keys) - bisect_right(self._keys, (score or 0, float('inf'))) + 1
+
+    def rank(self, user_id):
+        member = self._members.get(user_id)
+        return self.rank_for_score(member.karma_score) if member else None
+
+    def percentile(self, rank):
+        total = len(self._keys)
+        return round((total - rank + 1) / total * 100, 1) if total > 0 else 100
+
+
+class MemberChange:
+    """
+    One resident's pending change to a board: replace the entry (put),
+    drop it (remove), or add a score delta and overwrite shown fields.
+    """
+
+    INVALID = object()
+
+    def __init__(self, member=None, remove=False, delta=0, fields=None):
+        self.member = member
+        self.remove = remove
+        self.delta = delta
+        self.fields = fields or {}
+
+    def merge(self, later):
+        """This change followed by a later one from the same transaction, or None."""
+        if later.member is not None or later.remove:
+            return later
+        if self.remove:
+            return None
+        if self.member is not None:
+            return MemberChange(member=later.apply(self.member))
+        return MemberChange(delta=self.delta + later.delta, fields=dict(self.fields, **later.fields))
+
+    def apply(self, current):
+        """The resident's new entry, None to drop it, or INVALID."""
+        if self.remove:
+            return None
+        if self.member is not None:
+            return self.member
+        if current is None:
+            return self.INVALID
+        return current._replace(karma_score=(current.karma_score or 0) + self.delta, **self.fields)
+
+
+class LeaderboardService:
+    """Load, share and maintain per-society leaderboards."""
+
+    _local = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _keys(society_id, version=None):
+        return f'leaderboard_ver:{society_id}', f'leaderboard:{society_id}:{version}'
+
+    @staticmethod
+    def _generation_key(society_id):
+        return f'leaderboard_gen:{society_id}'
+
+    @staticmethod
+    def _acquire(society_id):
+        """Take the society's publish lock; returns a release callable or None."""
+        lock_key = f'leaderboard_lock:{society_id}'
+        for wait in (0,) + LOCK_RETRIES:
+            if wait:
+                time.sleep(wait)
+            if cache.add(lock_key, uuid.uuid4().hex, timeout=LOCK_TIMEOUT):
+                return lambda: cache.delete(lock_key)
+        return None
+
+    @staticmethod
+    def _remember(board):
+        with LeaderboardService._lock:
+            LeaderboardService._local[board.society_id] = board
+            LeaderboardService._local.move_to_end(board.society_id)
+            while len(LeaderboardService._local) > LOCAL_BOARDS:
+                LeaderboardService._local.popitem(last=False)
+
+    @staticmethod
+    def _publish(board, previous_version=None):
+        """
+        Store a board in the shared cache under a fresh version stamp (call
+        with the publish lock held). Both keys expire when the board loaded
+        from the database would, however often it is patched, so a board is
+        rebuilt at least every LEADERBOARD_CACHE_TIMEOUT seconds.
+        """
+        if board.expires_at is None:
+            board.expires_at = time.time() + current_app.config.get('LEADERBOARD_CACHE_TIMEOUT', 600)
+        timeout = math.ceil(board.expires_at - time.time())
+        if timeout <= 0:
+            LeaderboardService.invalidate(board.society_id)
+            return board
+
+        version = uuid.uuid4().hex
+        version_key, board_key = LeaderboardService._keys(board.society_id, version)
+        cache.set(board_key, board.snapshot(), timeout=timeout)
+        cache.set(version_key, version, timeout=timeout)
+        if previous_version is not None:
+            cache.delete(LeaderboardService._keys(board.society_id, previous_version)[1])
+        board.version = version
+        LeaderboardService._remember(board)
+        return board
+
+    @staticmethod
+    def _cached(society_id):
+        """Return the shared board, reusing this worker's copy when it is current."""
+        version_key, _ = LeaderboardService._keys(society_id)
+        version = cache.get(version_key)
+        if version is None:
+            return None
+
+        local = LeaderboardService._local.get(society_id)
+        if local is not None and local.version == version:
+            return local
+
+        snapshot = cache.get(LeaderboardService._keys(society_id, version)[1])
+        if snapshot is None:
+            return None
+        board = Leaderboard.from_snapshot(society_id, snapshot, version)
+        LeaderboardService._remember(board)
+        return board
+
+    @staticmethod
+    def load(society_id):
+        """Build a society's board from the database (two queries)."""
+        name = db.session.query(Society.name).filter(Society.id == society_id).scalar()
+        if name is None:
+            return None
+        rows = db.session.query(User.id, *(getattr(User, field) for field in MEMBER_FIELDS))\
+            .filter(User.society_id == society_id, User.active == True)
+        return Leaderboard(society_id, name, [LeaderboardMember(*row) for row in rows])
+
+    @staticmethod
+    def get(society_id):
+        """Return the society's leaderboard, or None if the society does not exist."""
+        board = LeaderboardService._cached(society_id)
+        if board is not None:
+            return board
+
+        generation_key = LeaderboardService._generation_key(society_id)
+        generation = cache.get(generation_key)
+        board = LeaderboardService.load(society_id)
+        if board is None:
+            return None
+
+        # A change committed since the load started would be missing from
+        # this board; serve it to this request but don't publish it
+        release = LeaderboardService._acquire(society_id)
+        if release is not None:
+            try:
+                if cache.get(generation_key) == generation:
+                    LeaderboardService._publish(board)
+            finally:
+                release()
+        return board
+
+    @staticmethod
+    def apply_changes(society_id, changes):
+        """
+        Apply committed {user_id: MemberChange} to the society's published
+        board. Falls back to dropping the board if the lock can't be taken
+        or a change doesn't fit the board.
+        """
+        release = LeaderboardService._acquire(society_id)
+        if release is None:
+            LeaderboardService.invalidate(society_id)
+            return
+        try:
+            cache.set(LeaderboardService._generation_key(society_id), uuid.uuid4().hex,
+                      timeout=current_app.config.get('LEADERBOARD_CACHE_TIMEOUT', 600))
+            board = LeaderboardService._cached(society_id)
+            if board is None:
+                return
+            patched = board.with_changes(changes) if changes is not None else None
+            if patched is None:
+                LeaderboardService.invalidate(society_id)
+            else:
+                LeaderboardService._publish(patched, previous_version=board.version)
+        finally:
+            release()
+
+    @staticmethod
+    def invalidate(society_id):
+        """Drop a society's board so the next read rebuilds it."""
+        cache.set(LeaderboardService._generation_key(society_id), uuid.uuid4().hex,
+                  timeout=current_app.config.get('LEADERBOARD_CACHE_TIMEOUT', 600))
+        cache.delete(LeaderboardService._keys(society_id)[0])
+        with LeaderboardService._lock:
+            LeaderboardService._local.pop(society_id, None)
+
+
+# ============================================
+# Commit-time maintenance
+# Resident changes are collected per society at flush time, as score
+# deltas and new field values, and applied to the published boards once
+# the transaction commits. A change that can't be expressed that way (a
+# renamed society, a score set by SQL expression) drops the board instead.
+# Bulk UPDATE paths call LeaderboardService.invalidate themselves.
+# ============================================
+
+_PENDING_KEY = 'leaderboard_changes'
+
+
+def _before(obj, field):
+    """Value of field before this flush."""
+    history = inspect(obj).attrs[field].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.added:
+        return None
+    return getattr(obj, field)
+
+
+def _member(obj):
+    return LeaderboardMember(obj.id, *(getattr(obj, field) for field in MEMBER_FIELDS))
+
+
+def _update(obj):
+    """Score delta and changed fields of a resident who stays listed, or None."""
+    state = inspect(obj)
+    delta = 0
+    fields = {}
+    for field in MEMBER_FIELDS:
+        history = state.attrs[field].history
+        if not history.has_changes():
+            continue
+        if field != 'karma_score':
+            fields[field] = getattr(obj, field)
+            continue
+        old = history.deleted[0] if history.deleted else None
+        new = history.added[0] if history.added else None
+        if not isinstance(old, int) or not isinstance(new, int):
+            return None  # unloaded or set by SQL expression
+        delta = new - old
+    return MemberChange(delta=delta, fields=fields)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_leaderboard_changes(session, flush_context):
+    pending = session.info.get(_PENDING_KEY)
+
+    def record(society_id, user_id, change):
+        nonlocal pending
+        if society_id is None:
+            return
+        if pending is None:
+            pending = session.info.setdefault(_PENDING_KEY, {})
+        changes = pending.setdefault(society_id, {})
+        if changes is None:
+            return
+        if change is not None and user_id in changes:
+            change = changes[user_id].merge(change)
+        if change is None:
+            pending[society_id] = None  # drop the board on commit
+        else:
+            changes[user_id] = change
+
+    for obj in session.new:
+        if isinstance(obj, User) and obj.active:
+            record(obj.society_id, obj.id, MemberChange(member=_member(obj)))
+
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            record(_before(obj, 'society_id') or obj.society_id, obj.id, MemberChange(remove=True))
+
+    for obj in session.dirty:
+        if isinstance(obj, Society) and inspect(obj).attrs.name.history.has_changes():
+            record(obj.id, None, None)
+        if not isinstance(obj, User) or obj in session.deleted:
+            continue
+        state = inspect(obj)
+        if not any(state.attrs[field].history.has_changes() for field in TRACKED_FIELDS):
+            continue
+
+        old_society = _before(obj, 'society_id') if state.attrs.society_id.history.has_changes() \
+            else obj.society_id
+        was_listed = bool(_before(obj, 'active')) and old_society is not None
+        is_listed = bool(obj.active) and obj.society_id is not None
+        if was_listed and (not is_listed or old_society != obj.society_id):
+            record(old_society, obj.id, MemberChange(remove=True))
+        if is_listed and (not was_listed or old_society != obj.society_id):
+            record(obj.society_id, obj.id, MemberChange(member=_member(obj)))
+        elif is_listed:
+            record(obj.society_id, obj.id, _update(obj))
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_leaderboard_changes(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending or not has_app_context():
+        return  # no cache to talk to; boards expire via LEADERBOARD_CACHE_TIMEOUT
+    for society_id, changes in pending.items():
+        LeaderboardService.apply_changes(society_id, changes)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_leaderboard_changes(session, previous_transaction):
+    if not session.in_transaction():
+        session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,160 @@
+"""
+Notification Service - Buffered notification fan-out
+Notifications raised during a request or task are queued on the database
+session and written when it commits: duplicates about the same complaint
+are merged, recent unread ones are updated in place (bumping updated_at,
+never created_at), and the rest go out in a single bulk insert.
+"""
+
+from datetime import datetime, timedelta
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, insert, update, bindparam, or_, and_
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models import Notification, NotificationType
+from app.services.notification_stream import broker
+
+
+_PENDING_KEY = 'pending_notifications'
+_NOTIFIED_KEY = 'notified_users'
+
+DEFAULT_COALESCE_WINDOW = 900  # seconds
+
+
+class NotificationDispatcher:
+    """Queue notifications on the session and write them in bulk at commit."""
+
+    @staticmethod
+    def notify(user_id, title, message, notification_type=NotificationType.SYSTEM,
+               complaint_id=None, action_url=None):
+        """Queue one notification; it is written when the session commits."""
+        NotificationDispatcher.notify_many(
+            [user_id], title, message, notification_type, complaint_id, action_url
+        )
+
+    @staticmethod
+    def notify_many(user_ids, title, message, notification_type=NotificationType.SYSTEM,
+                    complaint_id=None, action_url=None):
+        """Queue the same notification for several recipients."""
+        pending = db.session.info.setdefault(_PENDING_KEY, [])
+        for user_id in user_ids:
+            pending.append({
+                'user_id': user_id,
+                'title': title,
+                'message': message,
+                'notification_type': notification_type,
+                'related_complaint_id': complaint_id,
+                'action_url': action_url
+            })
+
+    @staticmethod
+    def _coalesce_window():
+        seconds = DEFAULT_COALESCE_WINDOW
+        if has_app_context():
+            seconds = current_app.config.get('NOTIFICATION_COALESCE_WINDOW', seconds)
+        return timedelta(seconds=seconds)
+
+    @staticmethod
+    def flush(session):
+        """Write queued notifications; returns the number of rows inserted."""
+        pending = session.info.pop(_PENDING_KEY, None)
+        if not pending:
+            return 0
+
+        now = datetime.utcnow()
+
+        # Merge duplicates within the batch. Only complaint notifications
+        # coalesce; everything else keeps its own row.
+        merged = {}
+        for i, row in enumerate(pending):
+            if row['related_complaint_id'] is None:
+                key = i
+            else:
+                key = (row['user_id'], row['related_complaint_id'],
+                       row['notification_type'], row['title'])
+            if key in merged:
+                merged[key]['message'] = row['message']
+                merged[key]['coalesced_count'] += 1
+            else:
+                merged[key] = dict(row, coalesced_count=1, is_read=False, created_at=now, updated_at=now)
+
+        # Fold into recent unread notifications with the same key
+        keyed = [key for key in merged if isinstance(key, tuple)]
+        updates = []
+        if keyed:
+            existing = session.execute(
+                db.select(
+                    Notification.id, Notification.user_id, Notification.related_complaint_id,
+                    Notification.notification_type, Notification.title, Notification.updated_at
+                ).where(
+                    Notification.user_id.in_({key[0] for key in keyed}),
+                    Notification.is_read == False,
+                    Notification.updated_at >= now - NotificationDispatcher._coalesce_window(),
+                    or_(*[
+                        and_(Notification.related_complaint_id == complaint_id, Notification.title == title)
+                        for complaint_id, title in {(key[1], key[3]) for key in keyed}
+                    ])
+                )
+            ).all()
+
+            # Newest match wins; sorting here keeps the lookup an index range
+            for row in sorted(existing, key=lambda r: r.updated_at, reverse=True):
+                key = (row.user_id, row.related_complaint_id, row.notification_type, row.title)
+                if key in merged:
+                    new = merged.pop(key)
+                    updates.append({
+                        'target_id': row.id,
+                        'new_message': new['message'],
+                        'extra': new['coalesced_count'],
+                        'now': now
+                    })
+
+        if updates:
+            table = Notification.__table__
+            session.execute(
+                update(table)
+                .where(table.c.id == bindparam('target_id'))
+                .values(
+                    message=bindparam('new_message'),
+                    coalesced_count=table.c.coalesced_count + bindparam('extra'),
+                    updated_at=bindparam('now')
+                ),
+                updates
+            )
+
+        rows = list(merged.values())
+        if rows:
+            session.execute(insert(Notification), rows)
+
+        notified = session.info.setdefault(_NOTIFIED_KEY, set())
+        notified.update(row['user_id'] for row in pending)
+        return len(rows)
+
+
+@event.listens_for(Session, 'before_commit')
+def _flush_pending_notifications(session):
+    NotificationDispatcher.flush(session)
+
+
+@event.listens_for(Session, 'after_commit')
+def _after_notifications_committed(session):
+    user_ids = session.info.pop(_NOTIFIED_KEY, None)
+    if not user_ids:
+        return
+    broker.publish(user_ids)
+    if not has_app_context():
+        return
+
+    # Bulk writes bypass the dashboard's flush hooks
+    from app.services.dashboard_service import DashboardService
+    for user_id in user_ids:
+        DashboardService.invalidate_user(user_id)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_pending_notifications(session, previous_transaction):
+    if not session.in_transaction():
+        session.info.pop(_PENDING_KEY, None)
+        session.info.pop(_NOTIFIED_KEY, None)
@@ -0,0 +1,255 @@
+"""
+Notification Stream - Live notifications over Server-Sent Events
+Open streams subscribe to an in-process broker. Commits that touch a
+user's notifications wake that user's streams, which then read what changed
+with an index range. A bridge thread polls the database every
+NOTIFICATION_STREAM_POLL_INTERVAL seconds so that commits made by other
+gunicorn workers (or Celery) reach this worker's streams too.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, or_, and_
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models import Notification
+from app.utils.helpers import encode_cursor
+
+
+logger = logging.getLogger(__name__)
+
+# Notifications sent per read; a full batch is followed by another read
+STREAM_BATCH_SIZE = 50
+
+
+class Subscription:
+    """One open stream. Wakes are level-triggered, so bursts collapse into one read."""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self._wake = threading.Event()
+
+    def wake(self):
+        self._wake.set()
+
+    def wait(self, timeout):
+        """Block until woken or timeout; returns True if woken."""
+        woken = self._wake.wait(timeout)
+        self._wake.clear()
+        return woken
+
+
+class NotificationBroker:
+    """In-process pub/sub keyed by user id."""
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._bridge_pid = None
+
+    def subscribe(self, user_id, max_clients=None):
+        """Register a stream; returns None when the process is at max_clients."""
+        subscription = Subscription(user_id)
+        with self._lock:
+            if max_clients is not None and self._count() >= max_clients:
+                return None
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            streams = self._subscribers.get(subscription.user_id)
+            if streams is not None:
+                streams.discard(subscription)
+                if not streams:
+                    del self._subscribers[subscription.user_id]
+
+    def publish(self, user_ids):
+        """Wake every local stream of the given users."""
+        with self._lock:
+            targets = [s for user_id in user_ids for s in self._subscribers.get(user_id, ())]
+        for subscription in targets:
+            subscription.wake()
+
+    def _count(self):
+        return sum(len(streams) for streams in self._subscribers.values())
+
+    def client_count(self):
+        with self._lock:
+            return self._count()
+
+    def subscribed_user_ids(self):
+        with self._lock:
+            return list(self._subscribers)
+
+    # ============================================
+    # Cross-worker bridge
+    # ============================================
+
+    def start_bridge(self, app):
+        """Start the polling thread for this process (no-op if running or disabled)."""
+        interval = app.config.get('NOTIFICATION_STREAM_POLL_INTERVAL', 0)
+        if not interval:
+            return
+        with self._lock:
+            # Threads don't survive a fork; each worker starts its own
+            if self._bridge_pid == os.getpid():
+                return
+            self._bridge_pid = os.getpid()
+        thread = threading.Thread(
+            target=self._run_bridge, args=(app, interval),
+            name='notification-stream-bridge', daemon=True
+        )
+        thread.start()
+
+    def _run_bridge(self, app, interval):
+        watermark = datetime.utcnow()
+        while True:
+            time.sleep(interval)
+            # Look back one extra interval: updated_at is stamped at flush,
+            # slightly before the row becomes visible to other connections
+            since = watermark - timedelta(seconds=interval)
+            watermark = datetime.utcnow()
+            try:
+                self.poll_once(app, since)
+            except Exception as e:
+                logger.warning(f'Notification stream bridge poll failed: {e}')
+
+    def poll_once(self, app, since):
+        """Wake local streams whose users gained or read notifications after since."""
+        user_ids = self.subscribed_user_ids()
+        if not user_ids:
+            return []
+        with app.app_context():
+            changed = [
+                user_id for (user_id,) in db.session.query(Notification.user_id).filter(
+                    Notification.user_id.in_(user_ids),
+                    or_(Notification.updated_at >= since, Notification.read_at >= since)
+                ).distinct()
+            ]
+        self.publish(changed)
+        return changed
+
+
+broker = NotificationBroker()
+
+
+# ============================================
+# Stream
+# ============================================
+
+def _sse(event_name, data, event_id=None):
+    lines = [f'id: {event_id}'] if event_id else []
+    lines.append(f'event: {event_name}')
+    lines.append(f'data: {json.dumps(data)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def latest_position(user_id):
+    """(updated_at, id) of the user's most recently changed notification, or None."""
+    row = db.session.query(Notification.updated_at, Notification.id)\
+        .filter(Notification.user_id == user_id)\
+        .order_by(Notification.updated_at.desc(), Notification.id.desc())\
+        .first()
+    return tuple(row) if row else None
+
+
+def read_updates(user_id, position):
+    """Notifications changed after position (oldest first) and the current unread count."""
+    query = Notification.query.filter(Notification.user_id == user_id)
+    if position is not None:
+        updated_at, row_id = position
+        query = query.filter(or_(
+            Notification.updated_at > updated_at,
+            and_(Notification.updated_at == updated_at, Notification.id > row_id)
+        ))
+    notifications = query.order_by(Notification.updated_at.asc(), Notification.id.asc())\
+        .limit(STREAM_BATCH_SIZE).all()
+    return notifications, Notification.get_unread_count(user_id)
+
+
+def stream_notifications(app, subscription, position):
+    """
+    Yield SSE events for one subscription until NOTIFICATION_STREAM_MAX_AGE.
+
+    Events: 'notification' (to_dict payload; a coalesced notification is
+    re-sent with the same id) and 'unread' ({unread_count, delta}). Event ids
+    are keyset cursors, so a reconnect with Last-Event-ID resumes in place.
+    """
+    config = app.config
+    heartbeat = config['NOTIFICATION_STREAM_HEARTBEAT']
+    deadline = time.monotonic() + config['NOTIFICATION_STREAM_MAX_AGE']
+    unread = None
+
+    try:
+        yield f'retry: {heartbeat * 1000}\n\n'
+        pending = True
+        while True:
+            if pending:
+                # Short-lived app context: the session (and its snapshot) is
+                # released before the stream goes back to sleep
+                with app.app_context():
+                    notifications, count = read_updates(subscription.user_id, position)
+                    events = []
+                    for notification in notifications:
+                        position = (notification.updated_at, notification.id)
+                        events.append(_sse('notification', notification.to_dict(),
+                                           encode_cursor(*position)))
+                for chunk in events:
+                    yield chunk
+                if count != unread:
+                    yield _sse('unread', {
+                        'unread_count': count,
+                        'delta': count - unread if unread is not None else 0
+                    })
+                    unread = count
+                if len(notifications) == STREAM_BATCH_SIZE:
+                    continue
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            pending = subscription.wait(min(heartbeat, remaining))
+            if not pending:
+                yield ': keep-alive\n\n'
+    finally:
+        broker.unsubscribe(subscription)
+
+
+# ============================================
+# Publishing
+# Users whose notifications changed through the ORM are woken after commit.
+# The dispatcher's bulk writes and bulk UPDATE/DELETE paths call
+# broker.publish themselves.
+# ============================================
+
+_PENDING_KEY = 'stream_wakeups'
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_stream_wakeups(session, flush_context):
+    user_ids = {
+        obj.user_id for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+        if isinstance(obj, Notification)
+    }
+    if user_ids:
+        session.info.setdefault(_PENDING_KEY, set()).update(user_ids)
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_stream_wakeups(session):
+    user_ids = session.info.pop(_PENDING_KEY, None)
+    if user_ids:
+        broker.publish(user_ids)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_stream_wakeups(session, previous_transaction):
+    if not session.in_transaction():
+        session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,192 @@
+"""
+Report Service - Weekly society reports and digests
+Every society's weekly numbers come from one grouped pass over the
+complaint table (plus one windowed query for top issues), instead of a
+handful of COUNT queries per society. Secretary reports are written as
+bulk notification inserts and digest mail goes out in batches, each over
+a single SMTP connection.
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import case, func, or_, select
+
+from app.db_routing import replica_reads
+from app.extensions import db
+from app.models import Complaint, ComplaintStatus, NotificationType, Society, User
+
+
+# Complaints still waiting on the committee
+PENDING_STATUSES = (
+    ComplaintStatus.OPEN.value,
+    ComplaintStatus.ACKNOWLEDGED.value,
+    ComplaintStatus.IN_PROGRESS.value,
+    ComplaintStatus.ESCALATED.value
+)
+
+# Most supported complaints of the week listed in the digest
+TOP_ISSUES = 3
+
+
+def _count_if(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+class WeeklyReportService:
+    """Compute and deliver weekly per-society summaries."""
+
+    @staticmethod
+    @replica_reads()
+    def collect(since=None):
+        """
+        Return {society_id: report} for every society, where report holds
+        name, new_complaints, resolved_complaints, pending_complaints and
+        top_issues (titles). Three queries regardless of society count,
+        served by the read replica when one is configured.
+        """
+        since = since or datetime.utcnow() - timedelta(days=7)
+
+        reports = {
+            society_id: {
+                'name': name,
+                'new_complaints': 0,
+                'resolved_complaints': 0,
+                'pending_complaints': 0,
+                'top_issues': []
+            }
+            for society_id, name in db.session.query(Society.id, Society.name)
+        }
+
+        created = Complaint.created_at >= since
+        resolved = Complaint.resolved_at >= since
+        pending = Complaint.status.in_(PENDING_STATUSES)
+        counts = db.session.query(
+            Complaint.society_id,
+            _count_if(created), _count_if(resolved), _count_if(pending)
+        ).filter(or_(created, resolved, pending))\
+         .group_by(Complaint.society_id)
+
+        for society_id, new, done, waiting in counts:
+            report = reports.get(society_id)
+            if report is not None:
+                report.update(new_complaints=new, resolved_complaints=done, pending_complaints=waiting)
+
+        ranked = select(
+            Complaint.society_id,
+            Complaint.title,
+            func.row_number().over(
+                partition_by=Complaint.society_id,
+                order_by=(Complaint.support_count.desc(), Complaint.id)
+            ).label('position')
+        ).where(created).subquery()
+        top = db.session.execute(
+            select(ranked.c.society_id, ranked.c.title)
+            .where(ranked.c.position <= TOP_ISSUES)
+            .order_by(ranked.c.society_id, ranked.c.position)
+        )
+        for society_id, title in top:
+            if society_id in reports:
+                reports[society_id]['top_issues'].append(title)
+
+        return reports
+
+    @staticmethod
+    def notify_secretaries(reports):
+        """Queue one report notification per secretary; written in bulk on commit."""
+        from app.services.notification_service import NotificationDispatcher
+
+        secretaries = defaultdict(list)
+        rows = db.session.query(User.id, User.society_id).filter(
+            User.society_id.in_(reports.keys()),
+            User.roles.any(name='secretary')
+        )
+        for user_id, society_id in rows:
+            secretaries[society_id].append(user_id)
+
+        queued = 0
+        for society_id, user_ids in secretaries.items():
+            report = reports[society_id]
+            NotificationDispatcher.notify_many(
+                user_ids,
+                title=f"Weekly Report - {report['name']}",
+                message=(
+                    f"Weekly Report for {report['name']}:\n"
+                    f"• New complaints: {report['new_complaints']}\n"
+                    f"• Resolved: {report['resolved_complaints']}\n"
+                    f"• Pending: {report['pending_complaints']}"
+                ),
+                notification_type=NotificationType.SYSTEM
+            )
+            queued += len(user_ids)
+        return queued
+
+    @staticmethod
+    def generate_reports(since=None):
+        """Send every society's weekly report to its secretaries."""
+        try:
+            reports = WeeklyReportService.collect(since)
+            queued = WeeklyReportService.notify_secretaries(reports)
+            db.session.commit()
+            return {'success': True, 'societies_processed': len(reports), 'notifications': queued}
+
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f'Weekly report error: {e}')
+            return {'success': False, 'error': str(e)}
+
+    @staticmethod
+    @replica_reads()
+    def send_digests(since=None, batch_size=None):
+        """
+        Email the weekly digest to every active resident.
+        Recipients are streamed (from the replica, if any) and handed out in
+        batches: to the mail task, so Celery workers send them in parallel,
+        or without Celery, sent here one batch after another. The task's
+        thread fallback would start a thread and SMTP connection per batch.
+        """
+        from app.services.email_service import send_batch
+        from app.services.task_service import get_celery, send_email_batch_task
+
+        send = send_email_batch_task if get_celery() else send_batch
+        batch_size = batch_size or current_app.config.get('MAIL_BATCH_SIZE', 200)
+        try:
+            reports = WeeklyReportService.collect(since)
+            recipients = db.session.query(
+                User.email, User.full_name, User.karma_score, User.society_id
+            ).filter(User.active == True)\
+             .order_by(User.society_id, User.id)\
+             .execution_options(yield_per=batch_size)
+
+            queued = batches = 0
+            batch = []
+            for email, full_name, karma_score, society_id in recipients:
+                report = reports.get(society_id)
+                if report is None:
+                    continue
+                batch.append((email, 'weekly_digest', {
+                    'name': full_name or email,
+                    'society_name': report['name'],
+                    'new_complaints': report['new_complaints'],
+                    'resolved_complaints': report['resolved_complaints'],
+                    'pending_complaints': report['pending_complaints'],
+                    'top_issues': report['top_issues'],
+                    'karma_points': karma_score
+                }))
+                if len(batch) >= batch_size:
+                    send(batch)
+                    queued += len(batch)
+                    batches += 1
+                    batch = []
+            if batch:
+                send(batch)
+                queued += len(batch)
+                batches += 1
+
+            return {'success': True, 'emails_queued': queued, 'batches': batches}
+
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f'Weekly digest error: {e}')
+            return {'success': False, 'error': str(e)}
@@ -0,0 +1,283 @@
+"""
+Search Service - Full-text search over complaints
+Ranks complaints by relevance using the database's own full-text engine:
+an FTS5 index on SQLite or an expression GIN index on PostgreSQL. Other
+databases (or SQLite builds without FTS5) fall back to substring matching.
+
+Both indexes follow complaint writes inside the database (FTS5 through
+triggers, PostgreSQL because the index is on an expression), so bulk
+UPDATEs that bypass the ORM stay searchable too. They are created by the
+f2c6d8e4a913 migration (`flask db upgrade`); until then search uses LIKE
+and says so in the log.
+"""
+
+import re
+
+from flask import current_app
+from sqlalchemy import or_, func, literal_column, table, column
+
+from app.extensions import db
+from app.models import Complaint
+
+
+# At most this many words of a query are used
+MAX_SEARCH_WORDS = 10
+
+
+def parse_search(search):
+    """
+    Split a search string into words, each a list of lowercase tokens.
+
+    Punctuation splits tokens but not words, so 'A-101' is one word of two
+    tokens ('a', '101') that must appear next to each other.
+    """
+    words = []
+    for word in search.split()[:MAX_SEARCH_WORDS]:
+        tokens = re.findall(r'\w+', word.lower())
+        if tokens:
+            words.append(tokens)
+    return words
+
+
+class SearchBackend:
+    """A full-text engine for the complaint table."""
+    name = None
+
+    def is_installed(self, connection):
+        return True
+
+    def install(self, connection):
+        """Create the index structures (idempotent)."""
+
+    def drop(self, connection):
+        """Remove the index structures (idempotent)."""
+
+    def rebuild(self, connection):
+        """Re-index every complaint."""
+
+    def apply(self, query, words, prefix=False, society_id=None):
+        """
+        Filter query to matching complaints; returns (query, relevance order clause).
+        society_id, when the query is already scoped to one society, lets the
+        engine narrow the match itself.
+        """
+        raise NotImplementedError
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """
+    FTS5 external-content index over title, description and accused_flat.
+    Ranked with bm25, weighting title and flat matches above the description.
+    society_id is indexed too, so a society-scoped search intersects posting
+    lists inside FTS5 instead of filtering every global match afterwards.
+    """
+    name = 'fts5'
+
+    DDL = (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS complaint_fts USING fts5("
+        " title, description, accused_flat, society_id,"
+        " content='complaint', content_rowid='id',"
+        " tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        "CREATE TRIGGER IF NOT EXISTS complaint_fts_ai AFTER INSERT ON complaint BEGIN"
+        " INSERT INTO complaint_fts(rowid, title, description, accused_flat, society_id)"
+        " VALUES (new.id, new.title, new.description, new.accused_flat, new.society_id);"
+        " END",
+        "CREATE TRIGGER IF NOT EXISTS complaint_fts_ad AFTER DELETE ON complaint BEGIN"
+        " INSERT INTO complaint_fts(complaint_fts, rowid, title, description, accused_flat, society_id)"
+        " VALUES ('delete', old.id, old.title, old.description, old.accused_flat, old.society_id);"
+        " END",
+        "CREATE TRIGGER IF NOT EXISTS complaint_fts_au"
+        " AFTER UPDATE OF title, description, accused_flat, society_id ON complaint BEGIN"
+        " INSERT INTO complaint_fts(complaint_fts, rowid, title, description, accused_flat, society_id)"
+        " VALUES ('delete', old.id, old.title, old.description, old.accused_flat, old.society_id);"
+        " INSERT INTO complaint_fts(rowid, title, description, accused_flat, society_id)"
+        " VALUES (new.id, new.title, new.description, new.accused_flat, new.society_id);"
+        " END",
+    )
+
+    # bm25 column weights: title, description, accused_flat, society_id
+    WEIGHTS = (10.0, 1.0, 5.0, 0.0)
+
+    @staticmethod
+    def supported(connection):
+        options = connection.exec_driver_sql('PRAGMA compile_options').scalars().all()
+        return 'ENABLE_FTS5' in options
+
+    def is_installed(self, connection):
+        return connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE name = 'complaint_fts'"
+        ).first() is not None
+
+    def install(self, connection):
+        for statement in self.DDL:
+            connection.exec_driver_sql(statement)
+
+    def drop(self, connection):
+        for trigger in ('complaint_fts_ai', 'complaint_fts_ad', 'complaint_fts_au'):
+            connection.exec_driver_sql(f'DROP TRIGGER IF EXISTS {trigger}')
+        connection.exec_driver_sql('DROP TABLE IF EXISTS complaint_fts')
+
+    def rebuild(self, connection):
+        connection.exec_driver_sql("INSERT INTO complaint_fts(complaint_fts) VALUES ('rebuild')")
+
+    @staticmethod
+    def match_expression(words, prefix=False, society_id=None):
+        """FTS5 query: every word must match, multi-token words as phrases."""
+        phrases = []
+        for tokens in words:
+            phrase = '"{}"'.format(' '.join(tokens))
+            phrases.append(phrase + ' *' if prefix else phrase)
+        expression = '{title description accused_flat} : (' + ' '.join(phrases) + ')'
+        if society_id is not None:
+            expression = f'society_id : "{int(society_id)}" AND {expression}'
+        return expression
+
+    def apply(self, query, words, prefix=False, society_id=None):
+        fts_table = table('complaint_fts', column('rowid'))
+        fts = literal_column('complaint_fts')
+        query = query.join(fts_table, fts_table.c.rowid == Complaint.id)\
+            .filter(fts.op('MATCH')(self.match_expression(words, prefix, society_id)))
+        return query, func.bm25(fts, *self.WEIGHTS).asc()
+
+
+class PostgresFTSBackend(SearchBackend):
+    """
+    GIN index on a weighted tsvector expression. The 'simple' configuration
+    (no stemming, no stop words) matches the SQLite tokenizer, so flat
+    numbers and names behave the same on both databases.
+    """
+    name = 'tsvector'
+
+    DOCUMENT = (
+        "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(accused_flat, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+    )
+
+    def is_installed(self, connection):
+        return connection.exec_driver_sql(
+            "SELECT 1 FROM pg_indexes WHERE indexname = 'ix_complaint_search'"
+        ).first() is not None
+
+    def install(self, connection):
+        connection.exec_driver_sql(
+            f'CREATE INDEX IF NOT EXISTS ix_complaint_search ON complaint USING gin (({self.DOCUMENT}))'
+        )
+
+    def drop(self, connection):
+        connection.exec_driver_sql('DROP INDEX IF EXISTS ix_complaint_search')
+
+    def rebuild(self, connection):
+        connection.exec_driver_sql('REINDEX INDEX ix_complaint_search')
+
+    @staticmethod
+    def tsquery(words, prefix=False):
+        """to_tsquery() input: words ANDed, multi-token words as phrases."""
+        clauses = []
+        for tokens in words:
+            if prefix:
+                tokens = tokens[:-1] + [tokens[-1] + ':*']
+            clauses.append('(' + ' <-> '.join(tokens) + ')')
+        return ' & '.join(clauses)
+
+    def apply(self, query, words, prefix=False, society_id=None):
+        # A BitmapAnd with the society_id index handles scoping; the expression must be spelled exactly as in the index to use it
+        document = literal_column(f'({self.DOCUMENT})')
+        tsquery = func.to_tsquery(literal_column("'simple'"), self.tsquery(words, prefix))
+        query = query.filter(document.op('@@')(tsquery))
+        return query, func.ts_rank(document, tsquery).desc()
+
+
+class LikeBackend(SearchBackend):
+    """Substring match on every word; no index and no ranking."""
+    name = 'like'
+
+    def apply(self, query, words, prefix=False, society_id=None):
+        for tokens in words:
+            pattern = '%' + '%'.join(tokens) + '%'
+            query = query.filter(or_(
+                Complaint.title.ilike(pattern),
+                Complaint.description.ilike(pattern),
+                Complaint.accused_flat.ilike(pattern)
+            ))
+        return query, Complaint.created_at.desc()
+
+
+class ComplaintSearch:
+    """Pick the search backend for the current database and run searches."""
+
+    # Backend chosen per database URL, decided on first use
+    _backends = {}
+
+    @staticmethod
+    def _candidate(dialect):
+        if dialect == 'sqlite':
+            return SQLiteFTSBackend()
+        if dialect == 'postgresql':
+            return PostgresFTSBackend()
+        return LikeBackend()
+
+    @staticmethod
+    def backend():
+        """Return the backend in use for the current app's database."""
+        engine = db.engine
+        key = str(engine.url)
+        backend = ComplaintSearch._backends.get(key)
+        if backend is None:
+            backend = ComplaintSearch._candidate(engine.dialect.name)
+            with engine.connect() as connection:
+                if not backend.is_installed(connection):
+                    if not isinstance(backend, LikeBackend):
+                        current_app.logger.warning(
+                            'Complaint search index missing (run flask db upgrade); searching with LIKE')
+                    backend = LikeBackend()
+            ComplaintSearch._backends[key] = backend
+        return backend
+
+    @staticmethod
+    def install():
+        """
+        Create the search index if missing, indexing existing complaints, for
+        databases built with create_all() (tests, benchmarks); deployments get
+        it from the migration. A no-op once installed.
+        """
+        engine = db.engine
+        backend = ComplaintSearch._candidate(engine.dialect.name)
+        try:
+            with engine.begin() as connection:
+                if isinstance(backend, SQLiteFTSBackend) and not backend.supported(connection):
+                    return LikeBackend.name
+                if not backend.is_installed(connection):
+                    backend.install(connection)
+                    backend.rebuild(connection)
+        finally:
+            ComplaintSearch._backends.pop(str(engine.url), None)
+        return backend.name
+
+    @staticmethod
+    def rebuild():
+        """Drop, recreate and fully re-index the search index."""
+        engine = db.engine
+        backend = ComplaintSearch._candidate(engine.dialect.name)
+        with engine.begin() as connection:
+            backend.drop(connection)
+            backend.install(connection)
+            backend.rebuild(connection)
+        ComplaintSearch._backends.pop(str(engine.url), None)
+        return backend.name
+
+    @staticmethod
+    def apply(query, search, prefix=False, society_id=None):
+        """
+        Restrict a Complaint query to matches for search.
+
+        Returns (query, relevance order clause). With prefix=True (what the
+        API uses unless search_prefix=false) the last token of each word may
+        be incomplete ('A-10' finds 'A-101', 'leak' finds 'leakage'). Pass
+        society_id when the query is scoped to one society. A search with no
+        usable tokens leaves the query unfiltered.
+        """
+        words = parse_search(search)
+        if not words:
+            return query, Complaint.created_at.desc()
+        return ComplaintSearch.backend().apply(query, words, prefix, society_id)
@@ -8,7 +8,9 @@ import os
 import threading
 from datetime import datetime, timedelta
 from functools import wraps
-from flask import current_app
+from flask import current_app, has_app_context
+
+from app.utils.metrics import timed_task
 
 # Check if Redis/Celery is available
 CELERY_ENABLED = os.environ.get('CELERY_ENABLED', 'false').lower() == 'true'
@@ -40,12 +42,22 @@ def async_task(task_name):
                 return celery.send_task(task_name, args=args, kwargs=kwargs)
             else:
                 # Run in background thread for dev, or sync for serverless
+                local = timed_task(func)
                 if os.environ.get('SERVERLESS', 'false').lower() == 'true':
                     # Serverless - run synchronously
-                    return func(*args, **kwargs)
+                    return local(*args, **kwargs)
                 else:
-                    # Dev - run in background thread
-                    thread = threading.Thread(target=func, args=args, kwargs=kwargs)
+                    # Dev - run in background thread. The thread gets its own
+                    # app context (and so its own database session).
+                    app = current_app._get_current_object() if has_app_context() else None
+                    
+                    def run():
+                        if app is None:
+                            return local(*args, **kwargs)
+                        with app.app_context():
+                            return local(*args, **kwargs)
+                    
+                    thread = threading.Thread(target=run)
                     thread.daemon = True
                     thread.start()
                     return {'status': 'started', 'thread_id': thread.ident}
@@ -56,78 +68,163 @@ def async_task(task_name):
     return decorator
 
 
+# Resolved complaints in a month that earn the monthly karma bonus
+MONTHLY_BONUS_MIN_RESOLVED = 3
+
+
 class TaskService:
     """Service for managing background tasks."""
     
     @staticmethod
-    def auto_escalate_complaints():
-        """Auto-escalate old complaints (7+ days without action)."""
+    @timed_task
+    def auto_escalate_complaints(chunk_size=500):
+        """
+        Auto-escalate complaints left open longer than their society's
+        auto_escalate_days (default 7).
+        Candidates are found with one query per chunk; escalations are bulk
+        inserted, notifications go through the NotificationDispatcher and
+        each chunk commits separately. Only complaints still open when the
+        UPDATE runs are escalated and notified.
+        """
+        from sqlalchemy import insert, select, update, and_, or_, exists
         from app.extensions import db
         from app.models import (
-            Complaint, ComplaintStatus, Escalation, User, 
-            Notification, NotificationType
+            Complaint, ComplaintStatus, Escalation, Society, User,
+            NotificationType, SocietyStat
         )
+        from app.models.society_stats import ComplaintSnapshot
+        from app.services.dashboard_service import DashboardService
+        from app.services.notification_service import NotificationDispatcher
         
         try:
-            cutoff_date = datetime.utcnow() - timedelta(days=7)
+            now = datetime.utcnow()
             
-            old_complaints = Complaint.query.filter(
-                Complaint.status == ComplaintStatus.OPEN.value,
-                Complaint.created_at < cutoff_date
-            ).all()
+            # One cutoff per distinct threshold keeps the candidate query a
+            # plain range filter on created_at
+            thresholds = {
+                7 if days is None else days
+                for (days,) in db.session.query(Society.auto_escalate_days).distinct()
+            }
+            if not thresholds:
+                return {'success': True, 'escalated': 0}
+            
+            threshold_filter = or_(*[
+                and_(
+                    db.func.coalesce(Society.auto_escalate_days, 7) == days,
+                    Complaint.created_at < now - timedelta(days=days)
+                )
+                for days in sorted(thresholds)
+            ])
+            already_auto_escalated = exists().where(
+                Escalation.complaint_id == Complaint.id,
+                Escalation.is_auto_escalated == True
+            )
             
+            secretaries_by_society = {}
             escalated_count = 0
+            last_id = 0
             
-            for complaint in old_complaints:
-                # Check if already escalated
-                existing = Escalation.query.filter_by(
-                    complaint_id=complaint.id,
-                    is_auto_escalated=True
-                ).first()
-                
-                if existing:
-                    continue
+            while True:
+                candidates = db.session.query(
+                    Complaint.id, Complaint.title, Complaint.complainant_id,
+                    Complaint.society_id, Complaint.status, Complaint.category,
+                    Complaint.priority, Complaint.created_at, Complaint.resolved_at,
+                    db.func.coalesce(Society.auto_escalate_days, 7).label('days')
+                ).join(Society, Society.id == Complaint.society_id)\
+                 .filter(
+                    Complaint.id > last_id,
+                    Complaint.status == ComplaintStatus.OPEN.value,
+                    threshold_filter,
+                    ~already_auto_escalated
+                ).order_by(Complaint.id).limit(chunk_size).all()
                 
-                escalation = Escalation(
-                    complaint_id=complaint.id,
-                    escalated_by_id=complaint.complainant_id,
-                    escalated_to='secretary',
-                    reason='Auto-escalated: Open for 7+ days without acknowledgment',
-                    previous_status=complaint.status,
-                    is_auto_escalated=True
-                )
-                
-                complaint.status = ComplaintStatus.ESCALATED.value
-                complaint.updated_at = datetime.utcnow()
+                if not candidates:
+                    break
+                last_id = candidates[-1].id
                 
-                db.session.add(escalation)
+                # Secretaries for societies not seen in earlier chunks
+                missing = {c.society_id for c in candidates} - secretaries_by_society.keys()
+                if missing:
+                    for society_id in missing:
+                        secretaries_by_society[society_id] = []
+                    rows = db.session.query(User.id, User.society_id).filter(
+                        User.society_id.in_(missing),
+                        User.roles.any(name='secretary')
+                    ).all()
+                    for user_id, society_id in rows:
+                        secretaries_by_society[society_id].append(user_id)
                 
-                # Notify secretary
-                secretaries = User.query.join(User.roles).filter(
-                    User.society_id == complaint.society_id,
-                    User.roles.any(name='secretary')
-                ).all()
+                ids = [c.id for c in candidates]
+                # A complaint acknowledged or resolved since the candidate
+                # query no longer matches and is left alone
+                escalate = update(Complaint)\
+                    .where(Complaint.id.in_(ids), Complaint.status == ComplaintStatus.OPEN.value)\
+                    .values(
+                        status=ComplaintStatus.ESCALATED.value,
+                        updated_at=now,
+                        escalations_count=Complaint.escalations_count + 1
+                    )\
+                    .execution_options(synchronize_session=False)
+                if db.engine.dialect.update_returning:
+                    changed = set(db.session.execute(escalate.returning(Complaint.id)).scalars())
+                else:
+                    db.session.execute(escalate)
+                    changed = set(db.session.execute(
+                        select(Complaint.id).where(
+                            Complaint.id.in_(ids),
+                            Complaint.status == ComplaintStatus.ESCALATED.value,
+                            Complaint.updated_at == now
+                        )
+                    ).scalars())
+                candidates = [c for c in candidates if c.id in changed]
+                if not candidates:
+                    db.session.commit()
+                    continue
                 
-                for secretary in secretaries:
-                    Notification.create_notification(
-                        user_id=secretary.id,
+                escalations = []
+                for c in candidates:
+                    escalations.append({
+                        'complaint_id': c.id,
+                        'escalated_by_id': c.complainant_id,
+                        'escalated_to': 'secretary',
+                        'reason': f'Auto-escalated: Open for {c.days}+ days without acknowledgment',
+                        'previous_status': c.status,
+                        'is_auto_escalated': True,
+                        'escalated_at': now
+                    })
+                    NotificationDispatcher.notify_many(
+                        secretaries_by_society[c.society_id],
                         title='Auto-Escalated Complaint',
-                        message=f'Complaint "{complaint.title}" auto-escalated (7+ days)',
+                        message=f'Complaint "{c.title}" auto-escalated ({c.days}+ days)',
                         notification_type=NotificationType.ESCALATION,
-                        complaint_id=complaint.id
+                        complaint_id=c.id
+                    )
+                    NotificationDispatcher.notify(
+                        c.complainant_id,
+                        title='Your Complaint Was Escalated',
+                        message=f'"{c.title}" has been automatically escalated to the secretary',
+                        notification_type=NotificationType.ESCALATION,
+                        complaint_id=c.id
                     )
                 
-                Notification.create_notification(
-                    user_id=complaint.complainant_id,
-                    title='Your Complaint Was Escalated',
-                    message=f'"{complaint.title}" has been automatically escalated to the secretary',
-                    notification_type=NotificationType.ESCALATION,
-                    complaint_id=complaint.id
+                db.session.execute(insert(Escalation), escalations)
+                
+                # Bulk UPDATE bypasses the flush listener; keep the rollup in step
+                SocietyStat.apply_changes(
+                    (before, before._replace(status=ComplaintStatus.ESCALATED.value))
+                    for before in (
+                        ComplaintSnapshot(c.society_id, c.status, c.category, c.priority,
+                                          c.created_at, c.resolved_at)
+                        for c in candidates
+                    )
                 )
                 
-                escalated_count += 1
-            
-            db.session.commit()
+                db.session.commit()
+                escalated_count += len(candidates)
+                
+                # Bulk UPDATE skips the dashboard's flush hooks
+                for society_id in {c.society_id for c in candidates}:
+                    DashboardService.invalidate_society(society_id)
             
             return {'success': True, 'escalated': escalated_count}
             
@@ -137,6 +234,109 @@ class TaskService:
             return {'success': False, 'error': str(e)}
     
     @staticmethod
+    @timed_task
+    def award_monthly_karma_bonus(year=None, month=None, chunk_size=1000):
+        """
+        Award the monthly participation bonus to active users who had at least
+        MONTHLY_BONUS_MIN_RESOLVED complaints resolved in the given month
+        (default: last month).
+        Qualifying users come from one GROUP BY; karma, ledger entries and
+        notifications are written in bulk and each chunk commits separately.
+        The ledger's unique (user_id, reason, period) key decides who is
+        paid: users already holding the bonus for that month are skipped, so
+        retries and overlapping runs never pay twice.
+        """
+        from sqlalchemy import update, exists
+        from app.extensions import db
+        from app.models import (
+            Complaint, ComplaintStatus, User, KarmaLog, KarmaReason,
+            KarmaMonthlyAggregate, NotificationType
+        )
+        from app.services.dashboard_service import DashboardService
+        from app.services.leaderboard_service import LeaderboardService
+        from app.services.notification_service import NotificationDispatcher
+        
+        try:
+            if year is None or month is None:
+                last_month = datetime.utcnow().replace(day=1) - timedelta(days=1)
+                year, month = last_month.year, last_month.month
+            start = datetime(year, month, 1)
+            end = datetime(year + month // 12, month % 12 + 1, 1)
+            
+            period = f'{year:04d}-{month:02d}'
+            marker = f'Monthly bonus {period}'
+            points = KarmaLog.get_points_for_reason(KarmaReason.MONTHLY_BONUS)
+            
+            # Narrows the candidates; insert_awards below is what enforces it
+            already_awarded = exists().where(
+                KarmaLog.user_id == Complaint.complainant_id,
+                KarmaLog.reason == KarmaReason.MONTHLY_BONUS,
+                KarmaLog.period == period
+            )
+            qualifying = db.session.query(Complaint.complainant_id, User.society_id)\
+                .join(User, User.id == Complaint.complainant_id)\
+                .filter(
+                    Complaint.status == ComplaintStatus.RESOLVED.value,
+                    Complaint.resolved_at >= start,
+                    Complaint.resolved_at < end,
+                    User.active == True,
+                    ~already_awarded
+                ).group_by(Complaint.complainant_id, User.society_id)\
+                .having(db.func.count(Complaint.id) >= MONTHLY_BONUS_MIN_RESOLVED)\
+                .order_by(Complaint.complainant_id).all()
+            
+            awarded = 0
+            for offset in range(0, len(qualifying), chunk_size):
+                chunk = qualifying[offset:offset + chunk_size]
+                now = datetime.utcnow()
+                
+                # Ledger rows first: users another run already paid are left out
+                user_ids = KarmaLog.insert_awards(
+                    [user_id for user_id, _ in chunk], KarmaReason.MONTHLY_BONUS,
+                    period, points, marker, now
+                )
+                if not user_ids:
+                    db.session.commit()
+                    continue
+                paid = set(user_ids)
+                chunk = [(user_id, society_id) for user_id, society_id in chunk if user_id in paid]
+                
+                db.session.execute(
+                    update(User)
+                    .where(User.id.in_(user_ids))
+                    .values(karma_score=User.karma_score + points)
+                    .execution_options(synchronize_session=False)
+                )
+                # Bulk INSERT bypasses the flush listener; keep the aggregates in step
+                KarmaMonthlyAggregate.apply(
+                    (user_id, now, KarmaReason.MONTHLY_BONUS, points) for user_id in user_ids
+                )
+                NotificationDispatcher.notify_many(
+                    user_ids,
+                    title='Monthly Karma Bonus',
+                    message=f'You received +{points} karma points for your participation last month!',
+                    notification_type=NotificationType.KARMA
+                )
+                
+                db.session.commit()
+                awarded += len(chunk)
+                
+                # Bulk UPDATE skips the dashboard and leaderboard commit hooks
+                for user_id in user_ids:
+                    DashboardService.invalidate_user(user_id)
+                for society_id in {society_id for _, society_id in chunk}:
+                    DashboardService.invalidate_society(society_id)
+                    LeaderboardService.invalidate(society_id)
+            
+            return {'success': True, 'awarded': awarded, 'period': period}
+            
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f'Monthly karma bonus error: {e}')
+            return {'success': False, 'error': str(e)}
+    
+    @staticmethod
+    @timed_task
     def send_pending_reminders():
         """Send reminders for complaints in progress for 3+ days."""
         from app.extensions import db
@@ -180,6 +380,7 @@ class TaskService:
             return {'success': False, 'error': str(e)}
     
     @staticmethod
+    @timed_task
     def cleanup_old_notifications(days=30):
         """Delete read notifications older than specified days."""
         from app.extensions import db
@@ -203,46 +404,82 @@ class TaskService:
             return {'success': False, 'error': str(e)}
     
     @staticmethod
-    def calculate_society_stats(society_id):
-        """Calculate and cache society statistics."""
-        from app.extensions import db, cache
-        from app.models import Complaint, ComplaintStatus, User
-        from sqlalchemy import func
+    @timed_task
+    def recount_complaint_counters(dry_run=False):
+        """Recompute denormalized complaint counters and report drift."""
+        from app.extensions import db
+        from app.models import Complaint
         
         try:
-            # Total complaints
-            total = Complaint.query.filter_by(society_id=society_id).count()
+            result = Complaint.recount_counters(dry_run=dry_run)
+            return {'success': True, **result}
             
-            # By status
-            status_counts = db.session.query(
-                Complaint.status,
-                func.count(Complaint.id)
-            ).filter_by(society_id=society_id).group_by(Complaint.status).all()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f'Recount error: {e}')
+            return {'success': False, 'error': str(e)}
+    
+    @staticmethod
+    @timed_task
+    def reconcile_society_stats(society_id=None, dry_run=False):
+        """Rebuild society rollups that drifted from the complaint table."""
+        from app.extensions import db
+        from app.models import SocietyStat
+        
+        try:
+            result = SocietyStat.reconcile(society_id=society_id, dry_run=dry_run)
+            return {'success': True, **result}
             
-            # Resolution rate
-            resolved = sum(c for s, c in status_counts if s == ComplaintStatus.RESOLVED.value)
-            resolution_rate = (resolved / total * 100) if total > 0 else 0
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f'Stats reconcile error: {e}')
+            return {'success': False, 'error': str(e)}
+    
+    @staticmethod
+    @timed_task
+    def rebuild_karma_aggregates(batch_size=500):
+        """Rebuild every user's monthly karma aggregates from the ledger, one batch per commit."""
+        from app.extensions import db
+        from app.models import User, KarmaMonthlyAggregate
+        
+        try:
+            rebuilt = 0
+            last_id = 0
+            while True:
+                user_ids = [row[0] for row in db.session.query(User.id)
+                            .filter(User.id > last_id)
+                            .order_by(User.id)
+                            .limit(batch_size)]
+                if not user_ids:
+                    break
+                
+                KarmaMonthlyAggregate.rebuild(user_ids)
+                db.session.commit()
+                rebuilt += len(user_ids)
+                last_id = user_ids[-1]
             
-            # Average resolution time
-            resolved_complaints = Complaint.query.filter_by(
-                society_id=society_id,
-                status=ComplaintStatus.RESOLVED.value
-            ).all()
+            return {'success': True, 'rebuilt': rebuilt}
             
-            if resolved_complaints:
-                total_days = sum(
-                    (c.updated_at - c.created_at).days 
-                    for c in resolved_complaints if c.updated_at
-                )
-                avg_resolution_days = total_days / len(resolved_complaints)
-            else:
-                avg_resolution_days = 0
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f'Karma aggregate rebuild error: {e}')
+            return {'success': False, 'error': str(e)}
+    
+    @staticmethod
+    @timed_task
+    def calculate_society_stats(society_id):
+        """Calculate and cache society statistics."""
+        from app.extensions import cache
+        from app.models import SocietyStat
+        
+        try:
+            rollup = SocietyStat.get_rollup(society_id)
             
             stats = {
-                'total_complaints': total,
-                'status_breakdown': dict(status_counts),
-                'resolution_rate': round(resolution_rate, 1),
-                'avg_resolution_days': round(avg_resolution_days, 1),
+                'total_complaints': rollup['total'],
+                'status_breakdown': rollup['status'],
+                'resolution_rate': round(rollup['resolution_rate'], 1),
+                'avg_resolution_days': round(rollup['average_resolution_days'], 1),
                 'calculated_at': datetime.utcnow().isoformat()
             }
             
@@ -281,6 +518,28 @@ def cleanup_notifications_task(days=30):
         return TaskService.cleanup_old_notifications(days)
 
 
+@async_task('tasks.reconcile_stats')
+def reconcile_stats_task(society_id=None):
+    """Background task for society rollup reconciliation."""
+    from flask import current_app
+    with current_app.app_context():
+        return TaskService.reconcile_society_stats(society_id)
+
+
+@async_task('tasks.process_evidence')
+def process_evidence_task(evidence_ids):
+    """Background task for evidence thumbnails and metadata."""
+    from app.services.upload_service import EvidenceUploadService
+    return EvidenceUploadService.process(evidence_ids)
+
+
+@async_task('tasks.send_email_batch')
+def send_email_batch_task(messages):
+    """Background task for one batch of templated emails."""
+    from app.services.email_service import send_batch
+    return send_batch(messages)
+
+
 @async_task('tasks.calculate_stats')
 def calculate_stats_task(society_id):
     """Background task for stats calculation."""
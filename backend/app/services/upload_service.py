@@ -0,0 +1,530 @@
+"""
+Upload Service - Evidence upload pipeline
+Uploaded files are copied in fixed-size chunks to a temporary file next to
+the upload folder before any database work starts, then moved into place
+and recorded in a short transaction of their own. Image metadata and
+thumbnails are produced afterwards by a background task, so requests never
+wait on image decoding.
+
+Files are content-addressed: each is stored once under its SHA-256 and
+extension in evidence/objects/, and every ComplaintEvidence row with that
+file_url counts as a reference. The thumbnail is shared by every
+extension of a hash, so any row with the content_hash references it. A
+file is unlinked when its last reference goes away; collect_garbage()
+reclaims anything left behind.
+
+Thumbnails need Pillow (optional); without it evidence is still processed
+and image dimensions are read from the file header.
+"""
+
+import hashlib
+import mimetypes
+import os
+import struct
+import tempfile
+import time
+
+from flask import current_app, request, abort, send_from_directory
+from sqlalchemy import update
+from werkzeug.security import safe_join
+from werkzeug.utils import secure_filename
+
+from app.extensions import db
+from app.models import ComplaintEvidence
+from app.utils.helpers import (
+    allowed_file, delete_uploaded_file, get_file_type, verify_upload_signature
+)
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - Pillow is optional
+    Image = None
+
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Bounding box for list view previews
+THUMBNAIL_SIZE = (320, 320)
+
+# Temporary files live inside UPLOAD_FOLDER so the final move is a rename
+INCOMING_FOLDER = '.incoming'
+
+OBJECTS_FOLDER = 'evidence/objects'
+
+# Seconds an unreferenced file is kept after its last write or reuse, so an
+# upload that found it moments ago can still commit its reference
+DEFAULT_GC_GRACE = 300
+
+# Content hashes per reference lookup in the garbage collector
+GC_BATCH_SIZE = 500
+
+
+class StagedUpload:
+    """An uploaded file written to a temporary path, not yet attached to a complaint."""
+
+    def __init__(self, path, file_name, file_size, file_type, mime_type, content_hash):
+        self.path = path
+        self.file_name = file_name
+        self.file_size = file_size
+        self.file_type = file_type
+        self.mime_type = mime_type
+        self.content_hash = content_hash
+
+
+def object_url(content_hash, ext):
+    """Upload URL of the stored file for a content hash, e.g. /uploads/evidence/objects/ab/ab12....png"""
+    return f'/uploads/{OBJECTS_FOLDER}/{content_hash[:2]}/{content_hash}{ext}'
+
+
+def thumbnail_url_for(file_url):
+    """Thumbnails sit next to their file, so content-addressed files share one."""
+    return os.path.splitext(file_url)[0] + '.thumb.jpg'
+
+
+def _image_size(path):
+    """(width, height) from a PNG, GIF or JPEG header, or None."""
+    with open(path, 'rb') as f:
+        head = f.read(26)
+        if head.startswith(b'\x89PNG\r\n\x1a\n') and head[12:16] == b'IHDR':
+            return struct.unpack('>II', head[16:24])
+        if head[:6] in (b'GIF87a', b'GIF89a'):
+            return struct.unpack('<HH', head[6:10])
+        if not head.startswith(b'\xff\xd8'):
+            return None
+
+        # JPEG: walk the segments to the first start-of-frame marker
+        f.seek(2)
+        while True:
+            marker = f.read(2)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                return None
+            if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+                frame = f.read(7)
+                if len(frame) < 7:
+                    return None
+                height, width = struct.unpack('>HH', frame[3:7])
+                return width, height
+            length = f.read(2)
+            if len(length) < 2:
+                return None
+            f.seek(struct.unpack('>H', length)[0] - 2, os.SEEK_CUR)
+
+
+class EvidenceUploadService:
+    """Stage, attach and post-process complaint evidence files."""
+
+    @staticmethod
+    def stage(file):
+        """
+        Copy an uploaded file to a temporary path in chunks.
+
+        Returns a StagedUpload with the real byte count and SHA-256. Raises
+        ValueError for missing, empty or disallowed files.
+        """
+        if not file or not file.filename:
+            raise ValueError('No file selected')
+        if not allowed_file(file.filename):
+            raise ValueError(f'File type not allowed: {file.filename}')
+
+        incoming = os.path.join(current_app.config['UPLOAD_FOLDER'], INCOMING_FOLDER)
+        os.makedirs(incoming, exist_ok=True)
+        ext = os.path.splitext(file.filename)[1].lower()
+        fd, path = tempfile.mkstemp(dir=incoming, suffix=ext)
+
+        size = 0
+        digest = hashlib.sha256()
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    chunk = file.stream.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+        except Exception:
+            os.remove(path)
+            raise
+
+        if size == 0:
+            os.remove(path)
+            raise ValueError(f'File is empty: {file.filename}')
+
+        return StagedUpload(
+            path=path,
+            file_name=secure_filename(file.filename),
+            file_size=size,
+            file_type=get_file_type(file.filename),
+            mime_type=file.mimetype or mimetypes.guess_type(file.filename)[0],
+            content_hash=digest.hexdigest()
+        )
+
+    @staticmethod
+    def discard(staged):
+        """Remove temporary files that will not be attached."""
+        for upload in staged:
+            try:
+                os.remove(upload.path)
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def attach(complaint_id, user_id, staged, description=None):
+        """
+        Move staged files into the object store and record them in one
+        transaction. A file whose content is already stored is not written
+        again; the staged copy is simply dropped.
+
+        Returns the committed ComplaintEvidence rows and queues them for
+        processing. On failure newly stored files are removed and the error
+        re-raised.
+        """
+        from app.models import Complaint
+
+        created = []
+        try:
+            evidence_list = []
+            for upload in staged:
+                file_url = object_url(upload.content_hash, os.path.splitext(upload.file_name)[1].lower())
+                final_path = EvidenceUploadService._local_path(file_url)
+                if os.path.exists(final_path):
+                    # Refresh the mtime so the collector's grace period covers this reuse
+                    os.utime(final_path)
+                    os.remove(upload.path)
+                else:
+                    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                    os.replace(upload.path, final_path)
+                    created.append(final_path)
+
+                evidence_list.append(ComplaintEvidence(
+                    complaint_id=complaint_id,
+                    uploaded_by_id=user_id,
+                    file_url=file_url,
+                    file_type=upload.file_type,
+                    file_name=upload.file_name,
+                    file_size=upload.file_size,
+                    mime_type=upload.mime_type,
+                    content_hash=upload.content_hash,
+                    description=description,
+                    processing_status='pending'
+                ))
+
+            db.session.add_all(evidence_list)
+            db.session.get(Complaint, complaint_id).adjust_counter('evidence_count', len(evidence_list))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            EvidenceUploadService.discard(staged)
+            for path in created:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            raise
+
+        from app.services.task_service import process_evidence_task
+        process_evidence_task.delay([evidence.id for evidence in evidence_list])
+        return evidence_list
+
+    @staticmethod
+    def attach_existing(complaint, user_id, content_hash, file_name=None, description=None):
+        """
+        Attach an already stored file by its SHA-256, without uploading it
+        again. Only files already attached within the complaint's society
+        can be reused. Returns the new ComplaintEvidence, or None when there
+        is no such file (the client should upload it instead).
+        """
+        from app.models import Complaint
+
+        source = ComplaintEvidence.query.join(Complaint, Complaint.id == ComplaintEvidence.complaint_id)\
+            .filter(
+                ComplaintEvidence.content_hash == content_hash,
+                Complaint.society_id == complaint.society_id
+            ).order_by(ComplaintEvidence.id.desc()).first()
+        if source is None:
+            return None
+
+        path = EvidenceUploadService._local_path(source.file_url)
+        if not os.path.exists(path):
+            return None
+        os.utime(path)
+
+        evidence = ComplaintEvidence(
+            complaint_id=complaint.id,
+            uploaded_by_id=user_id,
+            file_url=source.file_url,
+            file_type=source.file_type,
+            file_name=secure_filename(file_name) if file_name else source.file_name,
+            file_size=source.file_size,
+            mime_type=source.mime_type,
+            content_hash=content_hash,
+            description=description,
+            processing_status='pending'
+        )
+        try:
+            db.session.add(evidence)
+            complaint.adjust_counter('evidence_count', 1)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        from app.services.task_service import process_evidence_task
+        process_evidence_task.delay([evidence.id])
+        return evidence
+
+    @staticmethod
+    def release_files(file_url, thumbnail_url, content_hash):
+        """
+        Unlink an evidence file and its thumbnail once no row references it.
+        Call after the deleting transaction commits. Returns True if unlinked;
+        a file reused within the grace period is left to collect_garbage().
+        """
+        if not content_hash:
+            delete_uploaded_file(file_url)
+            delete_uploaded_file(thumbnail_url)
+            return True
+
+        if ComplaintEvidence.count_references(content_hash, file_url):
+            return False
+        path = EvidenceUploadService._local_path(file_url)
+        if os.path.exists(path) and os.path.getmtime(path) > time.time() - EvidenceUploadService._gc_grace():
+            return False
+
+        delete_uploaded_file(file_url)
+        # The same content stored under another extension shares the thumbnail
+        if not ComplaintEvidence.count_references(content_hash):
+            delete_uploaded_file(thumbnail_url)
+        return True
+
+    # ============================================
+    # Background processing
+    # ============================================
+
+    @staticmethod
+    def _local_path(file_url):
+        return os.path.join(current_app.config['UPLOAD_FOLDER'], file_url.replace('/uploads/', '', 1))
+
+    @staticmethod
+    def _make_thumbnail(evidence, source_path):
+        """Write a JPEG thumbnail; returns (thumbnail_url, (width, height))."""
+        with Image.open(source_path) as image:
+            image = ImageOps.exif_transpose(image)
+            size = image.size
+            image.thumbnail(THUMBNAIL_SIZE)
+            if image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+
+            thumbnail_url = thumbnail_url_for(evidence.file_url)
+            image.save(EvidenceUploadService._local_path(thumbnail_url), 'JPEG', quality=80, optimize=True)
+        return thumbnail_url, size
+
+    @staticmethod
+    def _claim_preview(evidence):
+        """Make this thumbnail the complaint's preview unless it already has one."""
+        from app.models import Complaint
+
+        # Conditional UPDATE: concurrent processors cannot overwrite each other
+        db.session.execute(
+            update(Complaint)
+            .where(Complaint.id == evidence.complaint_id, Complaint.preview_url.is_(None))
+            .values(preview_url=evidence.thumbnail_url)
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    def release_preview(evidence):
+        """
+        Point the complaint's preview at another thumbnail (or none) when the
+        evidence it shows is deleted. Call before deleting the row.
+        """
+        complaint = evidence.complaint
+        if not evidence.thumbnail_url or complaint.preview_url != evidence.thumbnail_url:
+            return
+        replacement = db.session.query(ComplaintEvidence.thumbnail_url).filter(
+            ComplaintEvidence.complaint_id == complaint.id,
+            ComplaintEvidence.id != evidence.id,
+            ComplaintEvidence.thumbnail_url.isnot(None)
+        ).order_by(ComplaintEvidence.id).first()
+        complaint.preview_url = replacement[0] if replacement else None
+
+    @staticmethod
+    def process(evidence_ids):
+        """
+        Fill in metadata and thumbnails for pending evidence.
+        Each row commits on its own so one bad file does not hold back the rest.
+        """
+        processed = failed = 0
+        for evidence_id in evidence_ids:
+            evidence = db.session.get(ComplaintEvidence, evidence_id)
+            if evidence is None or evidence.processing_status != 'pending':
+                continue
+
+            try:
+                path = EvidenceUploadService._local_path(evidence.file_url)
+                if evidence.file_size is None:
+                    evidence.file_size = os.path.getsize(path)
+                if evidence.mime_type is None:
+                    evidence.mime_type = mimetypes.guess_type(path)[0]
+
+                # The same content was processed before: reuse its results
+                done = ComplaintEvidence.query.filter(
+                    ComplaintEvidence.content_hash == evidence.content_hash,
+                    ComplaintEvidence.processing_status == 'ready'
+                ).first() if evidence.content_hash else None
+
+                if done is not None:
+                    evidence.width, evidence.height = done.width, done.height
+                    evidence.thumbnail_url = done.thumbnail_url
+                    if evidence.thumbnail_url:
+                        EvidenceUploadService._claim_preview(evidence)
+                elif evidence.file_type == 'image':
+                    if Image is not None:
+                        evidence.thumbnail_url, size = EvidenceUploadService._make_thumbnail(evidence, path)
+                    else:
+                        size = _image_size(path)
+                    if size:
+                        evidence.width, evidence.height = size
+                    if evidence.thumbnail_url:
+                        EvidenceUploadService._claim_preview(evidence)
+
+                evidence.processing_status = 'ready'
+                db.session.commit()
+                processed += 1
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.warning(f'Evidence {evidence_id} processing failed: {e}')
+                # The row may have been deleted while it was being processed
+                evidence = db.session.get(ComplaintEvidence, evidence_id)
+                if evidence is not None:
+                    evidence.processing_status = 'failed'
+                    db.session.commit()
+                failed += 1
+
+        return {'success': True, 'processed': processed, 'failed': failed}
+
+    @staticmethod
+    def process_pending(batch_size=100):
+        """Process every pending evidence row (e.g. rows uploaded before this pipeline)."""
+        total = {'processed': 0, 'failed': 0}
+        last_id = 0
+        while True:
+            ids = [evidence_id for (evidence_id,) in db.session.query(ComplaintEvidence.id).filter(
+                ComplaintEvidence.processing_status == 'pending',
+                ComplaintEvidence.id > last_id
+            ).order_by(ComplaintEvidence.id).limit(batch_size)]
+            if not ids:
+                break
+            result = EvidenceUploadService.process(ids)
+            total['processed'] += result['processed']
+            total['failed'] += result['failed']
+            last_id = ids[-1]
+        return {'success': True, **total}
+
+    # ============================================
+    # Garbage collection
+    # ============================================
+
+    @staticmethod
+    def _gc_grace():
+        return current_app.config.get('UPLOAD_GC_GRACE', DEFAULT_GC_GRACE)
+
+    @staticmethod
+    def collect_garbage(dry_run=False):
+        """
+        Remove stored files no evidence row references, and abandoned
+        temporary uploads. Anything written or reused within UPLOAD_GC_GRACE
+        seconds is kept. Returns counts of files and bytes reclaimed.
+        """
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        cutoff = time.time() - EvidenceUploadService._gc_grace()
+        result = {'success': True, 'files': 0, 'bytes': 0, 'dry_run': dry_run}
+
+        def reclaim(path):
+            try:
+                stat = os.stat(path)
+                if stat.st_mtime > cutoff:
+                    return
+                if not dry_run:
+                    os.remove(path)
+            except FileNotFoundError:
+                return
+            result['files'] += 1
+            result['bytes'] += stat.st_size
+
+        incoming = os.path.join(upload_folder, INCOMING_FOLDER)
+        if os.path.isdir(incoming):
+            for name in os.listdir(incoming):
+                reclaim(os.path.join(incoming, name))
+
+        objects = os.path.join(upload_folder, OBJECTS_FOLDER)
+        if not os.path.isdir(objects):
+            return result
+
+        for prefix in sorted(os.listdir(objects)):
+            directory = os.path.join(objects, prefix)
+            # File names are the 64-character hash plus the extension, or
+            # .thumb.jpg for the thumbnail shared by all extensions
+            names = sorted(os.listdir(directory))
+            hashes = sorted({name[:64] for name in names})
+            referenced_hashes, referenced_urls = set(), set()
+            for start in range(0, len(hashes), GC_BATCH_SIZE):
+                batch = hashes[start:start + GC_BATCH_SIZE]
+                for content_hash, file_url in db.session.query(
+                    ComplaintEvidence.content_hash, ComplaintEvidence.file_url
+                ).filter(ComplaintEvidence.content_hash.in_(batch)).distinct():
+                    referenced_hashes.add(content_hash)
+                    referenced_urls.add(file_url)
+            for name in names:
+                if name.endswith('.thumb.jpg'):
+                    keep = name[:64] in referenced_hashes
+                else:
+                    keep = object_url(name[:64], name[64:]) in referenced_urls
+                if not keep:
+                    reclaim(os.path.join(directory, name))
+
+        return result
+
+    # ============================================
+    # Serving
+    # ============================================
+
+    @staticmethod
+    def send(filename):
+        """
+        Response for GET /uploads/<filename> with a signed URL.
+
+        Content-addressed files never change, so they are cached as immutable
+        with their hash as ETag; other files revalidate. Range and conditional
+        requests are handled by send_file, or by the front proxy when
+        UPLOAD_ACCEL_REDIRECT (nginx) or USE_X_SENDFILE (Apache/lighttpd) is
+        set, in which case the worker never copies file data.
+        """
+        config = current_app.config
+        if not verify_upload_signature(filename, request.args.get('expires'), request.args.get('sig')):
+            abort(403)
+
+        upload_folder = config['UPLOAD_FOLDER']
+        path = safe_join(upload_folder, filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+
+        if filename.startswith(OBJECTS_FOLDER + '/'):
+            # <sha256><ext> or <sha256>.thumb.jpg: unique per content
+            etag = os.path.basename(filename)
+            cache_control = 'private, max-age=31536000, immutable'
+        else:
+            etag = True
+            cache_control = 'private, no-cache'
+
+        accel = config.get('UPLOAD_ACCEL_REDIRECT')
+        if accel:
+            response = current_app.response_class(
+                mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            )
+            response.headers['X-Accel-Redirect'] = accel.rstrip('/') + '/' + filename
+        else:
+            response = send_from_directory(upload_folder, filename, conditional=True, etag=etag)
+
+        response.headers['Cache-Control'] = cache_control
+        return response
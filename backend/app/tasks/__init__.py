@@ -7,7 +7,9 @@ from app.tasks.scheduled import (
     send_reminder_notifications,
     calculate_monthly_karma,
     generate_weekly_report,
-    cleanup_old_notifications
+    cleanup_old_notifications,
+    reconcile_society_stats,
+    collect_upload_garbage
 )
 
 __all__ = [
@@ -15,5 +17,7 @@ __all__ = [
     'send_reminder_notifications',
     'calculate_monthly_karma',
     'generate_weekly_report',
-    'cleanup_old_notifications'
+    'cleanup_old_notifications',
+    'reconcile_society_stats',
+    'collect_upload_garbage'
 ]
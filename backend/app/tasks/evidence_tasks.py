@@ -0,0 +1,16 @@
+"""
+Celery Tasks for Evidence Processing
+"""
+
+from app.celery_app import celery
+
+
+@celery.task(name='tasks.process_evidence')
+def process_evidence(evidence_ids):
+    """
+    Generate metadata and thumbnails for newly uploaded evidence.
+    Queued by EvidenceUploadService.attach after the upload commits.
+    """
+    from app.services.upload_service import EvidenceUploadService
+    
+    return EvidenceUploadService.process(evidence_ids)
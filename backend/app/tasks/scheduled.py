@@ -11,80 +11,21 @@ from app.extensions import db
 @celery.task(name='app.tasks.scheduled.auto_escalate_old_complaints')
 def auto_escalate_old_complaints():
     """
-    Auto-escalate complaints that have been open for more than 7 days.
+    Auto-escalate complaints left open past their society's
+    auto_escalate_days (default 7).
     Runs daily at midnight.
     """
-    from app.models import Complaint, ComplaintStatus, Escalation, User, Notification, NotificationType
-    from flask import current_app
+    from app.services.task_service import TaskService
     
-    try:
-        cutoff_date = datetime.utcnow() - timedelta(days=7)
-        
-        # Find old open complaints
-        old_complaints = Complaint.query.filter(
-            Complaint.status == ComplaintStatus.OPEN.value,
-            Complaint.created_at < cutoff_date
-        ).all()
-        
-        escalated_count = 0
-        
-        for complaint in old_complaints:
-            # Create auto-escalation
-            escalation = Escalation(
-                complaint_id=complaint.id,
-                escalated_by_id=complaint.complainant_id,
-                escalated_to='secretary',
-                reason='Auto-escalated: Complaint open for more than 7 days without acknowledgment',
-                previous_status=complaint.status,
-                is_auto_escalated=True
-            )
-            
-            # Update complaint status
-            complaint.status = ComplaintStatus.ESCALATED.value
-            complaint.updated_at = datetime.utcnow()
-            
-            db.session.add(escalation)
-            
-            # Notify secretary
-            secretaries = User.query.join(User.roles).filter(
-                User.society_id == complaint.society_id,
-                User.roles.any(name='secretary')
-            ).all()
-            
-            for secretary in secretaries:
-                Notification.create_notification(
-                    user_id=secretary.id,
-                    title='Auto-Escalated Complaint',
-                    message=f'Complaint "{complaint.title}" auto-escalated due to no response for 7 days',
-                    notification_type=NotificationType.ESCALATION,
-                    complaint_id=complaint.id
-                )
-            
-            # Notify complainant
-            Notification.create_notification(
-                user_id=complaint.complainant_id,
-                title='Complaint Auto-Escalated',
-                message=f'Your complaint "{complaint.title}" has been automatically escalated to the secretary',
-                notification_type=NotificationType.ESCALATION,
-                complaint_id=complaint.id
-            )
-            
-            escalated_count += 1
-        
-        db.session.commit()
-        
-        return {
-            'success': True,
-            'escalated_count': escalated_count,
-            'message': f'Auto-escalated {escalated_count} complaints'
-        }
-        
-    except Exception as e:
-        db.session.rollback()
-        return {
-            'success': False,
-            'error': str(e)
-        }
+    result = TaskService.auto_escalate_complaints()
+    if not result['success']:
+        return result
+    
+    return {
+        'success': True,
+        'escalated_count': result['escalated'],
+        'message': f"Auto-escalated {result['escalated']} complaints"
+    }
 
 
 @celery.task(name='app.tasks.scheduled.send_reminder_notifications')
@@ -151,49 +92,47 @@ def send_reminder_notifications():
 @celery.task(name='app.tasks.scheduled.calculate_monthly_karma')
 def calculate_monthly_karma():
     """
-    Calculate and apply monthly karma adjustments.
-    Runs on 1st of every month.
+    Award last month's participation bonus.
+    Runs on 1st of every month; safe to retry.
+    """
+    from app.services.task_service import TaskService
+    
+    result = TaskService.award_monthly_karma_bonus()
+    if not result['success']:
+        return result
+    
+    return {
+        'success': True,
+        'users_awarded': result['awarded'],
+        'period': result['period']
+    }
+
+
+@celery.task(name='app.tasks.scheduled.generate_weekly_report')
+def generate_weekly_report():
     """
-    from app.models import User, Complaint, ComplaintStatus, KarmaLog, KarmaReason, Notification, NotificationType
-    from sqlalchemy import func
+    Generate weekly report for society secretaries.
+    Runs every Monday at 9 AM.
+    """
+    from app.services.report_service import WeeklyReportService
+    
+    return WeeklyReportService.generate_reports()
+
+
+@celery.task(name='app.tasks.scheduled.cleanup_old_notifications')
+def cleanup_old_notifications():
+    """
+    Delete old read notifications (older than 30 days).
+    Runs weekly on Sunday.
+    """
+    from app.models import Notification
     
     try:
-        last_month = datetime.utcnow().replace(day=1) - timedelta(days=1)
-        first_of_last_month = last_month.replace(day=1)
-        
-        # Get all active users
-        users = User.query.filter_by(active=True).all()
-        
-        for user in users:
-            bonus_points = 0
-            
-            # Check for resolved complaints filed by user last month
-            resolved_count = Complaint.query.filter(
-                Complaint.complainant_id == user.id,
-                Complaint.status == ComplaintStatus.RESOLVED.value,
-                Complaint.resolved_at >= first_of_last_month,
-                Complaint.resolved_at <= last_month
-            ).count()
-            
-            if resolved_count >= 3:
-                bonus_points += 10  # Monthly bonus for active participation
-            
-            # Apply bonus if any
-            if bonus_points > 0:
-                user.update_karma(bonus_points, KarmaReason.MONTHLY_BONUS)
-                
-                Notification.create_notification(
-                    user_id=user.id,
-                    title='Monthly Karma Bonus',
-                    message=f'You received +{bonus_points} karma points for your participation last month!',
-                    notification_type=NotificationType.KARMA
-                )
-        
-        db.session.commit()
+        deleted_count = Notification.cleanup_old_notifications(days=30)
         
         return {
             'success': True,
-            'users_processed': len(users)
+            'deleted_count': deleted_count
         }
         
     except Exception as e:
@@ -204,67 +143,20 @@ def calculate_monthly_karma():
         }
 
 
-@celery.task(name='app.tasks.scheduled.generate_weekly_report')
-def generate_weekly_report():
+@celery.task(name='app.tasks.scheduled.reconcile_society_stats')
+def reconcile_society_stats():
     """
-    Generate weekly report for society secretaries.
-    Runs every Monday at 9 AM.
+    Repair society statistics rollups that drifted from the complaint table.
+    Runs daily at 3 AM.
     """
-    from app.models import Society, Complaint, ComplaintStatus, User, Notification, NotificationType
-    from sqlalchemy import func
+    from app.models import SocietyStat
     
     try:
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        
-        societies = Society.query.all()
-        
-        for society in societies:
-            # Calculate weekly stats
-            new_complaints = Complaint.query.filter(
-                Complaint.society_id == society.id,
-                Complaint.created_at >= week_ago
-            ).count()
-            
-            resolved_complaints = Complaint.query.filter(
-                Complaint.society_id == society.id,
-                Complaint.resolved_at >= week_ago
-            ).count()
-            
-            pending_complaints = Complaint.query.filter(
-                Complaint.society_id == society.id,
-                Complaint.status.in_([
-                    ComplaintStatus.OPEN.value,
-                    ComplaintStatus.IN_PROGRESS.value,
-                    ComplaintStatus.ESCALATED.value
-                ])
-            ).count()
-            
-            # Get secretaries
-            secretaries = User.query.join(User.roles).filter(
-                User.society_id == society.id,
-                User.roles.any(name='secretary')
-            ).all()
-            
-            report_message = (
-                f"Weekly Report for {society.name}:\n"
-                f"• New complaints: {new_complaints}\n"
-                f"• Resolved: {resolved_complaints}\n"
-                f"• Pending: {pending_complaints}"
-            )
-            
-            for secretary in secretaries:
-                Notification.create_notification(
-                    user_id=secretary.id,
-                    title=f'Weekly Report - {society.name}',
-                    message=report_message,
-                    notification_type=NotificationType.SYSTEM
-                )
-        
-        db.session.commit()
+        result = SocietyStat.reconcile()
         
         return {
             'success': True,
-            'societies_processed': len(societies)
+            **result
         }
         
     except Exception as e:
@@ -275,24 +167,18 @@ def generate_weekly_report():
         }
 
 
-@celery.task(name='app.tasks.scheduled.cleanup_old_notifications')
-def cleanup_old_notifications():
+@celery.task(name='app.tasks.scheduled.collect_upload_garbage')
+def collect_upload_garbage():
     """
-    Delete old read notifications (older than 30 days).
-    Runs weekly on Sunday.
+    Remove stored evidence files that no complaint references any more.
+    Runs daily at 4 AM.
     """
-    from app.models import Notification
+    from app.services.upload_service import EvidenceUploadService
     
     try:
-        deleted_count = Notification.cleanup_old_notifications(days=30)
-        
-        return {
-            'success': True,
-            'deleted_count': deleted_count
-        }
+        return EvidenceUploadService.collect_garbage()
         
     except Exception as e:
-        db.session.rollback()
         return {
             'success': False,
             'error': str(e)
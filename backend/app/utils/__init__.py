@@ -9,12 +9,17 @@ from app.utils.helpers import (
     get_file_type,
     save_uploaded_file,
     delete_uploaded_file,
+    sign_upload_url,
+    verify_upload_signature,
     validate_email,
     validate_phone,
     validate_flat_number,
     sanitize_string,
     paginate_query,
     get_pagination_params,
+    get_cursor_params,
+    encode_cursor,
+    decode_cursor,
     format_datetime,
     calculate_days_since,
     mask_email,
@@ -23,7 +28,10 @@ from app.utils.helpers import (
 
 from app.utils.decorators import (
     jwt_required_custom,
+    jwt_stream_required,
+    STREAM_TOKEN_SCOPE,
     get_current_user,
+    get_current_principal,
     admin_required,
     secretary_required,
     committee_required,
@@ -33,6 +41,12 @@ from app.utils.decorators import (
     log_api_call
 )
 
+from app.utils.principal import (
+    Principal,
+    load_principal,
+    invalidate_principal
+)
+
 from app.utils.validators import (
     UserRegistrationSchema,
     UserLoginSchema,
@@ -54,18 +68,26 @@ __all__ = [
     'get_file_type',
     'save_uploaded_file',
     'delete_uploaded_file',
+    'sign_upload_url',
+    'verify_upload_signature',
     'validate_email',
     'validate_phone',
     'validate_flat_number',
     'sanitize_string',
     'paginate_query',
     'get_pagination_params',
+    'get_cursor_params',
+    'encode_cursor',
+    'decode_cursor',
     'format_datetime',
     'calculate_days_since',
     'mask_email',
     'mask_phone',
     'jwt_required_custom',
+    'jwt_stream_required',
+    'STREAM_TOKEN_SCOPE',
     'get_current_user',
+    'get_current_principal',
     'admin_required',
     'secretary_required',
     'committee_required',
@@ -73,6 +95,9 @@ __all__ = [
     'validate_json',
     'ownership_required',
     'log_api_call',
+    'Principal',
+    'load_principal',
+    'invalidate_principal',
     'UserRegistrationSchema',
     'UserLoginSchema',
     'UserUpdateSchema',
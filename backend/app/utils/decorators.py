@@ -4,50 +4,109 @@ Custom Decorators - Authentication, authorization, and validation decorators
 
 from functools import wraps
 from flask import jsonify, request, g
-from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from flask_jwt_extended import (
+    verify_jwt_in_request, get_jwt_identity, get_jwt, get_jwt_request_location
+)
+from app.extensions import db
 from app.models import User, Complaint
+from app.utils.principal import load_principal
 
 
-def jwt_required_custom(fn):
-    """Custom JWT required decorator with user loading."""
+# 'scope' claim of the short-lived tokens issued for the notification stream
+STREAM_TOKEN_SCOPE = 'stream'
+
+
+def _token_scope_allowed(stream):
+    """Stream tokens only open streams; a URL only carries stream tokens."""
+    scope = get_jwt().get('scope')
+    if not stream:
+        return scope is None
+    return scope == STREAM_TOKEN_SCOPE or get_jwt_request_location() != 'query_string'
+
+
+def jwt_required_custom(fn, locations=None, stream=False):
+    """
+    Custom JWT required decorator with principal loading.
+    
+    Resolves the caller to a cached Principal (id, society, active flag and
+    role names) stored on flask g; the full User row is only loaded when a
+    view asks for it via get_current_user(). Stacked auth decorators reuse
+    the principal already resolved for the request.
+    """
     @wraps(fn)
     def wrapper(*args, **kwargs):
         try:
-            verify_jwt_in_request()
+            verify_jwt_in_request(locations=locations)
+            if not _token_scope_allowed(stream):
+                return jsonify({
+                    'success': False,
+                    'error': 'Invalid or expired token'
+                }), 401
             user_id = get_jwt_identity()
             # Convert to int if it's a string (JWT stores as string)
             if isinstance(user_id, str):
                 user_id = int(user_id)
-            user = User.query.get(user_id)
             
-            if not user:
-                return jsonify({
-                    'success': False,
-                    'error': 'User not found'
-                }), 401
-            
-            if not user.active:
-                return jsonify({
-                    'success': False,
-                    'error': 'Account is deactivated'
-                }), 403
-            
-            # Store user in flask g object for easy access
-            g.current_user = user
-            
-            return fn(*args, **kwargs)
+            principal = getattr(g, 'principal', None)
+            if principal is None or principal.user_id != user_id:
+                principal = load_principal(user_id)
         except Exception as e:
             return jsonify({
                 'success': False,
                 'error': 'Invalid or expired token'
             }), 401
+        
+        if not principal:
+            return jsonify({
+                'success': False,
+                'error': 'User not found'
+            }), 401
+        
+        if not principal.active:
+            return jsonify({
+                'success': False,
+                'error': 'Account is deactivated'
+            }), 403
+        
+        # Store principal in flask g object for easy access
+        if getattr(g, 'principal', None) is not principal:
+            g.principal = principal
+            g.pop('current_user', None)
+        
+        return fn(*args, **kwargs)
     
     return wrapper
 
 
+def jwt_stream_required(fn):
+    """
+    Like jwt_required_custom, but also accepts a stream token as ?token=.
+    
+    Only for streaming endpoints: EventSource cannot send an Authorization
+    header. URLs end up in proxy and access logs, so the query string only
+    takes the short-lived tokens from POST /api/notifications/stream-token.
+    """
+    return jwt_required_custom(fn, locations=['headers', 'query_string'], stream=True)
+
+
+def get_current_principal():
+    """Get the cached principal for the authenticated request."""
+    return getattr(g, 'principal', None)
+
+
 def get_current_user():
-    """Get the current logged in user from flask g object."""
-    return getattr(g, 'current_user', None)
+    """Get the current logged in user, loading it on first access."""
+    user = getattr(g, 'current_user', None)
+    if user is None:
+        principal = get_current_principal()
+        if principal is None:
+            return None
+        user = db.session.get(User, principal.user_id)
+        if user is not None:
+            # Role checks on the user reuse the principal's cached role set
+            user.attach_principal(principal)
+        g.current_user = user
+    return user
 
 
 def admin_required(fn):
@@ -55,8 +114,8 @@ def admin_required(fn):
     @wraps(fn)
     @jwt_required_custom
     def wrapper(*args, **kwargs):
-        user = get_current_user()
-        if not user.is_admin():
+        principal = get_current_principal()
+        if not principal.is_admin():
             return jsonify({
                 'success': False,
                 'error': 'Admin access required'
@@ -70,8 +129,8 @@ def secretary_required(fn):
     @wraps(fn)
     @jwt_required_custom
     def wrapper(*args, **kwargs):
-        user = get_current_user()
-        if not user.is_secretary():
+        principal = get_current_principal()
+        if not principal.is_secretary():
             return jsonify({
                 'success': False,
                 'error': 'Secretary access required'
@@ -85,8 +144,8 @@ def committee_required(fn):
     @wraps(fn)
     @jwt_required_custom
     def wrapper(*args, **kwargs):
-        user = get_current_user()
-        if not user.is_committee_member():
+        principal = get_current_principal()
+        if not principal.is_committee_member():
             return jsonify({
                 'success': False,
                 'error': 'Committee member access required'
@@ -100,14 +159,15 @@ def same_society_required(fn):
     @wraps(fn)
     @jwt_required_custom
     def wrapper(*args, **kwargs):
-        user = get_current_user()
+        principal = get_current_principal()
         
         # Check if complaint_id is in kwargs
         complaint_id = kwargs.get('complaint_id') or kwargs.get('id')
         if complaint_id:
-            complaint = Complaint.query.get(complaint_id)
-            if complaint and complaint.society_id != user.society_id:
-                if not user.is_admin():  # Admins can access any society
+            # Loaded into the identity map, so the view's own lookup is free
+            complaint = db.session.get(Complaint, complaint_id)
+            if complaint and complaint.society_id != principal.society_id:
+                if not principal.is_admin():  # Admins can access any society
                     return jsonify({
                         'success': False,
                         'error': 'Access denied: Different society'
@@ -155,9 +215,9 @@ def rate_limit_by_user(limit_string):
         @wraps(fn)
         def wrapper(*args, **kwargs):
             # Use user ID for rate limiting if authenticated
-            user = get_current_user()
-            if user:
-                key = f"user_{user.id}"
+            principal = get_current_principal()
+            if principal:
+                key = f"user_{principal.user_id}"
             else:
                 key = request.remote_addr
             
@@ -173,7 +233,7 @@ def ownership_required(model_class, id_param='id'):
         @wraps(fn)
         @jwt_required_custom
         def wrapper(*args, **kwargs):
-            user = get_current_user()
+            principal = get_current_principal()
             resource_id = kwargs.get(id_param)
             
             if resource_id:
@@ -187,7 +247,7 @@ def ownership_required(model_class, id_param='id'):
                 # Check ownership (assumes model has user_id or complainant_id)
                 owner_id = getattr(resource, 'user_id', None) or getattr(resource, 'complainant_id', None)
                 
-                if owner_id != user.id and not user.is_secretary():
+                if owner_id != principal.user_id and not principal.is_secretary():
                     return jsonify({
                         'success': False,
                         'error': 'You do not have permission to access this resource'
@@ -0,0 +1,163 @@
+"""
+Engine Profiles - Per-backend connection tuning
+SQLite files are switched to WAL with synchronous=NORMAL, a busy timeout
+and a larger page cache / mmap window, so readers no longer block behind
+a writer across gunicorn threads and workers. PostgreSQL gets a sized,
+pre-pinged, recycled pool. Its statement and idle-in-transaction timeouts
+are set with SET LOCAL in each transaction a request opens, so migrations,
+CLI commands, background jobs and views marked without_db_timeouts (the
+streaming export) are not cut off. Options set explicitly in
+SQLALCHEMY_ENGINE_OPTIONS always win over the profile.
+An optional SQLALCHEMY_REPLICA_URI is registered as the 'replica' bind with
+its own profile, opened read-only.
+"""
+
+from functools import wraps
+
+from flask import current_app, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+from app.db_routing import REPLICA_BIND, RoutingSession
+from app.extensions import db
+
+
+def _backend(uri):
+    url = make_url(uri)
+    backend = url.get_backend_name()
+    if backend == 'sqlite' and url.database in (None, '', ':memory:'):
+        return 'sqlite-memory'
+    return backend
+
+
+def sqlite_pragmas(config):
+    """PRAGMA statements run on every new SQLite connection, in order."""
+    return [
+        f"PRAGMA journal_mode={config['DB_SQLITE_JOURNAL_MODE']}",
+        f"PRAGMA synchronous={config['DB_SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA busy_timeout={int(config['DB_BUSY_TIMEOUT'])}",
+        f"PRAGMA mmap_size={int(config['DB_SQLITE_MMAP_SIZE'])}",
+        f"PRAGMA cache_size={int(config['DB_SQLITE_CACHE_SIZE'])}",
+    ]
+
+
+def engine_profile(config, uri=None, read_only=False):
+    """SQLALCHEMY_ENGINE_OPTIONS defaults for the database backend of uri (default: the primary)."""
+    backend = _backend(uri or config['SQLALCHEMY_DATABASE_URI'])
+
+    if backend == 'postgresql':
+        connect_args = {'connect_timeout': 10}
+        if read_only:
+            connect_args['options'] = '-c default_transaction_read_only=on'
+        return {
+            'pool_size': config['DB_POOL_SIZE'],
+            'max_overflow': config['DB_MAX_OVERFLOW'],
+            'pool_timeout': config['DB_POOL_TIMEOUT'],
+            'pool_recycle': config['DB_POOL_RECYCLE'],
+            'pool_pre_ping': True,
+            'connect_args': connect_args,
+        }
+
+    if backend == 'sqlite':
+        # Connections are cheap; size the pool for the gunicorn thread count.
+        # The driver-level timeout mirrors busy_timeout for BEGIN statements.
+        return {
+            'pool_size': config['DB_POOL_SIZE'],
+            'max_overflow': config['DB_MAX_OVERFLOW'],
+            'pool_timeout': config['DB_POOL_TIMEOUT'],
+            'connect_args': {'timeout': int(config['DB_BUSY_TIMEOUT']) / 1000},
+        }
+
+    return {}
+
+
+def request_timeout_statements(config):
+    """SET LOCAL statements run at the start of each PostgreSQL transaction a request opens."""
+    return [
+        f"SET LOCAL statement_timeout = {int(config['DB_STATEMENT_TIMEOUT'])}",
+        f"SET LOCAL idle_in_transaction_session_timeout = {int(config['DB_IDLE_IN_TRANSACTION_TIMEOUT'])}",
+    ]
+
+
+def without_db_timeouts(fn):
+    """Exempt a view from the per-request timeouts (long streams that hold a transaction open)."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        return fn(*args, **kwargs)
+    wrapper.db_timeouts_exempt = True
+    return wrapper
+
+
+def _request_timeouts_apply():
+    if not has_request_context() or current_app.config.get('DB_ENGINE_PROFILE', 'auto') == 'off':
+        return False
+    view = current_app.view_functions.get(request.endpoint)
+    return not getattr(view, 'db_timeouts_exempt', False)
+
+
+def _merge_options(profile, explicit):
+    connect_args = {**profile.pop('connect_args', {}), **explicit.get('connect_args', {})}
+    merged = {**profile, **explicit}
+    if connect_args:
+        merged['connect_args'] = connect_args
+    return merged
+
+
+def configure_engine_options(app):
+    """
+    Merge the backend profile under SQLALCHEMY_ENGINE_OPTIONS and register
+    the replica bind, if any (call before db.init_app).
+    """
+    profiled = app.config.get('DB_ENGINE_PROFILE', 'auto') != 'off'
+    explicit = app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}
+    if profiled:
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = _merge_options(engine_profile(app.config), explicit)
+
+    replica_uri = app.config.get('SQLALCHEMY_REPLICA_URI')
+    if replica_uri:
+        if replica_uri.startswith('postgres://'):
+            replica_uri = replica_uri.replace('postgres://', 'postgresql://', 1)
+        # Binds don't inherit SQLALCHEMY_ENGINE_OPTIONS, so pass them explicitly
+        options = dict(explicit)
+        if profiled:
+            options = _merge_options(engine_profile(app.config, replica_uri, read_only=True), explicit)
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        binds[REPLICA_BIND] = {'url': replica_uri, **options}
+        app.config['SQLALCHEMY_BINDS'] = binds
+
+
+def _pragma_hook(pragmas):
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+    return apply_pragmas
+
+
+def install_connect_hooks(app):
+    """
+    Run the SQLite PRAGMAs on every new connection to a SQLite file, and
+    make replica connections query-only (call after db.init_app).
+    """
+    profiled = app.config.get('DB_ENGINE_PROFILE', 'auto') != 'off'
+
+    with app.app_context():
+        for key, engine in db.engines.items():
+            if _backend(engine.url) != 'sqlite':
+                continue
+            pragmas = sqlite_pragmas(app.config) if profiled else []
+            if key == REPLICA_BIND:
+                pragmas.append('PRAGMA query_only=ON')
+            if pragmas:
+                event.listen(engine, 'connect', _pragma_hook(pragmas))
+
+
+@event.listens_for(RoutingSession, 'after_begin')
+def _apply_request_timeouts(session, transaction, connection):
+    if connection.dialect.name != 'postgresql' or not _request_timeouts_apply():
+        return
+    for statement in request_timeout_statements(current_app.config):
+        connection.exec_driver_sql(statement)
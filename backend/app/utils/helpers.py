@@ -5,10 +5,15 @@ Utility Functions - Common helper functions for the application
 import os
 import uuid
 import re
+import base64
+import hashlib
+import hmac
+import time
 from datetime import datetime
 from functools import wraps
+from sqlalchemy import and_, or_
 from werkzeug.utils import secure_filename
-from flask import current_app, request
+from flask import current_app, request, abort
 
 
 def generate_unique_filename(filename):
@@ -94,6 +99,40 @@ def delete_uploaded_file(file_url):
     return False
 
 
+def _upload_signature(path, expires):
+    key = current_app.config['SECRET_KEY'].encode()
+    return hmac.new(key, f'{path}:{expires}'.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def sign_upload_url(file_url, ttl=None):
+    """
+    Return file_url with an expiring signature (?expires=...&sig=...).
+    
+    Expiry is rounded up to half-TTL steps, so a URL stays identical for a
+    while and browsers can reuse their cached copy. The link is valid for
+    between ttl/2 and ttl seconds.
+    """
+    if not file_url or not file_url.startswith('/uploads/'):
+        return file_url
+    
+    ttl = ttl or current_app.config.get('UPLOAD_URL_TTL', 3600)
+    step = max(ttl // 2, 1)
+    expires = (int(time.time()) // step + 2) * step
+    path = file_url[len('/uploads/'):]
+    return f'{file_url}?expires={expires}&sig={_upload_signature(path, expires)}'
+
+
+def verify_upload_signature(path, expires, signature):
+    """Check a signature from sign_upload_url() for a path under /uploads/."""
+    try:
+        expires = int(expires)
+    except (TypeError, ValueError):
+        return False
+    if expires < time.time() or not signature:
+        return False
+    return hmac.compare_digest(_upload_signature(path, expires), signature)
+
+
 def validate_email(email):
     """Validate email format."""
     pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
@@ -129,12 +168,40 @@ def sanitize_string(text, max_length=None):
     return text
 
 
-def paginate_query(query, page=1, per_page=10, max_per_page=100):
-    """Paginate a SQLAlchemy query."""
+def encode_cursor(created_at, row_id):
+    """Encode a (created_at, id) keyset position as an opaque cursor."""
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor from encode_cursor(). Raises ValueError if malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def paginate_query(query, page=1, per_page=10, max_per_page=100,
+                   cursor=None, keyset=None, include_total=False, direction='desc'):
+    """
+    Paginate a SQLAlchemy query.
+    
+    By default uses OFFSET pagination with a total count. When ``cursor`` is
+    not None and ``keyset`` gives the (created_at, id) columns, switches to
+    keyset pagination: rows are ordered by (created_at, id), the page starts
+    after the cursor position (an empty cursor means the first page), and
+    the total COUNT(*) is skipped unless ``include_total`` is set.
+    """
     # Ensure valid page and per_page values
     page = max(1, page)
     per_page = min(max(1, per_page), max_per_page)
     
+    if cursor is not None and keyset is not None:
+        return _paginate_keyset(query, per_page, cursor, keyset, include_total, direction)
+    
     # Execute pagination
     pagination = query.paginate(page=page, per_page=per_page, error_out=False)
     
@@ -149,6 +216,56 @@ def paginate_query(query, page=1, per_page=10, max_per_page=100):
     }
 
 
+def _paginate_keyset(query, per_page, cursor, keyset, include_total, direction):
+    """Keyset pagination on (created_at, id); see paginate_query()."""
+    created_col, id_col = keyset
+    
+    total = query.order_by(None).count() if include_total else None
+    
+    if direction == 'asc':
+        query = query.order_by(None).order_by(created_col.asc(), id_col.asc())
+    else:
+        query = query.order_by(None).order_by(created_col.desc(), id_col.desc())
+    
+    if cursor:
+        try:
+            cursor_created, cursor_id = decode_cursor(cursor)
+        except ValueError:
+            abort(400, description='Invalid pagination cursor')
+        
+        if direction == 'asc':
+            query = query.filter(or_(
+                created_col > cursor_created,
+                and_(created_col == cursor_created, id_col > cursor_id)
+            ))
+        else:
+            query = query.filter(or_(
+                created_col < cursor_created,
+                and_(created_col == cursor_created, id_col < cursor_id)
+            ))
+    
+    # Fetch one extra row to know whether another page exists
+    items = query.limit(per_page + 1).all()
+    has_next = len(items) > per_page
+    items = items[:per_page]
+    
+    next_cursor = None
+    if has_next:
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, created_col.key), getattr(last, id_col.key))
+    
+    return {
+        'items': items,
+        'total': total,
+        'pages': None,
+        'page': None,
+        'per_page': per_page,
+        'has_next': has_next,
+        'has_prev': bool(cursor),
+        'next_cursor': next_cursor
+    }
+
+
 def get_pagination_params():
     """Get pagination parameters from request args."""
     page = request.args.get('page', 1, type=int)
@@ -156,6 +273,18 @@ def get_pagination_params():
     return page, per_page
 
 
+def get_cursor_params():
+    """
+    Get keyset pagination parameters from request args.
+    
+    Returns (cursor, include_total). cursor is None unless ?cursor= was sent;
+    an empty ?cursor= requests the first page in cursor mode.
+    """
+    cursor = request.args.get('cursor')
+    include_total = request.args.get('include_total', 'false').lower() == 'true'
+    return cursor, include_total
+
+
 def format_datetime(dt, format_type='default'):
     """Format datetime for display."""
     if not dt:
@@ -225,6 +354,21 @@ class APIResponse:
             response['errors'] = errors
         return response, status_code
     
+    @staticmethod
+    def pagination_meta(pagination_info):
+        """Build the 'pagination' block for a paginate_query() result."""
+        meta = {
+            'total': pagination_info['total'],
+            'pages': pagination_info['pages'],
+            'page': pagination_info['page'],
+            'per_page': pagination_info['per_page'],
+            'has_next': pagination_info['has_next'],
+            'has_prev': pagination_info['has_prev']
+        }
+        if 'next_cursor' in pagination_info:
+            meta['next_cursor'] = pagination_info['next_cursor']
+        return meta
+    
     @staticmethod
     def paginated(items, pagination_info, item_transform=None):
         """Return paginated response."""
@@ -234,12 +378,5 @@ class APIResponse:
         return {
             'success': True,
             'data': items,
-            'pagination': {
-                'total': pagination_info['total'],
-                'pages': pagination_info['pages'],
-                'page': pagination_info['page'],
-                'per_page': pagination_info['per_page'],
-                'has_next': pagination_info['has_next'],
-                'has_prev': pagination_info['has_prev']
-            }
+            'pagination': APIResponse.pagination_meta(pagination_info)
         }, 200
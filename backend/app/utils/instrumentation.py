@@ -0,0 +1,253 @@
+"""
+Request Instrumentation - SQL counts, DB time and latency per route
+With INSTRUMENTATION_ENABLED every request records how many statements it
+ran, how long they took and which were slowest, answers with a
+Server-Timing header, logs statements repeated often enough to look like
+an N+1, and feeds rolling per-route histograms served by /api/debug/metrics.
+When disabled no engine listener or request hook is installed at all.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+from app.extensions import db
+
+
+# Upper bounds (ms) of the latency histogram buckets; one overflow bucket follows
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Slowest distinct statements kept per request and per route
+SLOWEST_STATEMENTS = 5
+STATEMENT_PREVIEW = 300
+
+
+class RequestStats:
+    """SQL activity of the current request, keyed by statement text."""
+    __slots__ = ('started', 'queries', 'db_ms', 'statements', '_mark')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_ms = 0.0
+        self.statements = {}  # statement -> [count, total_ms, max_ms]
+        self._mark = None
+
+    def record(self, statement, elapsed_ms):
+        self.queries += 1
+        self.db_ms += elapsed_ms
+        entry = self.statements.get(statement)
+        if entry is None:
+            self.statements[statement] = [1, elapsed_ms, elapsed_ms]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed_ms
+            entry[2] = max(entry[2], elapsed_ms)
+
+    def slowest(self, limit=SLOWEST_STATEMENTS):
+        """[(statement, max_ms)] of the slowest distinct statements."""
+        ranked = sorted(self.statements.items(), key=lambda item: -item[1][2])[:limit]
+        return [(statement, entry[2]) for statement, entry in ranked]
+
+    def repeated(self, threshold):
+        """[(statement, count)] of statements run at least threshold times."""
+        return [(statement, entry[0]) for statement, entry in self.statements.items()
+                if entry[0] >= threshold]
+
+
+class _RouteSlice:
+    """Aggregates of one route within one time slice."""
+    __slots__ = ('requests', 'errors', 'buckets', 'total_ms', 'max_ms',
+                 'queries', 'max_queries', 'db_ms', 'n_plus_one', 'slowest')
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.queries = 0
+        self.max_queries = 0
+        self.db_ms = 0.0
+        self.n_plus_one = 0
+        self.slowest = {}  # statement -> max_ms
+
+
+class RouteMetrics:
+    """
+    Rolling per-route latency histograms and SQL totals (per worker process).
+    The window is split into slices that are recycled as time moves on, so
+    recording is O(1) and old traffic ages out without a sweeper.
+    """
+
+    def __init__(self, window=300, slices=5):
+        self._lock = threading.Lock()
+        self.configure(window, slices)
+
+    def configure(self, window=None, slices=None):
+        with self._lock:
+            self.window = window or getattr(self, 'window', 300)
+            self.slices = slices or getattr(self, 'slices', 5)
+            self._slice_seconds = max(self.window / self.slices, 1)
+            self._epochs = [None] * self.slices
+            self._data = [{} for _ in range(self.slices)]
+
+    def reset(self):
+        self.configure()
+
+    def record(self, route, elapsed_ms, status_code, stats, n_plus_one=False):
+        epoch = int(time.time() // self._slice_seconds)
+        index = epoch % self.slices
+        with self._lock:
+            if self._epochs[index] != epoch:
+                self._epochs[index] = epoch
+                self._data[index] = {}
+            entry = self._data[index].get(route)
+            if entry is None:
+                entry = self._data[index][route] = _RouteSlice()
+
+            entry.requests += 1
+            entry.errors += status_code >= 500
+            entry.buckets[bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+            entry.total_ms += elapsed_ms
+            entry.max_ms = max(entry.max_ms, elapsed_ms)
+            entry.queries += stats.queries
+            entry.max_queries = max(entry.max_queries, stats.queries)
+            entry.db_ms += stats.db_ms
+            entry.n_plus_one += n_plus_one
+            for statement, max_ms in stats.slowest():
+                if max_ms > entry.slowest.get(statement, 0):
+                    entry.slowest[statement] = max_ms
+            if len(entry.slowest) > 4 * SLOWEST_STATEMENTS:
+                entry.slowest = dict(sorted(entry.slowest.items(),
+                                            key=lambda item: -item[1])[:SLOWEST_STATEMENTS])
+
+    def snapshot(self):
+        """Per-route numbers over the current window."""
+        oldest = int(time.time() // self._slice_seconds) - self.slices + 1
+        merged = {}
+        with self._lock:
+            for epoch, routes in zip(self._epochs, self._data):
+                if epoch is None or epoch < oldest:
+                    continue
+                for route, part in routes.items():
+                    total = merged.get(route)
+                    if total is None:
+                        total = merged[route] = _RouteSlice()
+                    total.requests += part.requests
+                    total.errors += part.errors
+                    total.buckets = [a + b for a, b in zip(total.buckets, part.buckets)]
+                    total.total_ms += part.total_ms
+                    total.max_ms = max(total.max_ms, part.max_ms)
+                    total.queries += part.queries
+                    total.max_queries = max(total.max_queries, part.max_queries)
+                    total.db_ms += part.db_ms
+                    total.n_plus_one += part.n_plus_one
+                    for statement, max_ms in part.slowest.items():
+                        total.slowest[statement] = max(total.slowest.get(statement, 0), max_ms)
+
+        return {route: _summarize(entry) for route, entry in sorted(merged.items())}
+
+
+def _percentile(entry, p):
+    """Upper bound of the histogram bucket holding the p-th percentile."""
+    target = entry.requests * p / 100
+    seen = 0
+    for bound, count in zip(LATENCY_BUCKETS_MS, entry.buckets):
+        seen += count
+        if seen >= target:
+            return min(bound, round(entry.max_ms, 2))
+    return round(entry.max_ms, 2)
+
+
+def _summarize(entry):
+    requests = entry.requests
+    return {
+        'requests': requests,
+        'errors': entry.errors,
+        'mean_ms': round(entry.total_ms / requests, 2),
+        'p50_ms': _percentile(entry, 50),
+        'p95_ms': _percentile(entry, 95),
+        'p99_ms': _percentile(entry, 99),
+        'max_ms': round(entry.max_ms, 2),
+        'histogram': [
+            {'le': bound, 'count': count}
+            for bound, count in zip(LATENCY_BUCKETS_MS + ('+Inf',), entry.buckets)
+        ],
+        'queries_per_request': round(entry.queries / requests, 2),
+        'max_queries': entry.max_queries,
+        'db_ms_per_request': round(entry.db_ms / requests, 2),
+        'n_plus_one_requests': entry.n_plus_one,
+        'slowest_statements': [
+            {'statement': statement[:STATEMENT_PREVIEW], 'max_ms': round(max_ms, 2)}
+            for statement, max_ms in sorted(entry.slowest.items(),
+                                            key=lambda item: -item[1])[:SLOWEST_STATEMENTS]
+        ]
+    }
+
+
+# Global instance
+route_metrics = RouteMetrics()
+
+
+# ============================================
+# Hooks
+# ============================================
+
+def _current_stats():
+    return g.get('_request_stats') if has_request_context() else None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats()
+    if stats is not None:
+        stats._mark = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats()
+    if stats is not None and stats._mark is not None:
+        stats.record(statement, (time.perf_counter() - stats._mark) * 1000)
+        stats._mark = None
+
+
+def init_instrumentation(app):
+    """Install the engine listeners and request hooks if instrumentation is on."""
+    if not app.config.get('INSTRUMENTATION_ENABLED'):
+        return
+
+    route_metrics.configure(window=app.config.get('INSTRUMENTATION_WINDOW', 300))
+    threshold = app.config.get('INSTRUMENTATION_N_PLUS_ONE_THRESHOLD', 10)
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+    @app.before_request
+    def start_request_stats():
+        g._request_stats = RequestStats()
+
+    @app.after_request
+    def finish_request_stats(response):
+        stats = g.pop('_request_stats', None)
+        if stats is None:
+            return response
+        elapsed_ms = (time.perf_counter() - stats.started) * 1000
+        route = f'{request.method} {request.url_rule.rule}' if request.url_rule else 'unmatched'
+
+        repeated = stats.repeated(threshold)
+        for statement, count in repeated:
+            app.logger.warning(
+                f'Likely N+1 in {route}: statement ran {count} times: '
+                f'{statement[:STATEMENT_PREVIEW]}'
+            )
+
+        route_metrics.record(route, elapsed_ms, response.status_code, stats, bool(repeated))
+        timing = f'db;dur={stats.db_ms:.2f};desc="{stats.queries} queries", app;dur={elapsed_ms:.2f}'
+        existing = response.headers.get('Server-Timing')
+        response.headers['Server-Timing'] = f'{existing}, {timing}' if existing else timing
+        return response
@@ -0,0 +1,237 @@
+"""
+Prometheus Metrics - Request, database pool, cache and task metrics
+Enabled with METRICS_ENABLED and served in Prometheus text format at
+/api/metrics. Under gunicorn, set PROMETHEUS_MULTIPROC_DIR (gunicorn.conf.py
+does) so every worker writes its samples to memory-mapped files in that
+directory and a scrape of any worker reports the sum over all of them.
+prometheus_client is optional; without it, or with the flag off, every
+recording helper here is a no-op.
+"""
+
+import os
+import time
+from functools import wraps
+
+from flask import g, request
+from sqlalchemy import event
+
+from app.extensions import db, cache
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+        generate_latest, multiprocess
+    )
+except ImportError:  # pragma: no cover - prometheus_client is optional
+    CollectorRegistry = None
+
+
+# Result keys TaskService jobs and Celery tasks report their row counts under
+ROW_KEYS = ('escalated', 'awarded', 'reminders_sent', 'deleted', 'repaired', 'rebuilt',
+            'processed', 'emails_queued', 'sent', 'notifications', 'societies_processed')
+
+TASK_BUCKETS = (0.05, 0.1, 0.5, 1, 5, 15, 30, 60, 300, 900, 1800)
+
+
+class Metrics:
+    """The process-wide metric families (created once, on first enable)."""
+
+    def __init__(self):
+        self.requests = Counter(
+            'padosi_http_requests_total', 'HTTP requests served',
+            ['blueprint', 'method', 'status'])
+        self.request_errors = Counter(
+            'padosi_http_request_errors_total', 'HTTP requests answered with a 5xx status',
+            ['blueprint'])
+        self.request_latency = Histogram(
+            'padosi_http_request_duration_seconds', 'HTTP request latency',
+            ['blueprint', 'method'])
+
+        self.pool_wait = Histogram(
+            'padosi_db_pool_checkout_wait_seconds', 'Time spent obtaining a pooled connection',
+            buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30))
+        self.pool_checked_out = Gauge(
+            'padosi_db_pool_checked_out', 'Connections currently checked out',
+            multiprocess_mode='livesum')
+        self.pool_overflow = Gauge(
+            'padosi_db_pool_overflow', 'Connections open beyond pool_size',
+            multiprocess_mode='livesum')
+
+        self.cache_lookups = Counter(
+            'padosi_cache_lookups_total', 'Cache lookups by outcome (hit ratio = hit / all)',
+            ['cache', 'result'])
+
+        self.task_duration = Histogram(
+            'padosi_task_duration_seconds', 'Background task run time',
+            ['task', 'status'], buckets=TASK_BUCKETS)
+        self.task_rows = Counter(
+            'padosi_task_rows_processed_total', 'Rows a background task reported as processed',
+            ['task'])
+
+
+# Set by enable_metrics once metrics are on and prometheus_client is present
+metrics = None
+
+
+def enable_metrics():
+    """Create the metric families; returns None if prometheus_client is missing."""
+    global metrics
+    if metrics is None and CollectorRegistry is not None:
+        metrics = Metrics()
+    return metrics
+
+
+# ============================================
+# Recording helpers
+# ============================================
+
+def record_cache_lookup(name, hit):
+    if metrics is not None:
+        metrics.cache_lookups.labels(name, 'hit' if hit else 'miss').inc()
+
+
+def rows_processed(result):
+    """Row count reported in a task's result dict, if any."""
+    if isinstance(result, dict):
+        for key in ROW_KEYS:
+            value = result.get(key)
+            if isinstance(value, int) and not isinstance(value, bool):
+                return value
+    return None
+
+
+def observe_task(name, seconds, result=None, failed=False):
+    if metrics is None:
+        return
+    if isinstance(result, dict) and result.get('success') is False:
+        failed = True
+    metrics.task_duration.labels(name, 'failure' if failed else 'success').observe(seconds)
+    rows = rows_processed(result)
+    if rows:
+        metrics.task_rows.labels(name).inc(rows)
+
+
+def timed_task(func):
+    """Record duration and rows processed of a TaskService job or local task run."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if metrics is None:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            observe_task(func.__name__, time.perf_counter() - start, failed=True)
+            raise
+        observe_task(func.__name__, time.perf_counter() - start, result)
+        return result
+    return wrapper
+
+
+class CountingCache:
+    """Cache backend proxy that counts hits and misses of get lookups."""
+
+    def __init__(self, backend, name='shared'):
+        self._backend = backend
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(self._backend, attr)
+
+    def get(self, key):
+        value = self._backend.get(key)
+        record_cache_lookup(self._name, value is not None)
+        return value
+
+    def get_many(self, *keys):
+        values = self._backend.get_many(*keys)
+        for value in values:
+            record_cache_lookup(self._name, value is not None)
+        return values
+
+
+# ============================================
+# Database pool
+# ============================================
+
+def _time_checkouts(pool):
+    """
+    SQLAlchemy has no event for a checkout that is still waiting, so the
+    pool's own getter is timed; pools are replaced on dispose() and are
+    wrapped again from the engine_disposed hook.
+    """
+    do_get = pool._do_get
+
+    def timed_do_get():
+        start = time.perf_counter()
+        try:
+            return do_get()
+        finally:
+            metrics.pool_wait.observe(time.perf_counter() - start)
+
+    pool._do_get = timed_do_get
+
+
+def _instrument_engine(engine):
+    def update_gauges(returning):
+        pool = engine.pool
+        if hasattr(pool, 'checkedout'):
+            # checkin fires before the connection is back in the pool
+            metrics.pool_checked_out.set(max(pool.checkedout() - returning, 0))
+        if hasattr(pool, 'overflow'):
+            metrics.pool_overflow.set(max(pool.overflow(), 0))
+
+    event.listen(engine, 'checkout', lambda *args: update_gauges(0))
+    event.listen(engine, 'checkin', lambda *args: update_gauges(1))
+    event.listen(engine, 'engine_disposed', lambda engine: _time_checkouts(engine.pool))
+    _time_checkouts(engine.pool)
+
+
+# ============================================
+# Setup and exposition
+# ============================================
+
+def init_metrics(app):
+    """Install request hooks and pool/cache instrumentation if metrics are on."""
+    if not app.config.get('METRICS_ENABLED'):
+        return
+    if enable_metrics() is None:
+        app.logger.warning('METRICS_ENABLED is set but prometheus_client is not installed')
+        return
+
+    with app.app_context():
+        for engine in db.engines.values():
+            _instrument_engine(engine)
+
+    backend = app.extensions['cache'][cache]
+    if not isinstance(backend, CountingCache):
+        app.extensions['cache'][cache] = CountingCache(backend)
+
+    @app.before_request
+    def start_request_timer():
+        g._metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('_metrics_started', None)
+        if started is None:
+            return response
+        blueprint = request.blueprint or 'app'
+        metrics.request_latency.labels(blueprint, request.method)\
+            .observe(time.perf_counter() - started)
+        metrics.requests.labels(blueprint, request.method, f'{response.status_code // 100}xx').inc()
+        if response.status_code >= 500:
+            metrics.request_errors.labels(blueprint).inc()
+        return response
+
+
+def render(multiproc_dir=None):
+    """Return (body, content type) of all metrics, summed across worker processes."""
+    multiproc_dir = multiproc_dir or os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if multiproc_dir:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=multiproc_dir)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
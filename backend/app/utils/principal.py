@@ -0,0 +1,181 @@
+"""
+Principal Cache - Cached identity and role lookups for authenticated requests
+Avoids loading the user and their roles from the database on every request.
+Entries live in each worker process and are stamped with the user's version
+token from the shared cache; a commit that changes roles, society or status
+replaces the token, so every worker reloads on its next request instead of
+waiting for the TTL.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict, namedtuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.db_routing import primary_reads
+from app.extensions import db, cache
+from app.models import User, Role, roles_users
+from app.utils.metrics import record_cache_lookup
+
+
+SECRETARY_ROLES = frozenset({'secretary', 'admin'})
+COMMITTEE_ROLES = frozenset({'committee_member', 'secretary', 'admin'})
+
+
+class Principal(namedtuple('Principal', ['user_id', 'society_id', 'active', 'roles'])):
+    """Immutable snapshot of who the caller is and what roles they hold."""
+    __slots__ = ()
+
+    def has_role(self, role_name):
+        return role_name in self.roles
+
+    def is_admin(self):
+        return 'admin' in self.roles
+
+    def is_secretary(self):
+        return not SECRETARY_ROLES.isdisjoint(self.roles)
+
+    def is_committee_member(self):
+        return not COMMITTEE_ROLES.isdisjoint(self.roles)
+
+
+class PrincipalCache:
+    """Thread-safe LRU cache of versioned principals with a per-entry TTL."""
+
+    def __init__(self, maxsize=4096, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, maxsize=None, ttl=None):
+        """Apply size and TTL settings from app config."""
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = maxsize
+            if ttl is not None:
+                self.ttl = ttl
+            self._entries.clear()
+
+    def get(self, user_id, version):
+        """Return the cached principal if it was stored under this version."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            principal, cached_version, expires_at = entry
+            if cached_version != version or expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return principal
+
+    def set(self, principal, version):
+        with self._lock:
+            self._entries[principal.user_id] = (principal, version, time.monotonic() + self.ttl)
+            self._entries.move_to_end(principal.user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+principal_cache = PrincipalCache()
+
+
+def _version_key(user_id):
+    return f'principal_version_{user_id}'
+
+
+def _current_version(user_id):
+    """
+    The user's version token from the shared cache, created if missing.
+    Read before loading, so a change committed mid-load leaves the new entry
+    stale. Never None: an evicted token can't match an older entry.
+    """
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex)
+        version = cache.get(key)
+    return version
+
+
+def load_principal(user_id):
+    """Return the principal for user_id, hitting the database only on a cache miss."""
+    version = _current_version(user_id)
+    principal = principal_cache.get(user_id, version) if version is not None else None
+    record_cache_lookup('principal', principal is not None)
+    if principal is not None:
+        return principal
+
+    # Always from the primary: a lagging replica could re-cache revoked roles
+    with primary_reads():
+        row = db.session.query(User.id, User.society_id, User.active)\
+            .filter(User.id == user_id).first()
+        if row is None:
+            return None
+
+        role_names = db.session.query(Role.name)\
+            .join(roles_users, roles_users.c.role_id == Role.id)\
+            .filter(roles_users.c.user_id == user_id).all()
+
+    principal = Principal(
+        user_id=row.id,
+        society_id=row.society_id,
+        active=bool(row.active),
+        roles=frozenset(name for (name,) in role_names)
+    )
+    if version is not None:
+        principal_cache.set(principal, version)
+    return principal
+
+
+def invalidate_principal(user_id):
+    """Drop a cached principal in every worker, e.g. after a role or status change."""
+    cache.set(_version_key(user_id), uuid.uuid4().hex)
+    principal_cache.invalidate(user_id)
+
+
+# ============================================
+# Automatic invalidation
+# Role, society and active-flag changes are recorded on the session and
+# invalidated (in all workers) once the transaction commits, so a reload
+# can't re-cache the pre-commit state.
+# ============================================
+
+_PENDING_KEY = 'principal_invalidations'
+
+
+def _mark_user_changed(target, *args):
+    session = object_session(target)
+    if session is None or target.id is None:
+        return
+    session.info.setdefault(_PENDING_KEY, set()).add(target.id)
+
+
+event.listen(User.active, 'set', _mark_user_changed)
+event.listen(User.society_id, 'set', _mark_user_changed)
+event.listen(User.roles, 'append', _mark_user_changed)
+event.listen(User.roles, 'remove', _mark_user_changed)
+
+
+@event.listens_for(Session, 'after_commit')
+def _flush_principal_invalidations(session):
+    for user_id in session.info.pop(_PENDING_KEY, ()):
+        invalidate_principal(user_id)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_principal_invalidations(session, previous_transaction):
+    if not session.in_transaction():
+        session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,240 @@
+"""
+SQLite Cache - Flask-Caching backend shared by every worker on one host
+Stores pickled values in a WAL-mode SQLite file so gunicorn workers see
+each other's entries and survive restarts, without running Redis.
+
+Enable with:
+    CACHE_TYPE = 'app.utils.sqlite_cache.SQLiteCache'
+    CACHE_SQLITE_PATH = '/path/to/cache.db'   # default: backend/padosi_cache.db
+    CACHE_THRESHOLD = 10000                   # max entries before pruning
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from flask_caching.backends.base import BaseCache
+
+
+DEFAULT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'padosi_cache.db'
+)
+
+
+class SQLiteCache(BaseCache):
+    """
+    Cross-process cache backed by SQLite in WAL mode.
+
+    Entries carry an absolute expiry (0 = never). Expired rows are ignored
+    on read and removed by a prune pass that runs every prune_interval
+    writes; the same pass trims the oldest writes once the table exceeds
+    threshold entries.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, default_timeout=300, threshold=10000,
+                 prune_interval=100, busy_timeout=5.0, ignore_errors=False):
+        super().__init__(default_timeout=default_timeout)
+        self.path = path
+        self.threshold = threshold
+        self.prune_interval = prune_interval
+        self.busy_timeout = busy_timeout
+        self.ignore_errors = ignore_errors
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._db.executescript(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            ' key TEXT PRIMARY KEY,'
+            ' value BLOB NOT NULL,'
+            ' expires REAL NOT NULL'
+            ');'
+            'CREATE INDEX IF NOT EXISTS ix_cache_expires ON cache (expires);'
+        )
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        kwargs.update(dict(
+            path=config.get('CACHE_SQLITE_PATH') or DEFAULT_PATH,
+            threshold=config['CACHE_THRESHOLD'],
+            ignore_errors=config['CACHE_IGNORE_ERRORS']
+        ))
+        return cls(*args, **kwargs)
+
+    # ============================================
+    # Connection handling
+    # ============================================
+
+    @property
+    def _db(self):
+        """One autocommit connection per thread, reopened after a fork."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _expiry(self, timeout):
+        timeout = self._normalize_timeout(timeout)
+        return time.time() + timeout if timeout > 0 else 0
+
+    def _after_write(self):
+        with self._writes_lock:
+            self._writes += 1
+            due = self._writes % self.prune_interval == 0
+        if due:
+            self._prune()
+
+    def _prune(self):
+        conn = self._db
+        conn.execute('DELETE FROM cache WHERE expires != 0 AND expires <= ?', (time.time(),))
+        (count,) = conn.execute('SELECT COUNT(*) FROM cache').fetchone()
+        if count > self.threshold:
+            # Drop the oldest writes down to 80% of the bound
+            conn.execute(
+                'DELETE FROM cache WHERE rowid IN '
+                '(SELECT rowid FROM cache ORDER BY rowid LIMIT ?)',
+                (count - int(self.threshold * 0.8),)
+            )
+
+    # ============================================
+    # Cache API
+    # ============================================
+
+    def get(self, key):
+        try:
+            row = self._db.execute(
+                'SELECT value FROM cache WHERE key = ? AND (expires = 0 OR expires > ?)',
+                (key, time.time())
+            ).fetchone()
+            return pickle.loads(row[0]) if row else None
+        except (sqlite3.Error, pickle.PickleError):
+            return None
+
+    def get_many(self, *keys):
+        if not keys:
+            return []
+        try:
+            placeholders = ','.join('?' * len(keys))
+            rows = dict(self._db.execute(
+                f'SELECT key, value FROM cache WHERE key IN ({placeholders}) '
+                f'AND (expires = 0 OR expires > ?)',
+                (*keys, time.time())
+            ))
+        except sqlite3.Error:
+            return [None] * len(keys)
+        return [pickle.loads(rows[key]) if key in rows else None for key in keys]
+
+    def set(self, key, value, timeout=None):
+        try:
+            self._db.execute(
+                'INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+                (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), self._expiry(timeout))
+            )
+        except sqlite3.Error:
+            return False
+        self._after_write()
+        return True
+
+    def set_many(self, mapping, timeout=None):
+        expires = self._expiry(timeout)
+        items = list(mapping.items())
+        try:
+            conn = self._db
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+                    [(k, pickle.dumps(v, pickle.HIGHEST_PROTOCOL), expires) for k, v in items]
+                )
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        except sqlite3.Error:
+            return []
+        self._after_write()
+        return [k for k, _ in items]
+
+    def add(self, key, value, timeout=None):
+        try:
+            conn = self._db
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                # An expired entry does not block add()
+                conn.execute('DELETE FROM cache WHERE key = ? AND expires != 0 AND expires <= ?',
+                             (key, time.time()))
+                added = conn.execute(
+                    'INSERT OR IGNORE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+                    (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), self._expiry(timeout))
+                ).rowcount == 1
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        except sqlite3.Error:
+            return False
+        if added:
+            self._after_write()
+        return added
+
+    def delete(self, key):
+        try:
+            return self._db.execute('DELETE FROM cache WHERE key = ?', (key,)).rowcount == 1
+        except sqlite3.Error:
+            return False
+
+    def delete_many(self, *keys):
+        return [key for key in keys if self.delete(key)]
+
+    def has(self, key):
+        try:
+            return self._db.execute(
+                'SELECT 1 FROM cache WHERE key = ? AND (expires = 0 OR expires > ?)',
+                (key, time.time())
+            ).fetchone() is not None
+        except sqlite3.Error:
+            return False
+
+    def clear(self):
+        try:
+            self._db.execute('DELETE FROM cache')
+        except sqlite3.Error:
+            return False
+        return True
+
+    def inc(self, key, delta=1):
+        """Atomically add delta to an integer entry (missing entries start at 0)."""
+        try:
+            conn = self._db
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute(
+                    'SELECT value, expires FROM cache WHERE key = ? AND (expires = 0 OR expires > ?)',
+                    (key, time.time())
+                ).fetchone()
+                value = (pickle.loads(row[0]) if row else 0) + delta
+                expires = row[1] if row else self._expiry(None)
+                conn.execute(
+                    'INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+                    (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires)
+                )
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        except sqlite3.Error:
+            return None
+        return value
+
+    def dec(self, key, delta=1):
+        return self.inc(key, -delta)
@@ -0,0 +1,5 @@
+"""
+Benchmarks Package - Repeatable performance measurements on seeded data
+Run a benchmark as a module from backend/, e.g.:
+    python -m benchmarks.bench_dashboard --complaints 100000
+"""
@@ -0,0 +1,361 @@
+"""
+API Benchmark - Latency, throughput and queries per request of the hot paths
+
+Run from backend/:
+    python -m benchmarks.bench_api --size small --output before.json
+    python -m benchmarks.bench_api --size medium --mode gunicorn --concurrency 32
+    python -m benchmarks.compare before.json after.json
+
+Every scenario replays a request plan generated from a fixed seed against a
+copy of the seeded database, so two runs on the same dataset issue exactly
+the same requests and their reports can be compared commit to commit.
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import func
+
+from app.extensions import db
+from app.models import Complaint, Notification, User
+from benchmarks.common import (
+    QueryCounter, create_benchmark_app, dataset_summary, percentiles, seed_dataset
+)
+
+
+# Dataset presets: residents are societies x residents_per_society
+SIZES = {
+    'tiny': dict(societies=5, residents_per_society=40, complaints=2000),
+    'small': dict(societies=20, residents_per_society=50, complaints=20000),
+    'medium': dict(societies=100, residents_per_society=100, complaints=200000),
+    'large': dict(societies=500, residents_per_society=200, complaints=1000000)
+}
+VOTES_PER_COMPLAINT = 3
+COMMENTS_PER_COMPLAINT = 2
+
+# Residents of the focus society that take part in a run
+CLIENT_USERS = 100
+# Complaints everybody piles onto in the vote storm / comment thread scenarios
+HOT_COMPLAINTS = 5
+
+
+# ============================================
+# Scenarios
+# Each returns one (method, path, json_body, user_id) request; plans are
+# built up front from the scenario seed so both runners replay the same list.
+# ============================================
+
+def dashboard_load(ctx, rng):
+    return 'GET', '/api/dashboard/stats', None, rng.choice(ctx['users'])
+
+
+def complaint_list(ctx, rng):
+    user = rng.choice(ctx['users'])
+    page = rng.choice((1, 1, 1, 2, 3))
+    status = rng.choice(('', '', '&status=open', '&status=resolved'))
+    return 'GET', f'/api/complaints?page={page}&per_page=20{status}', None, user
+
+
+def vote_storm(ctx, rng):
+    complaint_id, complainant = rng.choice(ctx['hot'])
+    user = rng.choice([u for u in ctx['users'] if u != complainant])
+    vote_type = 'support' if rng.random() < 0.7 else 'oppose'
+    return 'POST', f'/api/complaints/{complaint_id}/vote', {'vote_type': vote_type}, user
+
+
+def comment_thread(ctx, rng):
+    complaint_id, _ = rng.choice(ctx['hot'])
+    user = rng.choice(ctx['users'])
+    if rng.random() < 0.2:
+        body = {'comment_text': f'Benchmark comment {rng.randint(0, 10 ** 6)}'}
+        return 'POST', f'/api/complaints/{complaint_id}/comments', body, user
+    return 'GET', f'/api/complaints/{complaint_id}/comments?per_page=20', None, user
+
+
+def notification_polling(ctx, rng):
+    user = rng.choice(ctx['notified'])
+    if rng.random() < 0.8:
+        return 'GET', '/api/notifications/unread-count', None, user
+    return 'GET', '/api/notifications?per_page=20', None, user
+
+
+SCENARIOS = {
+    'dashboard_load': dashboard_load,
+    'complaint_list': complaint_list,
+    'vote_storm': vote_storm,
+    'comment_thread': comment_thread,
+    'notification_polling': notification_polling
+}
+
+
+def build_context(app, seed):
+    """Pick the focus society, its clients and hot complaints, and mint their tokens."""
+    rng = random.Random(seed)
+    with app.app_context():
+        society_id = db.session.query(User.society_id)\
+            .filter(User.email.like('bench%'))\
+            .order_by(User.society_id).limit(1).scalar()
+        residents = [row[0] for row in db.session.query(User.id)
+                     .filter(User.society_id == society_id, User.active == True)
+                     .order_by(User.id)]
+        users = rng.sample(residents, min(CLIENT_USERS, len(residents)))
+
+        hot = db.session.query(Complaint.id, Complaint.complainant_id)\
+            .filter(Complaint.society_id == society_id)\
+            .order_by(Complaint.comments_count.desc(), Complaint.id)\
+            .limit(HOT_COMPLAINTS).all()
+
+        notified = [row[0] for row in db.session.query(Notification.user_id)
+                    .filter(Notification.user_id.in_(users))
+                    .group_by(Notification.user_id)
+                    .order_by(func.count(Notification.id).desc(), Notification.user_id)]
+
+        tokens = {user_id: create_access_token(identity=str(user_id)) for user_id in users}
+
+    return {
+        'society_id': society_id,
+        'users': sorted(users),
+        'hot': [tuple(row) for row in hot],
+        'notified': notified or sorted(users),
+        'tokens': tokens
+    }
+
+
+def build_plan(scenario, ctx, requests, seed):
+    rng = random.Random(f'{seed}:{scenario}')
+    return [SCENARIOS[scenario](ctx, rng) for _ in range(requests)]
+
+
+def summarize(samples, errors, elapsed, queries=None):
+    result = {
+        'requests': len(samples),
+        'errors': errors,
+        'throughput_rps': round(len(samples) / elapsed, 1) if elapsed else None,
+        **percentiles(samples)
+    }
+    if queries is not None:
+        result['queries_per_request'] = round(sum(queries) / len(queries), 2) if queries else None
+        result['max_queries'] = max(queries, default=None)
+    return result
+
+
+# ============================================
+# Runners
+# ============================================
+
+def run_in_process(app, ctx, plan, warmup):
+    """Serve the plan through the test client, counting SQL per request."""
+    client = app.test_client()
+    with app.app_context():
+        engine = db.engine
+
+    def call(method, path, body, user_id):
+        headers = {'Authorization': f"Bearer {ctx['tokens'][user_id]}"}
+        return client.open(path, method=method, json=body, headers=headers)
+
+    for request in plan[:warmup]:
+        call(*request)
+
+    samples, queries, errors = [], [], 0
+    started = time.perf_counter()
+    for request in plan[warmup:]:
+        with QueryCounter(engine) as counter:
+            start = time.perf_counter()
+            response = call(*request)
+            samples.append((time.perf_counter() - start) * 1000)
+        queries.append(counter.count)
+        errors += response.status_code >= 400
+    return summarize(samples, errors, time.perf_counter() - started, queries)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(db_path, workers, threads):
+    """Serve benchmarks.wsgi on a free port; returns (process, base_url)."""
+    port = _free_port()
+    env = dict(os.environ, BENCH_DB_PATH=db_path)
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}',
+         '--workers', str(workers), '--threads', str(threads),
+         '--log-level', 'warning', 'benchmarks.wsgi:app'],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=env
+    )
+    base_url = f'http://127.0.0.1:{port}'
+
+    import requests
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'gunicorn exited with status {process.returncode}')
+        try:
+            if requests.get(f'{base_url}/api/health', timeout=1).ok:
+                return process, base_url
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('gunicorn did not become healthy within 60s')
+
+
+def run_http(base_url, ctx, plan, warmup, concurrency):
+    """Replay the plan over HTTP from `concurrency` keep-alive clients."""
+    import requests
+
+    local = threading.local()
+
+    def call(request):
+        method, path, body, user_id = request
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            response = session.request(
+                method, base_url + path, json=body, timeout=60,
+                headers={'Authorization': f"Bearer {ctx['tokens'][user_id]}"}
+            )
+            failed = response.status_code >= 400
+        except requests.RequestException:
+            failed = True
+        return (time.perf_counter() - start) * 1000, failed
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, plan[:warmup]))
+        started = time.perf_counter()
+        results = list(pool.map(call, plan[warmup:]))
+        elapsed = time.perf_counter() - started
+
+    return summarize([r[0] for r in results], sum(r[1] for r in results), elapsed)
+
+
+# ============================================
+# Driver
+# ============================================
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def prepare_database(args):
+    """
+    Seed args.db_path unless it already holds a benchmark dataset, then
+    return (path to run against, dataset counts, whether it is a copy). Runs
+    use a throwaway copy so the writes of one run never leak into the next.
+    """
+    db_path = args.db_path or os.path.join(tempfile.gettempdir(), f'padosi_bench_{args.size}.db')
+    app = create_benchmark_app(db_path)
+    dataset = dataset_summary(app)
+    if dataset is None:
+        dataset = seed_dataset(
+            app, votes_per_complaint=VOTES_PER_COMPLAINT,
+            comments_per_complaint=COMMENTS_PER_COMPLAINT, seed=args.seed, **SIZES[args.size]
+        )
+    with app.app_context():
+        db.engine.dispose()
+
+    if args.in_place or os.environ.get('TEST_DATABASE_URL'):
+        return db_path, dataset, False
+    handle, run_path = tempfile.mkstemp(prefix='padosi_bench_run_', suffix='.db')
+    os.close(handle)
+    shutil.copyfile(db_path, run_path)
+    return run_path, dataset, True
+
+
+def run(args):
+    run_path, dataset, is_copy = prepare_database(args)
+    app = create_benchmark_app(run_path)
+    ctx = build_context(app, args.seed)
+    with app.app_context():
+        dialect = db.engine.dialect.name
+    scenarios = args.scenario or list(SCENARIOS)
+
+    report = {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'mode': args.mode,
+            'dialect': dialect,
+            'size': args.size,
+            'seed': args.seed,
+            'requests': args.requests,
+            'warmup': args.warmup,
+            'concurrency': args.concurrency if args.mode == 'gunicorn' else 1,
+            'workers': args.workers if args.mode == 'gunicorn' else None,
+            'threads': args.threads if args.mode == 'gunicorn' else None
+        },
+        'dataset': dataset,
+        'scenarios': {}
+    }
+
+    process = None
+    try:
+        if args.mode == 'gunicorn':
+            process, base_url = start_gunicorn(run_path, args.workers, args.threads)
+        for scenario in scenarios:
+            plan = build_plan(scenario, ctx, args.warmup + args.requests, args.seed)
+            if args.mode == 'gunicorn':
+                result = run_http(base_url, ctx, plan, args.warmup, args.concurrency)
+            else:
+                result = run_in_process(app, ctx, plan, args.warmup)
+            report['scenarios'][scenario] = result
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+        with app.app_context():
+            db.engine.dispose()
+        if is_copy:
+            os.remove(run_path)
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', choices=SIZES, default='small')
+    parser.add_argument('--mode', choices=('in-process', 'gunicorn'), default='in-process')
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS,
+                        help='Scenario to run (repeatable, default: all)')
+    parser.add_argument('--requests', type=int, default=500, help='Timed requests per scenario')
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=16, help='HTTP clients (gunicorn mode)')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4, help='Threads per worker (matches the Procfile)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--db-path', help='Seeded SQLite file to reuse (default: one per size in the temp dir)')
+    parser.add_argument('--in-place', action='store_true', help='Run against --db-path itself, not a copy')
+    parser.add_argument('--output', help='Write the JSON report here as well as to stdout')
+    args = parser.parse_args()
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(text + '\n')
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
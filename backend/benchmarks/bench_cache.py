@@ -0,0 +1,117 @@
+"""
+Cache Backend Benchmark - simple vs filesystem vs shared SQLite
+
+Run from backend/:
+    python -m benchmarks.bench_cache --workers 4
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from flask_caching.backends import SimpleCache, FileSystemCache
+
+from app.utils.sqlite_cache import SQLiteCache
+from benchmarks.common import measure
+
+
+# Roughly the shape of a cached society stats / dashboard entry
+PAYLOAD = {
+    'total_complaints': 1234,
+    'status_breakdown': {'open': 120, 'resolved': 900, 'closed': 150, 'escalated': 64},
+    'resolution_rate': 72.9,
+    'avg_resolution_days': 3.4,
+    'calculated_at': '2024-01-01T00:00:00'
+}
+
+
+def make_cache(backend, workdir, threshold=10000):
+    if backend == 'simple':
+        return SimpleCache(threshold=threshold, default_timeout=300)
+    if backend == 'filesystem':
+        return FileSystemCache(os.path.join(workdir, 'fs'), threshold=threshold, default_timeout=300)
+    return SQLiteCache(os.path.join(workdir, 'cache.db'), threshold=threshold, default_timeout=300)
+
+
+def single_process(backend, workdir, iterations):
+    cache = make_cache(backend, workdir)
+    keys = [f'society_stats_{i}' for i in range(500)]
+    for key in keys:
+        cache.set(key, PAYLOAD)
+    hits = iter(keys * (iterations // len(keys) + 10))
+    counter = iter(range(10 ** 9))
+    return {
+        'get_hit': measure(lambda: cache.get(next(hits)), iterations),
+        'get_miss': measure(lambda: cache.get(f'missing_{next(counter)}'), iterations),
+        'set': measure(lambda: cache.set(f'new_{next(counter)}', PAYLOAD), iterations)
+    }
+
+
+def _worker(backend, workdir, worker_id, ops, queue):
+    cache = make_cache(backend, workdir)
+    rng = random.Random(worker_id)
+    keys = [f'shared_{i}' for i in range(200)]
+    hits = 0
+    gets = 0
+    start = time.perf_counter()
+    for _ in range(ops):
+        key = rng.choice(keys)
+        if rng.random() < 0.9:
+            gets += 1
+            if cache.get(key) is not None:
+                hits += 1
+        else:
+            cache.set(key, PAYLOAD)
+    queue.put((time.perf_counter() - start, hits, gets))
+
+
+def multi_process(backend, workdir, workers, ops):
+    """Each worker misses until someone sets the key; a shared cache hits far sooner."""
+    queue = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(target=_worker, args=(backend, workdir, i, ops, queue))
+        for i in range(workers)
+    ]
+    for proc in procs:
+        proc.start()
+    results = [queue.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+
+    elapsed = max(r[0] for r in results)
+    return {
+        'workers': workers,
+        'ops_per_worker': ops,
+        'ops_per_sec': round(workers * ops / elapsed),
+        'hit_ratio': round(sum(r[1] for r in results) / sum(r[2] for r in results), 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--ops', type=int, default=5000)
+    args = parser.parse_args()
+
+    results = {}
+    for backend in ('simple', 'filesystem', 'sqlite'):
+        workdir = tempfile.mkdtemp(prefix=f'padosi_cache_{backend}_')
+        try:
+            results[backend] = {
+                'single_process': single_process(backend, workdir, args.iterations),
+                'multi_process': multi_process(backend, workdir, args.workers, args.ops)
+            }
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
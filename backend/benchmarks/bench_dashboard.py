@@ -0,0 +1,141 @@
+"""
+Dashboard Benchmark - Nine-query dashboard vs conditional aggregation + cache
+
+Run from backend/:
+    python -m benchmarks.bench_dashboard --complaints 100000
+"""
+
+import argparse
+import json
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from app.extensions import db
+from app.models import Complaint, ComplaintStatus, User, Notification, KarmaLog
+from app.services.dashboard_service import DashboardService
+from benchmarks.common import create_benchmark_app, seed_dataset, measure, count_queries
+
+
+def legacy_dashboard_stats(user):
+    """The previous get_dashboard_stats body: one query per number."""
+    society_id = user.society_id
+
+    total_complaints_open = Complaint.query.filter(
+        Complaint.society_id == society_id,
+        Complaint.status.in_([
+            ComplaintStatus.OPEN.value,
+            ComplaintStatus.ACKNOWLEDGED.value,
+            ComplaintStatus.IN_PROGRESS.value,
+            ComplaintStatus.ESCALATED.value
+        ])
+    ).count()
+    total_complaints_resolved = Complaint.query.filter(
+        Complaint.society_id == society_id,
+        Complaint.status == ComplaintStatus.RESOLVED.value
+    ).count()
+    my_complaints_count = user.complaints_filed.count()
+    complaints_against_me = Complaint.query.filter(
+        Complaint.society_id == society_id,
+        db.or_(
+            Complaint.accused_user_id == user.id,
+            Complaint.accused_flat == user.flat_number
+        )
+    ).count()
+    society_karma_avg = db.session.query(func.avg(User.karma_score)).filter(
+        User.society_id == society_id,
+        User.active == True
+    ).scalar() or 0
+    week_ago = datetime.utcnow() - timedelta(days=7)
+    new_complaints_this_week = Complaint.query.filter(
+        Complaint.society_id == society_id,
+        Complaint.created_at >= week_ago
+    ).count()
+    resolved_this_week = Complaint.query.filter(
+        Complaint.society_id == society_id,
+        Complaint.resolved_at >= week_ago
+    ).count()
+    my_karma_change = db.session.query(func.sum(KarmaLog.points)).filter(
+        KarmaLog.user_id == user.id,
+        KarmaLog.created_at >= week_ago
+    ).scalar() or 0
+    unread_notifications = Notification.get_unread_count(user.id)
+
+    return {
+        'total_complaints_open': total_complaints_open,
+        'total_complaints_resolved': total_complaints_resolved,
+        'my_complaints_count': my_complaints_count,
+        'complaints_against_me': complaints_against_me,
+        'my_karma': user.karma_score,
+        'my_karma_change_this_week': my_karma_change,
+        'society_karma_average': round(society_karma_avg, 2),
+        'new_complaints_this_week': new_complaints_this_week,
+        'resolved_this_week': resolved_this_week,
+        'unread_notifications': unread_notifications
+    }
+
+
+def run(complaints, iterations, db_path=None):
+    app = create_benchmark_app(db_path)
+    dataset = seed_dataset(app, complaints=complaints)
+
+    with app.app_context():
+        user_ids = [row[0] for row in db.session.query(User.id).filter(User.email.like('bench%'))]
+        rng = random.Random(7)
+        sample = [db.session.get(User, uid) for uid in rng.sample(user_ids, 50)]
+        pairs = [(u.id, u.society_id) for u in sample]
+
+        mismatches = sum(
+            legacy_dashboard_stats(u) != DashboardService.compute_stats(u.id, u.society_id)
+            for u in sample
+        )
+
+        users = iter(sample * (iterations * 2))
+        keys = iter(pairs * (iterations * 2))
+
+        def legacy():
+            legacy_dashboard_stats(next(users))
+
+        def aggregated():
+            DashboardService.compute_stats(*next(keys))
+
+        def cached():
+            DashboardService.get_stats(*next(keys))
+
+        with app.test_request_context():
+            # Warm every sampled user's cache entry before timing hits
+            for user_id, society_id in pairs:
+                DashboardService.get_stats(user_id, society_id)
+
+            results = {
+                'dataset': dataset,
+                'mismatched_users': mismatches,
+                'legacy': {
+                    'queries': count_queries(app, lambda: legacy_dashboard_stats(sample[0])),
+                    **measure(legacy, iterations)
+                },
+                'aggregated': {
+                    'queries': count_queries(app, lambda: DashboardService.compute_stats(*pairs[0])),
+                    **measure(aggregated, iterations)
+                },
+                'cached': {
+                    'queries': count_queries(app, lambda: DashboardService.get_stats(*pairs[0])),
+                    **measure(cached, iterations)
+                }
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--complaints', type=int, default=100000)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--db-path', help='SQLite file to use (default: fresh temp file)')
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.complaints, args.iterations, args.db_path), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Search Benchmark - Triple ILIKE scan vs the full-text search index
+
+Run from backend/:
+    python -m benchmarks.bench_search --complaints 1000000
+"""
+
+import argparse
+import json
+import random
+
+from sqlalchemy import or_
+
+from app.extensions import db
+from app.models import Complaint, Society
+from app.services.search_service import ComplaintSearch
+from benchmarks.common import create_benchmark_app, seed_dataset, measure, count_queries
+
+
+PAGE_SIZE = 20
+
+# (label, search text, prefix) covering a common word, a rare phrase and a
+# partially typed flat number
+SEARCHES = [
+    ('common_word', 'water', False),
+    ('two_words', 'leaking basement', False),
+    ('flat_prefix', 'B-12', True),
+]
+
+
+def legacy_search(society_id, search):
+    """The previous list_complaints search: ILIKE on three columns, newest first."""
+    pattern = f'%{search}%'
+    query = Complaint.query.filter(
+        Complaint.society_id == society_id,
+        or_(
+            Complaint.title.ilike(pattern),
+            Complaint.description.ilike(pattern),
+            Complaint.accused_flat.ilike(pattern)
+        )
+    ).order_by(Complaint.created_at.desc())
+    return query.count(), query.limit(PAGE_SIZE).all()
+
+
+def indexed_search(society_id, search, prefix):
+    """ComplaintSearch with relevance ranking, as list_complaints runs it."""
+    query = Complaint.query.filter(Complaint.society_id == society_id)
+    query, relevance = ComplaintSearch.apply(query, search, prefix=prefix, society_id=society_id)
+    query = query.order_by(relevance, Complaint.created_at.desc())
+    return query.count(), query.limit(PAGE_SIZE).all()
+
+
+def run(complaints, iterations, db_path=None):
+    app = create_benchmark_app(db_path)
+    with app.app_context():
+        seeded = Complaint.query.count()
+    dataset = seed_dataset(app, complaints=complaints) if not seeded else {'complaints': seeded}
+
+    with app.app_context():
+        society_ids = [row[0] for row in db.session.query(Society.id)]
+        rng = random.Random(7)
+        societies = iter(rng.choice(society_ids) for _ in range(iterations * 10))
+
+        results = {'dataset': dataset, 'backend': ComplaintSearch.backend().name, 'searches': {}}
+        for label, search, prefix in SEARCHES:
+            sample_society = society_ids[0]
+            legacy_total, _ = legacy_search(sample_society, search)
+            indexed_total, _ = indexed_search(sample_society, search, prefix)
+            results['searches'][label] = {
+                'search': search,
+                'prefix': prefix,
+                # ILIKE matches substrings anywhere, so totals can differ
+                'matches': {'legacy': legacy_total, 'indexed': indexed_total},
+                'legacy': {
+                    'queries': count_queries(app, lambda: legacy_search(sample_society, search)),
+                    **measure(lambda: legacy_search(next(societies), search), iterations)
+                },
+                'indexed': {
+                    'queries': count_queries(app, lambda: indexed_search(sample_society, search, prefix)),
+                    **measure(lambda: indexed_search(next(societies), search, prefix), iterations)
+                }
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--complaints', type=int, default=1000000)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--db-path', help='SQLite file to use (default: fresh temp file); '
+                                          'an already seeded file is reused')
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.complaints, args.iterations, args.db_path), indent=2))
+
+
+if __name__ == '__main__':
+    main()
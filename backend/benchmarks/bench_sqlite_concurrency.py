@@ -0,0 +1,173 @@
+"""
+SQLite Concurrency Benchmark - Rollback journal vs the tuned WAL profile
+
+Run from backend/:
+    python -m benchmarks.bench_sqlite_concurrency --readers 16 --writers 4 --seconds 10
+
+Readers page through a society's complaints while writers bump vote counts
+and insert notifications, all on one SQLite file from many threads (as
+gunicorn's threads do). Each profile runs on its own copy of the same
+seeded file; the report shows how long readers wait behind writers and
+how often anyone gives up on a locked database.
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.extensions import db
+from benchmarks.common import create_benchmark_app, percentiles, seed_dataset
+
+
+READ_PAGE = text(
+    'SELECT id, title, status, support_count FROM complaint '
+    'WHERE society_id = :society_id ORDER BY created_at DESC LIMIT 20'
+)
+READ_OPEN = text(
+    "SELECT count(*) FROM complaint WHERE society_id = :society_id AND status = 'open'"
+)
+WRITE_VOTE = text('UPDATE complaint SET support_count = support_count + 1 WHERE id = :id')
+WRITE_NOTIFY = text(
+    'INSERT INTO notification (user_id, title, message, notification_type, is_read, created_at) '
+    "VALUES (:user_id, 'Bench', 'Concurrent write', 'vote', 0, :now)"
+)
+
+
+def _worker(engine, deadline, seed, body, samples, errors, lock):
+    rng = random.Random(seed)
+    local_samples, local_errors = [], 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            body(engine, rng)
+        except OperationalError:
+            local_errors += 1
+            continue
+        local_samples.append((time.perf_counter() - start) * 1000)
+    with lock:
+        samples.extend(local_samples)
+        errors[0] += local_errors
+
+
+def run_profile(base_path, profile, readers, writers, seconds, ids):
+    """Run the mixed workload on a copy of base_path under one engine profile."""
+    handle, run_path = tempfile.mkstemp(prefix=f'padosi_conc_{profile}_', suffix='.db')
+    os.close(handle)
+    shutil.copyfile(base_path, run_path)
+    if profile == 'off':
+        # journal_mode is stored in the file; put the copy back on the default
+        with sqlite3.connect(run_path) as conn:
+            conn.execute('PRAGMA journal_mode=DELETE')
+
+    # Same pool for both runs, so only the journal settings differ
+    app = create_benchmark_app(
+        run_path, DB_ENGINE_PROFILE=profile,
+        SQLALCHEMY_ENGINE_OPTIONS={'pool_size': readers + writers, 'max_overflow': 0}
+    )
+    society_ids, complaint_ids, user_ids = ids
+
+    def read(engine, rng):
+        with engine.connect() as conn:
+            society_id = rng.choice(society_ids)
+            conn.execute(READ_PAGE, {'society_id': society_id}).fetchall()
+            conn.execute(READ_OPEN, {'society_id': society_id}).scalar()
+
+    def write(engine, rng):
+        with engine.begin() as conn:
+            conn.execute(WRITE_VOTE, {'id': rng.choice(complaint_ids)})
+            conn.execute(WRITE_NOTIFY, {'user_id': rng.choice(user_ids), 'now': datetime.utcnow()})
+
+    try:
+        with app.app_context():
+            engine = db.engine
+            journal = db.session.execute(text('PRAGMA journal_mode')).scalar()
+            db.session.remove()
+
+            lock = threading.Lock()
+            read_samples, read_errors = [], [0]
+            write_samples, write_errors = [], [0]
+            deadline = time.perf_counter() + seconds
+            threads = [
+                threading.Thread(target=_worker, args=(
+                    engine, deadline, f'r{i}', read, read_samples, read_errors, lock))
+                for i in range(readers)
+            ] + [
+                threading.Thread(target=_worker, args=(
+                    engine, deadline, f'w{i}', write, write_samples, write_errors, lock))
+                for i in range(writers)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            engine.dispose()
+    finally:
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(run_path + suffix):
+                os.remove(run_path + suffix)
+
+    return {
+        'journal_mode': journal,
+        'reads': {
+            'ops_per_sec': round(len(read_samples) / seconds, 1),
+            'locked_errors': read_errors[0],
+            'over_100ms': sum(sample > 100 for sample in read_samples),
+            **percentiles(read_samples)
+        },
+        'writes': {
+            'ops_per_sec': round(len(write_samples) / seconds, 1),
+            'locked_errors': write_errors[0],
+            **percentiles(write_samples)
+        }
+    }
+
+
+def run(complaints, readers, writers, seconds, db_path=None):
+    base_path = db_path or os.path.join(tempfile.gettempdir(), f'padosi_conc_base_{complaints}.db')
+    app = create_benchmark_app(base_path)
+    with app.app_context():
+        seeded = db.session.execute(text('SELECT count(*) FROM complaint')).scalar()
+    dataset = seed_dataset(app, complaints=complaints, societies=20) if not seeded else None
+
+    with app.app_context():
+        ids = (
+            db.session.execute(text('SELECT id FROM society')).scalars().all(),
+            db.session.execute(text('SELECT id FROM complaint')).scalars().all(),
+            db.session.execute(text('SELECT id FROM user')).scalars().all(),
+        )
+        db.engine.dispose()
+
+    return {
+        'dataset': dataset or {'complaints': seeded},
+        'readers': readers,
+        'writers': writers,
+        'seconds': seconds,
+        'default': run_profile(base_path, 'off', readers, writers, seconds, ids),
+        'tuned': run_profile(base_path, 'auto', readers, writers, seconds, ids)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--complaints', type=int, default=50000)
+    parser.add_argument('--readers', type=int, default=16)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--db-path', help='Seeded SQLite file to reuse (default: temp file per size)')
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.complaints, args.readers, args.writers, args.seconds, args.db_path), indent=2))
+
+
+if __name__ == '__main__':
+    main()
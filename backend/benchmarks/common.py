@@ -0,0 +1,306 @@
+"""
+Benchmark Helpers - Seeded app factory, data generator and timers
+"""
+
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, insert
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from app.extensions import db
+from app.models import (
+    User, Role, Society, Complaint, ComplaintCategory, ComplaintStatus,
+    ComplaintPriority, ComplaintVote, ComplaintComment, KarmaLog, Notification, roles_users
+)
+from app.services.search_service import ComplaintSearch
+from config import config, TestingConfig
+
+
+class QueryCounter:
+    """Count SQL statements executed on an engine while active."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _record(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._record)
+        return False
+
+
+def create_benchmark_app(db_path=None, **overrides):
+    """
+    Create a testing app backed by a SQLite file (a fresh temp file by
+    default); keyword arguments override config values.
+    """
+    if db_path is None:
+        handle, db_path = tempfile.mkstemp(prefix='padosi_bench_', suffix='.db')
+        os.close(handle)
+        os.remove(db_path)
+
+    class BenchmarkConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL') or f'sqlite:///{db_path}'
+        RATELIMIT_ENABLED = False
+
+    for key, value in overrides.items():
+        setattr(BenchmarkConfig, key, value)
+    config['benchmark'] = BenchmarkConfig
+    app = create_app('benchmark')
+    # The schema comes from create_all(), so add the search index the
+    # migration would have created
+    with app.app_context():
+        ComplaintSearch.install()
+    return app
+
+
+# Vocabulary for seeded complaint text, so full-text search has realistic
+# term frequencies (a few common words, a long tail of rarer ones)
+SUBJECTS = ['water', 'noise', 'parking', 'garbage', 'lift', 'pipe', 'dog', 'music', 'car',
+            'light', 'drain', 'terrace', 'gate', 'smell', 'smoke', 'leak', 'wiring', 'paint']
+PROBLEMS = ['leaking', 'blocked', 'broken', 'loud', 'overflowing', 'damaged', 'missing',
+            'dirty', 'stuck', 'flickering', 'dripping', 'cracked']
+PLACES = ['corridor', 'basement', 'stairwell', 'lobby', 'balcony', 'bathroom', 'kitchen',
+          'compound', 'clubhouse', 'garden', 'roof', 'entrance']
+DETAILS = ['since last week', 'every night after eleven', 'despite repeated requests',
+           'during the weekend', 'for the third time this month', 'near the main gate',
+           'since the monsoon started', 'early in the morning']
+
+
+def seed_dataset(app, complaints=100000, societies=50, residents_per_society=40,
+                 votes_per_complaint=0, comments_per_complaint=0, notifications=None,
+                 chunk_size=10000, seed=42):
+    """
+    Bulk-load a realistic dataset: societies with residents and a secretary,
+    complaints spread over the last year in mixed states, karma logs and
+    notifications. With votes/comments_per_complaint set, each complaint also
+    gets on average that many votes and comments, and its counters match them.
+    The same arguments always produce the same rows.
+    Returns {'societies', 'users', 'complaints', 'votes', 'comments', 'notifications'} counts.
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    password = generate_password_hash('password123')
+    statuses = [s.value for s in ComplaintStatus]
+    categories = [c.value for c in ComplaintCategory]
+    priorities = [p.value for p in ComplaintPriority]
+
+    def flush(model, rows):
+        if rows:
+            db.session.execute(insert(model), rows)
+            rows.clear()
+
+    with app.app_context():
+        db.session.execute(insert(Society), [
+            {'name': f'Bench Society {i}', 'city': 'Mumbai', 'total_flats': residents_per_society}
+            for i in range(societies)
+        ])
+        society_ids = [s.id for s in Society.query.order_by(Society.id)]
+
+        users = []
+        for society_id in society_ids:
+            for n in range(residents_per_society):
+                users.append({
+                    'email': f'bench{society_id}_{n}@example.com',
+                    'password': password,
+                    'full_name': f'Bench Resident {society_id}-{n}',
+                    'flat_number': f'A-{100 + n}',
+                    'wing': 'A',
+                    'society_id': society_id,
+                    'fs_uniquifier': uuid.uuid4().hex,
+                    'karma_score': rng.randint(-20, 80),
+                    'active': True
+                })
+        db.session.execute(insert(User), users)
+        members = {}
+        for user_id, society_id in db.session.query(User.id, User.society_id).filter(
+                User.email.like('bench%')):
+            members.setdefault(society_id, []).append(user_id)
+
+        roles = {r.name: r.id for r in Role.query}
+        db.session.execute(insert(roles_users), [
+            {'user_id': ids[n], 'role_id': roles['secretary' if n == 0 else 'resident']}
+            for ids in members.values() for n in range(len(ids))
+        ])
+
+        rows = []
+        children = []  # (votes, comments) per complaint row, in the same order
+        totals = {'votes': 0, 'comments': 0}
+
+        def flush_complaints():
+            if not rows:
+                return
+            ids = db.session.execute(
+                insert(Complaint).returning(Complaint.id, sort_by_parameter_order=True), rows
+            ).scalars().all()
+            votes = [dict(vote, complaint_id=cid) for cid, (vs, _) in zip(ids, children) for vote in vs]
+            comments = [dict(c, complaint_id=cid) for cid, (_, cs) in zip(ids, children) for c in cs]
+            rows.clear()
+            children.clear()
+            flush(ComplaintVote, votes)
+            flush(ComplaintComment, comments)
+            totals['votes'] += len(votes)
+            totals['comments'] += len(comments)
+
+        for i in range(complaints):
+            society_id = rng.choice(society_ids)
+            complainant, accused = rng.sample(members[society_id], 2)
+            created_at = now - timedelta(days=rng.uniform(0, 365))
+            status = rng.choice(statuses)
+            resolved_at = None
+            if status in (ComplaintStatus.RESOLVED.value, ComplaintStatus.CLOSED.value):
+                resolved_at = min(now, created_at + timedelta(days=rng.uniform(0.5, 30)))
+            subject, problem, place = rng.choice(SUBJECTS), rng.choice(PROBLEMS), rng.choice(PLACES)
+            row = {
+                'title': f'{subject.title()} {problem} in the {place}',
+                'description': (f'The {subject} in the {place} has been {problem} '
+                                f'{rng.choice(DETAILS)}. Complaint #{i}, please look into it.'),
+                'accused_flat': f'{rng.choice("ABCD")}-{rng.randint(1, 20)}{rng.randint(1, 8):02d}',
+                'category': rng.choice(categories),
+                'priority': rng.choice(priorities),
+                'status': status,
+                'complainant_id': complainant,
+                'accused_user_id': accused if rng.random() < 0.4 else None,
+                'society_id': society_id,
+                'is_anonymous': rng.random() < 0.2,
+                'support_count': rng.randint(0, 15),
+                'oppose_count': rng.randint(0, 5),
+                'created_at': created_at,
+                'updated_at': resolved_at or created_at,
+                'resolved_at': resolved_at
+            }
+
+            votes, comments = [], []
+            if votes_per_complaint:
+                k = min(rng.randint(0, 2 * votes_per_complaint), len(members[society_id]) - 1)
+                voters = [v for v in rng.sample(members[society_id], k + 1) if v != complainant][:k]
+                votes = [{
+                    'user_id': voter,
+                    'vote_type': 'support' if rng.random() < 0.75 else 'oppose',
+                    'is_anonymous': True,
+                    'created_at': created_at
+                } for voter in voters]
+                row['support_count'] = sum(v['vote_type'] == 'support' for v in votes)
+                row['oppose_count'] = len(votes) - row['support_count']
+            if comments_per_complaint:
+                comments = [{
+                    'user_id': rng.choice(members[society_id]),
+                    'comment_text': f'Same {rng.choice(PROBLEMS)} {rng.choice(SUBJECTS)} here, {rng.choice(DETAILS)}.',
+                    'is_anonymous': False,
+                    'is_official': False,
+                    'created_at': created_at + (now - created_at) * rng.random()
+                } for _ in range(rng.randint(0, 2 * comments_per_complaint))]
+                row['comments_count'] = len(comments)
+
+            rows.append(row)
+            children.append((votes, comments))
+            if len(rows) >= chunk_size:
+                flush_complaints()
+        flush_complaints()
+
+        all_users = [user_id for ids in members.values() for user_id in ids]
+        for model, count, make in (
+            (KarmaLog, complaints // 2, lambda: {
+                'user_id': rng.choice(all_users),
+                'points': rng.choice([1, 2, 5, 10, -5, -10]),
+                'reason': 'complaint_filed',
+                'created_at': now - timedelta(days=rng.uniform(0, 365))
+            }),
+            (Notification, complaints // 2 if notifications is None else notifications, lambda: {
+                'user_id': rng.choice(all_users),
+                'title': 'Bench notification',
+                'message': 'Seeded notification',
+                'notification_type': 'complaint',
+                'is_read': rng.random() < 0.7,
+                'created_at': now - timedelta(days=rng.uniform(0, 60))
+            }),
+        ):
+            for _ in range(count):
+                rows.append(make())
+                if len(rows) >= chunk_size:
+                    flush(model, rows)
+            flush(model, rows)
+
+        db.session.commit()
+        # Rollups are maintained on flush; bulk inserts bypass that
+        from app.models import SocietyStat
+        SocietyStat.reconcile()
+
+        return {
+            'societies': len(society_ids),
+            'users': len(all_users),
+            'complaints': complaints,
+            'votes': totals['votes'],
+            'comments': totals['comments'],
+            'notifications': complaints // 2 if notifications is None else notifications
+        }
+
+
+def dataset_summary(app):
+    """Row counts of an already seeded benchmark database, or None if it is empty."""
+    from sqlalchemy import func
+
+    with app.app_context():
+        societies = Society.query.filter(Society.name.like('Bench Society %')).count()
+        if not societies:
+            return None
+        return {
+            'societies': societies,
+            'users': User.query.filter(User.email.like('bench%')).count(),
+            'complaints': db.session.query(func.count(Complaint.id)).scalar(),
+            'votes': db.session.query(func.count(ComplaintVote.id)).scalar(),
+            'comments': db.session.query(func.count(ComplaintComment.id)).scalar(),
+            'notifications': db.session.query(func.count(Notification.id)).scalar()
+        }
+
+
+def percentiles(samples):
+    """Summarize latency samples (milliseconds) as mean and p50/p95/p99."""
+    samples = sorted(samples)
+    if not samples:
+        return {'mean_ms': None, 'p50_ms': None, 'p95_ms': None, 'p99_ms': None}
+
+    def pct(p):
+        return samples[min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))]
+
+    return {
+        'mean_ms': round(statistics.fmean(samples), 3),
+        'p50_ms': round(pct(50), 3),
+        'p95_ms': round(pct(95), 3),
+        'p99_ms': round(pct(99), 3)
+    }
+
+
+def measure(fn, iterations=200, warmup=5):
+    """Time fn() and return latency percentiles in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {'iterations': iterations, **percentiles(samples)}
+
+
+def count_queries(app, fn):
+    """Return how many SQL statements one call of fn() issues."""
+    with app.app_context():
+        engine = db.engine
+    with QueryCounter(engine) as counter:
+        fn()
+    return counter.count
@@ -0,0 +1,95 @@
+"""
+Benchmark Comparison - Diff two bench_api reports
+
+Run from backend/:
+    python -m benchmarks.compare before.json after.json --threshold 10
+
+Prints the change of every metric per scenario and exits with status 1 when
+a latency percentile got slower by more than --threshold percent, throughput
+dropped by more than that, or a scenario issues more queries per request.
+"""
+
+import argparse
+import json
+import sys
+
+
+# (metric, True when a higher value is better)
+METRICS = (
+    ('p50_ms', False),
+    ('p95_ms', False),
+    ('p99_ms', False),
+    ('throughput_rps', True),
+    ('queries_per_request', False),
+    ('errors', False)
+)
+
+
+def _change(before, after):
+    if before in (None, 0) or after is None:
+        return None
+    return (after - before) / before * 100
+
+
+def compare(before, after, threshold):
+    """Return (rows, regressions) for the scenarios present in both reports."""
+    rows, regressions = [], []
+    for scenario, old in before['scenarios'].items():
+        new = after['scenarios'].get(scenario)
+        if new is None:
+            continue
+        for metric, higher_is_better in METRICS:
+            a, b = old.get(metric), new.get(metric)
+            if a is None and b is None:
+                continue
+            change = _change(a, b)
+            rows.append((scenario, metric, a, b, change))
+
+            if metric in ('queries_per_request', 'errors'):
+                regressed = a is not None and b is not None and b > a
+            elif change is None:
+                regressed = False
+            else:
+                regressed = (-change if higher_is_better else change) > threshold
+            if regressed:
+                regressions.append((scenario, metric, a, b, change))
+    return rows, regressions
+
+
+def _format(value):
+    return '-' if value is None else f'{value:g}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='Allowed slowdown in percent before a metric counts as a regression')
+    args = parser.parse_args()
+
+    with open(args.before) as handle:
+        before = json.load(handle)
+    with open(args.after) as handle:
+        after = json.load(handle)
+
+    for key in ('mode', 'size', 'seed', 'requests', 'concurrency'):
+        if before['meta'].get(key) != after['meta'].get(key):
+            print(f"warning: runs differ in {key} "
+                  f"({before['meta'].get(key)} vs {after['meta'].get(key)})", file=sys.stderr)
+
+    rows, regressions = compare(before, after, args.threshold)
+    print(f"{'scenario':<22} {'metric':<20} {'before':>10} {'after':>10} {'change':>9}")
+    for scenario, metric, a, b, change in rows:
+        delta = '' if change is None else f'{change:+.1f}%'
+        print(f'{scenario:<22} {metric:<20} {_format(a):>10} {_format(b):>10} {delta:>9}')
+
+    if regressions:
+        print(f'\n{len(regressions)} regression(s) beyond {args.threshold:g}%:')
+        for scenario, metric, a, b, _ in regressions:
+            print(f'  {scenario} {metric}: {_format(a)} -> {_format(b)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
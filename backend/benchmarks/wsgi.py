@@ -0,0 +1,14 @@
+"""
+WSGI entry point for serving a benchmark database with gunicorn.
+
+    BENCH_DB_PATH=/tmp/bench.db gunicorn "benchmarks.wsgi:app"
+
+Used by bench_api --mode gunicorn; the app is configured exactly like the
+in-process benchmark app so both modes hit the same code paths.
+"""
+
+import os
+
+from benchmarks.common import create_benchmark_app
+
+app = create_benchmark_app(os.environ['BENCH_DB_PATH'])
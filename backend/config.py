@@ -19,7 +19,33 @@ class Config:
     
     # SQLAlchemy
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    SQLALCHEMY_RECORD_QUERIES = True
+    # Flask-SQLAlchemy's own query recording; INSTRUMENTATION_ENABLED below
+    # covers the same ground and costs nothing when switched off
+    SQLALCHEMY_RECORD_QUERIES = False
+    # Explicit engine options; they win over the DB_* profile below
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    
+    # Database engine profile (app/utils/engine_profiles.py): 'auto' tunes
+    # SQLite files (WAL, PRAGMAs) and the PostgreSQL pool, 'off' keeps the
+    # driver defaults
+    DB_ENGINE_PROFILE = os.environ.get('DB_ENGINE_PROFILE', 'auto')
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_STATEMENT_TIMEOUT = int(os.environ.get('DB_STATEMENT_TIMEOUT', 30000))  # ms, PostgreSQL
+    DB_IDLE_IN_TRANSACTION_TIMEOUT = int(os.environ.get('DB_IDLE_IN_TRANSACTION_TIMEOUT', 60000))  # ms
+    DB_BUSY_TIMEOUT = int(os.environ.get('DB_BUSY_TIMEOUT', 5000))  # ms a SQLite writer waits for the lock
+    DB_SQLITE_JOURNAL_MODE = os.environ.get('DB_SQLITE_JOURNAL_MODE', 'WAL')
+    DB_SQLITE_SYNCHRONOUS = os.environ.get('DB_SQLITE_SYNCHRONOUS', 'NORMAL')
+    DB_SQLITE_MMAP_SIZE = int(os.environ.get('DB_SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    DB_SQLITE_CACHE_SIZE = int(os.environ.get('DB_SQLITE_CACHE_SIZE', -64000))  # negative = KiB
+    
+    # Optional read replica (app/db_routing.py): GET requests and reporting
+    # jobs read from it, writes go to the primary, and a user's requests stay
+    # on the primary for REPLICA_STICKY_SECONDS after their own write
+    SQLALCHEMY_REPLICA_URI = os.environ.get('REPLICA_DATABASE_URL')
+    REPLICA_STICKY_SECONDS = float(os.environ.get('REPLICA_STICKY_SECONDS', 5))
     
     # Flask-Security
     SECURITY_PASSWORD_SALT = os.environ.get('SECURITY_PASSWORD_SALT') or 'padosi-politics-security-salt'
@@ -36,11 +62,20 @@ class Config:
     JWT_TOKEN_LOCATION = ['headers']
     JWT_HEADER_NAME = 'Authorization'
     JWT_HEADER_TYPE = 'Bearer'
+    JWT_QUERY_STRING_NAME = 'token'  # only read by jwt_stream_required views
     
     # File Upload
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'mp4', 'mp3', 'wav', 'pdf', 'doc', 'docx'}
+    # Seconds an unreferenced evidence file survives before it may be reclaimed
+    UPLOAD_GC_GRACE = int(os.environ.get('UPLOAD_GC_GRACE', 300))
+    # Lifetime of signed /uploads/ links handed out by the API
+    UPLOAD_URL_TTL = int(os.environ.get('UPLOAD_URL_TTL', 3600))
+    # Hand file transfers to the front proxy: an nginx internal location
+    # prefix for X-Accel-Redirect, or X-Sendfile for Apache/lighttpd
+    UPLOAD_ACCEL_REDIRECT = os.environ.get('UPLOAD_ACCEL_REDIRECT')
+    USE_X_SENDFILE = os.environ.get('UPLOAD_X_SENDFILE', 'false').lower() == 'true'
     
     # CORS
     CORS_ORIGINS = ['http://localhost:5173', 'http://localhost:8080', 'http://127.0.0.1:5173']
@@ -52,10 +87,57 @@ class Config:
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER', 'noreply@padosipolitics.com')
+    # Bulk mail: messages per queued batch, and per SMTP connection before reconnecting
+    MAIL_BATCH_SIZE = int(os.environ.get('MAIL_BATCH_SIZE', 200))
+    MAIL_MAX_EMAILS = int(os.environ.get('MAIL_MAX_EMAILS', 100))
     
     # Cache Configuration
     CACHE_TYPE = 'simple'
     CACHE_DEFAULT_TIMEOUT = 300
+    CACHE_THRESHOLD = int(os.environ.get('CACHE_THRESHOLD', 10000))
+    CACHE_SQLITE_PATH = os.environ.get('CACHE_SQLITE_PATH')  # used by SQLiteCache
+    
+    # Authenticated principal cache (per worker process). Entries are checked
+    # against a per-user version in the shared cache, which role and status
+    # changes replace on commit, so revocations reach every worker at once.
+    PRINCIPAL_CACHE_TTL = int(os.environ.get('PRINCIPAL_CACHE_TTL', 60))
+    PRINCIPAL_CACHE_SIZE = int(os.environ.get('PRINCIPAL_CACHE_SIZE', 4096))
+    
+    # Per-user dashboard cache; invalidated on commit, TTL bounds bulk updates
+    DASHBOARD_CACHE_TIMEOUT = int(os.environ.get('DASHBOARD_CACHE_TIMEOUT', 30))
+    
+    # Ranked karma leaderboard per society, shared through the cache and
+    # patched on commit; the TTL bounds drift from bulk updates and races
+    LEADERBOARD_CACHE_TIMEOUT = int(os.environ.get('LEADERBOARD_CACHE_TIMEOUT', 600))
+    
+    # Repeat notifications about the same complaint within this many seconds
+    # are merged into the recipient's unread one
+    NOTIFICATION_COALESCE_WINDOW = int(os.environ.get('NOTIFICATION_COALESCE_WINDOW', 900))
+    
+    # Live notification stream (SSE). On the threaded web workers each open
+    # stream holds a thread, so connections are capped per process (half of
+    # the 4 gunicorn threads by default); the gevent stream process raises
+    # the cap (see DEPLOYMENT.md). Streams are recycled after MAX_AGE
+    # seconds; POLL_INTERVAL is how often other workers' commits are picked
+    # up. Stream tokens (?token=) expire after TOKEN_EXPIRES seconds.
+    NOTIFICATION_STREAM_MAX_CLIENTS = int(os.environ.get('NOTIFICATION_STREAM_MAX_CLIENTS', 2))
+    NOTIFICATION_STREAM_MAX_AGE = int(os.environ.get('NOTIFICATION_STREAM_MAX_AGE', 300))
+    NOTIFICATION_STREAM_HEARTBEAT = int(os.environ.get('NOTIFICATION_STREAM_HEARTBEAT', 15))
+    NOTIFICATION_STREAM_POLL_INTERVAL = float(os.environ.get('NOTIFICATION_STREAM_POLL_INTERVAL', 2))
+    NOTIFICATION_STREAM_TOKEN_EXPIRES = int(os.environ.get('NOTIFICATION_STREAM_TOKEN_EXPIRES', 60))
+    
+    # Request instrumentation: per-route SQL counts, DB time and latency
+    # histograms (/api/debug/metrics), Server-Timing headers and N+1
+    # warnings. Nothing is hooked in while disabled.
+    INSTRUMENTATION_ENABLED = os.environ.get('INSTRUMENTATION_ENABLED', 'false').lower() == 'true'
+    INSTRUMENTATION_WINDOW = int(os.environ.get('INSTRUMENTATION_WINDOW', 300))
+    INSTRUMENTATION_N_PLUS_ONE_THRESHOLD = int(os.environ.get('INSTRUMENTATION_N_PLUS_ONE_THRESHOLD', 10))
+    
+    # Prometheus metrics at /api/metrics (needs prometheus_client). Under
+    # gunicorn, PROMETHEUS_MULTIPROC_DIR makes every worker's samples count;
+    # METRICS_TOKEN, if set, is required as a bearer token to scrape.
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'false').lower() == 'true'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
     
     # Celery Configuration (Optional - for local dev with Redis)
     CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'redis://localhost:6379/0')
@@ -99,9 +181,10 @@ class DevelopmentConfig(Config):
 class TestingConfig(Config):
     """Testing configuration."""
     TESTING = True
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL') or 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
     PRESERVE_CONTEXT_ON_EXCEPTION = False
+    NOTIFICATION_STREAM_POLL_INTERVAL = 0  # tests drive the bridge via poll_once()
 
 
 class ProductionConfig(Config):
@@ -140,8 +223,8 @@ class ProductionConfig(Config):
     REMEMBER_COOKIE_SECURE = True
     REMEMBER_COOKIE_HTTPONLY = True
     
-    # Cache - use simple cache if Redis not available
-    CACHE_TYPE = os.environ.get('CACHE_TYPE', 'simple')
+    # Cache - shared across gunicorn workers via SQLite unless Redis is configured
+    CACHE_TYPE = os.environ.get('CACHE_TYPE', 'app.utils.sqlite_cache.SQLiteCache')
     CACHE_REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/1')
     
     @classmethod
@@ -0,0 +1,28 @@
+"""
+Gunicorn settings, picked up from the working directory by default.
+With METRICS_ENABLED the workers share Prometheus samples through
+PROMETHEUS_MULTIPROC_DIR, which has to be set before any worker imports
+prometheus_client; it is emptied on startup and a dead worker's live
+gauges are dropped when it exits.
+"""
+
+import os
+import shutil
+import tempfile
+
+if os.environ.get('METRICS_ENABLED', 'false').lower() == 'true':
+    os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR',
+                          os.path.join(tempfile.gettempdir(), 'padosi_prometheus'))
+
+
+def on_starting(server):
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -14,6 +14,7 @@ os.environ['FLASK_ENV'] = 'production'
 
 from app import create_app
 from app.extensions import db
+from flask_migrate import upgrade
 from app.models import User, Society, Complaint, Role
 from datetime import datetime
 from werkzeug.security import generate_password_hash
@@ -27,6 +28,9 @@ def init_database():
         print("Creating database tables...")
         db.create_all()
         
+        print("Applying migrations (indexes, search, backfills)...")
+        upgrade()
+        
         # Check if admin already exists
         admin = User.query.filter_by(email='admin@padosipolitics.com').first()
         if admin:
@@ -0,0 +1,51 @@
+"""Add denormalized comment, evidence and escalation counters to complaint
+
+Revision ID: 3f2a9c1d7b10
+Revises:
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a9c1d7b10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+COUNTERS = {
+    'comments_count': 'complaint_comment',
+    'evidence_count': 'complaint_evidence',
+    'escalations_count': 'escalation',
+}
+
+
+def _existing_columns(table):
+    return {c['name'] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    # create_app() runs db.create_all(), so fresh databases already have
+    # these columns; only add what is missing.
+    existing = _existing_columns('complaint')
+    with op.batch_alter_table('complaint') as batch_op:
+        for column in COUNTERS:
+            if column not in existing:
+                batch_op.add_column(
+                    sa.Column(column, sa.Integer(), nullable=False, server_default='0')
+                )
+
+    # Backfill from the child tables
+    for column, child_table in COUNTERS.items():
+        op.execute(
+            f'UPDATE complaint SET {column} = '
+            f'(SELECT COUNT(*) FROM {child_table} WHERE {child_table}.complaint_id = complaint.id)'
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('complaint') as batch_op:
+        for column in COUNTERS:
+            batch_op.drop_column(column)
@@ -0,0 +1,42 @@
+"""Add society_stats rollup table
+
+Revision ID: 7c41e2b9a5d3
+Revises: 3f2a9c1d7b10
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c41e2b9a5d3'
+down_revision = '3f2a9c1d7b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_app() runs db.create_all(), so the table may already exist.
+    # Rollups are built on a society's next complaint write; reads aggregate on
+    # the fly until then (or build all at once: `flask reconcile-stats`).
+    if 'society_stats' in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table(
+        'society_stats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('society_id', sa.Integer(), nullable=False),
+        sa.Column('dimension', sa.String(length=20), nullable=False),
+        sa.Column('bucket', sa.String(length=50), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('resolution_seconds', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['society_id'], ['society.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('society_id', 'dimension', 'bucket', name='uq_society_stats_bucket')
+    )
+
+
+def downgrade():
+    op.drop_table('society_stats')
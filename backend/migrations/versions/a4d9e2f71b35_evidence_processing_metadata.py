@@ -0,0 +1,53 @@
+"""Add evidence processing metadata and complaint preview_url
+
+Revision ID: a4d9e2f71b35
+Revises: f2c6d8e4a913
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4d9e2f71b35'
+down_revision = 'f2c6d8e4a913'
+branch_labels = None
+depends_on = None
+
+
+COLUMNS = (
+    ('mime_type', lambda: sa.Column('mime_type', sa.String(length=100), nullable=True)),
+    ('width', lambda: sa.Column('width', sa.Integer(), nullable=True)),
+    ('height', lambda: sa.Column('height', sa.Integer(), nullable=True)),
+    ('thumbnail_url', lambda: sa.Column('thumbnail_url', sa.String(length=500), nullable=True)),
+    # Existing rows start pending so `flask process-evidence` picks them up
+    ('processing_status', lambda: sa.Column('processing_status', sa.String(length=20), nullable=False,
+                                            server_default='pending')),
+)
+
+
+def _existing_columns(table):
+    return {col['name'] for col in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    # Plain ADD/DROP COLUMN rather than batch mode: a batch table rebuild
+    # on SQLite would drop the complaint_fts triggers on complaint
+    existing = _existing_columns('complaint_evidence')
+    for name, make in COLUMNS:
+        if name not in existing:
+            op.add_column('complaint_evidence', make())
+
+    if 'preview_url' not in _existing_columns('complaint'):
+        op.add_column('complaint', sa.Column('preview_url', sa.String(length=500), nullable=True))
+
+
+def downgrade():
+    if 'preview_url' in _existing_columns('complaint'):
+        op.drop_column('complaint', 'preview_url')
+
+    existing = _existing_columns('complaint_evidence')
+    for name, _ in reversed(COLUMNS):
+        if name in existing:
+            op.drop_column('complaint_evidence', name)
@@ -0,0 +1,60 @@
+"""Add composite indexes for hot complaint, notification and karma queries
+
+Revision ID: a91d4f6c2e80
+Revises: 7c41e2b9a5d3
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a91d4f6c2e80'
+down_revision = '7c41e2b9a5d3'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_complaint_society_created', 'complaint', ['society_id', 'created_at', 'id']),
+    ('ix_complaint_society_status_created', 'complaint', ['society_id', 'status', 'created_at']),
+    ('ix_complaint_society_resolved', 'complaint', ['society_id', 'resolved_at']),
+    ('ix_complaint_accused_status', 'complaint', ['accused_user_id', 'status']),
+    ('ix_notification_user_created', 'notification', ['user_id', 'created_at', 'id']),
+    ('ix_notification_user_read_created', 'notification', ['user_id', 'is_read', 'created_at']),
+    ('ix_karma_log_user_created', 'karma_log', ['user_id', 'created_at', 'id']),
+]
+
+# Single-column indexes made redundant by the leading columns above
+REDUNDANT = [
+    ('ix_complaint_society_id', 'complaint', ['society_id']),
+    ('ix_complaint_accused_user_id', 'complaint', ['accused_user_id']),
+    ('ix_notification_user_id', 'notification', ['user_id']),
+    ('ix_karma_log_user_id', 'karma_log', ['user_id']),
+]
+
+
+def _existing_indexes(table):
+    return {ix['name'] for ix in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    # create_app() runs db.create_all(), so fresh databases may already
+    # have the new indexes; only create what is missing.
+    for name, table, columns in INDEXES:
+        if name not in _existing_indexes(table):
+            op.create_index(name, table, columns)
+
+    for name, table, _ in REDUNDANT:
+        if name in _existing_indexes(table):
+            op.drop_index(name, table_name=table)
+
+
+def downgrade():
+    for name, table, columns in REDUNDANT:
+        if name not in _existing_indexes(table):
+            op.create_index(name, table, columns)
+
+    for name, table, _ in INDEXES:
+        if name in _existing_indexes(table):
+            op.drop_index(name, table_name=table)
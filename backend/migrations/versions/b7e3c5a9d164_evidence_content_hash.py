@@ -0,0 +1,40 @@
+"""Add content_hash to complaint_evidence
+
+Revision ID: b7e3c5a9d164
+Revises: a4d9e2f71b35
+Create Date: 2026-10-17 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e3c5a9d164'
+down_revision = 'a4d9e2f71b35'
+branch_labels = None
+depends_on = None
+
+
+def _existing_columns(table):
+    return {col['name'] for col in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def _existing_indexes(table):
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    # Existing files keep their per-complaint paths and stay unhashed;
+    # only new uploads go to the content-addressed store
+    if 'content_hash' not in _existing_columns('complaint_evidence'):
+        op.add_column('complaint_evidence', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    if 'ix_complaint_evidence_content_hash' not in _existing_indexes('complaint_evidence'):
+        op.create_index('ix_complaint_evidence_content_hash', 'complaint_evidence', ['content_hash'])
+
+
+def downgrade():
+    if 'ix_complaint_evidence_content_hash' in _existing_indexes('complaint_evidence'):
+        op.drop_index('ix_complaint_evidence_content_hash', table_name='complaint_evidence')
+    if 'content_hash' in _existing_columns('complaint_evidence'):
+        op.drop_column('complaint_evidence', 'content_hash')
@@ -0,0 +1,42 @@
+"""Index complaints by accused user and flat within a society
+
+Revision ID: c3e8b1f04a27
+Revises: a91d4f6c2e80
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e8b1f04a27'
+down_revision = 'a91d4f6c2e80'
+branch_labels = None
+depends_on = None
+
+
+def _existing_indexes(table):
+    return {ix['name'] for ix in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    existing = _existing_indexes('complaint')
+    if 'ix_complaint_accused_society_status' not in existing:
+        op.create_index('ix_complaint_accused_society_status', 'complaint',
+                        ['accused_user_id', 'society_id', 'status'])
+    if 'ix_complaint_society_accused_flat' not in existing:
+        op.create_index('ix_complaint_society_accused_flat', 'complaint',
+                        ['society_id', 'accused_flat'])
+    # Superseded by ix_complaint_accused_society_status
+    if 'ix_complaint_accused_status' in existing:
+        op.drop_index('ix_complaint_accused_status', table_name='complaint')
+
+
+def downgrade():
+    existing = _existing_indexes('complaint')
+    if 'ix_complaint_accused_status' not in existing:
+        op.create_index('ix_complaint_accused_status', 'complaint', ['accused_user_id', 'status'])
+    for name in ('ix_complaint_society_accused_flat', 'ix_complaint_accused_society_status'):
+        if name in existing:
+            op.drop_index(name, table_name='complaint')
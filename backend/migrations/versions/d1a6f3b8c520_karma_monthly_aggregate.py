@@ -0,0 +1,47 @@
+"""Add karma_monthly_aggregate table
+
+Revision ID: d1a6f3b8c520
+Revises: b7e3c5a9d164
+Create Date: 2026-10-17 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd1a6f3b8c520'
+down_revision = 'b7e3c5a9d164'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_app() runs db.create_all(), so the table may already exist.
+    # Aggregates are built per user on their next karma change; reads fall back
+    # to the ledger until then (or build all at once: `flask rebuild-karma-aggregates`).
+    if 'karma_monthly_aggregate' in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table(
+        'karma_monthly_aggregate',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('society_id', sa.Integer(), nullable=False),
+        sa.Column('period', sa.String(length=7), nullable=False),
+        sa.Column('reason', sa.String(length=100), nullable=False),
+        sa.Column('points', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['society_id'], ['society.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'period', 'reason', name='uq_karma_monthly_aggregate')
+    )
+    op.create_index('ix_karma_monthly_aggregate_society_period', 'karma_monthly_aggregate',
+                    ['society_id', 'period'])
+
+
+def downgrade():
+    op.drop_index('ix_karma_monthly_aggregate_society_period', table_name='karma_monthly_aggregate')
+    op.drop_table('karma_monthly_aggregate')
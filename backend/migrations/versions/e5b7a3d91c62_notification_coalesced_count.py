@@ -0,0 +1,33 @@
+"""Add coalesced_count to notification
+
+Revision ID: e5b7a3d91c62
+Revises: c3e8b1f04a27
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b7a3d91c62'
+down_revision = 'c3e8b1f04a27'
+branch_labels = None
+depends_on = None
+
+
+def _existing_columns(table):
+    return {col['name'] for col in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    if 'coalesced_count' not in _existing_columns('notification'):
+        with op.batch_alter_table('notification') as batch_op:
+            batch_op.add_column(sa.Column('coalesced_count', sa.Integer(), nullable=False,
+                                          server_default='1'))
+
+
+def downgrade():
+    if 'coalesced_count' in _existing_columns('notification'):
+        with op.batch_alter_table('notification') as batch_op:
+            batch_op.drop_column('coalesced_count')
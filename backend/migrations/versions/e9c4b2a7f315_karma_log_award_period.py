@@ -0,0 +1,100 @@
+"""Add period and a unique award key to karma_log
+
+Revision ID: e9c4b2a7f315
+Revises: d1a6f3b8c520
+Create Date: 2026-10-17 23:30:00.000000
+
+"""
+from datetime import timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e9c4b2a7f315'
+down_revision = 'd1a6f3b8c520'
+branch_labels = None
+depends_on = None
+
+BONUS_PREFIX = 'Monthly bonus '
+
+
+def _existing_columns(table):
+    return {col['name'] for col in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def _existing_indexes(table):
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def _bonus_period(description, created_at):
+    """
+    The month a bonus row was paid for. Rows written by the bulk task say so
+    in their description ('Monthly bonus YYYY-MM'); older rows have no
+    description and were paid by the job on the 1st for the previous month.
+    """
+    if description and description.startswith(BONUS_PREFIX):
+        return description[len(BONUS_PREFIX):len(BONUS_PREFIX) + 7]
+    if description is None and created_at is not None:
+        previous_month = created_at.replace(day=1) - timedelta(days=1)
+        return previous_month.strftime('%Y-%m')
+    return None
+
+
+def _backfill_bonus_periods():
+    # Only the earliest row per user and month gets a period; duplicates
+    # from an earlier double run keep NULL so the unique index can be built
+    karma_log = sa.table(
+        'karma_log',
+        sa.column('id', sa.Integer),
+        sa.column('user_id', sa.Integer),
+        sa.column('reason', sa.String),
+        sa.column('description', sa.String),
+        sa.column('period', sa.String),
+        sa.column('created_at', sa.DateTime),
+    )
+    bind = op.get_bind()
+    claimed = set(bind.execute(
+        sa.select(karma_log.c.user_id, karma_log.c.period)
+        .where(karma_log.c.reason == 'monthly_bonus', karma_log.c.period.isnot(None))
+    ).all())
+    rows = bind.execute(
+        sa.select(karma_log.c.id, karma_log.c.user_id, karma_log.c.description, karma_log.c.created_at)
+        .where(karma_log.c.reason == 'monthly_bonus', karma_log.c.period.is_(None))
+        .order_by(karma_log.c.id)
+    ).all()
+
+    updates = []
+    for row in rows:
+        period = _bonus_period(row.description, row.created_at)
+        if period is None or (row.user_id, period) in claimed:
+            continue
+        claimed.add((row.user_id, period))
+        updates.append({'row_id': row.id, 'period': period})
+
+    if updates:
+        bind.execute(
+            karma_log.update().where(karma_log.c.id == sa.bindparam('row_id'))
+            .values(period=sa.bindparam('period')),
+            updates
+        )
+
+
+def upgrade():
+    if 'period' not in _existing_columns('karma_log'):
+        op.add_column('karma_log', sa.Column('period', sa.String(length=7), nullable=True))
+
+    _backfill_bonus_periods()
+
+    if 'uq_karma_log_award_period' not in _existing_indexes('karma_log'):
+        op.create_index('uq_karma_log_award_period', 'karma_log',
+                        ['user_id', 'reason', 'period'], unique=True)
+
+
+def downgrade():
+    if 'uq_karma_log_award_period' in _existing_indexes('karma_log'):
+        op.drop_index('uq_karma_log_award_period', table_name='karma_log')
+    if 'period' in _existing_columns('karma_log'):
+        with op.batch_alter_table('karma_log') as batch_op:
+            batch_op.drop_column('period')
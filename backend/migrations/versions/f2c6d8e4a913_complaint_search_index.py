@@ -0,0 +1,86 @@
+"""Full-text search index for complaints
+
+Revision ID: f2c6d8e4a913
+Revises: e5b7a3d91c62
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c6d8e4a913'
+down_revision = 'e5b7a3d91c62'
+branch_labels = None
+depends_on = None
+
+
+SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS complaint_fts USING fts5("
+    " title, description, accused_flat, society_id,"
+    " content='complaint', content_rowid='id',"
+    " tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS complaint_fts_ai AFTER INSERT ON complaint BEGIN"
+    " INSERT INTO complaint_fts(rowid, title, description, accused_flat, society_id)"
+    " VALUES (new.id, new.title, new.description, new.accused_flat, new.society_id);"
+    " END",
+    "CREATE TRIGGER IF NOT EXISTS complaint_fts_ad AFTER DELETE ON complaint BEGIN"
+    " INSERT INTO complaint_fts(complaint_fts, rowid, title, description, accused_flat, society_id)"
+    " VALUES ('delete', old.id, old.title, old.description, old.accused_flat, old.society_id);"
+    " END",
+    "CREATE TRIGGER IF NOT EXISTS complaint_fts_au"
+    " AFTER UPDATE OF title, description, accused_flat, society_id ON complaint BEGIN"
+    " INSERT INTO complaint_fts(complaint_fts, rowid, title, description, accused_flat, society_id)"
+    " VALUES ('delete', old.id, old.title, old.description, old.accused_flat, old.society_id);"
+    " INSERT INTO complaint_fts(rowid, title, description, accused_flat, society_id)"
+    " VALUES (new.id, new.title, new.description, new.accused_flat, new.society_id);"
+    " END",
+)
+
+POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(accused_flat, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+)
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        options = bind.exec_driver_sql('PRAGMA compile_options').scalars().all()
+        if 'ENABLE_FTS5' not in options:
+            return  # search falls back to LIKE
+        exists = bind.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE name = 'complaint_fts'"
+        ).first()
+        for statement in SQLITE_DDL:
+            op.execute(statement)
+        if not exists:
+            op.execute("INSERT INTO complaint_fts(complaint_fts) VALUES ('rebuild')")
+    elif bind.dialect.name == 'postgresql':
+        # Built without blocking complaint writes; CONCURRENTLY can't run in
+        # a transaction. A build that failed part way leaves an invalid
+        # index behind that IF NOT EXISTS would skip, so drop it first.
+        with op.get_context().autocommit_block():
+            invalid = bind.exec_driver_sql(
+                "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid"
+                " WHERE c.relname = 'ix_complaint_search' AND NOT i.indisvalid"
+            ).first()
+            if invalid:
+                op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_complaint_search')
+            op.execute(
+                'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_complaint_search'
+                f' ON complaint USING gin (({POSTGRES_DOCUMENT}))'
+            )
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        for trigger in ('complaint_fts_ai', 'complaint_fts_ad', 'complaint_fts_au'):
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        op.execute('DROP TABLE IF EXISTS complaint_fts')
+    elif bind.dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_complaint_search')
@@ -0,0 +1,43 @@
+"""Add updated_at to notification
+
+Revision ID: f4b8d2c6a319
+Revises: e9c4b2a7f315
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4b8d2c6a319'
+down_revision = 'e9c4b2a7f315'
+branch_labels = None
+depends_on = None
+
+
+def _existing_columns(table):
+    return {col['name'] for col in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def _existing_indexes(table):
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    # Coalescing used to bump created_at; it now bumps updated_at and leaves
+    # created_at alone. Existing rows start with both equal.
+    if 'updated_at' not in _existing_columns('notification'):
+        op.add_column('notification', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute('UPDATE notification SET updated_at = created_at WHERE updated_at IS NULL')
+    if 'ix_notification_user_updated' not in _existing_indexes('notification'):
+        op.create_index('ix_notification_user_updated', 'notification',
+                        ['user_id', 'updated_at', 'id'])
+
+
+def downgrade():
+    if 'ix_notification_user_updated' in _existing_indexes('notification'):
+        op.drop_index('ix_notification_user_updated', table_name='notification')
+    if 'updated_at' in _existing_columns('notification'):
+        with op.batch_alter_table('notification') as batch_op:
+            batch_op.drop_column('updated_at')
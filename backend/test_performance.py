@@ -0,0 +1,1976 @@
+"""
+Performance Regression Test Script for Padosi Politics
+Runs the API in-process against an in-memory database and pins the number
+of SQL queries issued by hot endpoints, so N+1 regressions fail loudly.
+
+Run: python test_performance.py
+Set TEST_DATABASE_URL to run the same checks against PostgreSQL.
+"""
+
+import csv
+import gzip
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import sqlite3
+import struct
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+from flask_jwt_extended import create_access_token
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from app.extensions import db, cache
+from config import config, TestingConfig
+from app.models import (
+    User, Role, Society, Complaint, ComplaintComment, ComplaintVote,
+    ComplaintEvidence, SocietyStat, Escalation, Notification,
+    KarmaLog, KarmaReason, KarmaMonthlyAggregate
+)
+from app.services.task_service import TaskService, process_evidence_task
+from app.services.dashboard_service import DashboardService
+from app.services.leaderboard_service import LeaderboardService
+from app.services.notification_service import NotificationDispatcher
+from app.services.notification_stream import broker
+from app.services.search_service import ComplaintSearch
+from app.services.upload_service import EvidenceUploadService
+from app.utils.sqlite_cache import SQLiteCache
+from app.utils.helpers import sign_upload_url
+from benchmarks.bench_dashboard import legacy_dashboard_stats
+from app.utils.principal import principal_cache
+from app.utils.instrumentation import route_metrics, _after_cursor_execute
+from app.utils import metrics as app_metrics
+from app.utils.engine_profiles import (
+    engine_profile, configure_engine_options, request_timeout_statements, _apply_request_timeouts
+)
+from app.db_routing import REPLICA_BIND, replica_reads
+from app.services.report_service import WeeklyReportService
+
+# Expected queries for GET /api/complaints regardless of page size, with the
+# caller's principal already cached:
+# user load, pagination count, page rows, viewer votes, complainants
+COMPLAINT_LIST_QUERIES = 5
+
+# A principal cache miss costs the user row plus the role names
+PRINCIPAL_LOAD_QUERIES = 2
+
+# Auto-escalating 65 complaints from three societies in chunks of 25:
+# thresholds and the final empty chunk, plus a fixed handful per chunk
+# (candidates, secretaries, status update, two bulk inserts, rollup upkeep)
+AUTO_ESCALATE_MAX_QUERIES = 26
+
+# Monthly bonus for 2 users in chunks of 1: the qualifying GROUP BY plus
+# karma update, ledger insert, aggregate upkeep and notifications per chunk
+MONTHLY_BONUS_MAX_QUERIES = 20
+
+# Weekly report: the grouped aggregation, secretaries, and the bulk
+# notification insert with its coalescing lookup
+WEEKLY_REPORT_MAX_QUERIES = 8
+
+# Dashboard on a cache miss: rollup aggregate + per-user scalar subqueries
+DASHBOARD_QUERIES = 2
+
+# Society stats: the rollup lookup plus repeat offenders and active complainers
+SOCIETY_STATS_QUERIES = 4
+
+# Cursor mode skips the pagination count
+COMPLAINT_CURSOR_QUERIES = 4
+
+# Export: the streamed complaint query plus comments and escalations per
+# chunk (the test society fits in one chunk)
+EXPORT_QUERIES = 3
+
+
+# Statement repetitions that flag a request as a likely N+1 in the
+# instrumentation check (its N+1 route loads 6 complainants one by one)
+INSTRUMENTATION_N_PLUS_ONE_THRESHOLD = 5
+
+
+# Tables whose hot queries must be served by an index
+INDEXED_TABLES = ('complaint', 'notification', 'karma_log', 'karma_monthly_aggregate')
+
+
+class QueryCounter:
+    """Count SQL statements executed on an engine while active."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+        self.executed = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+        if not executemany:
+            self.executed.append((statement, parameters))
+
+    def __enter__(self):
+        self.statements = []
+        self.executed = []
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._record)
+        return False
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+def find_unindexed_steps(connection, statement, parameters):
+    """
+    Return plan lines where a SELECT on INDEXED_TABLES scans a whole table
+    or has to sort rows the index should already deliver in order.
+    """
+    tables = '|'.join(INDEXED_TABLES)
+    if not re.search(rf'\bFROM ({tables})\b', statement):
+        return []
+    dialect = connection.dialect.name
+
+    if dialect == 'sqlite':
+        rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)
+        # SEARCH uses an index range; SCAN walks the table or a whole index
+        return [
+            row[-1] for row in rows
+            if re.match(rf'SCAN ({tables})\b', row[-1]) or 'TEMP B-TREE FOR ORDER BY' in row[-1]
+        ]
+
+    if dialect == 'postgresql':
+        # Tiny test tables always favour seq scans and sorts; ask whether an
+        # index path exists
+        connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+        connection.exec_driver_sql('SET LOCAL enable_sort = off')
+        rows = connection.exec_driver_sql('EXPLAIN ' + statement, parameters)
+        return [
+            row[0] for row in rows
+            if re.search(rf'Seq Scan on ({tables})\b', row[0]) or re.search(r'->\s+Sort\b|^Sort\b', row[0])
+        ]
+
+    return []
+
+
+def _set_in_child(path):
+    SQLiteCache(path).set('society_stats_1', {'total_complaints': 7})
+
+
+def _observe_task_in_child():
+    # Spawned with PROMETHEUS_MULTIPROC_DIR set, so samples go to shared files
+    app_metrics.enable_metrics()
+    app_metrics.observe_task('child_job', 0.2, {'success': True, 'processed': 5})
+
+
+class PerformanceTester:
+    def __init__(self):
+        self.app = create_app('testing')
+        self.client = self.app.test_client()
+        self.test_results = []
+        self.tokens = {}
+
+    def log(self, test_name, success, message=""):
+        status = "✅ PASS" if success else "❌ FAIL"
+        print(f"{status}: {test_name}")
+        if message:
+            print(f"       {message}")
+        self.test_results.append({
+            'test': test_name,
+            'success': success,
+            'message': message
+        })
+        return success
+
+    def seed(self, complaint_count=120):
+        """Create one society with a few residents and a page-worth of complaints."""
+        with self.app.app_context():
+            society = Society(name='Perf Society', city='Mumbai')
+            db.session.add(society)
+            db.session.flush()
+
+            resident_role = Role.query.filter_by(name='resident').first()
+            secretary_role = Role.query.filter_by(name='secretary').first()
+
+            users = []
+            for i in range(10):
+                user = User(
+                    email=f'perf{i}@example.com',
+                    password=generate_password_hash('password123'),
+                    full_name=f'Perf Resident {i}',
+                    flat_number=f'A-{100 + i}',
+                    wing='A',
+                    society_id=society.id,
+                    fs_uniquifier=str(uuid.uuid4()),
+                    karma_score=i
+                )
+                user.roles.append(secretary_role if i == 0 else resident_role)
+                db.session.add(user)
+                users.append(user)
+            db.session.flush()
+
+            for i in range(complaint_count):
+                complainant = users[i % len(users)]
+                complaint = Complaint(
+                    title=f'Perf complaint {i}',
+                    description='Seeded complaint used for query count checks',
+                    category='noise',
+                    complainant_id=complainant.id,
+                    society_id=society.id,
+                    is_anonymous=(i % 3 == 0)
+                )
+                db.session.add(complaint)
+                db.session.flush()
+
+                for voter in users[1:4]:
+                    if voter.id != complainant.id:
+                        db.session.add(ComplaintVote(
+                            complaint_id=complaint.id, user_id=voter.id, vote_type='support'
+                        ))
+                db.session.add(ComplaintComment(
+                    complaint_id=complaint.id, user_id=users[1].id, comment_text='Seeded comment'
+                ))
+                db.session.add(ComplaintEvidence(
+                    complaint_id=complaint.id, uploaded_by_id=complainant.id,
+                    file_url='/uploads/evidence/seed.png', file_type='image'
+                ))
+
+            db.session.commit()
+            Complaint.recount_counters()
+
+            with self.app.test_request_context():
+                self.tokens['secretary'] = create_access_token(identity=str(users[0].id))
+                self.tokens['resident'] = create_access_token(identity=str(users[1].id))
+
+    def get_headers(self, role):
+        return {'Authorization': f'Bearer {self.tokens[role]}'}
+
+    def count_queries(self, method, url, role='resident'):
+        """Issue a request and return (response, number of SQL statements)."""
+        with self.app.app_context():
+            engine = db.engine
+        with QueryCounter(engine) as counter:
+            response = self.client.open(url, method=method, headers=self.get_headers(role))
+        return response, counter.count
+
+    def test_complaint_list_query_count(self):
+        """Complaint list must use a fixed number of queries per page."""
+        print("\n📋 Testing Complaint List Query Count...")
+
+        # Warm the principal cache so the pins measure the view itself
+        self.client.get('/api/complaints', headers=self.get_headers('resident'))
+
+        for per_page in (10, 100):
+            response, count = self.count_queries('GET', f'/api/complaints?per_page={per_page}')
+            self.log(f"List complaints (per_page={per_page}) succeeds", response.status_code == 200)
+            self.log(
+                f"List complaints (per_page={per_page}) issues {COMPLAINT_LIST_QUERIES} queries",
+                count == COMPLAINT_LIST_QUERIES,
+                f"Executed {count} queries"
+            )
+
+    def test_complaint_cursor_pagination(self):
+        """Cursor mode must skip COUNT(*) and walk every row exactly once."""
+        print("\n🧭 Testing Complaint Cursor Pagination...")
+
+        response, count = self.count_queries('GET', '/api/complaints?per_page=25&cursor=')
+        self.log(
+            f"First cursor page issues {COMPLAINT_CURSOR_QUERIES} queries",
+            count == COMPLAINT_CURSOR_QUERIES,
+            f"Executed {count} queries"
+        )
+
+        seen = []
+        cursor = ''
+        while cursor is not None:
+            response = self.client.get(
+                f'/api/complaints?per_page=25&cursor={cursor}',
+                headers=self.get_headers('resident')
+            )
+            body = response.get_json()
+            seen.extend(item['id'] for item in body['data'])
+            cursor = body['pagination']['next_cursor']
+
+        with self.app.app_context():
+            total = Complaint.query.count()
+        self.log("Cursor walk returns every complaint once",
+                 len(seen) == total and len(set(seen)) == total,
+                 f"Saw {len(seen)} of {total}")
+
+    def test_principal_cache(self):
+        """Auth decorators must reuse the cached principal and drop it on role changes."""
+        print("\n🪪 Testing Principal Cache...")
+
+        principal_cache.clear()
+        _, cold = self.count_queries('GET', '/api/notifications/unread-count')
+        _, warm = self.count_queries('GET', '/api/notifications/unread-count')
+        self.log(f"Warm request skips {PRINCIPAL_LOAD_QUERIES} principal queries",
+                 cold - warm == PRINCIPAL_LOAD_QUERIES,
+                 f"Cold {cold}, warm {warm}")
+
+        # Resident is not a secretary; promoting them must take effect immediately
+        response = self.client.get('/api/dashboard/society-stats', headers=self.get_headers('resident'))
+        self.log("Resident blocked from secretary route", response.status_code == 403,
+                 f"Status {response.status_code}")
+
+        with self.app.app_context():
+            user = User.query.filter_by(email='perf1@example.com').first()
+            secretary_role = Role.query.filter_by(name='secretary').first()
+            user.roles.append(secretary_role)
+            db.session.commit()
+
+        response = self.client.get('/api/dashboard/society-stats', headers=self.get_headers('resident'))
+        self.log("Role grant invalidates cached principal", response.status_code == 200,
+                 f"Status {response.status_code}")
+
+        # Revoke as if on another worker: this process's entries survive the commit
+        with principal_cache._lock:
+            other_worker = dict(principal_cache._entries)
+        with self.app.app_context():
+            user = User.query.filter_by(email='perf1@example.com').first()
+            user.roles.remove(Role.query.filter_by(name='secretary').first())
+            db.session.commit()
+        with principal_cache._lock:
+            principal_cache._entries.update(other_worker)
+
+        response = self.client.get('/api/dashboard/society-stats', headers=self.get_headers('resident'))
+        self.log("Role revoke reaches every worker's cached principal", response.status_code == 403,
+                 f"Status {response.status_code}")
+
+    def test_society_stats_rollup(self):
+        """The society rollup must track complaint writes without drifting."""
+        print("\n📈 Testing Society Stats Rollup...")
+
+        headers = self.get_headers('secretary')
+        created = []
+        for i in range(3):
+            response = self.client.post('/api/complaints', headers=headers, json={
+                'title': f'Rollup complaint {i}',
+                'description': 'Created to exercise the society rollup',
+                'category': 'parking',
+                'priority': 'high'
+            })
+            created.append(response.get_json()['data']['id'])
+
+        self.client.patch(f'/api/complaints/{created[0]}/status', headers=headers,
+                          json={'status': 'resolved', 'resolution_note': 'Done'})
+        self.client.patch(f'/api/complaints/{created[1]}/status', headers=headers,
+                          json={'status': 'in_progress'})
+        self.client.put(f'/api/complaints/{created[1]}', headers=headers,
+                        json={'category': 'water', 'priority': 'low'})
+        self.client.delete(f'/api/complaints/{created[2]}', headers=headers)
+
+        with self.app.app_context():
+            result = SocietyStat.reconcile(dry_run=True)
+            self.log("Rollup matches complaint table after writes", result['drifted'] == 0,
+                     f"{result['drifted']} of {result['checked']} societies drifted")
+
+            society_id = db.session.get(Complaint, created[0]).society_id
+            rollup = SocietyStat.get_rollup(society_id)
+            self.log("Rollup counts created complaints",
+                     rollup['total'] == Complaint.query.filter_by(society_id=society_id).count(),
+                     f"Rollup total {rollup['total']}")
+
+            # Simulate drift and let the reconcile job repair it
+            SocietyStat.query.filter_by(society_id=society_id, dimension='total')\
+                .update({'count': 0})
+            db.session.commit()
+            result = SocietyStat.reconcile()
+            self.log("Reconcile repairs drifted rollup",
+                     result['repaired'] == 1 and SocietyStat.reconcile(dry_run=True)['drifted'] == 0,
+                     f"Repaired {result['repaired']}")
+
+            # A missing rollup is computed for the read without writing anything,
+            # and the caller's staged changes stay uncommitted
+            expected = SocietyStat.get_rollup(society_id)
+            member_id = User.query.filter_by(society_id=society_id).first().id
+            dashboard = DashboardService.compute_stats(member_id, society_id)
+            SocietyStat.query.filter_by(society_id=society_id).delete()
+            db.session.commit()
+            self.log("Dashboard falls back to the computed rollup",
+                     DashboardService.compute_stats(member_id, society_id) == dashboard)
+            staged = db.session.get(Complaint, created[0])
+            staged_title = staged.title
+            staged.title = 'Staged, never committed'
+            rollup = SocietyStat.get_rollup(society_id)
+            db.session.rollback()
+            self.log("Rollup miss is computed without writing",
+                     rollup == expected and SocietyStat.query.filter_by(society_id=society_id).count() == 0
+                     and db.session.get(Complaint, created[0]).title == staged_title)
+            SocietyStat.reconcile(society_id)
+
+        response, count = self.count_queries('GET', '/api/dashboard/society-stats', role='secretary')
+        self.log("Society stats succeeds", response.status_code == 200,
+                 f"Status {response.status_code}")
+        self.log(f"Society stats issues {SOCIETY_STATS_QUERIES} queries",
+                 count == SOCIETY_STATS_QUERIES, f"Executed {count} queries")
+
+    def test_bulk_auto_escalation(self):
+        """Auto-escalation must honour per-society thresholds in bounded queries."""
+        print("\n⏫ Testing Bulk Auto-Escalation...")
+
+        with self.app.app_context():
+            society = Society(name='Stale Society', city='Pune', auto_escalate_days=3)
+            # 0 means escalate at once, not the default of 7
+            eager = Society(name='Eager Society', city='Pune', auto_escalate_days=0)
+            db.session.add_all([society, eager])
+            db.session.flush()
+            resident = User(
+                email='stale@example.com',
+                password=generate_password_hash('password123'),
+                full_name='Stale Resident',
+                flat_number='B-1',
+                society_id=society.id,
+                fs_uniquifier=str(uuid.uuid4())
+            )
+            db.session.add(resident)
+            db.session.flush()
+
+            perf_resident = User.query.filter_by(email='perf2@example.com').first()
+            now = datetime.utcnow()
+            # (society, complainant, age in days, expected to escalate)
+            plan = [(society.id, resident.id, 5, True)] * 30 + \
+                   [(society.id, resident.id, 2, False)] * 10 + \
+                   [(perf_resident.society_id, perf_resident.id, 10, True)] * 30 + \
+                   [(perf_resident.society_id, perf_resident.id, 5, False)] * 10 + \
+                   [(eager.id, resident.id, 1, True)] * 5
+            for i, (society_id, complainant_id, age, _) in enumerate(plan):
+                db.session.add(Complaint(
+                    title=f'Stale complaint {i}',
+                    description='Seeded for auto-escalation',
+                    category='maintenance',
+                    complainant_id=complainant_id,
+                    society_id=society_id,
+                    created_at=now - timedelta(days=age)
+                ))
+            db.session.commit()
+            expected = sum(1 for *_, escalates in plan if escalates)
+
+            with QueryCounter(db.engine) as counter:
+                result = TaskService.auto_escalate_complaints(chunk_size=25)
+            self.log(f"Escalates {expected} stale complaints",
+                     result == {'success': True, 'escalated': expected}, str(result))
+            self.log(f"Escalation issues <= {AUTO_ESCALATE_MAX_QUERIES} queries for 3 chunks",
+                     counter.count <= AUTO_ESCALATE_MAX_QUERIES, f"Executed {counter.count} queries")
+
+            result = TaskService.auto_escalate_complaints(chunk_size=25)
+            self.log("Second run is a no-op", result.get('escalated') == 0, str(result))
+
+            escalations = Escalation.query.filter_by(is_auto_escalated=True).count()
+            self.log("One escalation per complaint", escalations == expected,
+                     f"{escalations} escalations")
+            drift = SocietyStat.reconcile(dry_run=True)['drifted']
+            self.log("Society rollup stays in step", drift == 0, f"{drift} societies drifted")
+
+            # A committee member acknowledges a candidate between the SELECT and the UPDATE
+            racing = []
+            for i in range(3):
+                complaint = Complaint(title=f'Racing complaint {i}', description='Seeded for auto-escalation',
+                                      category='maintenance', complainant_id=resident.id,
+                                      society_id=society.id, created_at=now - timedelta(days=5))
+                db.session.add(complaint)
+                db.session.flush()
+                racing.append(complaint.id)
+            db.session.commit()
+
+            def acknowledge_first(orm_execute_state):
+                if orm_execute_state.is_update and not acknowledged:
+                    acknowledged.append(racing[0])
+                    with db.engine.begin() as conn:
+                        conn.execute(db.text("UPDATE complaint SET status = 'acknowledged' WHERE id = :id"),
+                                     {'id': racing[0]})
+
+            acknowledged = []
+            event.listen(db.session, 'do_orm_execute', acknowledge_first)
+            try:
+                result = TaskService.auto_escalate_complaints(chunk_size=25)
+            finally:
+                event.remove(db.session, 'do_orm_execute', acknowledge_first)
+            status = db.session.get(Complaint, racing[0]).status
+            escalated = Escalation.query.filter(Escalation.complaint_id.in_(racing)).count()
+            notified = Notification.query.filter(Notification.related_complaint_id == racing[0]).count()
+            self.log("Complaints acknowledged mid-run are not escalated",
+                     result.get('escalated') == 2 and status == 'acknowledged'
+                     and escalated == 2 and notified == 0,
+                     f"{result} status={status} escalations={escalated} notifications={notified}")
+            # The out-of-band acknowledgement bypassed the rollup hooks
+            SocietyStat.reconcile(society.id)
+
+    def test_karma_aggregates(self):
+        """Monthly karma aggregates must follow the ledger and answer in one query."""
+        print("\n🏅 Testing Karma Aggregates...")
+
+        def ledger_totals():
+            rows = db.session.query(KarmaLog.user_id, KarmaLog.created_at, KarmaLog.reason, KarmaLog.points)
+            totals = {}
+            for user_id, created_at, reason, points in rows:
+                for key in ((user_id, created_at.strftime('%Y-%m'), reason),
+                            (user_id, 'all', reason), (user_id, 'all', '*')):
+                    entry = totals.setdefault(key, [0, 0])
+                    entry[0] += points
+                    entry[1] += 1
+            return totals
+
+        def aggregate_totals():
+            return {
+                (row.user_id, row.period, row.reason): [row.points, row.count]
+                for row in KarmaMonthlyAggregate.query if row.count
+            }
+
+        with self.app.app_context():
+            user = User.query.filter_by(email='perf1@example.com').first()
+            user_id = user.id
+            user.update_karma(10, KarmaReason.COMPLAINT_RESOLVED)
+            user.update_karma(-5, KarmaReason.COMPLAINT_AGAINST_RESOLVED)
+            user.update_karma(2, KarmaReason.HELPFUL_VOTE)
+            db.session.commit()
+            user.update_karma(2, KarmaReason.HELPFUL_VOTE)
+            last_month = datetime.utcnow().replace(day=1) - timedelta(days=1)
+            db.session.add(KarmaLog(user_id=user_id, points=15, created_at=last_month,
+                                    reason=KarmaReason.COMMUNITY_CONTRIBUTION))
+            db.session.commit()
+
+            TaskService.rebuild_karma_aggregates()
+            expected = ledger_totals()
+            self.log("Aggregates match the ledger", aggregate_totals() == expected)
+
+            now = datetime.utcnow()
+            with QueryCounter(db.engine) as counter:
+                monthly = KarmaLog.calculate_monthly_karma(user_id, now.year, now.month)
+            self.log("Monthly karma read issues 1 query", counter.count == 1,
+                     f"Executed {counter.count} queries")
+            legacy = sum(points for (uid, period, reason), (points, _) in expected.items()
+                         if uid == user_id and period == now.strftime('%Y-%m'))
+            self.log("Monthly karma matches the ledger", monthly == legacy, f"{monthly} vs {legacy}")
+            self.log("Previous month is kept apart",
+                     KarmaLog.calculate_monthly_karma(user_id, last_month.year, last_month.month) == 15)
+
+            # Until they are built, reads aggregate the ledger and write nothing
+            breakdown = KarmaMonthlyAggregate.get_breakdown(user_id)
+            KarmaMonthlyAggregate.query.filter_by(user_id=user_id).delete()
+            db.session.commit()
+            self.log("Missing aggregates are read from the ledger without writing",
+                     KarmaLog.calculate_monthly_karma(user_id, now.year, now.month) == monthly
+                     and KarmaLog.calculate_monthly_karma(user_id, last_month.year, last_month.month) == 15
+                     and KarmaMonthlyAggregate.get_breakdown(user_id) == breakdown
+                     and KarmaMonthlyAggregate.query.filter_by(user_id=user_id).count() == 0)
+
+            # Users pre-dating the table are built on first write
+            KarmaMonthlyAggregate.query.filter_by(user_id=user_id).delete()
+            db.session.commit()
+            db.session.get(User, user_id).update_karma(1, KarmaReason.COMPLAINT_FILED)
+            db.session.commit()
+            self.log("Missing aggregates are rebuilt on write", aggregate_totals() == ledger_totals())
+
+            entry = KarmaLog.query.filter_by(user_id=user_id).first()
+            db.session.delete(entry)
+            db.session.commit()
+            self.log("Ledger deletes are reflected", aggregate_totals() == ledger_totals())
+
+            TaskService.rebuild_karma_aggregates(batch_size=2)
+            self.log("Rebuild is idempotent", aggregate_totals() == ledger_totals())
+            breakdown = {
+                reason: [points, count]
+                for (uid, period, reason), (points, count) in ledger_totals().items()
+                if uid == user_id and period == 'all' and reason != '*'
+            }
+
+        response = self.client.get('/api/karma-stats', headers=self.get_headers('resident'))
+        returned = {item['reason']: [item['total_points'], item['count']]
+                    for item in response.get_json()['data']['breakdown']}
+        self.log("Karma stats breakdown matches the ledger", returned == breakdown, str(returned))
+
+    def test_karma_leaderboard(self):
+        """The ranked leaderboard must match SQL ordering, follow commits and skip the DB when warm."""
+        print("\n🏆 Testing Karma Leaderboard...")
+
+        def legacy(society_id):
+            users = User.query.filter_by(society_id=society_id, active=True).all()
+            return {u.id: sum(1 for o in users if o.karma_score > u.karma_score) + 1 for u in users}, \
+                sorted((u.karma_score for u in users), reverse=True)
+
+        with self.app.app_context():
+            society_id = User.query.filter_by(email='perf1@example.com').first().society_id
+            engine = db.engine
+
+        response, cold = self.count_queries('GET', '/api/leaderboard?limit=50')
+        data = response.get_json()['data']
+        response, warm = self.count_queries('GET', '/api/leaderboard?limit=50')
+        self.log("Warm leaderboard issues no queries", warm == 0, f"Cold {cold}, warm {warm}")
+
+        with self.app.app_context():
+            ranks, scores = legacy(society_id)
+            self.log("Leaderboard order matches SQL",
+                     [row['karma_score'] for row in data['leaderboard']] == scores[:50])
+            board = LeaderboardService.get(society_id)
+            self.log("Ranks match COUNT(*) query",
+                     all(board.rank(uid) == rank for uid, rank in ranks.items()))
+
+            climber = User.query.filter_by(email='perf2@example.com').first()
+            climber.update_karma(1000, 'manual_adjustment')
+            leaver = User.query.filter_by(email='perf3@example.com').first()
+            leaver.active = False
+            db.session.commit()
+            climber_id, leaver_id = climber.id, leaver.id
+
+        response, count = self.count_queries('GET', '/api/leaderboard?limit=50')
+        leaders = response.get_json()['data']['leaderboard']
+        self.log("Committed karma change is applied to the board without queries",
+                 leaders[0]['user_id'] == climber_id and count == 0, f"Executed {count} queries")
+        self.log("Deactivated resident leaves the board",
+                 all(row['user_id'] != leaver_id for row in leaders))
+
+        response, _ = self.count_queries('GET', '/api/leaderboard?type=bottom&limit=3')
+        bottom = [row['karma_score'] for row in response.get_json()['data']['leaderboard']]
+        self.log("Bottom leaderboard is ascending", bottom == sorted(bottom), str(bottom))
+
+        # Another worker has no local copy and reads the published board
+        LeaderboardService._local.clear()
+        response, count = self.count_queries('GET', '/api/leaderboard?limit=50')
+        self.log("Other workers load the board from the cache", count == 0 and
+                 response.get_json()['data']['leaderboard'] == leaders, f"Executed {count} queries")
+
+        with self.app.app_context():
+            # A commit while another worker holds the publish lock drops the board
+            lock_key = f'leaderboard_lock:{society_id}'
+            cache.add(lock_key, 'other-worker')
+            try:
+                db.session.get(User, climber_id).update_karma(-1000, 'manual_adjustment')
+                db.session.commit()
+            finally:
+                cache.delete(lock_key)
+            board = LeaderboardService.get(society_id)
+            self.log("Busy lock falls back to a rebuild",
+                     board.member(climber_id).karma_score == db.session.get(User, climber_id).karma_score)
+
+            # A change committed while a board is loading keeps it unpublished
+            LeaderboardService.invalidate(society_id)
+            load = LeaderboardService.load
+
+            def racing_load(sid):
+                board = load(sid)
+                LeaderboardService.apply_changes(sid, {})
+                return board
+
+            LeaderboardService.load = staticmethod(racing_load)
+            try:
+                LeaderboardService.get(society_id)
+            finally:
+                LeaderboardService.load = staticmethod(load)
+            self.log("Board loaded across a commit is not published",
+                     cache.get(LeaderboardService._keys(society_id)[0]) is None)
+
+        response = self.client.get('/api/karma-stats', headers=self.get_headers('resident'))
+        stats = response.get_json()['data']
+        with self.app.app_context():
+            ranks, _ = legacy(society_id)
+            resident = User.query.filter_by(email='perf1@example.com').first()
+            self.log("Karma stats rank matches COUNT(*) query",
+                     stats['rank'] == ranks[resident.id] and stats['total_users'] == len(ranks),
+                     f"Rank {stats['rank']} of {stats['total_users']}")
+
+            leaver = db.session.get(User, leaver_id)
+            leaver.active = True
+            db.session.commit()
+
+    def test_monthly_karma_bonus(self):
+        """The monthly bonus must award qualifying users once, in bounded queries."""
+        print("\n🎁 Testing Monthly Karma Bonus...")
+
+        with self.app.app_context():
+            society_id = User.query.filter_by(email='perf1@example.com').first().society_id
+            plan = [('bonus-a', True, 3), ('bonus-b', True, 4), ('bonus-c', True, 2), ('bonus-d', False, 3)]
+            users = {}
+            for name, active, resolved in plan:
+                user = User(
+                    email=f'{name}@example.com', password=generate_password_hash('password123'),
+                    full_name=name, flat_number=name, society_id=society_id, active=active,
+                    fs_uniquifier=str(uuid.uuid4())
+                )
+                db.session.add(user)
+                db.session.flush()
+                users[name] = user.id
+                for i in range(resolved):
+                    db.session.add(Complaint(
+                        title=f'{name} resolved {i}', description='Seeded for the monthly bonus',
+                        category='other', complainant_id=user.id, society_id=society_id,
+                        status='resolved', resolved_at=datetime(2020, 1, 10 + i)
+                    ))
+            # Resolved in the next month, so it must not count
+            db.session.add(Complaint(
+                title='bonus-c late', description='Seeded for the monthly bonus', category='other',
+                complainant_id=users['bonus-c'], society_id=society_id,
+                status='resolved', resolved_at=datetime(2020, 2, 1)
+            ))
+            db.session.commit()
+
+            with QueryCounter(db.engine) as counter:
+                result = TaskService.award_monthly_karma_bonus(2020, 1, chunk_size=1)
+            self.log("Awards only qualifying active users",
+                     result.get('awarded') == 2, str(result))
+            self.log(f"Bonus issues <= {MONTHLY_BONUS_MAX_QUERIES} queries for 2 chunks",
+                     counter.count <= MONTHLY_BONUS_MAX_QUERIES, f"Executed {counter.count} queries")
+
+            karma = {name: db.session.get(User, uid).karma_score for name, uid in users.items()}
+            self.log("Karma credited once", karma == {'bonus-a': 10, 'bonus-b': 10, 'bonus-c': 0, 'bonus-d': 0},
+                     str(karma))
+
+            result = TaskService.award_monthly_karma_bonus(2020, 1)
+            self.log("Retry for the same month is a no-op", result.get('awarded') == 0, str(result))
+
+            logs = KarmaLog.query.filter(KarmaLog.user_id.in_(users.values()),
+                                         KarmaLog.reason == KarmaReason.MONTHLY_BONUS).count()
+            notified = Notification.query.filter(Notification.user_id.in_(users.values()),
+                                                 Notification.title == 'Monthly Karma Bonus').count()
+            self.log("One ledger entry and notification per award", logs == 2 and notified == 2,
+                     f"{logs} logs, {notified} notifications")
+            self.log("Karma aggregates follow the bulk insert",
+                     KarmaMonthlyAggregate.get_breakdown(users['bonus-a'])
+                     == [{'reason': KarmaReason.MONTHLY_BONUS, 'total_points': 10, 'count': 1}])
+            board = LeaderboardService.get(society_id)
+            self.log("Leaderboard sees the bulk update",
+                     board.member(users['bonus-b']).karma_score == 10)
+
+            # An overlapping run pays bonus-a for March after this run picked
+            # its candidates; the ledger key must stop the second payment
+            for name in ('bonus-a', 'bonus-b'):
+                for i in range(3):
+                    db.session.add(Complaint(
+                        title=f'{name} march {i}', description='Seeded for the monthly bonus',
+                        category='other', complainant_id=users[name], society_id=society_id,
+                        status='resolved', resolved_at=datetime(2020, 3, 10 + i)
+                    ))
+            db.session.commit()
+
+            raced = []
+
+            def overlapping_run(state):
+                if state.is_insert and state.statement.table.name == 'karma_log' and not raced:
+                    raced.append(True)
+                    state.session.connection().execute(db.text(
+                        "INSERT INTO karma_log (user_id, points, reason, period, description, created_at) "
+                        "VALUES (:uid, 10, 'monthly_bonus', '2020-03', 'Monthly bonus 2020-03', :now)"
+                    ), {'uid': users['bonus-a'], 'now': datetime.utcnow()})
+
+            event.listen(db.session, 'do_orm_execute', overlapping_run)
+            try:
+                result = TaskService.award_monthly_karma_bonus(2020, 3)
+            finally:
+                event.remove(db.session, 'do_orm_execute', overlapping_run)
+            march = KarmaLog.query.filter_by(reason=KarmaReason.MONTHLY_BONUS, period='2020-03')\
+                .filter(KarmaLog.user_id.in_(users.values())).count()
+            self.log("Overlapping run pays only users it claimed",
+                     result.get('awarded') == 1 and march == 2
+                     and db.session.get(User, users['bonus-a']).karma_score == 10
+                     and db.session.get(User, users['bonus-b']).karma_score == 20,
+                     f"{result}, {march} March logs")
+
+    def test_weekly_reports(self):
+        """Weekly reports must match per-society counts in a fixed number of queries."""
+        print("\n🗓️  Testing Weekly Reports...")
+
+        from app.extensions import mail
+        from app.models import ComplaintStatus
+        from app.services.report_service import WeeklyReportService, PENDING_STATUSES
+
+        def legacy(society, since):
+            complaints = Complaint.query.filter_by(society_id=society.id)
+            return {
+                'name': society.name,
+                'new_complaints': complaints.filter(Complaint.created_at >= since).count(),
+                'resolved_complaints': complaints.filter(Complaint.resolved_at >= since).count(),
+                'pending_complaints': complaints.filter(Complaint.status.in_(PENDING_STATUSES)).count(),
+                'top_issues': [c.title for c in complaints.filter(Complaint.created_at >= since)
+                               .order_by(Complaint.support_count.desc(), Complaint.id).limit(3)]
+            }
+
+        with self.app.app_context():
+            since = datetime.utcnow() - timedelta(days=7)
+            secretary_role = Role.query.filter_by(name='secretary').first()
+            for n in range(3):
+                society = Society(name=f'Report Society {n}', city='Delhi')
+                db.session.add(society)
+                db.session.flush()
+                secretary = User(
+                    email=f'report{n}@example.com', password=generate_password_hash('password123'),
+                    full_name=f'Report Secretary {n}', flat_number='S-1', society_id=society.id,
+                    fs_uniquifier=str(uuid.uuid4())
+                )
+                secretary.roles.append(secretary_role)
+                db.session.add(secretary)
+                db.session.flush()
+                for i in range(4 + n):
+                    db.session.add(Complaint(
+                        title=f'Report {n}-{i}', description='Seeded for weekly reports',
+                        category='other', complainant_id=secretary.id, society_id=society.id,
+                        support_count=i % 3,
+                        status=ComplaintStatus.RESOLVED.value if i % 2 else ComplaintStatus.OPEN.value,
+                        resolved_at=datetime.utcnow() if i % 2 else None,
+                        created_at=datetime.utcnow() - timedelta(days=10 if i == 0 else 1)
+                    ))
+            db.session.commit()
+
+            with QueryCounter(db.engine) as counter:
+                reports = WeeklyReportService.collect(since)
+            self.log("Weekly aggregation issues 3 queries", counter.count == 3,
+                     f"Executed {counter.count} queries")
+            expected = {society.id: legacy(society, since) for society in Society.query.all()}
+            self.log("Grouped report matches per-society queries", reports == expected)
+
+            secretaries = User.query.filter(User.roles.any(name='secretary')).count()
+            before = Notification.query.filter(Notification.title.like('Weekly Report - %')).count()
+            with QueryCounter(db.engine) as counter:
+                result = WeeklyReportService.generate_reports(since)
+            written = Notification.query.filter(Notification.title.like('Weekly Report - %')).count() - before
+            self.log("One report per secretary", result.get('notifications') == secretaries == written,
+                     f"{written} of {secretaries}")
+            self.log(f"Report job issues <= {WEEKLY_REPORT_MAX_QUERIES} queries",
+                     counter.count <= WEEKLY_REPORT_MAX_QUERIES, f"Executed {counter.count} queries")
+
+            # Digest mail goes out in batches over one connection each
+            self.app.config.update(MAIL_SERVER='localhost', MAIL_SUPPRESS_SEND=True)
+            mail.init_app(self.app)
+            started = []
+            spawn = threading.Thread.start
+            threading.Thread.start = lambda thread: started.append(thread) or spawn(thread)
+            try:
+                with mail.record_messages() as outbox:
+                    result = WeeklyReportService.send_digests(since, batch_size=4)
+            finally:
+                threading.Thread.start = spawn
+                self.app.config['MAIL_SERVER'] = None
+            active = User.query.filter_by(active=True).count()
+            self.log("Digest mails every active resident in batches",
+                     len(outbox) == result.get('emails_queued') == active
+                     and result.get('batches') == -(-active // 4), str(result))
+            self.log("Without Celery batches are sent in turn, not a thread each",
+                     not started, f"{len(started)} threads started")
+            first = next(m for m in outbox if m.recipients == ['report0@example.com'])
+            self.log("Digest lists the week's top issue",
+                     expected[db.session.query(User.society_id).filter_by(email='report0@example.com').scalar()]
+                     ['top_issues'][0] in first.body)
+
+    def test_hot_queries_use_indexes(self):
+        """Hot endpoint queries must not fall back to full table scans."""
+        print("\n🗂️  Testing Hot Query Plans...")
+
+        with self.app.app_context():
+            resident = User.query.filter_by(email='perf1@example.com').first()
+            accused = User.query.filter_by(email='perf3@example.com').first()
+            complaint = Complaint(
+                title='Explain complaint', description='Exercises the repeat-offender check',
+                category='noise', complainant_id=resident.id, society_id=resident.society_id,
+                accused_flat=accused.flat_number, accused_user_id=accused.id
+            )
+            db.session.add(complaint)
+            db.session.commit()
+            complaint_id = complaint.id
+            resident_id = resident.id
+            engine = db.engine
+
+        cache.clear()  # make the dashboard hit the database
+        requests = [
+            ('GET', '/api/complaints', 'resident'),
+            ('GET', '/api/complaints?status=open', 'resident'),
+            ('GET', '/api/complaints?cursor=', 'resident'),
+            ('GET', '/api/dashboard/stats', 'resident'),
+            ('GET', '/api/notifications', 'resident'),
+            ('GET', '/api/notifications?unread_only=true', 'resident'),
+            ('GET', f'/api/users/{resident_id}/karma?cursor=', 'resident'),
+            ('GET', '/api/karma-stats', 'resident'),
+            ('PATCH', f'/api/complaints/{complaint_id}/status', 'secretary'),
+        ]
+
+        for method, url, role in requests:
+            with QueryCounter(engine) as counter:
+                kwargs = {'json': {'status': 'resolved'}} if method == 'PATCH' else {}
+                response = self.client.open(url, method=method, headers=self.get_headers(role), **kwargs)
+
+            scans = []
+            with engine.connect() as connection:
+                for statement, parameters in counter.executed:
+                    if statement.lstrip().upper().startswith('SELECT'):
+                        scans.extend(find_unindexed_steps(connection, statement, parameters))
+                connection.rollback()
+
+            self.log(f"{method} {url} avoids full scans and sorts",
+                     response.status_code == 200 and not scans,
+                     f"Status {response.status_code}; " + '; '.join(scans) if scans or response.status_code != 200 else "")
+
+    def test_dashboard_stats(self):
+        """Dashboard must match the per-number queries, cache hits and drop stale entries."""
+        print("\n🏠 Testing Dashboard Stats...")
+
+        with self.app.app_context():
+            for email in ('perf0@example.com', 'perf1@example.com', 'perf3@example.com'):
+                user = User.query.filter_by(email=email).first()
+                self.log(f"Aggregated dashboard matches legacy queries ({email})",
+                         DashboardService.compute_stats(user.id, user.society_id)
+                         == legacy_dashboard_stats(user))
+
+            # Flat numbers repeat across societies; only the caller's own
+            # society counts against them
+            resident = User.query.filter_by(email='perf1@example.com').first()
+            before = DashboardService.compute_stats(resident.id, resident.society_id)['complaints_against_me']
+            elsewhere = Society(name='Elsewhere Society', city='Delhi')
+            db.session.add(elsewhere)
+            db.session.flush()
+            db.session.add(Complaint(title='Same flat, other building', description='Not this resident',
+                                     category='noise', complainant_id=resident.id,
+                                     society_id=elsewhere.id, accused_flat=resident.flat_number))
+            db.session.commit()
+            after = DashboardService.compute_stats(resident.id, resident.society_id)['complaints_against_me']
+            self.log("complaints_against_me counts the caller's society only", after == before,
+                     f"{before} -> {after}")
+
+        cache.clear()
+        # Clearing the shared cache also drops the principal versions; re-warm
+        # the principal so the pin measures the dashboard itself
+        self.client.get('/api/notifications/unread-count', headers=self.get_headers('resident'))
+        response, cold = self.count_queries('GET', '/api/dashboard/stats')
+        self.log(f"Dashboard cache miss issues {DASHBOARD_QUERIES} queries",
+                 response.status_code == 200 and cold == DASHBOARD_QUERIES, f"Executed {cold} queries")
+        before = response.get_json()['data']
+
+        response, warm = self.count_queries('GET', '/api/dashboard/stats')
+        self.log("Dashboard cache hit issues no queries", warm == 0, f"Executed {warm} queries")
+
+        # A new complaint in the society must show up immediately
+        self.client.post('/api/complaints', headers=self.get_headers('secretary'), json={
+            'title': 'Dashboard complaint',
+            'description': 'Created to check dashboard invalidation',
+            'category': 'noise'
+        })
+        after = self.client.get('/api/dashboard/stats', headers=self.get_headers('resident')).get_json()['data']
+        self.log("Complaint commit invalidates society dashboards",
+                 after['total_complaints_open'] == before['total_complaints_open'] + 1,
+                 f"Open {before['total_complaints_open']} -> {after['total_complaints_open']}")
+
+        with self.app.app_context():
+            resident = User.query.filter_by(email='perf1@example.com').first()
+            Notification.create_notification(resident.id, 'Ping', 'Dashboard invalidation check')
+            db.session.commit()
+        after = self.client.get('/api/dashboard/stats', headers=self.get_headers('resident')).get_json()['data']
+        self.log("New notification invalidates user dashboard",
+                 after['unread_notifications'] == before['unread_notifications'] + 1,
+                 f"Unread {before['unread_notifications']} -> {after['unread_notifications']}")
+
+        self.client.patch('/api/notifications/mark-all-read', headers=self.get_headers('resident'))
+        after = self.client.get('/api/dashboard/stats', headers=self.get_headers('resident')).get_json()['data']
+        self.log("Bulk mark-all-read invalidates user dashboard", after['unread_notifications'] == 0,
+                 f"Unread {after['unread_notifications']}")
+
+    def test_complaint_search(self):
+        """Search must rank by relevance, follow writes and use the full-text index."""
+        print("\n🔎 Testing Complaint Search...")
+
+        # create_app() leaves the index to the migration; tests build the
+        # schema with create_all(), so install it the same way
+        with self.app.app_context():
+            at_startup = ComplaintSearch.backend().name
+            installed = ComplaintSearch.install()
+        self.log("App startup runs no search DDL", at_startup == 'like' and installed != 'like',
+                 f"At startup {at_startup}, installed {installed}")
+
+        headers = self.get_headers('secretary')
+        ids = {}
+        for key, title, description, flat in (
+            ('title', 'Seepage from terrace tank', 'Walls on the top floor are damp', 'C-301'),
+            ('body', 'Damp corridor', 'Probably seepage from the floor above', 'C-302'),
+            ('other', 'Lift stuck again', 'Third breakdown this week, please fix', 'D-401'),
+        ):
+            response = self.client.post('/api/complaints', headers=headers, json={
+                'title': title, 'description': description, 'category': 'other',
+                'accused_flat': flat
+            })
+            ids[key] = response.get_json()['data']['id']
+
+        def search(text, **params):
+            with self.app.app_context():
+                engine = db.engine
+            with QueryCounter(engine) as counter:
+                response = self.client.get('/api/complaints', headers=headers,
+                                           query_string={'search': text, **params})
+            return [c['id'] for c in response.get_json()['data']], counter
+
+        found, counter = search('seepage')
+        self.log("Title matches rank above description matches",
+                 found == [ids['title'], ids['body']], f"Got {found}")
+
+        with self.app.app_context():
+            backend = ComplaintSearch.backend().name
+            scans = []
+            with db.engine.connect() as connection:
+                for statement, parameters in counter.executed:
+                    if 'MATCH' in statement or '@@' in statement:
+                        scans.extend(step for step in find_unindexed_steps(connection, statement, parameters)
+                                     if 'TEMP B-TREE' not in step and 'Sort' not in step)
+                connection.rollback()
+        self.log("Search is served by the full-text index", backend != 'like' and not scans,
+                 f"Backend {backend}; " + '; '.join(scans))
+
+        found, _ = search('C-30')
+        self.log("Search matches prefixes by default",
+                 set(found) == {ids['title'], ids['body']}, f"Got {found}")
+        found, _ = search('seep')
+        self.log("A partial word matches the whole word",
+                 set(found) == {ids['title'], ids['body']}, f"Got {found}")
+        found, _ = search('C-30', search_prefix='false')
+        self.log("search_prefix=false matches whole words only", found == [], f"Got {found}")
+
+        self.client.put(f'/api/complaints/{ids["other"]}', headers=headers,
+                        json={'title': 'Lift seepage in shaft'})
+        self.client.delete(f'/api/complaints/{ids["body"]}', headers=headers)
+        found, _ = search('seepage')
+        self.log("Index follows updates and deletes",
+                 set(found) == {ids['title'], ids['other']}, f"Got {found}")
+
+        with self.app.app_context():
+            Complaint.query.filter_by(id=ids['title']).update({'title': 'Terrace tank overflow'})
+            db.session.commit()
+        found, _ = search('overflow')
+        self.log("Index follows bulk updates", found == [ids['title']], f"Got {found}")
+
+        with self.app.app_context():
+            ComplaintSearch.rebuild()
+        found, _ = search('overflow')
+        self.log("Rebuild keeps results", found == [ids['title']], f"Got {found}")
+
+    def test_complaint_export(self):
+        """Exports must stream every complaint in a fixed number of queries."""
+        print("\n📤 Testing Complaint Export...")
+
+        response = self.client.get('/api/complaints/export', headers=self.get_headers('resident'))
+        self.log("Export is secretary-only", response.status_code == 403, f"Status {response.status_code}")
+
+        # Warm the principal cache so only the export's own queries count
+        self.client.get('/api/complaints/export?format=bogus', headers=self.get_headers('secretary'))
+        with self.app.app_context():
+            engine = db.engine
+        with QueryCounter(engine) as counter:
+            response = self.client.get('/api/complaints/export', headers=self.get_headers('secretary'))
+            streamed = response.is_streamed
+            body = response.get_data(as_text=True)  # the body is produced while streaming
+        count = counter.count
+        rows = list(csv.DictReader(io.StringIO(body)))
+        with self.app.app_context():
+            secretary = User.query.filter_by(email='perf0@example.com').first()
+            expected = Complaint.query.filter_by(society_id=secretary.society_id).count()
+            anonymous = Complaint.query.filter_by(society_id=secretary.society_id, is_anonymous=True).first()
+            anonymous_id = anonymous.id
+        self.log(f"CSV export streams all rows in {EXPORT_QUERIES} queries",
+                 streamed and len(rows) == expected and count == EXPORT_QUERIES,
+                 f"{len(rows)} of {expected} rows, {count} queries")
+        by_id = {int(row['id']): row for row in rows}
+        self.log("Anonymous complainants are masked",
+                 by_id[anonymous_id]['complainant'] == 'Anonymous Resident')
+        self.log("Comments are included", 'Seeded comment' in by_id[anonymous_id]['comments'])
+
+        response = self.client.get('/api/complaints/export?format=ndjson&status=resolved',
+                                   headers={**self.get_headers('secretary'), 'Accept-Encoding': 'gzip'})
+        records = [json.loads(line) for line in gzip.decompress(response.get_data()).splitlines()]
+        self.log("Gzipped NDJSON export honours the status filter",
+                 response.headers.get('Content-Encoding') == 'gzip' and records
+                 and all(r['status'] == 'resolved' for r in records),
+                 f"{len(records)} records")
+
+        response = self.client.get('/api/complaints/export?from=2000-01-01&to=2000-12-31',
+                                   headers=self.get_headers('secretary'))
+        self.log("Date filter excludes rows outside the range",
+                 len(response.get_data(as_text=True).splitlines()) == 1)
+
+        formula = '=HYPERLINK("http://example.com","Click")'
+        with self.app.app_context():
+            secretary = User.query.filter_by(email='perf0@example.com').first()
+            db.session.add(Complaint(title=formula, description='-1+2', category='noise',
+                                     complainant_id=secretary.id, society_id=secretary.society_id,
+                                     created_at=datetime(2001, 6, 1)))
+            db.session.commit()
+        query = '/api/complaints/export?from=2001-01-01&to=2001-12-31'
+        row, = csv.DictReader(io.StringIO(
+            self.client.get(query, headers=self.get_headers('secretary')).get_data(as_text=True)))
+        record, = [json.loads(line) for line in self.client.get(
+            query + '&format=ndjson', headers=self.get_headers('secretary')).get_data(as_text=True).splitlines()]
+        self.log("CSV cells that would run as formulas are escaped",
+                 row['title'] == "'" + formula and row['description'] == "'-1+2", row['title'])
+        self.log("NDJSON keeps the original text", record['title'] == formula)
+
+    def test_evidence_pipeline(self):
+        """Uploads must record real sizes, commit on their own, process in the background and deduplicate."""
+        print("\n🖼️  Testing Evidence Pipeline...")
+
+        def png(width, height):
+            def chunk(kind, data):
+                return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+            rows = b''.join(b'\x00' + b'\x80\x40\x20' * width for _ in range(height))
+            return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+                    + chunk(b'IDAT', zlib.compress(rows)) + chunk(b'IEND', b''))
+
+        upload_folder = tempfile.mkdtemp()
+        self.app.config.update(UPLOAD_FOLDER=upload_folder, UPLOAD_GC_GRACE=0)
+        incoming = os.path.join(upload_folder, '.incoming')
+        # Run processing tasks inline; the in-memory test database is one
+        # shared connection that a task thread must not use mid-request
+        os.environ['SERVERLESS'] = 'true'
+
+        with self.app.app_context():
+            resident = User.query.filter_by(email='perf1@example.com').first()
+            own_id, repeat_id, by_hash_id = [c.id for c in Complaint.query.filter_by(
+                complainant_id=resident.id).order_by(Complaint.id).limit(3)]
+            other_id = Complaint.query.filter(Complaint.complainant_id != resident.id).first().id
+
+        def upload(complaint_id, data, name='photo.png'):
+            return self.client.post('/api/evidence', headers=self.get_headers('resident'), data={
+                'complaint_id': str(complaint_id),
+                'file': (io.BytesIO(data), name, 'image/png')
+            }, content_type='multipart/form-data')
+
+        stage = EvidenceUploadService.stage
+        staged_calls = []
+        EvidenceUploadService.stage = staticmethod(lambda file: staged_calls.append(file) or stage(file))
+        try:
+            response = upload(other_id, png(8, 5))
+        finally:
+            EvidenceUploadService.stage = staticmethod(stage)
+        self.log("Rejected uploads leave no temporary files",
+                 response.status_code == 403 and not (os.path.isdir(incoming) and os.listdir(incoming)),
+                 f"Status {response.status_code}")
+        self.log("Permission is checked before the upload is staged", not staged_calls,
+                 f"{len(staged_calls)} staged")
+        response = upload('not-a-number', png(8, 5))
+        self.log("Non-numeric complaint ID is a 400", response.status_code == 400,
+                 f"Status {response.status_code}")
+
+        image = png(640, 480)
+        response = upload(own_id, image)
+        evidence = response.get_json()['data']
+        stored_url = evidence['file_url'].split('?')[0]  # API URLs are signed
+        self.log("Upload records the real file size",
+                 response.status_code == 201 and evidence['file_size'] == len(image),
+                 f"file_size {evidence['file_size']} of {len(image)} bytes")
+        self.log("Staged file is moved into place",
+                 os.path.exists(os.path.join(upload_folder, stored_url.replace('/uploads/', '')))
+                 and not os.listdir(incoming))
+
+        with self.app.app_context():
+            processed = db.session.get(ComplaintEvidence, evidence['id'])
+            self.log("Background processing records image metadata",
+                     processed.processing_status == 'ready'
+                     and (processed.width, processed.height) == (640, 480)
+                     and processed.mime_type == 'image/png',
+                     f"{processed.processing_status} {processed.width}x{processed.height}")
+
+        # Without SERVERLESS the task runs on a thread with its own app context;
+        # it is started outside a request and joined before the session is reused
+        evidence_id = upload(own_id, png(12, 9)).get_json()['data']['id']
+        with self.app.app_context():
+            pending = db.session.get(ComplaintEvidence, evidence_id)
+            pending.processing_status = 'pending'
+            pending.width = pending.height = None
+            db.session.commit()
+            os.environ.pop('SERVERLESS')
+            started = process_evidence_task([evidence_id])
+            os.environ['SERVERLESS'] = 'true'
+            for thread in threading.enumerate():
+                if thread.ident == started.get('thread_id'):
+                    thread.join(timeout=5)
+            db.session.expire_all()
+            threaded = db.session.get(ComplaintEvidence, evidence_id)
+            self.log("Threaded task runs inside an app context",
+                     threaded.processing_status == 'ready' and threaded.width == 12,
+                     threaded.processing_status)
+
+        # A row deleted while it is processed must not abort the rest of the batch
+        doomed_id = upload(own_id, png(12, 9)).get_json()['data']['id']  # shares the stored file
+        with self.app.app_context():
+            for row in ComplaintEvidence.query.filter(ComplaintEvidence.id.in_([doomed_id, evidence_id])):
+                row.processing_status = 'pending'
+            db.session.commit()
+            local_path = EvidenceUploadService._local_path
+
+            def deleted_midway(file_url):
+                if db.session.get(ComplaintEvidence, doomed_id) is not None:
+                    db.session.execute(db.delete(ComplaintEvidence).where(ComplaintEvidence.id == doomed_id))
+                    db.session.commit()
+                    raise OSError('deleted while processing')
+                return local_path(file_url)
+
+            EvidenceUploadService._local_path = staticmethod(deleted_midway)
+            try:
+                result = EvidenceUploadService.process([doomed_id, evidence_id])
+            except Exception as e:
+                result = {'error': str(e)}
+            finally:
+                EvidenceUploadService._local_path = staticmethod(local_path)
+            self.log("Row deleted mid-processing doesn't abort the batch",
+                     result.get('failed') == 1 and result.get('processed') == 1, str(result))
+
+        # Identical content is stored once, and can be attached by hash alone
+        def stored_files():
+            return sorted(name for _, _, names in os.walk(os.path.join(upload_folder, 'evidence'))
+                          for name in names)
+
+        before = stored_files()
+        repeat = upload(repeat_id, image, name='same-photo.png').get_json()['data']
+        self.log("Repeat upload reuses the stored file",
+                 repeat['file_url'].split('?')[0] == stored_url and stored_files() == before,
+                 repeat['file_url'])
+        with self.app.app_context():
+            reused = db.session.get(ComplaintEvidence, repeat['id'])
+            self.log("Repeat upload reuses earlier processing",
+                     reused.processing_status == 'ready' and reused.width == 640)
+
+        digest = hashlib.sha256(image).hexdigest()
+        response = self.client.post('/api/evidence', headers=self.get_headers('resident'), data={
+            'complaint_id': str(by_hash_id), 'content_hash': digest, 'file_name': 'again.png'
+        })
+        by_hash = response.get_json().get('data') or {}
+        self.log("Known content attaches by hash without a file",
+                 response.status_code == 201 and by_hash.get('file_url', '').split('?')[0] == stored_url
+                 and by_hash.get('file_size') == len(image),
+                 f"Status {response.status_code}")
+        response = self.client.post('/api/evidence', headers=self.get_headers('resident'), data={
+            'complaint_id': str(by_hash_id), 'content_hash': '0' * 64
+        })
+        self.log("Unknown hash asks for the file", response.status_code == 404,
+                 f"Status {response.status_code}")
+
+        stored_path = os.path.join(upload_folder, stored_url.replace('/uploads/', ''))
+        self.client.delete(f"/api/evidence/{repeat['id']}", headers=self.get_headers('resident'))
+        self.client.delete(f"/api/evidence/{by_hash['id']}", headers=self.get_headers('resident'))
+        self.log("Shared file survives while still referenced", os.path.exists(stored_path))
+
+        # Orphans (e.g. from deleted complaints) are reclaimed by the sweep
+        orphan_dir = os.path.join(upload_folder, 'evidence', 'objects', 'ff')
+        os.makedirs(orphan_dir, exist_ok=True)
+        orphan = os.path.join(orphan_dir, 'f' * 64 + '.png')
+        with open(orphan, 'wb') as f:
+            f.write(b'orphaned')
+        os.utime(orphan, (time.time() - 60, time.time() - 60))
+        with self.app.app_context():
+            swept = EvidenceUploadService.collect_garbage()
+        self.log("Garbage collection removes only unreferenced files",
+                 swept['files'] == 1 and not os.path.exists(orphan) and os.path.exists(stored_path),
+                 f"Removed {swept['files']} files")
+
+        # The same bytes under another extension are a file of their own
+        as_jpg = upload(repeat_id, image, name='same-photo.jpg').get_json()['data']
+        jpg_path = os.path.join(upload_folder, as_jpg['file_url'].split('?')[0].replace('/uploads/', ''))
+        self.client.delete(f"/api/evidence/{as_jpg['id']}", headers=self.get_headers('resident'))
+        self.log("Deleting the last row for an extension removes that file",
+                 jpg_path != stored_path and not os.path.exists(jpg_path) and os.path.exists(stored_path))
+
+        stale_gif = os.path.splitext(stored_path)[0] + '.gif'
+        shared_thumb = os.path.splitext(stored_path)[0] + '.thumb.jpg'
+        for path in (stale_gif, shared_thumb):
+            with open(path, 'wb') as f:
+                f.write(b'left behind')
+            os.utime(path, (time.time() - 60, time.time() - 60))
+        with self.app.app_context():
+            swept = EvidenceUploadService.collect_garbage()
+        self.log("Garbage collection checks each extension, and keeps shared thumbnails",
+                 swept['files'] == 1 and not os.path.exists(stale_gif)
+                 and os.path.exists(shared_thumb) and os.path.exists(stored_path),
+                 f"Removed {swept['files']} files")
+
+        # List previews come from the complaint row; deleting the shown image moves on
+        with self.app.app_context():
+            first, second = ComplaintEvidence.query.filter(
+                ComplaintEvidence.id.in_([evidence['id'], evidence_id])
+            ).order_by(ComplaintEvidence.id).all()
+            first.thumbnail_url, second.thumbnail_url = '/uploads/t/first.jpg', '/uploads/t/second.jpg'
+            db.session.get(Complaint, own_id).preview_url = None
+            db.session.flush()
+            EvidenceUploadService._claim_preview(first)
+            EvidenceUploadService._claim_preview(second)
+            db.session.commit()
+            first_id = first.id
+
+        def preview():
+            with self.app.app_context():
+                return Complaint.to_list_dicts([db.session.get(Complaint, own_id)])[0]['preview_url'].split('?')[0]
+
+        self.log("List view serves the first thumbnail as preview", preview() == '/uploads/t/first.jpg',
+                 preview())
+        self.client.delete(f'/api/evidence/{first_id}', headers=self.get_headers('resident'))
+        self.log("Deleting the previewed image falls back to the next one",
+                 preview() == '/uploads/t/second.jpg', preview())
+        self.log("Deleting the last reference unlinks the file", not os.path.exists(stored_path))
+        os.environ.pop('SERVERLESS')
+
+    def test_upload_serving(self):
+        """Uploads must need a valid signature and support caching, ranges and proxy hand-off."""
+        print("\n📦 Testing Upload Serving...")
+
+        upload_folder = tempfile.mkdtemp()
+        self.app.config['UPLOAD_FOLDER'] = upload_folder
+        content = bytes(range(256)) * 64
+        digest = hashlib.sha256(content).hexdigest()
+        object_path = f'evidence/objects/{digest[:2]}/{digest}.mp4'
+        for path in (object_path, 'evidence/7/legacy.mp4'):
+            os.makedirs(os.path.join(upload_folder, os.path.dirname(path)), exist_ok=True)
+            with open(os.path.join(upload_folder, path), 'wb') as f:
+                f.write(content)
+
+        with self.app.test_request_context():
+            signed = sign_upload_url(f'/uploads/{object_path}')
+            legacy = sign_upload_url('/uploads/evidence/7/legacy.mp4')
+            tampered = re.sub(r'sig=\w+', 'sig=' + '0' * 32, signed)
+
+        for label, url in (("Unsigned", f'/uploads/{object_path}'), ("Tampered", tampered),
+                           ("Signed for another file", signed.replace(object_path, 'evidence/7/legacy.mp4'))):
+            response = self.client.get(url)
+            self.log(f"{label} upload URL is refused", response.status_code == 403,
+                     f"Status {response.status_code}")
+
+        response = self.client.get(signed)
+        etag = response.headers.get('ETag')
+        self.log("Content-addressed files are cached as immutable",
+                 response.status_code == 200 and response.get_data() == content
+                 and 'immutable' in response.headers.get('Cache-Control', '') and etag,
+                 response.headers.get('Cache-Control'))
+        response = self.client.get(signed, headers={'If-None-Match': etag})
+        self.log("Matching ETag returns 304", response.status_code == 304, f"Status {response.status_code}")
+        response = self.client.get(signed, headers={'Range': 'bytes=100-199'})
+        self.log("Range requests return partial content",
+                 response.status_code == 206 and response.get_data() == content[100:200]
+                 and response.headers.get('Content-Range') == f'bytes 100-199/{len(content)}',
+                 f"Status {response.status_code}")
+        response = self.client.get(legacy)
+        self.log("Other uploads revalidate", response.headers.get('Cache-Control') == 'private, no-cache',
+                 response.headers.get('Cache-Control'))
+
+        self.app.config['UPLOAD_ACCEL_REDIRECT'] = '/protected-uploads/'
+        try:
+            response = self.client.get(signed)
+        finally:
+            self.app.config['UPLOAD_ACCEL_REDIRECT'] = None
+        self.log("Transfers can be handed to the front proxy",
+                 response.headers.get('X-Accel-Redirect') == f'/protected-uploads/{object_path}'
+                 and response.get_data() == b'' and response.mimetype == 'video/mp4',
+                 response.headers.get('X-Accel-Redirect'))
+
+        response = self.client.get('/api/complaints/1', headers=self.get_headers('resident'))
+        urls = [e['file_url'] for e in response.get_json()['data'].get('evidence', [])]
+        self.log("API hands out signed evidence URLs", urls and all('sig=' in url for url in urls), urls[:1])
+
+        with self.app.app_context():
+            other = Society(name='Evidence Outsiders', city='Nagpur')
+            db.session.add(other)
+            db.session.flush()
+            outsider = User(email='evidence-outsider@example.com', password='x', full_name='Outsider',
+                            flat_number='O-1', society_id=other.id, fs_uniquifier=str(uuid.uuid4()))
+            db.session.add(outsider)
+            db.session.commit()
+            evidence_id = ComplaintEvidence.query.filter_by(complaint_id=1).first().id
+            with self.app.test_request_context():
+                outsider_headers = {'Authorization': f'Bearer {create_access_token(identity=str(outsider.id))}'}
+        for url in (f'/api/evidence/{evidence_id}', '/api/evidence/complaints/1/evidence'):
+            response = self.client.get(url, headers=outsider_headers)
+            self.log(f"Other societies can't get signed links from {url}",
+                     response.status_code == 403 and 'sig=' not in response.get_data(as_text=True),
+                     f"Status {response.status_code}")
+        response = self.client.get(f'/api/evidence/{evidence_id}', headers=self.get_headers('resident'))
+        self.log("Residents of the society still see evidence", response.status_code == 200
+                 and 'sig=' in response.get_json()['data']['file_url'], f"Status {response.status_code}")
+
+    def test_notification_coalescing(self):
+        """Repeat notifications must merge and a batch must go out as one insert."""
+        print("\n🔔 Testing Notification Coalescing...")
+
+        response = self.client.post('/api/complaints', headers=self.get_headers('secretary'), json={
+            'title': 'Coalescing complaint',
+            'description': 'Created to check notification coalescing',
+            'category': 'noise'
+        })
+        complaint_id = response.get_json()['data']['id']
+
+        def comment_notifications():
+            with self.app.app_context():
+                return Notification.query.filter_by(
+                    related_complaint_id=complaint_id, notification_type='comment'
+                ).all()
+
+        first_created = None
+        for i in range(3):
+            self.client.post(f'/api/complaints/{complaint_id}/comments',
+                             headers=self.get_headers('resident'), json={'comment_text': f'Comment {i}'})
+            if first_created is None:
+                first_created = comment_notifications()[0].created_at
+            time.sleep(0.01)
+        notifications = comment_notifications()
+        self.log("Repeated comments coalesce into one notification",
+                 len(notifications) == 1 and notifications[0].coalesced_count == 3,
+                 f"{len(notifications)} rows, counts {[n.coalesced_count for n in notifications]}")
+        self.log("Coalesced notification keeps the latest message",
+                 notifications[0].message.endswith('"Coalescing complaint"'))
+        self.log("Coalescing bumps updated_at and keeps created_at",
+                 notifications[0].created_at == first_created
+                 and notifications[0].updated_at > first_created,
+                 f"created {notifications[0].created_at}, updated {notifications[0].updated_at}")
+
+        # Once read, the next comment starts a fresh notification
+        self.client.patch('/api/notifications/mark-all-read', headers=self.get_headers('secretary'))
+        self.client.post(f'/api/complaints/{complaint_id}/comments',
+                         headers=self.get_headers('resident'), json={'comment_text': 'After read'})
+        notifications = comment_notifications()
+        self.log("Read notifications are not coalesced into", len(notifications) == 2,
+                 f"{len(notifications)} rows")
+
+        with self.app.app_context():
+            user_ids = [u.id for u in User.query.filter(User.email.like('perf%')).all()]
+            with QueryCounter(db.engine) as counter:
+                for i in range(5):
+                    NotificationDispatcher.notify_many(user_ids, f'Broadcast {i}', 'Batched notice')
+                db.session.commit()
+            inserts = [s for s in counter.statements if s.startswith('INSERT INTO notification')]
+            self.log("Queued notifications are written with one bulk insert",
+                     len(inserts) == 1 and Notification.query.filter_by(message='Batched notice').count()
+                     == 5 * len(user_ids),
+                     f"{len(inserts)} inserts")
+
+    def test_notification_stream(self):
+        """The SSE stream must push commits, stay idle without queries and clean up."""
+        print("\n📡 Testing Notification Stream...")
+
+        self.app.config.update(NOTIFICATION_STREAM_HEARTBEAT=1, NOTIFICATION_STREAM_MAX_AGE=3)
+        access_token = self.tokens['resident']
+
+        blocked = self.client.get(f'/api/notifications/stream?token={access_token}')
+        self.log("Stream rejects a long-lived access token in the URL", blocked.status_code == 401,
+                 f"Status {blocked.status_code}")
+
+        issued = self.client.post('/api/notifications/stream-token', headers=self.get_headers('resident'))
+        token = issued.get_json()['data']['token']
+        blocked = self.client.get(f'/api/notifications?token={token}')
+        self.log("Query-string token is rejected outside the stream", blocked.status_code == 401,
+                 f"Status {blocked.status_code}")
+        blocked = self.client.get('/api/notifications', headers={'Authorization': f'Bearer {token}'})
+        self.log("Stream token is rejected as a bearer token", blocked.status_code == 401,
+                 f"Status {blocked.status_code}")
+
+        response = self.client.get(f'/api/notifications/stream?token={token}', buffered=False)
+        self.log("Stream accepts a stream token in the URL",
+                 response.status_code == 200 and response.mimetype == 'text/event-stream',
+                 f"Status {response.status_code}")
+        events = iter(response.response)
+        next(events)  # retry hint
+        first = next(events)
+        self.log("Stream opens with the unread count", first.startswith(b'event: unread'))
+
+        with self.app.app_context():
+            engine = db.engine
+        with QueryCounter(engine) as counter:
+            idle = next(events)
+        self.log("Idle stream sends heartbeats without querying",
+                 idle.startswith(b':') and counter.count == 0, f"Executed {counter.count} queries")
+
+        with self.app.app_context():
+            resident_id = User.query.filter_by(email='perf1@example.com').first().id
+            Notification.create_notification(resident_id, 'Live', 'Pushed over the stream')
+            db.session.commit()
+        pushed = next(events)
+        self.log("Committed notification is pushed", b'event: notification' in pushed and b'"Live"' in pushed)
+        self.log("Unread delta follows the notification", b'"delta": 1' in next(events))
+
+        # A write that bypasses this process's hooks, as another worker's would
+        with self.app.app_context():
+            db.session.execute(db.insert(Notification), [{
+                'user_id': resident_id, 'title': 'Other worker', 'message': 'Bridged',
+                'created_at': datetime.utcnow()
+            }])
+            db.session.commit()
+            woken = broker.poll_once(self.app, datetime.utcnow() - timedelta(seconds=5))
+        self.log("Bridge poll wakes streams for other workers' commits",
+                 resident_id in woken and b'"Other worker"' in next(events))
+
+        response.close()
+        self.log("Closed stream unsubscribes", broker.client_count() == 0,
+                 f"{broker.client_count()} subscribers left")
+
+        max_clients = self.app.config['NOTIFICATION_STREAM_MAX_CLIENTS']
+        self.app.config['NOTIFICATION_STREAM_MAX_CLIENTS'] = 0
+        response = self.client.get('/api/notifications/stream', headers=self.get_headers('resident'))
+        self.log("Stream at capacity returns 503 with Retry-After",
+                 response.status_code == 503 and 'Retry-After' in response.headers,
+                 f"Status {response.status_code}")
+        self.app.config['NOTIFICATION_STREAM_MAX_CLIENTS'] = max_clients
+
+    def test_sqlite_cache(self):
+        """The shared cache must be visible across processes and honour TTL and size bounds."""
+        print("\n🗄️  Testing SQLite Cache Backend...")
+
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, 'cache.db')
+            cache = SQLiteCache(path, threshold=50, prune_interval=10)
+
+            child = multiprocessing.Process(target=_set_in_child, args=(path,))
+            child.start()
+            child.join()
+            self.log("Entry set by another process is visible",
+                     cache.get('society_stats_1') == {'total_complaints': 7})
+
+            cache.set('short', 'value', timeout=1)
+            cache.set('forever', 'value', timeout=0)
+            time.sleep(1.1)
+            self.log("Expired entry is not returned",
+                     cache.get('short') is None and not cache.has('short'))
+            self.log("add() replaces an expired entry", cache.add('short', 'again'))
+            self.log("inc() is atomic and starts from 0",
+                     cache.inc('counter') == 1 and cache.inc('counter', 5) == 6)
+
+            for i in range(200):
+                cache.set(f'bulk_{i}', i)
+            (count,) = cache._db.execute('SELECT COUNT(*) FROM cache').fetchone()
+            self.log("Prune keeps the cache within its threshold",
+                     count <= 50 + cache.prune_interval and cache.get('bulk_199') == 199,
+                     f"{count} entries")
+
+    def test_batch_serializer_matches_row_serializer(self):
+        """Batch serializer output must match per-row to_list_dict()."""
+        print("\n🔁 Testing Batch Serializer Output...")
+
+        with self.app.app_context():
+            viewer = User.query.filter_by(email='perf1@example.com').first()
+            complaints = Complaint.query.order_by(Complaint.id).limit(50).all()
+
+            expected = [c.to_list_dict(viewer) for c in complaints]
+            self.log("Batch output matches (with viewer)",
+                     Complaint.to_list_dicts(complaints, viewer) == expected)
+
+            expected = [c.to_list_dict() for c in complaints]
+            self.log("Batch output matches (anonymous viewer)",
+                     Complaint.to_list_dicts(complaints) == expected)
+
+    def test_request_instrumentation(self):
+        """Instrumentation must be inert when off and report per-route SQL when on."""
+        print("\n📈 Testing Request Instrumentation...")
+
+        with self.app.app_context():
+            engine = db.engine
+        response = self.client.get('/api/complaints', headers=self.get_headers('resident'))
+        self.log("Disabled: no Server-Timing header", 'Server-Timing' not in response.headers)
+        self.log("Disabled: no engine listeners installed",
+                 not event.contains(engine, 'after_cursor_execute', _after_cursor_execute))
+
+        class InstrumentedConfig(TestingConfig):
+            INSTRUMENTATION_ENABLED = True
+            INSTRUMENTATION_N_PLUS_ONE_THRESHOLD = INSTRUMENTATION_N_PLUS_ONE_THRESHOLD
+
+        config['instrumented'] = InstrumentedConfig
+        app = create_app('instrumented')
+
+        @app.route('/n-plus-one')
+        def n_plus_one():
+            # Deliberately lazy-loads every complainant
+            return {'names': [c.complainant.full_name for c in Complaint.query.limit(6)]}
+
+        client = app.test_client()
+        with app.app_context():
+            society = Society(name='Instrumented Society', city='Pune')
+            db.session.add(society)
+            db.session.flush()
+            admin = User(email='metrics-admin@example.com', password='x', full_name='Metrics Admin',
+                         flat_number='M-1', society_id=society.id, fs_uniquifier=str(uuid.uuid4()))
+            admin.roles.append(Role.query.filter_by(name='admin').first())
+            db.session.add(admin)
+            for i in range(6):
+                resident = User(email=f'metrics{i}@example.com', password='x', full_name=f'Metrics {i}',
+                                flat_number=f'M-{10 + i}', society_id=society.id, fs_uniquifier=str(uuid.uuid4()))
+                db.session.add(resident)
+                db.session.flush()
+                db.session.add(Complaint(title=f'Metrics complaint {i}', description='Instrumented',
+                                         category='noise', complainant_id=resident.id,
+                                         society_id=society.id))
+            db.session.commit()
+            with app.test_request_context():
+                headers = {'Authorization': f'Bearer {create_access_token(identity=str(admin.id))}'}
+
+        route_metrics.reset()
+        warnings = []
+        app.logger.warning = lambda message, *args, **kwargs: warnings.append(message)
+
+        response = client.get('/api/complaints', headers=headers)
+        timing = response.headers.get('Server-Timing', '')
+        match = re.search(r'db;dur=[\d.]+;desc="(\d+) queries"', timing)
+        self.log("Enabled: Server-Timing reports DB time and query count",
+                 response.status_code == 200 and match is not None and 'app;dur=' in timing, timing)
+        self.log("Enabled: no N+1 warning for the complaint list", not warnings, str(warnings))
+
+        client.get('/n-plus-one')
+        self.log("Repeated statement is logged as a likely N+1",
+                 len(warnings) == 1 and 'GET /n-plus-one' in warnings[0], str(warnings))
+
+        response = client.get('/api/debug/metrics', headers=headers)
+        routes = response.get_json()['data']['routes'] if response.status_code == 200 else {}
+        listing = routes.get('GET /api/complaints', {})
+        self.log("Metrics endpoint serves per-route numbers to admins",
+                 listing.get('requests') == 1 and listing.get('max_queries') == int(match.group(1)),
+                 json.dumps(listing)[:200])
+        self.log("Route histogram accounts for every request",
+                 sum(b['count'] for b in listing.get('histogram', [])) == listing.get('requests')
+                 and listing.get('slowest_statements'))
+        self.log("N+1 requests are counted per route",
+                 routes.get('GET /n-plus-one', {}).get('n_plus_one_requests') == 1)
+
+        response = client.get('/api/debug/metrics', headers=self.get_headers('resident'))
+        self.log("Metrics endpoint rejects non-admins", response.status_code in (401, 403),
+                 f"Status {response.status_code}")
+
+        app.config['INSTRUMENTATION_ENABLED'] = False
+        response = client.get('/api/debug/metrics', headers=headers)
+        self.log("Metrics endpoint is not served while disabled", response.status_code == 404,
+                 f"Status {response.status_code}")
+
+        route_metrics.reset()
+        with app.app_context():
+            db.engine.dispose()
+
+    def test_prometheus_metrics(self):
+        """Metrics must be off by default and, when on, cover requests, pool, cache and tasks."""
+        print("\n📡 Testing Prometheus Metrics...")
+
+        response = self.client.get('/api/metrics')
+        self.log("Metrics endpoint is not served while disabled", response.status_code == 404,
+                 f"Status {response.status_code}")
+        self.log("Task row counts are read from task results",
+                 app_metrics.rows_processed({'success': True, 'escalated': 3}) == 3
+                 and app_metrics.rows_processed({'success': True, 'stats': {}}) is None)
+
+        if app_metrics.CollectorRegistry is None:
+            self.log("prometheus_client not installed; exposition checks skipped", True)
+            return
+
+        class MetricsConfig(TestingConfig):
+            METRICS_ENABLED = True
+            METRICS_TOKEN = 'scrape-secret'
+
+        config['metrics'] = MetricsConfig
+        app = create_app('metrics')
+        client = app.test_client()
+        with app.app_context():
+            society = Society(name='Metrics Society', city='Delhi')
+            db.session.add(society)
+            db.session.flush()
+            user = User(email='prom@example.com', password='x', full_name='Prom Resident',
+                        flat_number='P-1', society_id=society.id, fs_uniquifier=str(uuid.uuid4()))
+            user.roles.append(Role.query.filter_by(name='resident').first())
+            db.session.add(user)
+            db.session.commit()
+            with app.test_request_context():
+                headers = {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+            TaskService.cleanup_old_notifications()
+
+        principal_cache.clear()
+        for _ in range(3):
+            client.get('/api/dashboard/stats', headers=headers)
+        client.get('/api/complaints/999999', headers=headers)
+
+        response = client.get('/api/metrics')
+        self.log("Scrape requires the metrics token", response.status_code == 401,
+                 f"Status {response.status_code}")
+        response = client.get('/api/metrics', headers={'Authorization': 'Bearer scrape-secret'})
+        text = response.get_data(as_text=True)
+
+        def sample(name, **labels):
+            for line in text.splitlines():
+                match = re.match(r'(\w+)\{(.*)\} (\S+)$', line)
+                if match and match.group(1) == name and \
+                        dict(re.findall(r'(\w+)="([^"]*)"', match.group(2))) == labels:
+                    return float(match.group(3))
+            return None
+
+        self.log("Exposition is served in Prometheus text format",
+                 response.status_code == 200 and response.content_type.startswith('text/plain'),
+                 response.content_type)
+        self.log("Requests are counted per blueprint and status class",
+                 sample('padosi_http_requests_total', blueprint='dashboard', method='GET', status='2xx') == 3
+                 and sample('padosi_http_requests_total', blueprint='complaints', method='GET', status='4xx') == 1)
+        self.log("Request latency histogram is recorded",
+                 sample('padosi_http_request_duration_seconds_count', blueprint='dashboard', method='GET') == 3)
+        self.log("Pool checkout wait is recorded",
+                 re.search(r'^padosi_db_pool_checkout_wait_seconds_count [1-9]', text, re.M) is not None)
+        self.log("Principal cache hits and misses are counted",
+                 sample('padosi_cache_lookups_total', cache='principal', result='hit') == 3
+                 and sample('padosi_cache_lookups_total', cache='principal', result='miss') == 1)
+        self.log("Shared cache lookups are counted",
+                 (sample('padosi_cache_lookups_total', cache='shared', result='hit') or 0) >= 1)
+        self.log("TaskService job durations are recorded",
+                 sample('padosi_task_duration_seconds_count', task='cleanup_old_notifications',
+                        status='success') == 1)
+
+        # Worker processes write to shared files; a scrape sums them
+        multiproc_dir = tempfile.mkdtemp(prefix='padosi_prom_')
+        os.environ['PROMETHEUS_MULTIPROC_DIR'] = multiproc_dir
+        try:
+            context = multiprocessing.get_context('spawn')
+            children = [context.Process(target=_observe_task_in_child) for _ in range(2)]
+            for child in children:
+                child.start()
+            for child in children:
+                child.join(60)
+        finally:
+            del os.environ['PROMETHEUS_MULTIPROC_DIR']
+        text = app_metrics.render(multiproc_dir)[0].decode()
+        self.log("Samples from several processes are aggregated",
+                 sample('padosi_task_rows_processed_total', task='child_job') == 10
+                 and sample('padosi_task_duration_seconds_count', task='child_job', status='success') == 2,
+                 f"exit codes {[c.exitcode for c in children]}")
+
+        with app.app_context():
+            db.engine.dispose()
+
+    def test_engine_profiles(self):
+        """SQLite files run in WAL with the tuned PRAGMAs; PostgreSQL gets a sized pool."""
+        print("\n🗄️  Testing Engine Profiles...")
+
+        settings = {key: getattr(TestingConfig, key) for key in dir(TestingConfig) if key.isupper()}
+
+        profile = engine_profile({**settings, 'SQLALCHEMY_DATABASE_URI': 'postgresql://u:p@db/padosi'})
+        self.log("PostgreSQL profile sizes, pre-pings and recycles the pool",
+                 profile.get('pool_size') == settings['DB_POOL_SIZE']
+                 and profile.get('max_overflow') == settings['DB_MAX_OVERFLOW']
+                 and profile.get('pool_pre_ping') is True and profile.get('pool_recycle'),
+                 str(profile))
+        self.log("PostgreSQL connections carry no session-wide timeouts",
+                 'statement_timeout' not in profile.get('connect_args', {}).get('options', ''),
+                 str(profile))
+        self.log("In-memory SQLite keeps the driver defaults", engine_profile(settings) == {})
+
+        class FakeApp:
+            config = {**settings, 'SQLALCHEMY_DATABASE_URI': 'postgresql://u:p@db/padosi',
+                      'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': 3, 'connect_args': {'sslmode': 'require'}}}
+        configure_engine_options(FakeApp)
+        options = FakeApp.config['SQLALCHEMY_ENGINE_OPTIONS']
+        self.log("Explicit engine options win over the profile",
+                 options['pool_size'] == 3 and options['max_overflow'] == settings['DB_MAX_OVERFLOW']
+                 and options['connect_args'].get('sslmode') == 'require'
+                 and options['connect_args'].get('connect_timeout') == 10,
+                 str(options))
+
+        # Timeouts are SET LOCAL per request transaction; migrations, CLI,
+        # jobs and the streaming export run without them
+        class FakeConnection:
+            class dialect:
+                name = 'postgresql'
+
+            def __init__(self):
+                self.statements = []
+
+            def exec_driver_sql(self, statement):
+                self.statements.append(statement)
+
+        def timeouts_set(path=None):
+            connection = FakeConnection()
+            if path is None:
+                with self.app.app_context():
+                    _apply_request_timeouts(None, None, connection)
+            else:
+                with self.app.test_request_context(path):
+                    _apply_request_timeouts(None, None, connection)
+            return connection.statements
+
+        self.log("Request transactions SET LOCAL the statement and idle timeouts",
+                 timeouts_set('/api/complaints') == request_timeout_statements(self.app.config)
+                 and f"statement_timeout = {settings['DB_STATEMENT_TIMEOUT']}" in timeouts_set('/api/complaints')[0],
+                 str(timeouts_set('/api/complaints')))
+        self.log("Background jobs and the streaming export run without timeouts",
+                 timeouts_set() == [] and timeouts_set('/api/complaints/export') == [],
+                 str(timeouts_set('/api/complaints/export')))
+
+        workdir = tempfile.mkdtemp(prefix='padosi_profile_')
+
+        class FileConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(workdir, 'profile.db')}"
+
+        config['sqlite-file'] = FileConfig
+        app = create_app('sqlite-file')
+        with app.app_context():
+            pragma = lambda name: db.session.execute(db.text(f'PRAGMA {name}')).scalar()
+            journal, synchronous, busy = pragma('journal_mode'), pragma('synchronous'), pragma('busy_timeout')
+            pool_size = db.engine.pool.size()
+            db.session.remove()
+            db.engine.dispose()
+        self.log("SQLite file connections use WAL with synchronous=NORMAL",
+                 journal == 'wal' and synchronous == 1, f"journal={journal} synchronous={synchronous}")
+        self.log("SQLite busy timeout and pool size come from the profile",
+                 busy == settings['DB_BUSY_TIMEOUT'] and pool_size == settings['DB_POOL_SIZE'],
+                 f"busy_timeout={busy} pool_size={pool_size}")
+
+        FileConfig.DB_ENGINE_PROFILE = 'off'
+        FileConfig.SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(workdir, 'plain.db')}"
+        app = create_app('sqlite-file')
+        with app.app_context():
+            journal = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+            db.session.remove()
+            db.engine.dispose()
+        self.log("DB_ENGINE_PROFILE=off leaves SQLite on its default journal", journal == 'delete', journal)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    def test_replica_routing(self):
+        """GET reads go to the replica, writes to the primary, and writers stick to the primary."""
+        print("\n🪞 Testing Read Replica Routing...")
+
+        workdir = tempfile.mkdtemp(prefix='padosi_replica_')
+        primary_path = os.path.join(workdir, 'primary.db')
+        replica_path = os.path.join(workdir, 'replica.db')
+
+        class ReplicaConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{primary_path}'
+            SQLALCHEMY_REPLICA_URI = f'sqlite:///{replica_path}'
+            REPLICA_STICKY_SECONDS = 1
+
+        config['replica'] = ReplicaConfig
+        app = create_app('replica')
+        client = app.test_client()
+
+        with app.app_context():
+            society = Society(name='Replica Society', city='Pune')
+            db.session.add(society)
+            db.session.flush()
+            author = User(email='replica-author@example.com', password='x', full_name='Replica Author',
+                          flat_number='R-1', society_id=society.id, fs_uniquifier=str(uuid.uuid4()))
+            reader = User(email='replica-reader@example.com', password='x', full_name='Replica Reader',
+                          flat_number='R-2', society_id=society.id, fs_uniquifier=str(uuid.uuid4()))
+            db.session.add_all([author, reader])
+            db.session.flush()
+            complaint = Complaint(title='Replica complaint', description='Routed reads',
+                                  category='noise', complainant_id=author.id, society_id=society.id)
+            db.session.add(complaint)
+            db.session.commit()
+            complaint_id, society_id, reader_id = complaint.id, society.id, reader.id
+            with app.test_request_context():
+                author_headers = {'Authorization': f'Bearer {create_access_token(identity=str(author.id))}'}
+                reader_headers = {'Authorization': f'Bearer {create_access_token(identity=str(reader.id))}'}
+            db.session.remove()
+
+            # The replica is a snapshot; nothing written from here on reaches it
+            with sqlite3.connect(primary_path) as source, sqlite3.connect(replica_path) as target:
+                source.backup(target)
+
+            db.session.add(ComplaintComment(complaint_id=complaint_id, user_id=reader_id,
+                                            comment_text='Only on the primary'))
+            db.session.commit()
+            db.session.remove()
+
+            replica_engine = db.engines[REPLICA_BIND]
+            with replica_engine.connect() as conn:
+                query_only = conn.exec_driver_sql('PRAGMA query_only').scalar()
+        self.log("Replica connections are query-only", query_only == 1, f"query_only={query_only}")
+
+        def comment_count(headers):
+            response = client.get(f'/api/complaints/{complaint_id}/comments', headers=headers)
+            return len(response.get_json()['data']) if response.status_code == 200 else response.status_code
+
+        self.log("GET requests read from the replica", comment_count(reader_headers) == 0,
+                 f"comments seen: {comment_count(reader_headers)}")
+
+        response = client.post(f'/api/complaints/{complaint_id}/comments', headers=author_headers,
+                               json={'comment_text': 'Written to the primary'})
+        with sqlite3.connect(primary_path) as conn:
+            on_primary = conn.execute('SELECT count(*) FROM complaint_comment').fetchone()[0]
+        with sqlite3.connect(replica_path) as conn:
+            on_replica = conn.execute('SELECT count(*) FROM complaint_comment').fetchone()[0]
+        self.log("Writes go to the primary only", response.status_code == 201
+                 and on_primary == 2 and on_replica == 0,
+                 f"status={response.status_code} primary={on_primary} replica={on_replica}")
+
+        author_count, reader_count = comment_count(author_headers), comment_count(reader_headers)
+        self.log("The writer reads their own write from the primary", author_count == 2, str(author_count))
+        self.log("Other users keep reading the replica", reader_count == 0, str(reader_count))
+
+        time.sleep(ReplicaConfig.REPLICA_STICKY_SECONDS + 0.2)
+        author_count = comment_count(author_headers)
+        self.log("Stickiness ends after REPLICA_STICKY_SECONDS", author_count == 0, str(author_count))
+
+        with app.app_context():
+            since = datetime.utcnow() - timedelta(days=1)
+            db.session.add(Complaint(title='Second replica complaint', description='Primary only',
+                                     category='noise', complainant_id=reader_id, society_id=society_id))
+            db.session.commit()
+            db.session.remove()
+            from_replica = WeeklyReportService.collect(since)[society_id]['new_complaints']
+            from_primary = Complaint.query.filter_by(society_id=society_id).count()
+            with replica_reads():
+                explicit = Complaint.query.filter_by(society_id=society_id).count()
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+        self.log("Reporting jobs read from the replica", from_replica == 1 and from_primary == 2,
+                 f"replica={from_replica} primary={from_primary}")
+        self.log("replica_reads() routes a block's reads to the replica", explicit == 1, str(explicit))
+
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    def print_summary(self):
+        """Print test summary."""
+        total = len(self.test_results)
+        passed = sum(1 for r in self.test_results if r['success'])
+        failed = total - passed
+
+        print("\n" + "="*60)
+        print("📊 TEST SUMMARY")
+        print("="*60)
+        print(f"Total Tests: {total}")
+        print(f"✅ Passed: {passed}")
+        print(f"❌ Failed: {failed}")
+        print("="*60)
+
+        if failed > 0:
+            print("\n❌ Failed Tests:")
+            for r in self.test_results:
+                if not r['success']:
+                    print(f"  - {r['test']}: {r['message']}")
+
+        return failed == 0
+
+
+def run_tests():
+    """Run all performance regression tests."""
+    print("="*60)
+    print("⏱️  PADOSI POLITICS - PERFORMANCE REGRESSION TEST")
+    print("="*60)
+    print(f"Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("="*60)
+
+    tester = PerformanceTester()
+    tester.seed()
+
+    tester.test_complaint_list_query_count()
+    tester.test_complaint_cursor_pagination()
+    tester.test_batch_serializer_matches_row_serializer()
+    tester.test_principal_cache()
+    tester.test_society_stats_rollup()
+    tester.test_bulk_auto_escalation()
+    tester.test_karma_aggregates()
+    tester.test_karma_leaderboard()
+    tester.test_monthly_karma_bonus()
+    tester.test_weekly_reports()
+    tester.test_dashboard_stats()
+    tester.test_complaint_search()
+    tester.test_complaint_export()
+    tester.test_evidence_pipeline()
+    tester.test_upload_serving()
+    tester.test_notification_coalescing()
+    tester.test_notification_stream()
+    tester.test_sqlite_cache()
+    tester.test_hot_queries_use_indexes()
+    tester.test_request_instrumentation()
+    tester.test_prometheus_metrics()
+    tester.test_engine_profiles()
+    tester.test_replica_routing()
+
+    return tester.print_summary()
+
+
+if __name__ == '__main__':
+    success = run_tests()
+    sys.exit(0 if success else 1)
@@ -14,6 +14,9 @@ const getBaseURL = () => {
   return '/api'
 }
 
+// Notification stream, optionally served by a separate stream service
+const getStreamURL = () => import.meta.env.VITE_STREAM_URL || getBaseURL()
+
 // Create axios instance
 const api = axios.create({
   baseURL: getBaseURL(),
@@ -158,7 +161,14 @@ export const notificationsAPI = {
   markAsRead: (id) => api.patch(`/notifications/${id}/read`),
   markAllAsRead: () => api.patch('/notifications/mark-all-read'),
   delete: (id) => api.delete(`/notifications/${id}`),
-  clearAll: () => api.delete('/notifications/clear-all')
+  clearAll: () => api.delete('/notifications/clear-all'),
+  // EventSource can't send headers, so a short-lived stream token goes in
+  // the query string (never the access token: URLs end up in logs)
+  getStreamToken: () => api.post('/notifications/stream-token'),
+  openStream: (token, lastEventId) => new EventSource(
+    `${getStreamURL()}/notifications/stream?token=${encodeURIComponent(token)}` +
+    (lastEventId ? `&last_event_id=${encodeURIComponent(lastEventId)}` : '')
+  )
 }
 
 // Dashboard API
@@ -211,7 +221,14 @@ export const notificationsService = {
   getAll: (params) => api.get('/notifications', { params }),
   markAsRead: (id) => api.patch(`/notifications/${id}/read`),
   markAllAsRead: () => api.patch('/notifications/mark-all-read'),
-  clearAll: () => api.delete('/notifications/clear-all')
+  clearAll: () => api.delete('/notifications/clear-all'),
+  // EventSource can't send headers, so a short-lived stream token goes in
+  // the query string (never the access token: URLs end up in logs)
+  getStreamToken: () => api.post('/notifications/stream-token'),
+  openStream: (token, lastEventId) => new EventSource(
+    `${getStreamURL()}/notifications/stream?token=${encodeURIComponent(token)}` +
+    (lastEventId ? `&last_event_id=${encodeURIComponent(lastEventId)}` : '')
+  )
 }
 
 export const dashboardService = {
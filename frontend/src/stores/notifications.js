@@ -18,6 +18,15 @@ export const useNotificationsStore = defineStore('notifications', () => {
   const toasts = ref([])
   let toastId = 0
 
+  // Live updates
+  let stream = null
+  let pollTimer = null
+  let reconnectTimer = null
+  const POLL_INTERVAL = 60000
+  const RECONNECT_MIN = 5000
+  const RECONNECT_MAX = 300000
+  let reconnectDelay = RECONNECT_MIN
+
   // Getters
   const hasUnread = computed(() => unreadCount.value > 0)
 
@@ -100,6 +109,105 @@ export const useNotificationsStore = defineStore('notifications', () => {
     }
   }
 
+  // Live updates: one SSE connection instead of polling the unread count,
+  // while the server has stream capacity. The stream URL carries a
+  // short-lived stream token, fetched on every connect, so the browser's
+  // own reconnect (which would reuse an expired token) is not used. When the
+  // stream closes (recycled, at capacity, 5xx) poll slowly and reconnect
+  // with exponential backoff, resuming after the last event seen; polling
+  // stops as soon as a stream opens again.
+  let streamWanted = false
+  let connecting = false
+  let lastEventId = null
+
+  async function connectStream() {
+    streamWanted = true
+    if (stream || connecting || typeof EventSource === 'undefined') return
+
+    let token
+    connecting = true
+    try {
+      token = (await notificationsAPI.getStreamToken()).data.data.token
+    } catch (err) {
+      token = null
+    } finally {
+      connecting = false
+    }
+    if (!streamWanted || stream) return
+    if (!token) {
+      startPolling()
+      scheduleReconnect()
+      return
+    }
+
+    stream = notificationsAPI.openStream(token, lastEventId)
+
+    stream.onopen = () => {
+      reconnectDelay = RECONNECT_MIN
+      stopPolling()
+    }
+
+    stream.addEventListener('notification', (event) => {
+      lastEventId = event.lastEventId || lastEventId
+      const notification = JSON.parse(event.data)
+      // Coalesced notifications are re-sent with the same id
+      notifications.value = [
+        notification,
+        ...notifications.value.filter(n => n.id !== notification.id)
+      ]
+    })
+
+    stream.addEventListener('unread', (event) => {
+      unreadCount.value = JSON.parse(event.data).unread_count
+    })
+
+    stream.onerror = () => {
+      if (stream) {
+        stream.close()
+        stream = null
+      }
+      startPolling()
+      scheduleReconnect()
+    }
+  }
+
+  function scheduleReconnect() {
+    if (reconnectTimer) return
+    // Jittered so clients refused together don't come back together
+    const delay = reconnectDelay / 2 + Math.random() * reconnectDelay / 2
+    reconnectDelay = Math.min(reconnectDelay * 2, RECONNECT_MAX)
+    reconnectTimer = setTimeout(() => {
+      reconnectTimer = null
+      connectStream()
+    }, delay)
+  }
+
+  function startPolling() {
+    if (pollTimer) return
+    pollTimer = setInterval(fetchUnreadCount, POLL_INTERVAL)
+  }
+
+  function stopPolling() {
+    if (pollTimer) {
+      clearInterval(pollTimer)
+      pollTimer = null
+    }
+  }
+
+  function disconnectStream() {
+    streamWanted = false
+    if (stream) {
+      stream.close()
+      stream = null
+    }
+    if (reconnectTimer) {
+      clearTimeout(reconnectTimer)
+      reconnectTimer = null
+    }
+    reconnectDelay = RECONNECT_MIN
+    stopPolling()
+  }
+
   // Toast management
   function showToast(message, type = 'info', duration = 4000) {
     const id = ++toastId
@@ -150,6 +258,8 @@ export const useNotificationsStore = defineStore('notifications', () => {
     markAllAsRead,
     deleteNotification,
     clearAll,
+    connectStream,
+    disconnectStream,
     showToast,
     removeToast,
     showSuccess,